@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Article output formats: legacy articles.json and streaming NDJSON (JSON Lines)
+
+NDJSON files get one article per line, appended and flushed as soon as the
+article is scraped, so a crash loses at most the article in flight and memory
+stays flat. iter_articles() reads either format back one article at a time.
+"""
+
+import json
+import os
+
+
+NDJSON_EXTENSIONS = ('.ndjson', '.jsonl')
+
+
+def is_ndjson(path):
+    return path.endswith(NDJSON_EXTENSIONS)
+
+
+class JsonSink:
+    """Collects articles in memory and writes a single JSON array on close (legacy format)"""
+
+    streaming = False
+
+    def __init__(self, path):
+        self.path = path
+        self.articles = []
+        self.count = 0
+        self.images = 0
+
+    def write(self, article):
+        self.articles.append(article)
+        self.count += 1
+        self.images += len(article.get('images', []))
+
+    def close(self):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(self.articles, f, ensure_ascii=False, indent=2)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class NdjsonSink:
+    """
+    Appends each article as one JSON line and flushes it immediately
+
+    Articles are not kept in memory; `articles` stays empty. A partial last
+    line left by a crash mid-write is cut off on open, so the next article
+    starts on a line of its own.
+    """
+
+    streaming = True
+
+    def __init__(self, path):
+        self.path = path
+        self.articles = []
+        self.count = 0
+        self.images = 0
+        drop_partial_line(path)
+        self.file = open(path, 'a', encoding='utf-8')
+
+    def write(self, article):
+        self.file.write(json.dumps(article, ensure_ascii=False) + '\n')
+        self.file.flush()
+        self.count += 1
+        self.images += len(article.get('images', []))
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def drop_partial_line(path, chunk_size=65536):
+    """Truncate an unterminated last line (a write cut short by a crash); returns the bytes dropped"""
+    try:
+        f = open(path, 'rb+')
+    except FileNotFoundError:
+        return 0
+    with f:
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return 0
+        f.seek(size - 1)
+        if f.read(1) == b'\n':
+            return 0
+        end = size
+        while end > 0:
+            start = max(0, end - chunk_size)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b'\n')
+            if newline >= 0:
+                end = start + newline + 1
+                break
+            end = start
+        f.truncate(end)
+    print(f"✗ Dropped a partial last line ({size - end} bytes) from {path}")
+    return size - end
+
+
+def open_sink(path):
+    """Sink for `path`, picked by extension (.ndjson/.jsonl stream, anything else is a JSON array)"""
+    return NdjsonSink(path) if is_ndjson(path) else JsonSink(path)
+
+
+def iter_ndjson(path):
+    """Yield articles from an NDJSON file; a truncated last line (crash mid-write) is skipped"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"✗ Skipping malformed line {line_number} in {path}: {e}")
+
+
+def iter_articles(path):
+    """Yield articles from an NDJSON file (streaming) or a legacy JSON array file"""
+    if is_ndjson(path):
+        yield from iter_ndjson(path)
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            yield from json.load(f)
+
+
+def compact_to_json(ndjson_path, json_path):
+    """
+    Write the legacy indented articles.json from an NDJSON file
+
+    Streams record by record; output is byte-identical to json.dump(list, indent=2).
+    Returns the number of articles written.
+    """
+    count = 0
+    tmp_path = json_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as out:
+        for article in iter_ndjson(ndjson_path):
+            out.write('[\n' if count == 0 else ',\n')
+            text = json.dumps(article, ensure_ascii=False, indent=2)
+            out.write('\n'.join('  ' + line for line in text.split('\n')))
+            count += 1
+        out.write('\n]' if count else '[]')
+    os.replace(tmp_path, json_path)
+    return count
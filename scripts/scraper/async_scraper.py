@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+"""
+Concurrent asyncio engine for the aimaqaqshamy.kz scraper
+
+Listing pages, article pages and images are fetched concurrently with aiohttp.
+Politeness is enforced with a per-host concurrency cap and a token-bucket
+rate limit instead of fixed sleeps; the bucket rate follows the same
+AdaptiveDelay and retry policy as the sync engine (http_transport.py), so it
+drops when the server slows down or returns 429/5xx. Output is the same
+articles.json schema as AimaqScraper.
+"""
+
+import asyncio
+import contextlib
+import itertools
+import time
+from urllib.parse import urlparse
+
+import aiohttp
+
+from article_store import open_sink
+from crawl_state import article_hash
+from frontier import Frontier
+from http_transport import parse_retry_after
+from image_store import CHUNK_SIZE
+from parse_pool import ParsePool, parse_page
+from scrape_aimaq import AimaqScraper
+
+
+# Image bytes are handed to a writer thread in pieces of this size
+WRITE_SIZE = 256 * 1024
+
+
+class TokenBucket:
+    """Async token bucket: at most `rate` acquisitions per second, bursts up to `capacity`"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.burst = capacity
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def set_rate(self, rate):
+        """Change the rate; the burst size follows it unless a capacity was given"""
+        self.rate = rate
+        if self.burst is None:
+            self.capacity = max(1.0, rate)
+            self.tokens = min(self.tokens, self.capacity)
+
+    def hold(self, seconds):
+        """No tokens accrue for `seconds` (a Retry-After pause must not turn into a burst)"""
+        self.tokens = 0
+        self.updated = max(self.updated, time.monotonic() + seconds)
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def trace_config():
+    """
+    aiohttp tracing of DNS lookups and connection setup (TCP + TLS)
+
+    Timings go to the Metrics each request passes as trace_request_ctx, so
+    scrapers sharing one session (multi_site.py) each get their own.
+    """
+    config = aiohttp.TraceConfig()
+
+    def started(attr):
+        async def on_start(session, context, params):
+            setattr(context, attr, time.perf_counter())
+        return on_start
+
+    def finished(attr, name):
+        async def on_end(session, context, params):
+            if context.trace_request_ctx is not None:
+                context.trace_request_ctx.observe(name, time.perf_counter() - getattr(context, attr))
+        return on_end
+
+    config.on_dns_resolvehost_start.append(started('dns_start'))
+    config.on_dns_resolvehost_end.append(finished('dns_start', 'scraper_dns_seconds'))
+    config.on_connection_create_start.append(started('connect_start'))
+    config.on_connection_create_end.append(finished('connect_start', 'scraper_connect_seconds'))
+    return config
+
+
+class AsyncAimaqScraper(AimaqScraper):
+    def __init__(self, base_url="https://aimaqaqshamy.kz", output_dir="scraped_data",
+                 per_host=4, rate=5.0, burst=None, timeout=30, page_delay=0.25, max_delay=30,
+                 retries=4, state_file=None, known_run_limit=5, output_format='json', compact_json=False,
+                 parser='lxml', parse_workers=0, archive_dir=None, discovery=None, since=None,
+                 metrics_file=None, job_db=None, job_name=None, profile=None, image_widths=(),
+                 image_format='webp', image_process_workers=None):
+        # Starts at page_delay and speeds up to the --rate ceiling: the delay never goes below 1/rate
+        super().__init__(base_url=base_url, output_dir=output_dir,
+                         page_delay=page_delay, min_delay=1 / rate, max_delay=max_delay, retries=retries,
+                         state_file=state_file, known_run_limit=known_run_limit,
+                         output_format=output_format, compact_json=compact_json, parser=parser,
+                         parse_workers=parse_workers, archive_dir=archive_dir,
+                         discovery=discovery, since=since, metrics_file=metrics_file,
+                         job_db=job_db, job_name=job_name, profile=profile, image_widths=image_widths,
+                         image_format=image_format, image_process_workers=image_process_workers)
+        self.per_host = per_host
+        self.rate = rate
+        self.burst = burst
+        self.timeout = timeout
+        self.http = None
+        self.bucket = None
+        self.host_slots = {}
+        # Concurrency shared with other scrapers in the same event loop (multi_site.py), if any
+        self.budget = None
+        self.parse_pool = None
+        self.parse_slots = None
+
+    def host_slot(self, url):
+        """Semaphore limiting concurrent requests to the host of `url`"""
+        host = urlparse(url).netloc
+        if host not in self.host_slots:
+            self.host_slots[host] = asyncio.Semaphore(self.per_host)
+        return self.host_slots[host]
+
+    @contextlib.asynccontextmanager
+    async def request_slot(self, url):
+        """Hold a slot of the host of `url`, then one of the shared budget, for one request"""
+        async with self.host_slot(url):
+            # Taken second: a site waiting on its own host cap must not sit on budget others could use
+            async with self.budget or contextlib.nullcontext():
+                yield
+
+    async def fetch(self, url):
+        """GET `url` under the rate limit and host cap, return the body bytes"""
+        status, headers, body = await self.fetch_response(url, kind='listing')
+        return body
+
+    async def pace(self):
+        """Wait for a token at the rate the adaptive delay allows, and out any Retry-After pause"""
+        self.bucket.set_rate(1 / self.pacer.delay)
+        await self.bucket.acquire()
+        # Checked after the token: requests queued in the bucket must not go out during a pause
+        paused = self.pacer.paused()
+        if paused:
+            self.bucket.hold(paused)
+            self.metrics.observe('scraper_wait_seconds', paused, reason='pacing')
+            await asyncio.sleep(paused)
+
+    async def with_retries(self, url, label, attempt):
+        """
+        Run `attempt(last)` until it succeeds or the retry policy gives up
+
+        `attempt` sends one request and returns (status, headers, ttfb, result).
+        Retryable statuses are returned without reading the body unless `last`
+        is true, in which case the attempt raises for them as usual.
+        """
+        policy = self.client.policy
+        for number in itertools.count():
+            await self.pace()
+            last = number >= policy.retries
+            sent = time.monotonic()
+            try:
+                status, headers, ttfb, result = await attempt(last)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                self.metrics.inc('scraper_request_errors_total', kind=label)
+                self.pacer.record(error=True, sent=sent)
+                delay = policy.delay(number)
+                if delay is None:
+                    raise
+                reason = 'error'
+            else:
+                retryable = policy.retryable(status)
+                retry_after = parse_retry_after(headers.get('Retry-After')) if retryable else None
+                self.pacer.record(ttfb, error=retryable, throttled=status == 429,
+                                  retry_after=retry_after, sent=sent)
+                delay = policy.delay(number, retry_after) if retryable and not last else None
+                if delay is None:
+                    return result
+                reason = str(status)
+
+            self.metrics.inc('scraper_retries_total', kind=label, reason=reason)
+            self.metrics.observe('scraper_wait_seconds', delay, reason='backoff')
+            await asyncio.sleep(delay)
+
+    async def fetch_response(self, url, headers=None, kind=None):
+        """GET `url` under the rate limit and host cap, with retries; return (status, headers, body)"""
+        label = kind or 'other'
+
+        async def attempt(last):
+            async with self.request_slot(url):
+                start = time.perf_counter()
+                async with self.http.get(url, headers=headers, trace_request_ctx=self.metrics) as response:
+                    ttfb = time.perf_counter() - start
+                    self.metrics.observe('scraper_ttfb_seconds', ttfb, kind=label)
+                    self.metrics.inc('scraper_requests_total', kind=label, status=str(response.status))
+                    if self.client.policy.retryable(response.status) and not last:
+                        return response.status, response.headers, ttfb, None
+                    response.raise_for_status()
+                    body = await response.read()
+                self.metrics.observe('scraper_request_seconds', time.perf_counter() - start, kind=label)
+                self.metrics.inc('scraper_response_bytes_total', len(body), kind=label)
+            return response.status, response.headers, ttfb, (response.status, response.headers, body)
+
+        status, response_headers, body = await self.with_retries(url, label, attempt)
+        self.archive_response(url, status, response_headers, body, kind)
+        return status, response_headers, body
+
+    async def fetch_article_links(self, num_articles=30):
+        """Get links to the latest articles, from discovery or listing pages fetched in parallel windows"""
+        if self.discovery != 'html':
+            # A few small sequential requests: run the sync discovery off the event loop
+            links = await asyncio.to_thread(self.discover_article_links, num_articles)
+            if links is not None:
+                return links
+            print("Falling back to listing pages")
+
+        print(f"Fetching article links from {self.base_url}...")
+        frontier = Frontier(self.profile)
+        article_links = frontier.urls
+        known_run = 0
+        page = 1
+
+        while len(article_links) < num_articles and page <= self.max_pages:
+            # Fetch as many pages at once as the host cap allows, consume them in order
+            window = range(page, min(page + self.per_host, self.max_pages + 1))
+            urls = [self.profile.listing_url(p) for p in window]
+            print(f"Scanning pages {window.start}-{window.stop - 1}...")
+            results = await asyncio.gather(*(self.fetch(url) for url in urls), return_exceptions=True)
+
+            for p, result in zip(window, results):
+                if isinstance(result, Exception):
+                    print(f"Error fetching page {p}: {result}")
+                    return article_links[:num_articles]
+
+                for href in self.extract_article_links(result):
+                    if frontier.add(href):
+                        known_run = self.track_known(href, len(article_links), known_run)
+
+                        if known_run >= self.known_run_limit:
+                            print(f"Reached {known_run} already-known articles in a row, stopping")
+                            return article_links[:num_articles]
+
+                if len(article_links) >= num_articles:
+                    break
+
+            page = window.stop
+
+        if len(article_links) < num_articles:
+            print("Reached page limit")
+
+        return article_links[:num_articles]
+
+    async def fetch_image(self, image_url):
+        """Stream an image into the content-addressed store and return the local path"""
+        try:
+            # Skip if this URL was already downloaded (by any article)
+            local_path = await asyncio.to_thread(self.image_store.lookup, image_url)
+            if local_path:
+                print(f"    Image already stored: {image_url}")
+                return local_path
+
+            print(f"    Downloading image: {image_url}")
+
+            async def attempt(last):
+                async with self.request_slot(image_url):
+                    start = time.perf_counter()
+                    async with self.http.get(image_url, trace_request_ctx=self.metrics) as response:
+                        ttfb = time.perf_counter() - start
+                        self.metrics.inc('scraper_requests_total', kind='image', status=str(response.status))
+                        if self.client.policy.retryable(response.status) and not last:
+                            return response.status, response.headers, ttfb, None
+                        response.raise_for_status()
+                        # Disk writes, hashing and the index commit run off the event loop
+                        pending = await asyncio.to_thread(self.image_store.begin, image_url)
+                        try:
+                            buffered = bytearray()
+                            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                                buffered += chunk
+                                if len(buffered) >= WRITE_SIZE:
+                                    await asyncio.to_thread(pending.write, bytes(buffered))
+                                    buffered.clear()
+                            if buffered:
+                                await asyncio.to_thread(pending.write, bytes(buffered))
+                        except BaseException:
+                            pending.discard()
+                            raise
+
+                local_path = await asyncio.to_thread(pending.commit)
+                self.metrics.observe('scraper_image_seconds', time.perf_counter() - start)
+                self.metrics.inc('scraper_response_bytes_total', pending.size, kind='image')
+                return response.status, response.headers, ttfb, local_path
+
+            return await self.with_retries(image_url, 'image', attempt)
+
+        except Exception as e:
+            print(f"    Error downloading image {image_url}: {e}")
+            return None
+
+    async def fetch_and_parse(self, article_url):
+        """Fetch an article page and parse it, in the worker pool if there is one"""
+        if self.parse_pool is None:
+            status, headers, content = await self.fetch_response(
+                article_url, headers=self.conditional_headers(article_url), kind='article')
+            if status == 304:
+                return status, headers, None
+            return status, headers, self.parse_article(content, article_url)
+
+        # A parse slot is held from fetch to parsed dict, bounding the raw pages held in memory
+        async with self.parse_slots:
+            status, headers, content = await self.fetch_response(
+                article_url, headers=self.conditional_headers(article_url), kind='article')
+            if status == 304:
+                return status, headers, None
+            loop = asyncio.get_running_loop()
+            article_data, seconds = await loop.run_in_executor(
+                self.parse_pool.executor, parse_page, article_url, content, self.profile)
+            self.metrics.observe('scraper_parse_seconds', seconds, stage='article')
+            return status, headers, article_data
+
+    async def fetch_article(self, article_url):
+        """Scrape a single article, downloading its images concurrently"""
+        print(f"\nScraping: {article_url}")
+        self.jobs.start(self.job, article_url)
+
+        try:
+            status, headers, article_data = await self.fetch_and_parse(article_url)
+            if status == 304:
+                self.skip_unchanged(article_url, headers, "Not modified (304)")
+                return None
+
+            content_hash = article_hash(article_data)
+            if self.state and self.state.is_unchanged(article_url, content_hash):
+                self.skip_unchanged(article_url, headers, "Content unchanged")
+                return None
+
+            downloads = self.image_downloads(article_data)
+            local_paths = await asyncio.gather(*(self.fetch_image(url) for url in downloads))
+            self.attach_images(article_data, list(local_paths))
+            # Waits on the image process pool (if any) off the event loop
+            await asyncio.to_thread(self.image_processor.annotate, article_data.get('images', []))
+
+            self.remember(article_url, headers, article_data, content_hash)
+            self.print_article_summary(article_data)
+
+            return article_data
+
+        except Exception as e:
+            print(f"  ✗ Error scraping {article_url}: {e}")
+            self.record_failure(article_url, e)
+            return None
+
+    async def crawl(self, sink, num_articles=30, article_links=None):
+        """
+        Discover and scrape articles concurrently into `sink`
+
+        `article_links` skips discovery (the pending items of a resumed job).
+
+        Streaming sinks get each article as soon as it completes; the JSON sink
+        gets them in listing order from the job queue once the crawl is done.
+        """
+        print(f"Starting async scrape of {num_articles} articles from {self.base_url}")
+        print(f"Per-host concurrency: {self.per_host}, rate limit: {self.rate} req/s\n")
+        print("=" * 70)
+
+        parse_pool = ParsePool(parser=self.parser_name, base_url=self.base_url, profile=self.profile,
+                               workers=self.parse_workers) if self.parse_workers else None
+
+        # Sized to the host cap; idle connections are kept alive between requests
+        connector = aiohttp.TCPConnector(limit_per_host=self.per_host, keepalive_timeout=30,
+                                         ttl_dns_cache=300)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        headers = dict(self.session.headers)
+
+        with parse_pool or contextlib.nullcontext():
+            async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=headers,
+                                             trace_configs=[trace_config()]) as http:
+                await self.run(http, sink, num_articles, article_links, parse_pool)
+
+    async def run(self, http, sink, num_articles=30, article_links=None, parse_pool=None, budget=None):
+        """
+        The crawl itself, on an open aiohttp session
+
+        Several scrapers can run on one event loop and one session this way,
+        with `budget` (an asyncio.Semaphore) capping their requests in flight
+        together; see multi_site.py.
+        """
+        self.bucket = TokenBucket(self.rate, self.burst)
+        self.host_slots = {}
+        self.budget = budget
+
+        async def scrape(link):
+            article_data = await self.fetch_article(link)
+            if article_data:
+                self.emit(sink, link, article_data)
+
+        self.http = http
+        self.parse_pool = parse_pool
+        if parse_pool:
+            self.parse_slots = asyncio.Semaphore(parse_pool.queue_size + parse_pool.workers)
+        try:
+            if article_links is None:
+                with self.metrics.timer('scraper_stage_seconds', stage='links'):
+                    article_links = await self.fetch_article_links(num_articles)
+                print(f"\n✓ Found {len(article_links)} article links\n")
+                article_links = self.begin_job(article_links, num_articles)
+            print("=" * 70)
+
+            with self.metrics.timer('scraper_stage_seconds', stage='articles'):
+                await asyncio.gather(*(scrape(link) for link in article_links))
+        finally:
+            self.http = None
+            self.parse_pool = None
+            self.budget = None
+
+    def scrape_articles(self, num_articles=30, resume=None):
+        """Main method to scrape multiple articles (or the rest of job `resume`)"""
+        article_links = None
+        if resume:
+            article_links = self.resume_job(resume)
+            if article_links is None:
+                return []
+
+        with open_sink(self.output_file) as sink, self.image_processor:
+            try:
+                asyncio.run(self.crawl(sink, num_articles, article_links))
+            except KeyboardInterrupt:
+                if self.job:
+                    print(f"\n✗ Interrupted: continue with --resume {self.job}")
+                raise
+            finally:
+                if self.job:
+                    self.close_job(sink)
+
+        self.print_run_summary(sink)
+        return sink.articles
+
+
+def main():
+    scraper = AsyncAimaqScraper(
+        base_url="https://aimaqaqshamy.kz",
+        output_dir="scraped_data"
+    )
+    scraper.scrape_articles(num_articles=30)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark: offline categorizer training time, accuracy and labelling rate
+
+The synthetic corpus (synthetic_corpus.py) draws every article from one
+shared vocabulary, so here each CMS category also gets a topic vocabulary:
+a share of an article's words (--signal, 3% by default) comes from its
+category's topic, some of it from a second category's, and the rest is the
+shared text. Trains on 90% of the articles, reports held-out accuracy and
+how many articles each confidence threshold leaves for the LLM, then times
+labelling at several batch sizes.
+"""
+
+import argparse
+import random
+import time
+
+from categorizer import Categorizer, evaluate
+from synthetic_corpus import WORDS, synthetic_articles
+
+
+# Slugs from the CMS categorization prompt (apps/api/scripts/categorize-articles.ts)
+TOPICS = {
+    'zhanalyqtar': "жаңалық хабарлады мәлімдеді оқиға апат өрт полиция жол-көлік тергеу куәгер "
+                   "новость сообщили происшествие пожар полиция авария",
+    'ozekti': "өзекті мәселе шағым тұрғындар наразылық баға тариф кезек жетіспеушілік "
+              "актуально проблема жалоба тариф очередь нехватка",
+    'sayasat': "парламент мәжіліс сенат депутат заң президент жарлық сайлау партия министр үкімет "
+               "парламент депутат закон президент указ выборы партия министр",
+    'madeniyet': "мәдениет театр спектакль ақын жыр күй домбыра мұражай көрме фестиваль әнші "
+                 "культура театр спектакль поэт концерт выставка фестиваль",
+    'qogam': "қоғам отбасы зейнеткер жәрдемақы мүгедек волонтер қайырымдылық жастар әлеуметтік "
+             "общество семья пенсионер пособие волонтер благотворительность",
+    'kazakhmys': "қазақмыс кеніш мыс кен өндіру металлургия шахта кенші байыту фабрика "
+                 "казахмыс рудник медь добыча металлургия шахта горняк",
+}
+
+
+def labelled_corpus(count, signal, seed=0):
+    """(articles, labels): synthetic articles with topic words of their category mixed in"""
+    rng = random.Random(seed)
+    topics = {slug: words.split() for slug, words in TOPICS.items()}
+    slugs = list(topics)
+    # Real desks are uneven: ordinary news dominates
+    weights = [6, 2, 2, 1.5, 2, 1]
+    articles, labels = [], []
+    for article in synthetic_articles(count, seed=seed):
+        slug = rng.choices(slugs, weights=weights)[0]
+        other = rng.choice(slugs)
+        words = article['content'].split()
+        for i in range(len(words)):
+            roll = rng.random()
+            if roll < signal:
+                words[i] = rng.choice(topics[slug])
+            elif roll < signal * 1.4:
+                words[i] = rng.choice(topics[other])
+        article['content'] = ' '.join(words)
+        title = article['title'].split()
+        title[rng.randrange(len(title))] = rng.choice(topics[slug] if rng.random() < 0.6 else WORDS)
+        article['title'] = ' '.join(title)
+        articles.append(article)
+        labels.append(slug)
+    return articles, labels
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-n', '--articles', type=int, default=20000)
+    parser.add_argument('--signal', type=float, default=0.03, help="Share of words from the category's topic")
+    args = parser.parse_args()
+
+    print(f"Generating {args.articles} labelled articles...")
+    articles, labels = labelled_corpus(args.articles, args.signal)
+    cut = int(len(articles) * 0.9)
+
+    start = time.perf_counter()
+    model = Categorizer.train(articles[:cut], labels[:cut])
+    print(f"Trained on {cut} articles in {time.perf_counter() - start:.1f} s "
+          f"({len(model.classes)} categories)\n")
+    evaluate(model, articles[cut:], labels[cut:])
+
+    print(f"\n{'batch size':>10} {'articles/s':>11}")
+    for batch_size in (1, 100, 1000, 5000):
+        sample = articles[:max(batch_size * 3, 2000)]
+        start = time.perf_counter()
+        for _ in model.label(sample, batch_size=batch_size):
+            pass
+        print(f"{batch_size:>10} {len(sample) / (time.perf_counter() - start):>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
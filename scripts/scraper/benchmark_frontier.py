@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Benchmark: URL de-duplication and the seen-set (url_canon.py, frontier.py)
+
+Three parts, on synthetic article URLs of aimaqaqshamy.kz:
+- duplicates: each URL also appears in spellings seen in the wild (http,
+  www., no trailing slash, utm_* parameters, #fragment, upper-case escapes,
+  raw Cyrillic);
+  counts the distinct URLs a raw string comparison and canonical_url() find
+- discovery: de-duplicating a pass of links with `href not in list` (the old
+  get_article_links), with a set, and with Frontier (set and canonical_url)
+- seen-set: memory and lookups per second of a Python set, the scalable
+  Bloom filter (SeenSet) and the crawl state database, over --urls URLs;
+  plus the Bloom filter's measured false positive rate on URLs never added
+"""
+
+import argparse
+import os
+import random
+import re
+import tempfile
+import time
+import tracemalloc
+from urllib.parse import quote, unquote
+
+from crawl_state import CrawlState
+from frontier import Frontier, ScalableBloomFilter
+from site_profiles import AIMAQ
+from url_canon import canonical_url
+
+
+BASE_URL = AIMAQ.base_url
+SECTIONS = ['qogham', 'zhanalyq', 'ekonomika', 'sport', 'madeniet', 'bilim']
+WORDS = ['aqmola', 'ауыл', 'жаңа', 'мектеп', 'жол', 'su', 'tender', 'денсаулық', 'ферма', 'oblys']
+
+
+def article_url(i):
+    rng = random.Random(i)
+    slug = '-'.join(rng.sample(WORDS, 3)) + f'-{i}'
+    return f"{BASE_URL}/{rng.choice(SECTIONS)}/{quote(slug).lower()}/"
+
+
+def variants(url):
+    """The spellings of one article URL that listing pages, feeds and shared links produce"""
+    bare = url.rstrip('/')
+    return [
+        url,
+        url.replace('https://', 'http://'),
+        url.replace('://', '://www.'),
+        bare,
+        url + '?utm_source=facebook&utm_medium=social',
+        url + '#comments',
+        re.sub(r'%[0-9a-f]{2}', lambda match: match.group().upper(), url),
+        unquote(url),
+    ]
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def measure_memory(build):
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def duplicates(n):
+    links = [variant for i in range(n) for variant in variants(article_url(i))]
+    raw = len(set(links))
+    canonical = len({canonical_url(link, BASE_URL) for link in links})
+    print(f"Duplicates: {n} articles linked in {len(links)} spellings")
+    print(f"  raw strings      {raw:>8} distinct URLs")
+    print(f"  canonical_url    {canonical:>8} distinct URLs\n")
+
+
+def discovery(sizes):
+    print("Discovery: a pass of n links, half of them repeats")
+    print(f"  {'links':>8} {'href not in list':>17} {'set':>8} {'Frontier':>9}   (seconds; Frontier includes canonical_url)")
+    for n in sizes:
+        links = [article_url(i % (n // 2)) for i in range(n)]
+        random.Random(0).shuffle(links)
+
+        def with_list():
+            article_links = []
+            for href in links:
+                if href not in article_links:
+                    article_links.append(href)
+            return article_links
+
+        def with_set():
+            article_links, found = [], set()
+            for href in links:
+                if href not in found:
+                    found.add(href)
+                    article_links.append(href)
+            return article_links
+
+        def with_frontier():
+            frontier = Frontier(AIMAQ)
+            for href in links:
+                frontier.add(href)
+            return frontier.urls
+
+        seconds = [timed(function)[1] for function in (with_list, with_set, with_frontier)]
+        print(f"  {n:>8} {seconds[0]:>17.3f} {seconds[1]:>8.3f} {seconds[2]:>9.3f}")
+    print()
+
+
+def seen_set(n, lookups, error_rate):
+    urls = [article_url(i) for i in range(n)]
+    present = random.Random(1).sample(urls, lookups // 2)
+    absent = [article_url(n + i) for i in range(lookups // 2)]
+    probes = present + absent
+    random.Random(2).shuffle(probes)
+
+    python_set, set_bytes = measure_memory(lambda: set(urls))
+
+    def build_bloom():
+        bloom = ScalableBloomFilter(error_rate=error_rate)
+        for url in urls:
+            bloom.add(url)
+        return bloom
+    bloom, bloom_seconds = timed(build_bloom)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        state = CrawlState(os.path.join(tmp, 'crawl_state.db'))
+        with state.connection:
+            state.connection.executemany("INSERT INTO pages (url) VALUES (?)", ((url,) for url in urls))
+        database_bytes = os.path.getsize(state.path)
+        bloom_path = os.path.join(tmp, 'crawl_state.seen')
+        bloom.save(bloom_path)
+        file_bytes = os.path.getsize(bloom_path)
+
+        def lookup(contains):
+            return sum(1 for url in probes if contains(url))
+
+        rows = [
+            ('Python set', set_bytes, lookup, python_set.__contains__),
+            ('Bloom filter', bloom.nbytes, lookup, bloom.__contains__),
+            ('crawl state (SQLite)', database_bytes, lookup, state.is_known),
+            ('Bloom, then SQLite', bloom.nbytes, lookup, lambda url: url in bloom and state.is_known(url)),
+        ]
+        print(f"Seen-set: {n:,} URLs, {lookups:,} lookups (half of them URLs never added); "
+              f"Bloom filter built in {bloom_seconds:.1f} s, saved as {file_bytes / 2 ** 20:.1f} MB")
+        print(f"  {'':<22} {'MB':>8} {'lookups/s':>11}")
+        for name, size, function, contains in rows:
+            _, seconds = timed(function, contains)
+            print(f"  {name:<22} {size / 2 ** 20:>8.1f} {lookups / seconds:>11,.0f}")
+        state.close()
+
+    false_positives = sum(1 for url in absent if url in bloom)
+    print(f"\n  Bloom filter: {len(bloom.filters)} filters, {bloom.nbytes * 8 / n:.1f} bits/URL, "
+          f"false positives {false_positives}/{len(absent)} = {false_positives / len(absent):.3%} "
+          f"(bound {error_rate:.1%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--articles', type=int, default=10000, help="Articles in the duplicates part")
+    parser.add_argument('--links', default='1000,10000,40000', help="Comma-separated pass sizes, discovery part")
+    parser.add_argument('--urls', type=int, default=1000000, help="URLs in the seen-set part")
+    parser.add_argument('--lookups', type=int, default=200000)
+    parser.add_argument('--error-rate', type=float, default=0.001)
+    args = parser.parse_args()
+
+    duplicates(args.articles)
+    discovery([int(n) for n in args.links.split(',')])
+    seen_set(args.urls, args.lookups, args.error_rate)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark: image size probing and responsive variant generation, in images/sec
+
+Generates synthetic JPEG photos (needs Pillow), stores them in a temporary
+ImageStore and measures:
+  - probe_size() (header only) against PIL.Image.open().size and a full decode
+  - ImageProcessor making WebP variants with 1..N worker processes
+  - a second pass over the same images, answered from the cache
+and the bytes a reader downloads: originals vs the largest variant.
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from image_store import ImageStore
+from image_variants import DEFAULT_WIDTHS, Image, ImageProcessor, probe_size
+
+
+def synthetic_photo(path, width, height, seed):
+    """Blurred colour noise over a gradient: compresses like a photo, not like a flat fill"""
+    from PIL import ImageFilter
+
+    rng = random.Random(seed)
+    channels = []
+    for _ in range(3):
+        noise = Image.effect_noise((width // 4, height // 4), rng.uniform(30, 80))
+        gradient = Image.linear_gradient('L').rotate(rng.uniform(0, 360)).resize(noise.size)
+        channel = Image.blend(noise, gradient, 0.5).filter(ImageFilter.GaussianBlur(1.5))
+        channels.append(channel.resize((width, height), Image.BICUBIC))
+    Image.merge('RGB', channels).save(path, 'JPEG', quality=85)
+
+
+def images_per_second(count, elapsed):
+    return count / elapsed if elapsed else float('inf')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-n', '--images', type=int, default=60)
+    parser.add_argument('--size', default='1600x1067', help="Photo size, WxH")
+    parser.add_argument('--widths', default=','.join(map(str, DEFAULT_WIDTHS)))
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    if Image is None:
+        print("This benchmark needs Pillow: pip install pillow")
+        return
+
+    width, height = (int(v) for v in args.size.split('x'))
+    widths = tuple(int(w) for w in args.widths.split(','))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sources = os.path.join(tmp, 'sources')
+        os.makedirs(sources)
+        print(f"Generating {args.images} photos of {width}x{height}...")
+        paths = []
+        for i in range(args.images):
+            path = os.path.join(sources, f"photo-{i}.jpg")
+            synthetic_photo(path, width, height, seed=i)
+            paths.append(path)
+
+        print(f"\n{'probe':<26} {'images/s':>10}")
+        for name, probe in (
+            ('probe_size (header)', probe_size),
+            ('PIL.Image.open().size', lambda p: Image.open(p).size),
+            ('full decode', lambda p: Image.open(p).convert('RGB').size),
+        ):
+            start = time.perf_counter()
+            sizes = [probe(path) for path in paths]
+            elapsed = time.perf_counter() - start
+            assert all(size == (width, height) for size in sizes), name
+            print(f"{name:<26} {images_per_second(len(paths), elapsed):>10.0f}")
+
+        print(f"\n{'variants ' + ','.join(map(str, widths)):<26} {'workers':>8} {'images/s':>10} {'cached/s':>10}")
+        original_bytes = variant_bytes = 0
+        for workers in sorted({1, args.max_workers}):
+            store = ImageStore(os.path.join(tmp, f'store-{workers}'))
+            images = []
+            for i, path in enumerate(paths):
+                pending = store.begin(f"https://example.kz/wp-content/uploads/photo-{i}.jpg")
+                with open(path, 'rb') as f:
+                    pending.write(f.read())
+                stored = pending.commit()
+                images.append({'local_path': stored, 'sha256': os.path.splitext(os.path.basename(stored))[0]})
+
+            with ImageProcessor(store, widths, workers=workers) as processor:
+                start = time.perf_counter()
+                processor.annotate(images)
+                elapsed = time.perf_counter() - start
+
+                again = [{k: v for k, v in image.items() if k in ('local_path', 'sha256')} for image in images]
+                start = time.perf_counter()
+                processor.annotate(again)
+                cached_elapsed = time.perf_counter() - start
+
+            assert processor.processed == len(images) and processor.cached == len(images)
+            print(f"{'':<26} {workers:>8} {images_per_second(len(images), elapsed):>10.1f} "
+                  f"{images_per_second(len(again), cached_elapsed):>10.0f}")
+            original_bytes = sum(os.path.getsize(image['local_path']) for image in images)
+            variant_bytes = sum(max(v['bytes'] for v in image['variants']) for image in images)
+
+        print(f"\nOriginals: {original_bytes / len(paths) / 1024:.0f} KB/image; "
+              f"largest WebP variant ({max(widths)} px): {variant_bytes / len(paths) / 1024:.0f} KB/image "
+              f"({1 - variant_bytes / original_bytes:.0%} less)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Benchmark: ArticleImporter.import_to_sql vs import_to_sql_batched on SQLite
+
+Imports a synthetic corpus (synthetic_corpus.py) into a fresh on-disk SQLite
+database with each method and reports rows/sec. A second batched pass over
+the same corpus measures the re-import (upsert) path.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sqlite3
+import tempfile
+import time
+
+from import_to_db import ArticleImporter
+from synthetic_corpus import synthetic_articles
+
+
+def timed_import(db_path, method, articles, **kwargs):
+    conn = sqlite3.connect(db_path)
+    importer = ArticleImporter()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        getattr(importer, method)(conn, articles, **kwargs)
+    elapsed = time.perf_counter() - start
+    article_rows = conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+    image_rows = conn.execute("SELECT COUNT(*) FROM article_images").fetchone()[0]
+    conn.close()
+    return elapsed, article_rows, image_rows
+
+
+def report(name, count, elapsed, article_rows, image_rows):
+    print(f"{name:<22} {count:>8} {elapsed:>9.2f} {count / elapsed:>14,.0f} "
+          f"{article_rows:>9} {image_rows:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-n', '--num-articles', type=int, default=100000)
+    parser.add_argument('--legacy-articles', type=int, default=20000,
+                        help="Corpus size for the row-by-row import (it is much slower)")
+    parser.add_argument('--batch-size', type=int, default=5000)
+    args = parser.parse_args()
+
+    print("Generating corpus...")
+    corpus = list(synthetic_articles(args.num_articles))
+    legacy_corpus = corpus[:args.legacy_articles]
+
+    print(f"\n{'method':<22} {'articles':>8} {'seconds':>9} {'articles/sec':>14} "
+          f"{'db rows':>9} {'images':>9}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_db = os.path.join(tmp, 'legacy.db')
+        report('import_to_sql', len(legacy_corpus),
+               *timed_import(legacy_db, 'import_to_sql', legacy_corpus))
+
+        batched_db = os.path.join(tmp, 'batched.db')
+        report('batched (insert)', len(corpus),
+               *timed_import(batched_db, 'import_to_sql_batched', corpus, batch_size=args.batch_size))
+        report('batched (re-import)', len(corpus),
+               *timed_import(batched_db, 'import_to_sql_batched', corpus, batch_size=args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark: ArticleImporter.import_to_mongodb vs import_to_mongodb_batched
+
+Imports a synthetic corpus (synthetic_corpus.py) into an empty collection
+(with the unique original_url index) with each method and reports
+articles/sec and the number of calls to the collection (round-trips); a
+second batched pass measures the re-import (upsert of existing URLs) path.
+Runs against a real server with --mongo-url, otherwise against mongomock
+in-process. mongomock has no network, so every call to it is delayed by
+--latency milliseconds to stand in for the round-trip to a remote cluster.
+It also scans the whole collection for every upsert and unique index check,
+so keep -n small there and expect its own CPU time in the totals.
+
+    pip install pymongo mongomock
+    python benchmark_mongodb.py -n 2000 --latency 5
+    python benchmark_mongodb.py -n 50000 --mongo-url mongodb://localhost:27017/
+"""
+
+import argparse
+import contextlib
+import io
+import time
+
+from import_to_db import ArticleImporter
+from synthetic_corpus import synthetic_articles
+
+
+class CountedCollection:
+    """Wraps a collection; counts method calls, sleeping `latency` seconds before each"""
+
+    def __init__(self, collection, latency=0):
+        self.collection = collection
+        self.latency = latency
+        self.calls = 0
+
+    def __getattr__(self, name):
+        attribute = getattr(self.collection, name)
+        if not callable(attribute):
+            return attribute
+
+        def counted(*args, **kwargs):
+            self.calls += 1
+            if self.latency:
+                time.sleep(self.latency)
+            return attribute(*args, **kwargs)
+        return counted
+
+
+def timed_import(collection, method, articles, **kwargs):
+    importer = ArticleImporter()
+    calls = collection.calls
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        getattr(importer, method)(collection, articles, **kwargs)
+    elapsed = time.perf_counter() - start
+    return elapsed, collection.calls - calls, collection.collection.count_documents({})
+
+
+def report(name, count, elapsed, calls, documents):
+    print(f"{name:<24} {count:>8} {elapsed:>9.2f} {count / elapsed:>14,.0f} {calls:>12} {documents:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-n', '--num-articles', type=int, default=2000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--mongo-url', help="Benchmark a real server instead of mongomock")
+    parser.add_argument('--latency', type=float, default=5.0,
+                        help="Simulated round-trip in ms per mongomock call")
+    args = parser.parse_args()
+
+    if args.mongo_url:
+        from pymongo import MongoClient
+        client = MongoClient(args.mongo_url)
+        target = f"{args.mongo_url} (database benchmark_import, dropped afterwards)"
+    else:
+        import mongomock
+        client = mongomock.MongoClient()
+        target = f"mongomock, {args.latency:g} ms simulated round-trip"
+    database = client['benchmark_import']
+
+    def collection(name):
+        database.drop_collection(name)
+        database[name].create_index('original_url', unique=True)
+        return CountedCollection(database[name], 0 if args.mongo_url else args.latency / 1000)
+
+    print("Generating corpus...")
+    corpus = list(synthetic_articles(args.num_articles))
+
+    print(f"\nTarget: {target}")
+    print(f"\n{'method':<24} {'articles':>8} {'seconds':>9} {'articles/sec':>14} {'round-trips':>12} {'documents':>10}")
+    try:
+        report('import_to_mongodb', len(corpus),
+               *timed_import(collection('legacy'), 'import_to_mongodb', corpus))
+
+        batched = collection('batched')
+        report('batched (insert)', len(corpus),
+               *timed_import(batched, 'import_to_mongodb_batched', corpus, batch_size=args.batch_size))
+        report('batched (re-import)', len(corpus),
+               *timed_import(batched, 'import_to_mongodb_batched', corpus, batch_size=args.batch_size))
+    finally:
+        if args.mongo_url:
+            client.drop_database('benchmark_import')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark: N sites scraped one after another vs concurrently with MultiSiteScraper
+
+Each site is its own stub server (stub_server.py); every other one uses a
+different theme (post and content classes, no <article> element) and is
+read through a matching site profile. The serial baseline runs one
+AsyncAimaqScraper per site in turn, like N scripts run from cron; the
+multi-site run crawls all of them in one event loop under a global budget.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from async_scraper import AsyncAimaqScraper
+from benchmark_scraper import comparable
+from multi_site import MultiSiteScraper
+from site_profiles import SiteProfile
+from stub_server import StubServer, StubSite
+
+
+def site_and_profile(i):
+    """(StubSite, profile without base_url) for site number i, alternating themes"""
+    if i % 2 == 0:
+        return StubSite(pages=5, per_page=10), dict(name=f"site{i}", discovery='html')
+    site = StubSite(pages=5, per_page=10, post_class='news-card', content_class='news-text',
+                    article_tag='section')
+    return site, dict(name=f"site{i}", discovery='html', post_class='news-card',
+                      content_classes=('news-text',))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sites', type=int, default=4)
+    parser.add_argument('-n', '--num-articles', type=int, default=20, help="Articles per site")
+    parser.add_argument('--latency', type=float, default=0.05,
+                        help="Simulated server latency per request, seconds")
+    parser.add_argument('--concurrency', type=int, default=16, help="Global budget of requests in flight")
+    parser.add_argument('--per-host', type=int, default=4)
+    parser.add_argument('--rate', type=float, default=50.0, help="Requests/second per site")
+    args = parser.parse_args()
+
+    print(f"{args.sites} stub sites, {args.num_articles} articles each, latency "
+          f"{args.latency * 1000:.0f} ms/request, {args.per_host} per host, {args.rate:g} req/s per site\n")
+
+    with contextlib.ExitStack() as stack:
+        profiles = []
+        servers = []
+        for i in range(args.sites):
+            site, options = site_and_profile(i)
+            server = stack.enter_context(StubServer(site=site, latency=args.latency))
+            servers.append(server)
+            profiles.append(SiteProfile(base_url=server.base_url, **options))
+        serial_dir = stack.enter_context(tempfile.TemporaryDirectory())
+        multi_dir = stack.enter_context(tempfile.TemporaryDirectory())
+
+        serial = {}
+        start = time.perf_counter()
+        for profile in profiles:
+            scraper = AsyncAimaqScraper(output_dir=os.path.join(serial_dir, profile.name), profile=profile,
+                                        per_host=args.per_host, rate=args.rate, page_delay=0)
+            with contextlib.redirect_stdout(io.StringIO()):
+                serial[profile.name] = scraper.scrape_articles(num_articles=args.num_articles)
+        serial_time = time.perf_counter() - start
+        serial_requests = sum(server.requests for server in servers)
+
+        runner = MultiSiteScraper(profiles, output_dir=multi_dir, concurrency=args.concurrency,
+                                  per_host=args.per_host, rate=args.rate, page_delay=0)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            multi = runner.scrape_all(num_articles=args.num_articles)
+        multi_time = time.perf_counter() - start
+        multi_requests = sum(server.requests for server in servers) - serial_requests
+
+    print(f"{'run':<12} {'articles':>9} {'requests':>9} {'seconds':>9} {'articles/s':>11}")
+    for name, results, requests, elapsed in (
+        ('serial', serial, serial_requests, serial_time),
+        ('multi-site', multi, multi_requests, multi_time),
+    ):
+        count = sum(len(articles) for articles in results.values())
+        print(f"{name:<12} {count:>9} {requests:>9} {elapsed:>9.2f} {count / elapsed:>11.1f}")
+
+    print(f"\nSpeedup: {serial_time / multi_time:.1f}x")
+    complete = all(len(articles) == args.num_articles and
+                   all(article.get('content') for article in articles)
+                   for articles in multi.values())
+    same = all(comparable(serial[name]) == comparable(multi[name]) for name in serial)
+    print(f"Every site complete: {'yes' if complete else 'NO'}")
+    print(f"Identical output: {'yes' if same else 'NO'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Benchmark: near-duplicate index build rate, lookup latency and recall at 100k articles
+
+Indexes a synthetic corpus (synthetic_corpus.py) with NearDuplicateIndex.build()
+and compares the build rate with article-by-article add() and with pure-Python
+signatures. Then looks up
+  - planted near-duplicates: corpus articles with a paragraph dropped, a few
+    words replaced and a source line appended (what a re-post looks like)
+  - rewrites: half of the paragraphs replaced (same story, new text)
+  - fresh articles that are not in the corpus
+and reports how many of each were matched (all reposts should be, nothing
+else), the exact Jaccard similarity of their shingle sets to the original,
+and lookup latency with and without computing the signature.
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import near_duplicates
+from near_duplicates import NearDuplicateIndex, minhash, shingle_hashes, signature, word_hashes
+from synthetic_corpus import WORDS, synthetic_articles
+
+
+def repost(content, rng):
+    """Drop one paragraph, replace three words, append a source line"""
+    paragraphs = content.split('\n\n')
+    del paragraphs[rng.randrange(len(paragraphs))]
+    words = '\n\n'.join(paragraphs).split(' ')
+    for _ in range(3):
+        words[rng.randrange(len(words))] = rng.choice(WORDS)
+    return ' '.join(words) + '\n\nДереккөз: aimaqaqshamy.kz'
+
+
+def rewrite(content, rng):
+    """Replace every other paragraph with new text"""
+    paragraphs = content.split('\n\n')
+    for i in range(0, len(paragraphs), 2):
+        paragraphs[i] = ' '.join(rng.choices(WORDS, k=40)).capitalize() + '.'
+    return '\n\n'.join(paragraphs)
+
+
+def jaccard(a, b):
+    a, b = shingle_hashes(word_hashes(a)), shingle_hashes(word_hashes(b))
+    return len(a & b) / len(a | b)
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-n', '--articles', type=int, default=100_000)
+    parser.add_argument('--queries', type=int, default=1000, help="Lookups of each kind")
+    parser.add_argument('--threshold', type=float, default=near_duplicates.THRESHOLD)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    print(f"Generating {args.articles} articles...")
+    corpus = list(synthetic_articles(args.articles))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'near_duplicates.db')
+        print(f"\n{'build':<28} {'articles/s':>11}")
+        with NearDuplicateIndex(path, threshold=args.threshold) as index:
+            start = time.perf_counter()
+            index.build(corpus)
+            elapsed = time.perf_counter() - start
+            print(f"{'build() with NumPy':<28} {args.articles / elapsed:>11.0f}   "
+                  f"({elapsed:.1f} s for {len(index)} articles)")
+
+        sample = corpus[:2000]
+        with NearDuplicateIndex(os.path.join(tmp, 'incremental.db')) as other:
+            start = time.perf_counter()
+            for article in sample:
+                other.add(article['url'], article['content'])
+            other.commit()
+            print(f"{'add() one by one':<28} {len(sample) / (time.perf_counter() - start):>11.0f}")
+        start = time.perf_counter()
+        for article in sample[:200]:
+            minhash(shingle_hashes(word_hashes(article['content'])))
+        print(f"{'pure-Python signatures':<28} {200 / (time.perf_counter() - start):>11.0f}   (signatures only)")
+
+        originals = rng.sample(corpus, args.queries)
+        fresh = list(synthetic_articles(args.queries, seed=2, base_url='https://example.kz'))
+        queries = {
+            'repost': [(repost(a['content'], rng), a) for a in originals],
+            'rewrite': [(rewrite(a['content'], rng), a) for a in originals],
+            'fresh': [(a['content'], None) for a in fresh],
+        }
+
+        print(f"\n{'lookup':<9} {'similarity':>15} {'matched':>10} "
+              f"{'p50 ms':>8} {'p99 ms':>8} {'+signature p50':>15}")
+        with NearDuplicateIndex(path, threshold=args.threshold) as index:
+            for kind, items in queries.items():
+                matched = 0
+                lookups, totals, similarities = [], [], []
+                for content, original in items:
+                    start = time.perf_counter()
+                    sig = signature(content)
+                    computed = time.perf_counter()
+                    match = index.find(content, sig=sig)
+                    done = time.perf_counter()
+                    lookups.append(done - computed)
+                    totals.append(done - start)
+
+                    if original:
+                        similarities.append(jaccard(content, original['content']))
+                        # A repost must match its own original, not just anything
+                        matched += bool(match and (kind != 'repost' or match[0] == original['url']))
+                    else:
+                        similarities.append(0.0)
+                        matched += match is not None
+                spread = f"{min(similarities):.2f}-{max(similarities):.2f}"
+                print(f"{kind:<9} {spread:>15} {f'{matched}/{len(items)}':>10} "
+                      f"{percentile(lookups, 0.5) * 1000:>8.3f} {percentile(lookups, 0.99) * 1000:>8.3f} "
+                      f"{percentile(totals, 0.5) * 1000:>15.3f}")
+
+        size = sum(os.path.getsize(os.path.join(tmp, name)) for name in os.listdir(tmp)
+                   if name.startswith('near_duplicates.db'))
+        print(f"\nIndex: {size / 1024 / 1024:.1f} MB for {args.articles} articles "
+              f"({size / args.articles:.0f} bytes/article)")
+        print(f"similarity: exact Jaccard of the shingle sets to the original (range); "
+              f"threshold {args.threshold:g}")
+
+
+if __name__ == "__main__":
+    main()
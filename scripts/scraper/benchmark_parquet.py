@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark: corpus summary from parsed JSON vs the month-partitioned Parquet export
+
+Writes a synthetic corpus (synthetic_corpus.py) as NDJSON and as Parquet
+(parquet_export.py), then times what the data team does today (parse the
+whole file, then count articles, images, months and content lengths) against
+ParquetCorpus.summary() and a projected read of three columns (the Arrow
+table that pandas' read_parquet would convert). The JSON
+baseline uses a smaller corpus (--json-articles) and is also reported per
+million articles.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+from collections import Counter
+
+from article_store import iter_articles
+from parquet_export import ParquetCorpus, ParquetExporter, print_corpus_summary
+from static_export import month_of
+from synthetic_corpus import synthetic_articles
+
+
+def json_summary(path):
+    """The same totals as ParquetCorpus.summary, computed from parsed articles"""
+    articles = list(iter_articles(path))
+    lengths = sorted(len(article.get('content', '')) for article in articles)
+    return {
+        'articles': len(articles),
+        'images': sum(len(article.get('images', [])) for article in articles),
+        'by_month': Counter(month_of(article) for article in articles),
+        'by_category': Counter(article.get('category') for article in articles),
+        'median_length': lengths[len(lengths) // 2] if lengths else None,
+    }
+
+
+def best_of(rounds, function):
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def size_of(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(path) for name in names)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-n', '--num-articles', type=int, default=1000000)
+    parser.add_argument('--json-articles', type=int, default=100000,
+                        help="Corpus size for the parse-everything baseline (it is much slower)")
+    parser.add_argument('--paragraphs', type=int, default=4, help="Paragraphs per synthetic article")
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ndjson_path = os.path.join(tmp, 'articles.ndjson')
+        parquet_dir = os.path.join(tmp, 'parquet')
+
+        print(f"Writing {args.json_articles} articles as NDJSON...")
+        with open(ndjson_path, 'w', encoding='utf-8') as f:
+            for article in synthetic_articles(args.json_articles, paragraphs=args.paragraphs):
+                f.write(json.dumps(article, ensure_ascii=False) + '\n')
+
+        print(f"Exporting {args.num_articles} articles to Parquet...")
+        stats = ParquetExporter(parquet_dir).export(
+            synthetic_articles(args.num_articles, paragraphs=args.paragraphs))
+        print(f"✓ {stats['articles']} articles, {stats['images']} images in {stats['seconds']:.1f} s "
+              f"({stats['articles'] / stats['seconds']:,.0f} articles/s), "
+              f"{size_of(parquet_dir) / 2 ** 20:.0f} MB "
+              f"(NDJSON: {size_of(ndjson_path) / args.json_articles * args.num_articles / 2 ** 20:.0f} MB)")
+
+        json_seconds = best_of(1, lambda: json_summary(ndjson_path))
+        corpus = ParquetCorpus(parquet_dir)
+        summary_seconds = best_of(args.rounds, lambda: corpus.summary())
+        columns_seconds = best_of(args.rounds, lambda: corpus.read(
+            ['date_published', 'content_length', 'image_count']))
+
+        def print_summary():
+            with contextlib.redirect_stdout(io.StringIO()):
+                print_corpus_summary(ParquetCorpus(parquet_dir).summary())
+        print_seconds = best_of(args.rounds, print_summary)
+
+        per_million = 1000000 / args.num_articles
+        print(f"\n{'method':<34} {'articles':>9} {'seconds':>9} {'s per 1M':>9}")
+        print(f"{'parse NDJSON + count':<34} {args.json_articles:>9} {json_seconds:>9.2f} "
+              f"{json_seconds * 1000000 / args.json_articles:>9.2f}")
+        for name, seconds in (('ParquetCorpus.summary()', summary_seconds),
+                              ('print_summary (open + summary)', print_seconds),
+                              ('read 3 columns', columns_seconds)):
+            print(f"{name:<34} {args.num_articles:>9} {seconds:>9.3f} {seconds * per_million:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of the HTML parser backends (html_parsers.py)
+
+Runs AimaqScraper.parse_article and extract_article_links over a corpus of
+saved pages with every available backend, reports parse+extract time per page
+and checks that all backends produce the same output as BeautifulSoup.
+
+Corpus: a directory of saved aimaqaqshamy.kz pages (*.html), e.g.
+    python benchmark_parsers.py --corpus saved_pages/
+Without --corpus, synthetic pages from stub_server.py are used.
+
+With --workers N the article pages are also parsed through ParsePool
+(parse_pool.py) with 1..N worker processes to show scaling across cores.
+"""
+
+import argparse
+import contextlib
+import io
+import tempfile
+import time
+
+from html_parsers import get_backend
+from parse_pool import ParsePool, iter_saved_pages
+from scrape_aimaq import AimaqScraper
+from stub_server import StubSite
+
+
+BASE_URL = "https://aimaqaqshamy.kz"
+
+
+def synthetic_corpus(count, chrome):
+    site = StubSite(pages=max(1, count // 10), chrome=chrome)
+    pages = [(f"{BASE_URL}/zhangalyq-{n}/", site.article(BASE_URL, n).encode('utf-8'))
+             for n in range(count)]
+    pages += [(f"{BASE_URL}/page/{p}/", site.listing(BASE_URL, p).encode('utf-8'))
+              for p in range(1, site.pages + 1)]
+    return pages
+
+
+def extract_all(scraper, pages):
+    results = []
+    for url, content in pages:
+        article = scraper.parse_article(content, url)
+        article.pop('scraped_at')
+        results.append((article, scraper.extract_article_links(content)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--corpus', help="Directory of saved *.html pages")
+    parser.add_argument('--pages', type=int, default=200, help="Synthetic corpus size")
+    parser.add_argument('--chrome', type=int, default=60,
+                        help="Synthetic pages: menu/sidebar entries per page")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=0,
+                        help="Also time ParsePool with 1..N processes (lxml backend)")
+    args = parser.parse_args()
+
+    pages = list(iter_saved_pages(args.corpus, BASE_URL)) if args.corpus else synthetic_corpus(args.pages, args.chrome)
+    total_bytes = sum(len(content) for _, content in pages)
+    print(f"Corpus: {len(pages)} pages, {total_bytes / len(pages) / 1024:.1f} KB/page average\n")
+
+    reference = None
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'backend':<12} {'ms/page':>9} {'pages/s':>9} {'speedup':>8}  same output")
+        baseline = None
+        for name in ('bs4', 'lxml', 'selectolax'):
+            with contextlib.redirect_stdout(io.StringIO()):
+                backend = get_backend(name)
+            if backend.name != name:
+                print(f"{name:<12} {'(not installed)':>28}")
+                continue
+
+            scraper = AimaqScraper(base_url=BASE_URL, output_dir=tmp)
+            scraper.parser = backend
+
+            best = None
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                results = extract_all(scraper, pages)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+
+            if reference is None:
+                reference = results
+                baseline = best
+            mismatches = sum(1 for ours, theirs in zip(results, reference) if ours != theirs)
+            same = 'yes' if not mismatches else f"NO ({mismatches} pages differ)"
+            print(f"{name:<12} {best / len(pages) * 1000:>9.3f} {len(pages) / best:>9.0f} "
+                  f"{baseline / best:>7.1f}x  {same}")
+
+
+    if args.workers:
+        benchmark_pool(pages, args.workers)
+
+
+def benchmark_pool(pages, max_workers):
+    """Throughput of the process-pool parsing stage for growing worker counts"""
+    articles = [(url, content, None) for url, content in pages if '/page/' not in url]
+    print(f"\nParsePool, {len(articles)} article pages (lxml)")
+    print(f"{'workers':<12} {'pages/s':>9} {'speedup':>8}")
+    baseline = None
+    workers = 1
+    while True:
+        with ParsePool(parser='lxml', base_url=BASE_URL, workers=workers) as pool:
+            # Warm-up: start the worker processes before timing
+            list(pool.map(articles[:workers]))
+            start = time.perf_counter()
+            parsed = sum(1 for _, _, article in pool.map(iter(articles)) if article)
+            elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"{workers:<12} {parsed / elapsed:>9.0f} {baseline / elapsed:>7.1f}x")
+        if workers >= max_workers:
+            break
+        workers = min(workers * 2, max_workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Benchmark: freshness lag and request count of cron re-runs vs the revisit scheduler
+
+Simulates a news site in virtual time (no network): articles are published
+as a Poisson process; about a third are breaking stories edited a few times
+in the first hours, and a few old articles get a late correction. Each
+strategy sees the same site and pays one request per listing page or article
+fetch (a 304 costs the same as a 200; images are left out):
+
+    cron, 30 latest      every --cron-interval: listing pages for the 30 latest, fetch all 30
+    cron, new only       every --cron-interval: listing until known articles, fetch the new ones
+                         (today's --state-db run)
+    scheduler            RevisitScheduler (revisit_scheduler.py) with a --budget requests/min cap
+
+Reported: requests per day, the lag from publication until an article is
+first scraped, and the lag from an edit until the edited version is scraped
+(edits never scraped within the run count as missed).
+"""
+
+import argparse
+import bisect
+import random
+
+from revisit_scheduler import (DAY, HOUR, LISTING, MINUTE, RequestBudget, RevisitPolicy,
+                               RevisitScheduler)
+
+
+PER_PAGE = 10
+# Stop paging once this many known articles were seen in a row (the scraper's known_run_limit)
+KNOWN_RUN_LIMIT = 5
+
+
+class SimulatedSite:
+    """Articles with publication and edit times, as the listing and article pages show them at `now`"""
+
+    def __init__(self, days, per_day, seed=0, history_days=30):
+        rng = random.Random(seed)
+        self.published = []
+        self.edits = []
+        now = -history_days * DAY
+        while now < days * DAY:
+            now += rng.expovariate(per_day / DAY)
+            edits = []
+            if rng.random() < 0.35:
+                # Breaking story: a few updates in the first hours
+                edit = now
+                for _ in range(1 + int(rng.expovariate(1 / 1.5))):
+                    edit += rng.expovariate(1 / (1.5 * HOUR))
+                    edits.append(edit)
+            if rng.random() < 0.03:
+                # Late correction
+                edits.append(now + rng.uniform(1, 20) * DAY)
+            self.published.append(now)
+            self.edits.append(sorted(edits))
+
+    def url(self, n):
+        return f"/article-{n}/"
+
+    def number(self, url):
+        return int(url.strip('/').split('-')[1])
+
+    def listing(self, now, page):
+        """URLs on listing page `page` at `now`, newest first"""
+        newest = bisect.bisect_right(self.published, now) - 1
+        first = newest - (page - 1) * PER_PAGE
+        return [self.url(n) for n in range(first, max(first - PER_PAGE, -1), -1)]
+
+    def version(self, n, now):
+        """How many edits of article n are live at `now` (0: as published)"""
+        return bisect.bisect_right(self.edits[n], now)
+
+    def modified(self, n, now):
+        version = self.version(n, now)
+        return self.edits[n][version - 1] if version else self.published[n]
+
+
+class Freshness:
+    """Requests made and the lag of every publication and edit until it was scraped"""
+
+    def __init__(self, site, days):
+        self.site = site
+        self.end = days * DAY
+        self.requests = 0
+        self.scraped = {}
+        self.new_lags = []
+        self.edit_lags = []
+
+    def listing_page(self, now, page):
+        self.requests += 1
+        return self.site.listing(now, page)
+
+    def fetch(self, url, now):
+        """Fetch an article; True if it changed since our last copy"""
+        self.requests += 1
+        n = self.site.number(url)
+        version = self.site.version(n, now)
+        previous = self.scraped.get(n)
+        if previous is None:
+            if self.site.published[n] >= 0:
+                self.new_lags.append(now - self.site.published[n])
+            previous = self.site.version(n, 0) if self.site.published[n] < 0 else 0
+        for edit in self.site.edits[n][previous:version]:
+            if edit >= 0:
+                self.edit_lags.append(now - edit)
+        self.scraped[n] = version
+        return version > previous
+
+    def missed_edits(self):
+        """Edits made during the run that no fetch picked up"""
+        missed = 0
+        for n, edits in enumerate(self.site.edits):
+            scraped = self.scraped.get(n, 0)
+            missed += sum(1 for edit in edits[scraped:] if 0 <= edit < self.end)
+        return missed
+
+    def known_listing(self, now, limit):
+        """Listing pages until KNOWN_RUN_LIMIT known articles in a row or `limit` links"""
+        links, known_run, page = [], 0, 1
+        while len(links) < limit:
+            urls = self.listing_page(now, page)
+            if not urls:
+                break
+            for url in urls:
+                links.append(url)
+                known_run = known_run + 1 if self.site.number(url) in self.scraped else 0
+                if known_run >= KNOWN_RUN_LIMIT or len(links) >= limit:
+                    return links
+            page += 1
+        return links
+
+
+def run_cron(site, days, interval, latest):
+    result = Freshness(site, days)
+    now = 0.0
+    while now < days * DAY:
+        if latest:
+            links = []
+            for page in range(1, (latest - 1) // PER_PAGE + 2):
+                links.extend(result.listing_page(now, page))
+            for url in links[:latest]:
+                result.fetch(url, now)
+        else:
+            for url in result.known_listing(now, limit=30):
+                if site.number(url) not in result.scraped:
+                    result.fetch(url, now)
+        now += interval
+    return result
+
+
+def run_scheduler(site, days, budget, listing_interval):
+    result = Freshness(site, days)
+    now = 0.0
+
+    def clock():
+        return now
+
+    scheduler = RevisitScheduler(RevisitPolicy(), RequestBudget(budget, clock=clock),
+                                 listing_interval=listing_interval, clock=clock)
+    while True:
+        wait, kind, entry = scheduler.next()
+        now += wait
+        if now >= days * DAY:
+            return result, scheduler
+        scheduler.pop()
+        requests = result.requests
+        if kind == LISTING:
+            for url in result.known_listing(now, limit=20):
+                if site.number(url) not in result.scraped:
+                    scheduler.add(url, now)
+            scheduler.listed(now)
+        else:
+            n = site.number(entry.url)
+            changed = result.fetch(entry.url, now)
+            scheduler.visited(entry, published=site.published[n], modified=site.modified(n, now),
+                              changed=changed, now=now)
+        scheduler.budget.charge(result.requests - requests, now)
+
+
+def percentile(values, share):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(share * len(values)))]
+
+
+def minutes(seconds):
+    return f"{seconds / MINUTE:.0f}" if seconds == seconds else '-'
+
+
+def report(name, result, days):
+    new, edits = result.new_lags, result.edit_lags
+    print(f"{name:<30} {result.requests / days:>9,.0f} "
+          f"{minutes(sum(new) / len(new)):>8} {minutes(percentile(new, 0.95)):>8} "
+          f"{minutes(sum(edits) / len(edits) if edits else float('nan')):>8} "
+          f"{minutes(percentile(edits, 0.95)):>8} {result.missed_edits():>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--days', type=int, default=7, help="Simulated run length")
+    parser.add_argument('--per-day', type=float, default=60, help="Articles published per day")
+    parser.add_argument('--cron-interval', type=float, default=30, help="Minutes between cron runs")
+    parser.add_argument('--budget', type=int, default=30, help="Scheduler: requests per minute")
+    parser.add_argument('--listing-interval', type=float, default=60, help="Scheduler: seconds between listing checks")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    site = SimulatedSite(args.days, args.per_day, seed=args.seed)
+    published = sum(1 for time in site.published if 0 <= time < args.days * DAY)
+    edits = sum(1 for edits in site.edits for edit in edits if 0 <= edit < args.days * DAY)
+    print(f"Simulated {args.days} days: {published} articles published, {edits} edits\n")
+
+    print(f"{'strategy':<30} {'req/day':>9} {'new lag (min): mean':>17} {'p95':>8} "
+          f"{'edit lag: mean':>8} {'p95':>8} {'missed':>7}")
+    interval = args.cron_interval * MINUTE
+    report(f"cron {args.cron_interval:g} min, 30 latest", run_cron(site, args.days, interval, 30), args.days)
+    report(f"cron {args.cron_interval:g} min, new only", run_cron(site, args.days, interval, 0), args.days)
+    report("cron 10 min, 30 latest", run_cron(site, args.days, 10 * MINUTE, 30), args.days)
+    result, scheduler = run_scheduler(site, args.days, args.budget, args.listing_interval)
+    report(f"scheduler, {args.budget} req/min", result, args.days)
+    print(f"\nScheduler at the end: {len(scheduler)} articles scheduled, {scheduler.retired} retired")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark: sequential AimaqScraper vs concurrent AsyncAimaqScraper
+
+Both scrapers run against a local stub server (stub_server.py) with simulated
+latency, so the numbers measure the crawl engine and not the real site.
+The sync scraper runs with its politeness sleeps disabled; the async engine
+runs with its per-host cap and token bucket.
+"""
+
+import argparse
+import contextlib
+import io
+import tempfile
+import time
+
+from async_scraper import AsyncAimaqScraper
+from scrape_aimaq import AimaqScraper
+from stub_server import StubServer, StubSite
+
+
+def comparable(articles):
+    """Strip run-specific fields so outputs of both engines can be compared"""
+    result = []
+    for article in articles:
+        article = {k: v for k, v in article.items() if k != 'scraped_at'}
+        article['images'] = [
+            {k: v for k, v in image.items() if k != 'local_path'}
+            for image in article.get('images', [])
+        ]
+        result.append(article)
+    return result
+
+
+def run(scraper, num_articles):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        articles = scraper.scrape_articles(num_articles=num_articles)
+    return articles, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-n', '--num-articles', type=int, default=30)
+    parser.add_argument('--latency', type=float, default=0.05,
+                        help="Simulated server latency per request, seconds")
+    parser.add_argument('--per-host', type=int, default=8)
+    parser.add_argument('--rate', type=float, default=200.0)
+    args = parser.parse_args()
+
+    site = StubSite(pages=10, per_page=10)
+    print(f"Stub site: {site.num_articles} articles, latency {args.latency * 1000:.0f} ms/request\n")
+
+    with StubServer(site=site, latency=args.latency) as server, \
+            tempfile.TemporaryDirectory() as sync_dir, \
+            tempfile.TemporaryDirectory() as async_dir:
+
+        sync_scraper = AimaqScraper(base_url=server.base_url, output_dir=sync_dir,
+                                    page_delay=0, min_delay=0, max_delay=0)
+        sync_articles, sync_time = run(sync_scraper, args.num_articles)
+        sync_requests = server.requests
+
+        async_scraper = AsyncAimaqScraper(base_url=server.base_url, output_dir=async_dir,
+                                          per_host=args.per_host, rate=args.rate, page_delay=0)
+        async_articles, async_time = run(async_scraper, args.num_articles)
+        async_requests = server.requests - sync_requests
+
+    print(f"{'engine':<8} {'articles':>9} {'requests':>9} {'seconds':>9} {'articles/s':>11}")
+    for name, articles, requests, elapsed in (
+        ('sync', sync_articles, sync_requests, sync_time),
+        ('async', async_articles, async_requests, async_time),
+    ):
+        print(f"{name:<8} {len(articles):>9} {requests:>9} {elapsed:>9.2f} {len(articles) / elapsed:>11.1f}")
+
+    print(f"\nSpeedup: {sync_time / async_time:.1f}x")
+    same = comparable(sync_articles) == comparable(async_articles)
+    print(f"Identical output: {'yes' if same else 'NO'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark: full-text search index build rate and query latency at 100k articles
+
+Synthetic articles (synthetic_corpus.py) only use a few dozen common words,
+so each one also gets a sentence of names drawn from a Zipf-distributed
+vocabulary of pseudo-words, like the people and places of real news. The
+corpus is written to NDJSON and indexed with SearchIndex.update_from_file();
+then measures an update with nothing new, an update after appending 1%, and
+query latency for common, mid-frequency and rare words, multi-word queries,
+phrases and inflected forms.
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from search_index import SearchIndex
+from synthetic_corpus import synthetic_articles
+
+
+SYLLABLES = "ба ке ту ма ра ло ны сы ай ер қа ғы ну бе ко ди ан ов ин ет".split()
+
+
+def names(count, rng):
+    return sorted({''.join(rng.choices(SYLLABLES, k=rng.randint(3, 4))).capitalize() for _ in range(count)})
+
+
+def corpus(count, vocabulary, rng, seed=0):
+    """Synthetic articles with a Zipf-distributed sentence of names appended"""
+    weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+    for article in synthetic_articles(count, seed=seed):
+        sentence = ' '.join(rng.choices(vocabulary, weights=weights, k=8))
+        article['content'] += f"\n\n{sentence}."
+        yield article
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-n', '--articles', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=20, help="Runs of each query")
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    vocabulary = names(50_000, rng)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ndjson = os.path.join(tmp, 'articles.ndjson')
+        print(f"Writing {args.articles} articles...")
+        with open(ndjson, 'w', encoding='utf-8') as f:
+            for article in corpus(args.articles, vocabulary, rng):
+                f.write(json.dumps(article, ensure_ascii=False) + '\n')
+        megabytes = os.path.getsize(ndjson) / 1024 / 1024
+
+        path = os.path.join(tmp, 'search.db')
+        with SearchIndex(path) as index:
+            print(f"\n{'update':<28} {'seconds':>8} {'articles/s':>11}")
+            start = time.perf_counter()
+            stats = index.update_from_file(ndjson)
+            elapsed = time.perf_counter() - start
+            print(f"{'build':<28} {elapsed:>8.1f} {stats['added'] / elapsed:>11.0f}   ({megabytes:.0f} MB NDJSON)")
+            start = time.perf_counter()
+            index.optimize()
+            print(f"{'optimize':<28} {time.perf_counter() - start:>8.1f}")
+
+            start = time.perf_counter()
+            stats = index.update_from_file(ndjson)
+            print(f"{'nothing new':<28} {time.perf_counter() - start:>8.3f}")
+
+            extra = args.articles // 100
+            with open(ndjson, 'a', encoding='utf-8') as f:
+                for article in corpus(extra, vocabulary, rng, seed=1):
+                    article['url'] = article['url'].replace('synthetic-article', 'appended-article')
+                    f.write(json.dumps(article, ensure_ascii=False) + '\n')
+            start = time.perf_counter()
+            stats = index.update_from_file(ndjson)
+            elapsed = time.perf_counter() - start
+            print(f"{f'{extra} appended':<28} {elapsed:>8.2f} {stats['added'] / elapsed:>11.0f}")
+
+            queries = [
+                ('common word', 'мектеп'),
+                ('common word, inflected', 'мектептерде'),
+                ('two common words', 'облыс әкімдігі'),
+                ('phrase', '"облыс әкімдігі"'),
+                ('frequent name', vocabulary[5]),
+                ('rare name', vocabulary[5000]),
+                ('rare name + common word', f"{vocabulary[5000]} бюджет"),
+                ('Russian, inflected', 'учителей'),
+            ]
+            print(f"\n{'query':<26} {'text':<22} {'matches':>8}  "
+                  f"{'by rank p50 / p99 ms':>20}  {'newest p50 / p99 ms':>20}")
+            for name, text in queries:
+                timings = []
+                for sort in ('rank', 'newest'):
+                    latencies = []
+                    for _ in range(args.repeat):
+                        start = time.perf_counter()
+                        index.search(text, limit=10, sort=sort)
+                        latencies.append(time.perf_counter() - start)
+                    timings.append(f"{percentile(latencies, 0.5) * 1000:.2f} / {percentile(latencies, 0.99) * 1000:.2f}")
+                print(f"{name:<26} {text:<22} {index.count(text):>8}  {timings[0]:>20}  {timings[1]:>20}")
+
+            count = len(index)
+
+        size = sum(os.path.getsize(os.path.join(tmp, name)) for name in os.listdir(tmp) if name.startswith('search.db'))
+        print(f"\nIndex: {size / 1024 / 1024:.0f} MB for {count} articles")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Benchmark: sharded crawl throughput by number of worker processes, under a global rate limit
+
+Serves --sites stub sites (stub_server.py) with --latency per request, seeds
+one crawl of all their articles into a SQLite lease store
+(sharded_crawl.py), then runs 1, 2, 4, ... worker processes on a fresh copy
+of it, with a per-site limit (--rate) loose enough not to matter. Reported
+per run: articles per second, the speedup over one worker, and the highest
+request rate any one site saw over two seconds (over the whole run if it
+was shorter). Two more runs use the most
+workers: one kills a worker mid-crawl (its batch is reclaimed once the lease
+expires, and the merged output must still hold every article exactly once),
+and one runs under a tight limit (--polite-rate) that the peak must respect.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from sharded_crawl import ShardWorker, SqliteLeaseStore, merge
+from site_profiles import SiteProfile
+from stub_server import StubServer, StubSite
+
+
+CRAWL = 'benchmark'
+
+
+def work(store_path, profiles, output_dir, worker_id, lease, rate):
+    store = SqliteLeaseStore(store_path)
+    worker = ShardWorker(store, CRAWL, profiles, output_dir=output_dir, worker_id=worker_id, lease=lease,
+                         rate=rate, poll=0.2, page_delay=0, min_delay=0)
+    with contextlib.redirect_stdout(io.StringIO()):
+        worker.run()
+
+
+class RequestRate:
+    """Samples the stub servers' request counters; highest per-site rate over any `window` seconds"""
+
+    def __init__(self, servers, window=2.0, interval=0.1):
+        self.servers = servers
+        self.window = window
+        self.interval = interval
+        self.samples = []
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.sample, daemon=True)
+
+    def take_sample(self):
+        self.samples.append((time.monotonic(), [server.requests for server in self.servers]))
+
+    def sample(self):
+        while not self.stopped.wait(self.interval):
+            self.take_sample()
+
+    def __enter__(self):
+        self.take_sample()
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stopped.set()
+        self.thread.join()
+        self.take_sample()
+
+    def peak(self):
+        """Requests/second; over the whole run if it was shorter than `window`, None if it took no time"""
+        window = min(self.window, self.samples[-1][0] - self.samples[0][0])
+        if window <= 0:
+            return None
+        peak = 0.0
+        for i, (start, counts) in enumerate(self.samples):
+            for end, later in self.samples[i + 1:]:
+                if end - start >= window:
+                    peak = max(peak, max(b - a for a, b in zip(counts, later)) / (end - start))
+                    break
+        return peak
+
+
+def crawl(seeded, workdir, profiles, servers, workers, lease, rate, kill_after=None):
+    """Run `workers` processes over a copy of the seeded store; (seconds, peak req/s, store path)"""
+    run = f"{workers}-{rate:g}{'-kill' if kill_after else ''}"
+    store_path = os.path.join(workdir, f"store-{run}.db")
+    shutil.copy(seeded, store_path)
+    # A fresh image store per run, so no run reuses another's downloads
+    output_dir = os.path.join(workdir, f"out-{run}")
+    processes = [multiprocessing.Process(target=work, args=(store_path, profiles, output_dir,
+                                                            f"worker-{i}", lease, rate))
+                 for i in range(workers)]
+    start = time.perf_counter()
+    with RequestRate(servers) as requests:
+        for process in processes:
+            process.start()
+        if kill_after:
+            time.sleep(kill_after)
+            processes[0].kill()
+        for process in processes:
+            process.join()
+    return time.perf_counter() - start, requests.peak(), store_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sites', type=int, default=4)
+    parser.add_argument('-n', '--num-articles', type=int, default=40, help="Articles per site")
+    parser.add_argument('--workers', default='1,2,4,8', help="Comma-separated worker counts")
+    parser.add_argument('--latency', type=float, default=0.05, help="Simulated server latency per request, seconds")
+    parser.add_argument('--rate', type=float, default=200.0,
+                        help="Max requests/second per site, all workers (scaling runs)")
+    parser.add_argument('--polite-rate', type=float, default=20.0, help="The limit of the last run")
+    parser.add_argument('--batch-size', type=int, default=5)
+    parser.add_argument('--lease', type=float, default=3.0, help="Lease seconds (short, for the kill run)")
+    args = parser.parse_args()
+
+    counts = [int(n) for n in args.workers.split(',')]
+    print(f"{args.sites} stub sites, {args.num_articles} articles each (+2 images), latency "
+          f"{args.latency * 1000:.0f} ms/request\n")
+
+    with contextlib.ExitStack() as stack:
+        servers = [stack.enter_context(StubServer(StubSite(pages=(args.num_articles + 9) // 10, per_page=10),
+                                                  latency=args.latency))
+                   for _ in range(args.sites)]
+        profiles = [SiteProfile(name=f"site{i}", base_url=server.base_url, discovery='html')
+                    for i, server in enumerate(servers)]
+        workdir = stack.enter_context(tempfile.TemporaryDirectory())
+
+        seeded = os.path.join(workdir, 'seeded.db')
+        seed_store = SqliteLeaseStore(seeded)
+        seeder = ShardWorker(seed_store, CRAWL, profiles, output_dir=os.path.join(workdir, 'seed'),
+                             rate=1000, batch_size=args.batch_size, page_delay=0, min_delay=0)
+        with contextlib.redirect_stdout(io.StringIO()):
+            seeder.wait_until_seeded(args.num_articles)
+        # Closing checkpoints the WAL into the file the runs copy
+        seed_store.close()
+        expected = args.sites * args.num_articles
+
+        print(f"{'workers':<16} {'articles':>9} {'seconds':>8} {'articles/s':>11} {'speedup':>8} "
+              f"{'limit req/s/site':>17} {'peak':>6} {'reclaimed':>10}")
+        base = None
+        most = max(counts)
+        runs = [(n, args.rate, None) for n in counts] + [(most, args.rate, 1.0), (most, args.polite_rate, None)]
+        for workers, limit, kill_after in runs:
+            elapsed, peak, store_path = crawl(seeded, workdir, profiles, servers, workers, args.lease,
+                                              limit, kill_after)
+            store = SqliteLeaseStore(store_path)
+            stats = store.counts(CRAWL)
+            merged = os.path.join(workdir, 'merged.ndjson')
+            merge(store, CRAWL, merged)
+            store.close()
+            with open(merged, encoding='utf-8') as f:
+                urls = [json.loads(line)['url'] for line in f]
+            rate = len(urls) / elapsed
+            base = base or rate
+            name = f"{workers}, 1 killed" if kill_after else str(workers)
+            peak = f"{peak:.1f}" if peak is not None else 'n/a'
+            print(f"{name:<16} {len(urls):>9} {elapsed:>8.2f} {rate:>11.1f} {rate / base:>7.1f}x "
+                  f"{limit:>17g} {peak:>6} {stats['reclaimed']:>10}")
+            if len(urls) != expected or len(set(urls)) != len(urls):
+                print(f"  ✗ expected {expected} distinct articles, got {len(set(urls))} distinct of {len(urls)}")
+
+
+if __name__ == "__main__":
+    main()
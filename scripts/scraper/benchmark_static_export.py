@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark: static-site export, old full rewrite vs StaticExporter
+
+On a synthetic corpus (synthetic_corpus.py) measures
+  - the old export (indent=2, every file rewritten, one index.json of all articles)
+  - a first StaticExporter build, with 1..N worker processes
+  - a rebuild with nothing changed, and with 1% of the articles edited
+and what a client downloads to show the newest articles.
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from static_export import StaticExporter, article_slug
+from synthetic_corpus import synthetic_articles
+
+
+def legacy_export(output_dir, articles):
+    """The export_for_static_site() this replaces"""
+    os.makedirs(output_dir, exist_ok=True)
+    index = []
+    for article in articles:
+        slug = article_slug(article)
+        with open(os.path.join(output_dir, f"{slug}.json"), 'w', encoding='utf-8') as f:
+            json.dump(article, f, ensure_ascii=False, indent=2)
+        index.append({
+            'slug': slug,
+            'title': article.get('title'),
+            'date_published': article.get('date_published'),
+            'thumbnail_url': article.get('thumbnail_url')
+        })
+    with open(os.path.join(output_dir, 'index.json'), 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, indent=2)
+
+
+def size(path):
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-n', '--articles', type=int, default=20000)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--compress', default='gz', help="Pre-compressed siblings for the StaticExporter runs")
+    args = parser.parse_args()
+    compress = tuple(kind for kind in args.compress.split(',') if kind)
+
+    print(f"Generating {args.articles} articles...")
+    articles = list(synthetic_articles(args.articles))
+    edited = [dict(article, title=article['title'] + ' (жаңартылды)') if i % 100 == 0 else article
+              for i, article in enumerate(articles)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"\n{'export':<40} {'seconds':>8} {'written':>8} {'unchanged':>10}")
+        start = time.perf_counter()
+        legacy_export(os.path.join(tmp, 'legacy'), articles)
+        print(f"{'old (indent=2, rewrite all)':<40} {time.perf_counter() - start:>8.2f} {args.articles + 1:>8}")
+
+        for workers in sorted({1, args.max_workers}):
+            exporter = StaticExporter(os.path.join(tmp, f'static-{workers}'), workers=workers, compress=compress)
+            for name, corpus in (('first build', articles), ('rebuild, nothing changed', articles),
+                                 ('rebuild, 1% edited', edited)):
+                stats = exporter.export(corpus)
+                print(f"{f'{name}, {workers} worker(s)':<40} {stats['seconds']:>8.2f} "
+                      f"{stats['written']:>8} {stats['unchanged']:>10}")
+
+        legacy_dir = os.path.join(tmp, 'legacy')
+        static_dir = os.path.join(tmp, 'static-1')
+        slug = article_slug(articles[0])
+        print(f"\n{'a client downloads':<40} {'KB':>8}")
+        print(f"{'old index.json':<40} {size(os.path.join(legacy_dir, 'index.json')) / 1024:>8.1f}")
+        first_page = size(os.path.join(static_dir, 'index.json')) + size(os.path.join(static_dir, 'pages/1.json'))
+        print(f"{'index.json + pages/1.json':<40} {first_page / 1024:>8.1f}")
+        if 'gz' in compress:
+            first_page_gz = (size(os.path.join(static_dir, 'index.json.gz')) +
+                             size(os.path.join(static_dir, 'pages/1.json.gz')))
+            print(f"{'  the same, .gz':<40} {first_page_gz / 1024:>8.1f}")
+        print(f"{'one article, old':<40} {size(os.path.join(legacy_dir, f'{slug}.json')) / 1024:>8.1f}")
+        print(f"{'one article, compact':<40} {size(os.path.join(static_dir, f'{slug}.json')) / 1024:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark: fixed delays vs adaptive pacing and retries against a faulty server
+
+Runs the scraper against a stub server (stub_server.py) that drops a share of
+connections, answers some requests with 503 and rate-limits clients above
+its capacity with 429 + Retry-After, then reports how many articles each
+transport configuration got through (complete = with all images), how fast,
+and how often it was throttled.
+"""
+
+import argparse
+import contextlib
+import io
+import tempfile
+import time
+
+from async_scraper import AsyncAimaqScraper
+from scrape_aimaq import AimaqScraper
+from stub_server import Faults, StubServer, StubSite
+
+
+CONFIGS = [
+    # name, engine, scraper options
+    ('fixed 0 s, no retries', AimaqScraper, dict(page_delay=0, min_delay=0, max_delay=0, retries=0)),
+    ('fixed 1 s, no retries', AimaqScraper, dict(page_delay=1, min_delay=1, max_delay=1, retries=0)),
+    ('fixed 0 s, retries', AimaqScraper, dict(page_delay=0, min_delay=0, max_delay=0)),
+    ('adaptive', AimaqScraper, dict(page_delay=1, min_delay=0)),
+    ('async adaptive', AsyncAimaqScraper, dict(per_host=8, rate=100)),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-n', '--num-articles', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.02,
+                        help="Simulated server latency per request, seconds")
+    parser.add_argument('--capacity', type=float, default=15,
+                        help="Requests/second the stub server accepts before answering 429")
+    parser.add_argument('--error-rate', type=float, default=0.05)
+    parser.add_argument('--reset-rate', type=float, default=0.02)
+    parser.add_argument('--skip-slow', action='store_true', help="Skip the fixed 1 s configuration")
+    args = parser.parse_args()
+
+    site = StubSite(pages=10, per_page=10)
+    print(f"Stub site: {args.num_articles} of {site.num_articles} articles, latency "
+          f"{args.latency * 1000:.0f} ms, capacity {args.capacity:g} req/s, "
+          f"{args.error_rate:.0%} 503, {args.reset_rate:.0%} dropped connections\n")
+    print(f"{'transport':<22} {'articles':>9} {'complete':>9} {'requests':>9} {'429':>5} {'503':>5} "
+          f"{'drops':>6} {'retries':>8} {'seconds':>8} {'req/s':>6} {'delay':>6}")
+
+    for name, engine, options in CONFIGS:
+        if args.skip_slow and name.startswith('fixed 1 s'):
+            continue
+        faults = Faults(error_rate=args.error_rate, reset_rate=args.reset_rate, capacity=args.capacity)
+        with StubServer(site=site, latency=args.latency, faults=faults) as server, \
+                tempfile.TemporaryDirectory() as tmp:
+            scraper = engine(base_url=server.base_url, output_dir=tmp, discovery='html', **options)
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                articles = scraper.scrape_articles(num_articles=args.num_articles)
+            elapsed = time.perf_counter() - start
+            complete = sum(all(image['local_path'] for image in article.get('images', []))
+                           for article in articles)
+
+            print(f"{name:<22} {len(articles):>9} {complete:>9} {server.requests:>9} "
+                  f"{faults.injected['429']:>5} {faults.injected['503']:>5} {faults.injected['reset']:>6} "
+                  f"{scraper.metrics.total('scraper_retries_total'):>8} {elapsed:>8.1f} "
+                  f"{server.requests / elapsed:>6.1f} {scraper.pacer.delay:>6.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Offline article categorizer: hashed n-gram TF-IDF and a linear model
+
+Learns the CMS categories (slugs such as zhanalyqtar, qogam, sayasat) from
+articles that already have one, and labels scraped articles in batches
+before import, with no call to a remote API. Features are the stemmed words
+of the text (search_index.stem cuts Kazakh and Russian endings), pairs of
+adjacent words and the title words, hashed into a fixed number of columns so
+there is no vocabulary to store; they are weighted by sublinear TF-IDF and
+L2-normalised. The model is multinomial logistic regression fitted with
+L-BFGS, so labelling a batch is one sparse matrix product.
+
+Every labelled article gets
+    category_slug         the most probable category
+    category_confidence   its probability
+    category_fallback     true under the confidence threshold: leave these to
+                          the LLM categorization (POST /articles/categorize-all)
+
+Needs NumPy and SciPy (pip install numpy scipy).
+
+    python categorizer.py train --from-cms --holdout 0.1       # DATABASE_URL as for the CMS import
+    python categorizer.py train labelled.ndjson --label-field category_slug
+    python categorizer.py classify scraped_data/articles.ndjson -o scraped_data/categorized.ndjson
+"""
+
+import argparse
+import os
+import random
+import re
+import time
+import zlib
+from collections import Counter
+from itertools import islice
+
+from article_store import iter_articles, open_sink
+from search_index import fold, stem
+
+try:
+    import numpy as np
+    from scipy import sparse
+    from scipy.optimize import minimize
+except ImportError:
+    np = sparse = minimize = None
+
+
+N_FEATURES = 2 ** 18
+# Only the start of long articles: the topic is set early and tokenizing is the slow part
+MAX_CONTENT_CHARS = 4000
+# Combines two word hashes into the hash of the pair (or of a title word)
+PAIR = 1000003
+TITLE = 1
+# Kazakh, Russian (ё folded to е) and Latin words; digits and punctuation separate them.
+# An explicit class is ~2x faster to scan than \w on Cyrillic text
+LETTERS_RE = re.compile(r'[а-яәғқңөұүһіa-z]+')
+MAX_CACHED_WORDS = 500_000
+THRESHOLD = 0.5
+# L2 penalty on the weights, per training article
+REGULARIZATION = 1e-4
+MAX_ITERATIONS = 300
+
+
+class StemHashes(dict):
+    """word -> 32-bit hash of its stem, computed on first use (vocabulary is Zipf-distributed)"""
+
+    def __missing__(self, word):
+        if len(self) >= MAX_CACHED_WORDS:
+            self.clear()
+        value = self[word] = zlib.crc32(stem(word).encode('utf-8'))
+        return value
+
+
+STEM_HASHES = StemHashes()
+
+
+def word_hashes(text):
+    # map() over the dict keeps the per-word work in C for words seen before
+    return list(map(STEM_HASHES.__getitem__, LETTERS_RE.findall(fold(text).lower())))
+
+
+class Categorizer:
+    """
+    Usage:
+        model = Categorizer.train(articles, labels)       # labels: CMS category slugs
+        model.save('scraped_data/categorizer.npz')
+
+        model = Categorizer.load('scraped_data/categorizer.npz')
+        for article in model.label(iter_articles('scraped_data/articles.ndjson')): ...
+        slugs, confidences = model.predict(batch)
+    """
+
+    def __init__(self, classes, weights, bias, idf, n_features=N_FEATURES):
+        self.classes = list(classes)
+        self.weights = weights
+        self.bias = bias
+        self.idf = idf
+        self.n_features = n_features
+        self.labelled = 0
+        self.fallbacks = 0
+
+    @staticmethod
+    def counts(articles, n_features=N_FEATURES):
+        """Sparse matrix of hashed feature counts, one row per article"""
+        if sparse is None:
+            raise ImportError("The categorizer needs NumPy and SciPy (pip install numpy scipy)")
+        body, body_lengths, title, title_lengths = [], [], [], []
+        for article in articles:
+            hashes = word_hashes((article.get('content') or '')[:MAX_CONTENT_CHARS])
+            body += hashes
+            body_lengths.append(len(hashes))
+            hashes = word_hashes(article.get('title') or '')
+            title += hashes
+            title_lengths.append(len(hashes))
+
+        rows = len(body_lengths)
+        body = np.array(body, dtype=np.int64)
+        body_rows = np.repeat(np.arange(rows), body_lengths)
+        title = np.array(title, dtype=np.int64)
+        # Adjacent words of the same article
+        same = body_rows[:-1] == body_rows[1:]
+        columns = np.concatenate([
+            body % n_features,
+            (body[:-1][same] * PAIR + body[1:][same]) % n_features,
+            (title * PAIR + TITLE) % n_features,
+        ])
+        row_ids = np.concatenate([body_rows, body_rows[:-1][same], np.repeat(np.arange(rows), title_lengths)])
+        # Duplicate (row, column) entries are summed into counts
+        matrix = sparse.csr_matrix((np.ones(len(columns), dtype=np.float32), (row_ids, columns)),
+                                   shape=(rows, n_features))
+        matrix.sum_duplicates()
+        return matrix
+
+    @staticmethod
+    def weighted(counts, idf):
+        """Sublinear TF-IDF, rows scaled to unit length"""
+        matrix = counts.copy()
+        matrix.data = (1 + np.log(matrix.data)) * idf[matrix.indices]
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        return sparse.diags((1 / norms).astype(np.float32)) @ matrix
+
+    @classmethod
+    def train(cls, articles, labels, regularization=REGULARIZATION, max_iterations=MAX_ITERATIONS,
+              n_features=N_FEATURES):
+        """Fit on articles and their category slugs"""
+        counts = cls.counts(articles, n_features)
+        classes = sorted(set(labels))
+        if len(classes) < 2:
+            raise ValueError(f"Need articles of at least two categories to train, got {classes}")
+        y = np.array([classes.index(label) for label in labels])
+        rows = counts.shape[0]
+
+        df = np.bincount(counts.indices, minlength=n_features)
+        idf = (np.log((1 + rows) / (1 + df)) + 1).astype(np.float32)
+        matrix = cls.weighted(counts, idf)
+        matrix_t = matrix.T.tocsr()
+        k = len(classes)
+
+        def loss_and_gradient(params):
+            weights = params[:-k].reshape(n_features, k)
+            scores = matrix @ weights + params[-k:]
+            scores -= scores.max(axis=1, keepdims=True)
+            log_norm = np.log(np.exp(scores).sum(axis=1))
+            loss = (log_norm - scores[np.arange(rows), y]).mean() + regularization / 2 * (weights ** 2).sum()
+            errors = np.exp(scores - log_norm[:, None])
+            errors[np.arange(rows), y] -= 1
+            errors /= rows
+            gradient = np.concatenate([(matrix_t @ errors + regularization * weights).ravel(), errors.sum(axis=0)])
+            return loss, gradient
+
+        result = minimize(loss_and_gradient, np.zeros(n_features * k + k), jac=True, method='L-BFGS-B',
+                          options={'maxiter': max_iterations})
+        weights = result.x[:-k].reshape(n_features, k).astype(np.float32)
+        return cls(classes, weights, result.x[-k:].astype(np.float32), idf, n_features)
+
+    def probabilities(self, articles):
+        scores = self.weighted(self.counts(articles, self.n_features), self.idf) @ self.weights + self.bias
+        scores -= scores.max(axis=1, keepdims=True)
+        probabilities = np.exp(scores)
+        return probabilities / probabilities.sum(axis=1, keepdims=True)
+
+    def predict(self, articles):
+        """(category slugs, confidences) for a list of articles"""
+        probabilities = self.probabilities(articles)
+        best = probabilities.argmax(axis=1)
+        return [self.classes[i] for i in best], probabilities[np.arange(len(best)), best]
+
+    def label(self, articles, threshold=THRESHOLD, batch_size=1000):
+        """Yield `articles` with the category fields set, labelled a batch at a time"""
+        articles = iter(articles)
+        while True:
+            batch = list(islice(articles, batch_size))
+            if not batch:
+                return
+            slugs, confidences = self.predict(batch)
+            for article, slug, confidence in zip(batch, slugs, confidences):
+                article['category_slug'] = slug
+                article['category_confidence'] = round(float(confidence), 4)
+                article['category_fallback'] = bool(confidence < threshold)
+                self.labelled += 1
+                self.fallbacks += article['category_fallback']
+                yield article
+
+    def save(self, path):
+        """Write the model as .npz, atomically"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(f, classes=np.array(self.classes), weights=self.weights, bias=self.bias,
+                                idf=self.idf, n_features=self.n_features)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        if np is None:
+            raise ImportError("The categorizer needs NumPy and SciPy (pip install numpy scipy)")
+        with np.load(path) as model:
+            return cls(model['classes'].tolist(), model['weights'], model['bias'], model['idf'],
+                       int(model['n_features']))
+
+
+def cms_examples(connection):
+    """(article, category slug) for every Smart-CMS article that has a category"""
+    from cms_postgres import content_text
+
+    # Named cursor: rows are streamed from the server instead of fetched at once
+    with connection.cursor(name='categorizer_examples') as cursor:
+        cursor.execute("""
+            SELECT a.title_kz, a.content_kz, c.slug
+            FROM articles a JOIN categories c ON c.id = a.category_id
+        """)
+        for title, content, slug in cursor:
+            yield {'title': title, 'content': content_text(content)}, slug
+
+
+def file_examples(path, label_field):
+    """(article, label) for the articles of a JSON/NDJSON file that have `label_field`"""
+    for article in iter_articles(path):
+        if article.get(label_field):
+            yield article, article[label_field]
+
+
+def evaluate(model, articles, labels, thresholds=(0.3, 0.5, 0.7, 0.9)):
+    """Accuracy overall and on the articles the model is confident about, per threshold"""
+    slugs, confidences = model.predict(articles)
+    correct = np.array(slugs) == np.array(labels)
+    print(f"Held-out accuracy: {correct.mean():.1%} of {len(labels)} articles")
+    print(f"{'threshold':>10} {'labelled':>9} {'accuracy':>9}  (the rest goes to the LLM)")
+    for threshold in thresholds:
+        confident = confidences >= threshold
+        accuracy = correct[confident].mean() if confident.any() else 0.0
+        print(f"{threshold:>10.1f} {confident.mean():>9.1%} {accuracy:>9.1%}")
+
+
+def run_train(args):
+    if args.from_cms:
+        import psycopg2
+
+        # Prisma-style DATABASE_URL from apps/api/.env; psycopg2 does not accept ?schema=
+        connection = psycopg2.connect(os.environ['DATABASE_URL'].split('?')[0])
+        examples = list(cms_examples(connection))
+        connection.close()
+    else:
+        examples = list(file_examples(args.articles_file, args.label_field))
+    print(f"{len(examples)} labelled articles: "
+          + ', '.join(f"{slug} {count}" for slug, count in Counter(label for _, label in examples).most_common()))
+
+    if args.holdout:
+        random.Random(1).shuffle(examples)
+        cut = int(len(examples) * (1 - args.holdout))
+        start = time.perf_counter()
+        model = Categorizer.train([a for a, _ in examples[:cut]], [l for _, l in examples[:cut]],
+                                  regularization=args.regularization)
+        print(f"Trained on {cut} in {time.perf_counter() - start:.1f} s")
+        evaluate(model, [a for a, _ in examples[cut:]], [l for _, l in examples[cut:]])
+
+    start = time.perf_counter()
+    model = Categorizer.train([a for a, _ in examples], [l for _, l in examples],
+                              regularization=args.regularization)
+    model.save(args.model)
+    print(f"✓ Trained on {len(examples)} articles in {time.perf_counter() - start:.1f} s -> {args.model}")
+
+
+def run_classify(args):
+    model = Categorizer.load(args.model)
+    output = args.output or os.path.splitext(args.articles_file)[0] + '.categorized.ndjson'
+    start = time.perf_counter()
+    categories = Counter()
+    with open_sink(output) as sink:
+        for article in model.label(iter_articles(args.articles_file), threshold=args.threshold):
+            if not article['category_fallback']:
+                categories[article['category_slug']] += 1
+            sink.write(article)
+    elapsed = time.perf_counter() - start
+
+    print(f"✓ {model.labelled} articles in {elapsed:.1f} s ({model.labelled / elapsed if elapsed else 0:.0f}/s) "
+          f"-> {output}")
+    print(f"  {model.labelled - model.fallbacks} categorized: "
+          + ', '.join(f"{slug} {count}" for slug, count in categories.most_common()))
+    print(f"  {model.fallbacks} under confidence {args.threshold:g}, left for the LLM (category_fallback)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train and apply the offline article categorizer")
+    parser.add_argument('-m', '--model', default='scraped_data/categorizer.npz')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    train = commands.add_parser('train', help="Fit on articles that already have a category")
+    train.add_argument('articles_file', nargs='?', help="JSON/NDJSON articles with a label field")
+    train.add_argument('--label-field', default='category_slug')
+    train.add_argument('--from-cms', action='store_true', help="Train on the Smart-CMS articles (DATABASE_URL)")
+    train.add_argument('--holdout', type=float, default=0.0,
+                       help="Also report accuracy on this share of the articles, held out")
+    train.add_argument('--regularization', type=float, default=REGULARIZATION)
+
+    classify = commands.add_parser('classify', help="Label a JSON/NDJSON file")
+    classify.add_argument('articles_file')
+    classify.add_argument('-o', '--output', help="Output file (default: <input>.categorized.ndjson)")
+    classify.add_argument('--threshold', type=float, default=THRESHOLD,
+                          help="Confidence under which an article is left for the LLM")
+
+    args = parser.parse_args()
+    if args.command == 'train':
+        if not args.from_cms and not args.articles_file:
+            parser.error("train needs an articles file or --from-cms")
+        run_train(args)
+    else:
+        run_classify(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Bulk loader from scraped articles into the Smart-CMS PostgreSQL database
+
+Maps scraped records onto the real `articles` table of apps/api/prisma/schema.prisma
+(slug_kz, title_kz, content_kz, cover_image, ...), streams them into a temporary
+staging table with COPY and merges them with a single set-based
+INSERT ... ON CONFLICT (slug_kz) DO UPDATE.
+
+Requires psycopg2 (pip install psycopg2-binary).
+"""
+
+import csv
+import html
+import io
+import re
+import uuid
+from urllib.parse import unquote, urlparse
+
+
+# Kazakh / Russian Cyrillic -> Latin, following the permalinks used on aimaqaqshamy.kz
+TRANSLIT = {
+    'а': 'a', 'ә': 'ae', 'б': 'b', 'в': 'v', 'г': 'g', 'ғ': 'gh', 'д': 'd', 'е': 'e',
+    'ё': 'yo', 'ж': 'zh', 'з': 'z', 'и': 'i', 'й': 'j', 'к': 'k', 'қ': 'q', 'л': 'l',
+    'м': 'm', 'н': 'n', 'ң': 'ng', 'о': 'o', 'ө': 'oe', 'п': 'p', 'р': 'r', 'с': 's',
+    'т': 't', 'у': 'w', 'ұ': 'u', 'ү': 'ue', 'ф': 'f', 'х': 'h', 'һ': 'h', 'ц': 'ts',
+    'ч': 'ch', 'ш': 'sh', 'щ': 'shch', 'ъ': '', 'ы': 'y', 'і': 'i', 'ь': '', 'э': 'e',
+    'ю': 'yu', 'я': 'ya',
+}
+
+SLUG_MAX_LENGTH = 100
+EXCERPT_LENGTH = 200
+
+STAGING_COLUMNS = (
+    'id', 'slug_kz', 'title_kz', 'excerpt_kz', 'content_kz', 'cover_image', 'published_at', 'category_slug'
+)
+
+
+def slugify(text):
+    """Latin slug from Kazakh/Russian text (same shape as createSlug in the WordPress import)"""
+    text = ''.join(TRANSLIT.get(ch, ch) for ch in text.lower())
+    text = re.sub(r'[^a-z0-9]+', '-', text)
+    return text.strip('-')[:SLUG_MAX_LENGTH].rstrip('-')
+
+
+def article_slug(article):
+    """slug_kz for a scraped article: its WordPress permalink slug, else the slugified title"""
+    path = urlparse(article.get('url') or '').path.rstrip('/')
+    slug = slugify(unquote(path.split('/')[-1])) if path else ''
+    return slug or slugify(article.get('title') or '')
+
+
+def content_html(content):
+    """Plain-text paragraphs (joined by blank lines) -> <p> HTML as stored by the CMS editor"""
+    paragraphs = [p.strip() for p in (content or '').split('\n\n') if p.strip()]
+    return ''.join(f"<p>{html.escape(p, quote=False)}</p>" for p in paragraphs)
+
+
+def content_text(content):
+    """CMS content HTML -> plain-text paragraphs joined by blank lines (as scraped)"""
+    text = re.sub(r'</p>|<br\s*/?>', '\n\n', content or '', flags=re.IGNORECASE)
+    paragraphs = (' '.join(html.unescape(re.sub(r'<[^>]+>', ' ', p)).split()) for p in text.split('\n\n'))
+    return '\n\n'.join(p for p in paragraphs if p)
+
+
+def excerpt(content):
+    text = ' '.join((content or '').split())
+    if len(text) <= EXCERPT_LENGTH:
+        return text
+    return text[:EXCERPT_LENGTH].rsplit(' ', 1)[0] + '…'
+
+
+def is_loadable(article):
+    """Whether to_cms_row() makes a row of `article`: it needs a slug and a title"""
+    return bool(article_slug(article) and (article.get('title') or '').strip())
+
+
+def to_cms_row(article):
+    """Staging row (STAGING_COLUMNS order) for one scraped article, or None if unusable"""
+    slug = article_slug(article)
+    title = (article.get('title') or '').strip()
+    if not slug or not title:
+        return None
+    return (
+        str(uuid.uuid4()),
+        slug,
+        title,
+        excerpt(article.get('content')),
+        content_html(article.get('content')),
+        article.get('thumbnail_url') or None,
+        article.get('date_published') or None,
+        # Set by categorizer.py; low-confidence guesses get the default category
+        None if article.get('category_fallback') else article.get('category_slug'),
+    )
+
+
+def copy_rows(cursor, table, columns, rows, chunk_size=10000):
+    """COPY rows into `table` in CSV chunks; returns the number of rows copied"""
+    sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+    total = 0
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    pending = 0
+
+    for row in rows:
+        # csv writes None as an empty unquoted field, which COPY reads as NULL
+        writer.writerow(row)
+        pending += 1
+        if pending >= chunk_size:
+            buffer.seek(0)
+            cursor.copy_expert(sql, buffer)
+            total += pending
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+
+    if pending:
+        buffer.seek(0)
+        cursor.copy_expert(sql, buffer)
+        total += pending
+
+    return total
+
+
+def load_articles(connection, articles, author_id, category_id, status='PUBLISHED', chunk_size=10000):
+    """
+    COPY scraped articles into a staging table and merge them into `articles`
+
+    New slugs are inserted with the given author and status, in the category
+    named by their category_slug (categorizer.py) if the CMS has it, else in
+    category_id.
+    Existing slugs get title, excerpt, content, cover image and publish date
+    refreshed; editorial fields (status, category, flags, metrics) are left
+    alone. Runs in one transaction. Returns a dict of inserted/updated/skipped counts.
+    """
+    skipped = 0
+
+    def rows():
+        nonlocal skipped
+        for article in articles:
+            row = to_cms_row(article)
+            if row is None:
+                skipped += 1
+                continue
+            yield row
+
+    published = status == 'PUBLISHED'
+
+    with connection:
+        with connection.cursor() as cursor:
+            # Dates without an offset are UTC, as published_at is stored, whatever the server's TimeZone
+            cursor.execute("SET LOCAL TIME ZONE 'UTC'")
+            cursor.execute("""
+                CREATE TEMP TABLE scraped_articles_stage (
+                    id TEXT,
+                    slug_kz TEXT,
+                    title_kz TEXT,
+                    excerpt_kz TEXT,
+                    content_kz TEXT,
+                    cover_image TEXT,
+                    -- timestamptz, so the newest copy of a slug is picked by time, not by string order
+                    published_at TIMESTAMPTZ,
+                    category_slug TEXT
+                ) ON COMMIT DROP
+            """)
+
+            staged = copy_rows(cursor, 'scraped_articles_stage', STAGING_COLUMNS, rows(), chunk_size)
+
+            # DISTINCT ON: a slug may appear twice in one load, ON CONFLICT can touch a row only once
+            cursor.execute("""
+                WITH merged AS (
+                    INSERT INTO articles (
+                        id, slug_kz, title_kz, excerpt_kz, content_kz, cover_image,
+                        status, published, published_at, author_id, category_id,
+                        created_at, updated_at
+                    )
+                    SELECT DISTINCT ON (s.slug_kz)
+                        s.id, s.slug_kz, s.title_kz, s.excerpt_kz, COALESCE(s.content_kz, ''), s.cover_image,
+                        %(status)s::"ArticleStatus", %(published)s,
+                        (s.published_at AT TIME ZONE 'UTC'),
+                        %(author_id)s, COALESCE(c.id, %(category_id)s),
+                        CURRENT_TIMESTAMP, CURRENT_TIMESTAMP
+                    FROM scraped_articles_stage s
+                    LEFT JOIN categories c ON c.slug = s.category_slug
+                    ORDER BY s.slug_kz, s.published_at DESC NULLS LAST
+                    ON CONFLICT (slug_kz) DO UPDATE SET
+                        title_kz = EXCLUDED.title_kz,
+                        excerpt_kz = EXCLUDED.excerpt_kz,
+                        content_kz = EXCLUDED.content_kz,
+                        cover_image = COALESCE(EXCLUDED.cover_image, articles.cover_image),
+                        published_at = COALESCE(EXCLUDED.published_at, articles.published_at),
+                        updated_at = CURRENT_TIMESTAMP
+                    RETURNING (xmax = 0) AS inserted
+                )
+                SELECT
+                    COUNT(*) FILTER (WHERE inserted),
+                    COUNT(*) FILTER (WHERE NOT inserted)
+                FROM merged
+            """, {
+                'status': status,
+                'published': published,
+                'author_id': author_id,
+                'category_id': category_id,
+            })
+            inserted, updated = cursor.fetchone()
+
+    return {
+        'staged': staged,
+        'inserted': inserted,
+        'updated': updated,
+        'skipped': skipped,
+    }
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Crawl jobs: a persistent, resumable work queue of article URLs
+
+Every scrape_articles() run is a job. Its article URLs are stored in SQLite
+before any is fetched, and each one moves through
+
+    pending -> in_flight -> done | failed
+
+with an attempt count, committed as it happens. A crash or Ctrl-C leaves the
+queue as it was: `scrape_aimaq.py --resume <job>` puts interrupted (in_flight)
+and failed items back to pending and continues with those only, without
+re-running discovery. For articles.json output the finished articles are kept
+in the queue too, so the file written at the end of a resumed job contains
+the whole job.
+
+List jobs and their progress:
+    python crawl_jobs.py scraped_data/jobs.db
+"""
+
+import argparse
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+
+STATES = ('pending', 'in_flight', 'done', 'failed')
+
+
+class JobQueue:
+    """
+    Usage:
+        jobs = JobQueue('scraped_data/jobs.db')
+        job = jobs.create(base_url=..., num_articles=30)
+        jobs.add(job, urls)
+        for url in jobs.pending(job):
+            jobs.start(job, url)
+            ...
+            jobs.complete(job, url)   # or jobs.fail(job, url, error)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        # The pipelined engine records fetch failures from its producer thread
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                params TEXT,
+                created_at TIMESTAMP,
+                finished_at TIMESTAMP
+            );
+            CREATE TABLE IF NOT EXISTS items (
+                job_id TEXT NOT NULL REFERENCES jobs(id),
+                url TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                state TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                result TEXT,
+                updated_at TIMESTAMP,
+                PRIMARY KEY (job_id, url)
+            );
+            CREATE INDEX IF NOT EXISTS idx_items_state ON items(job_id, state, position);
+        """)
+        self.connection.commit()
+
+    def execute(self, sql, params=()):
+        with self.lock:
+            cursor = self.connection.execute(sql, params)
+            self.connection.commit()
+            return cursor
+
+    def query(self, sql, params=()):
+        with self.lock:
+            return self.connection.execute(sql, params).fetchall()
+
+    def create(self, job_id=None, **params):
+        """Register a new job and return its id (default: creation time, e.g. 20251202-045753)"""
+        now = datetime.now()
+        if job_id and self.get(job_id):
+            raise ValueError(f"Job {job_id} already exists (continue it with --resume {job_id})")
+        if not job_id:
+            stamp = job_id = now.strftime('%Y%m%d-%H%M%S')
+            suffix = 1
+            while self.get(job_id):
+                suffix += 1
+                job_id = f"{stamp}-{suffix}"
+        self.execute("INSERT INTO jobs (id, params, created_at) VALUES (?, ?, ?)",
+                     (job_id, json.dumps(params, ensure_ascii=False), now.isoformat()))
+        return job_id
+
+    def get(self, job_id):
+        """Job row with decoded params, or None"""
+        rows = self.query("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        if not rows:
+            return None
+        job = dict(rows[0])
+        job['params'] = json.loads(job['params'] or '{}')
+        return job
+
+    def add(self, job_id, urls):
+        """Queue URLs in order; URLs already in the job are left as they are"""
+        with self.lock:
+            offset = self.connection.execute(
+                "SELECT COALESCE(MAX(position), -1) + 1 FROM items WHERE job_id = ?", (job_id,)
+            ).fetchone()[0]
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO items (job_id, url, position, updated_at) VALUES (?, ?, ?, ?)",
+                [(job_id, url, offset + i, datetime.now().isoformat()) for i, url in enumerate(urls)]
+            )
+            self.connection.commit()
+
+    def requeue(self, job_id):
+        """Put interrupted and failed items back to pending; returns how many"""
+        cursor = self.execute("""
+            UPDATE items SET state = 'pending', updated_at = ?
+            WHERE job_id = ? AND state IN ('in_flight', 'failed')
+        """, (datetime.now().isoformat(), job_id))
+        self.execute("UPDATE jobs SET finished_at = NULL WHERE id = ?", (job_id,))
+        return cursor.rowcount
+
+    def pending(self, job_id):
+        """Pending URLs in queue order"""
+        rows = self.query(
+            "SELECT url FROM items WHERE job_id = ? AND state = 'pending' ORDER BY position", (job_id,)
+        )
+        return [row['url'] for row in rows]
+
+    def start(self, job_id, url):
+        self.execute("""
+            UPDATE items SET state = 'in_flight', attempts = attempts + 1, updated_at = ?
+            WHERE job_id = ? AND url = ?
+        """, (datetime.now().isoformat(), job_id, url))
+
+    def complete(self, job_id, url, article=None):
+        """Mark an item done, keeping the article if given (for outputs written at the end)"""
+        result = json.dumps(article, ensure_ascii=False) if article is not None else None
+        self.execute("""
+            UPDATE items SET state = 'done', result = ?, last_error = NULL, updated_at = ?
+            WHERE job_id = ? AND url = ?
+        """, (result, datetime.now().isoformat(), job_id, url))
+
+    def fail(self, job_id, url, error):
+        self.execute("""
+            UPDATE items SET state = 'failed', last_error = ?, updated_at = ?
+            WHERE job_id = ? AND url = ?
+        """, (str(error), datetime.now().isoformat(), job_id, url))
+
+    def results(self, job_id):
+        """Kept articles of the job's done items, in queue order"""
+        rows = self.query("""
+            SELECT result FROM items
+            WHERE job_id = ? AND state = 'done' AND result IS NOT NULL ORDER BY position
+        """, (job_id,))
+        for row in rows:
+            yield json.loads(row['result'])
+
+    def counts(self, job_id):
+        """{state: number of items} for every state"""
+        counts = dict.fromkeys(STATES, 0)
+        for row in self.query(
+            "SELECT state, COUNT(*) AS n FROM items WHERE job_id = ? GROUP BY state", (job_id,)
+        ):
+            counts[row['state']] = row['n']
+        return counts
+
+    def finish(self, job_id):
+        """Stamp the job finished if nothing is left to do; returns True if it is"""
+        counts = self.counts(job_id)
+        if counts['pending'] or counts['in_flight']:
+            return False
+        self.execute("UPDATE jobs SET finished_at = COALESCE(finished_at, ?) WHERE id = ?",
+                     (datetime.now().isoformat(), job_id))
+        return True
+
+    def jobs(self):
+        """All jobs, newest first"""
+        return [dict(row) for row in self.query("SELECT * FROM jobs ORDER BY created_at DESC")]
+
+    def close(self):
+        self.connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List crawl jobs and their progress")
+    parser.add_argument('db', nargs='?', default="scraped_data/jobs.db")
+    parser.add_argument('--failed', metavar='JOB', help="Show the failed items of a job with their errors")
+    args = parser.parse_args()
+
+    jobs = JobQueue(args.db)
+    if args.failed:
+        for row in jobs.query("""
+            SELECT url, attempts, last_error FROM items
+            WHERE job_id = ? AND state = 'failed' ORDER BY position
+        """, (args.failed,)):
+            print(f"{row['url']}  (attempts: {row['attempts']})\n    {row['last_error']}")
+        return
+
+    print(f"{'job':<22} {'created':<20} {'pending':>8} {'in_flight':>10} {'done':>6} {'failed':>7}  status")
+    for job in jobs.jobs():
+        counts = jobs.counts(job['id'])
+        status = 'finished' if job['finished_at'] else 'resumable'
+        print(f"{job['id']:<22} {job['created_at'][:19]:<20} {counts['pending']:>8} "
+              f"{counts['in_flight']:>10} {counts['done']:>6} {counts['failed']:>7}  {status}")
+
+
+if __name__ == "__main__":
+    main()
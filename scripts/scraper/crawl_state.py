@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Persistent crawl state for incremental scraping
+
+A SQLite index keyed by article URL that remembers the HTTP validators
+(ETag / Last-Modified), the JSON-LD dateModified and a hash of the extracted
+content. Later runs send conditional GETs and skip articles that did not change.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+from discovery import parse_lastmod
+
+
+def article_hash(article_data):
+    """Hash of the extracted fields that matter to the CMS (ignores scrape time, local paths)"""
+    fingerprint = {
+        'title': article_data.get('title'),
+        'content': article_data.get('content'),
+        'author': article_data.get('author'),
+        'date_published': article_data.get('date_published'),
+        'date_modified': article_data.get('date_modified'),
+        'thumbnail_url': article_data.get('thumbnail_url'),
+        'images': [image.get('url') for image in article_data.get('images', [])],
+    }
+    payload = json.dumps(fingerprint, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class CrawlState:
+    """
+    SQLite-backed seen-URL index
+
+    Usage:
+        state = CrawlState('scraped_data/crawl_state.db')
+        headers = state.conditional_headers(url)
+        ...
+        state.record(url, etag=..., last_modified=..., date_modified=..., content_hash=...)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        # The async engine runs sitemap/REST discovery (is_current) in a worker thread
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                date_modified TEXT,
+                content_hash TEXT,
+                first_seen TIMESTAMP,
+                last_checked TIMESTAMP,
+                last_changed TIMESTAMP
+            )
+        """)
+        self.connection.commit()
+
+    def execute(self, sql, params=()):
+        with self.lock:
+            self.connection.execute(sql, params)
+            self.connection.commit()
+
+    def query(self, sql, params=()):
+        with self.lock:
+            return self.connection.execute(sql, params).fetchall()
+
+    def get(self, url):
+        """Stored row for `url` as a dict, or None if never scraped"""
+        rows = self.query("SELECT * FROM pages WHERE url = ?", (url,))
+        return dict(rows[0]) if rows else None
+
+    def is_known(self, url):
+        return bool(self.query("SELECT 1 FROM pages WHERE url = ?", (url,)))
+
+    def conditional_headers(self, url):
+        """If-None-Match / If-Modified-Since headers for a revalidating GET"""
+        page = self.get(url)
+        headers = {}
+        if page:
+            if page['etag']:
+                headers['If-None-Match'] = page['etag']
+            if page['last_modified']:
+                headers['If-Modified-Since'] = page['last_modified']
+        return headers
+
+    def is_unchanged(self, url, content_hash):
+        """True if `url` was scraped before and its extracted content still hashes the same"""
+        page = self.get(url)
+        return bool(page) and page['content_hash'] == content_hash
+
+    def is_current(self, url, lastmod):
+        """True if `url` was scraped and a sitemap/REST lastmod is not newer than its stored dateModified"""
+        page = self.get(url)
+        if not page:
+            return False
+        stored = parse_lastmod(page['date_modified'])
+        modified = parse_lastmod(lastmod)
+        return stored is not None and modified is not None and modified <= stored
+
+    def record(self, url, etag=None, last_modified=None, date_modified=None, content_hash=None):
+        """Store a successful scrape of `url`"""
+        now = datetime.now().isoformat()
+        self.execute("""
+            INSERT INTO pages
+            (url, etag, last_modified, date_modified, content_hash, first_seen, last_checked, last_changed)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(url) DO UPDATE SET
+                etag = excluded.etag,
+                last_modified = excluded.last_modified,
+                date_modified = excluded.date_modified,
+                last_changed = CASE
+                    WHEN pages.content_hash IS excluded.content_hash THEN pages.last_changed
+                    ELSE excluded.last_changed
+                END,
+                content_hash = excluded.content_hash,
+                last_checked = excluded.last_checked
+        """, (url, etag, last_modified, date_modified, content_hash, now, now, now))
+
+    def mark_checked(self, url, etag=None, last_modified=None):
+        """Record a revalidation that found no change, refreshing validators if the server sent new ones"""
+        self.execute("""
+            UPDATE pages SET
+                etag = COALESCE(?, etag),
+                last_modified = COALESCE(?, last_modified),
+                last_checked = ?
+            WHERE url = ?
+        """, (etag, last_modified, datetime.now().isoformat(), url))
+
+    def urls(self, chunk_size=10000):
+        """Every URL in the index, read in chunks so the lock is not held while the caller iterates"""
+        last = 0
+        while True:
+            rows = self.query("SELECT rowid, url FROM pages WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                              (last, chunk_size))
+            if not rows:
+                return
+            for row in rows:
+                yield row['url']
+            last = rows[-1]['rowid']
+
+    def count(self):
+        """Number of URLs in the index"""
+        return self.query("SELECT COUNT(*) FROM pages")[0][0]
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
@@ -1,16 +1,22 @@
 #!/usr/bin/env python3
 """
 Debug JSON-LD extraction logic
+
+Usage: python debug_extraction.py [url] [archive_dir]
+With archive_dir (e.g. scraped_data/archive) the page is read from the
+response archive when it is there, without a request to the site.
 """
 
-import requests
+import sys
 from bs4 import BeautifulSoup
 import json
 
-url = "https://aimaqaqshamy.kz/mughalimdi-kez-kelgen-zhazatajym-zhaghdaj-ueshin-zhazalaw-orynsyz-aereket/"
+from html_archive import load_page
+
+url = sys.argv[1] if len(sys.argv) > 1 else "https://aimaqaqshamy.kz/mughalimdi-kez-kelgen-zhazatajym-zhaghdaj-ueshin-zhazalaw-orynsyz-aereket/"
+archive_dir = sys.argv[2] if len(sys.argv) > 2 else None
 
-response = requests.get(url)
-soup = BeautifulSoup(response.content, 'html.parser')
+soup = BeautifulSoup(load_page(url, archive_dir), 'html.parser')
 
 json_ld_scripts = soup.find_all('script', type='application/ld+json')
 
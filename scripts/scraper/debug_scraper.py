@@ -1,18 +1,24 @@
 #!/usr/bin/env python3
 """
 Debug version to see what JSON-LD data is actually on the page
+
+Usage: python debug_scraper.py [url] [archive_dir]
+With archive_dir (e.g. scraped_data/archive) the page is read from the
+response archive when it is there, without a request to the site.
 """
 
-import requests
+import sys
 from bs4 import BeautifulSoup
 import json
 
-url = "https://aimaqaqshamy.kz/mughalimdi-kez-kelgen-zhazatajym-zhaghdaj-ueshin-zhazalaw-orynsyz-aereket/"
+from html_archive import load_page
+
+url = sys.argv[1] if len(sys.argv) > 1 else "https://aimaqaqshamy.kz/mughalimdi-kez-kelgen-zhazatajym-zhaghdaj-ueshin-zhazalaw-orynsyz-aereket/"
+archive_dir = sys.argv[2] if len(sys.argv) > 2 else None
 
 print(f"Fetching: {url}\n")
 
-response = requests.get(url)
-soup = BeautifulSoup(response.content, 'html.parser')
+soup = BeautifulSoup(load_page(url, archive_dir), 'html.parser')
 
 print("="*70)
 print("JSON-LD SCRIPTS FOUND:")
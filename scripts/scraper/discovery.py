@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Article URL discovery from sitemaps and the WordPress REST API
+
+Walking /page/N/ listing pages costs a full page render per 10 articles and
+cannot reach past the first pages. These sources list every post with a
+handful of small requests instead:
+
+    rest_posts()     /wp-json/wp/v2/posts, newest first, 100 posts per request
+    sitemap_posts()  /wp-sitemap.xml (WordPress core), /sitemap_index.xml
+                     (Yoast, Rank Math) or /sitemap.xml, parsed incrementally
+
+Both are generators of (url, lastmod) pairs and skip entries last modified
+before `since` (a timezone-aware datetime). AimaqScraper falls back to the
+HTML listing crawl when neither is available.
+"""
+
+import re
+import time
+from datetime import datetime, timezone
+from xml.etree import ElementTree
+
+import requests
+
+
+SITEMAP_INDEXES = ('/wp-sitemap.xml', '/sitemap_index.xml', '/sitemap.xml')
+
+# Child sitemaps that list posts (core: wp-sitemap-posts-post-N.xml, Yoast/Rank Math: post-sitemapN.xml)
+POST_SITEMAP_RE = re.compile(r'(wp-sitemap-posts-post-\d+|post-sitemap\d*)\.xml')
+
+# Errors meaning "this source is not usable here", as opposed to bugs
+DISCOVERY_ERRORS = (requests.RequestException, ElementTree.ParseError, LookupError, ValueError)
+
+
+def parse_lastmod(text):
+    """W3C datetime / ISO 8601 string -> aware datetime (naive values are UTC), or None"""
+    if not text:
+        return None
+    try:
+        value = datetime.fromisoformat(text.strip().replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def modified_since(lastmod, since):
+    """Keep an entry unless it has a lastmod older than `since`"""
+    if since is None:
+        return True
+    modified = parse_lastmod(lastmod)
+    return modified is None or modified >= since
+
+
+def iter_sitemap(session, url, timeout=30):
+    """Stream (tag, loc, lastmod) for each <sitemap> or <url> entry without loading the whole file"""
+    with session.get(url, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        response.raw.decode_content = True
+
+        loc = lastmod = None
+        for _, element in ElementTree.iterparse(response.raw, events=('end',)):
+            tag = element.tag.rsplit('}', 1)[-1]
+            if tag == 'loc':
+                loc = (element.text or '').strip()
+            elif tag == 'lastmod':
+                lastmod = (element.text or '').strip()
+            elif tag in ('url', 'sitemap'):
+                if loc:
+                    yield tag, loc, lastmod
+                loc = lastmod = None
+                element.clear()
+
+
+def sitemap_posts(session, base_url, since=None, delay=0):
+    """
+    Yield (url, lastmod) for every post in the site's sitemaps
+
+    Tries the sitemap locations in SITEMAP_INDEXES order; raises LookupError
+    if none of them exists. Sitemaps are usually oldest first.
+    """
+    for path in SITEMAP_INDEXES:
+        children = []
+        found = False
+        try:
+            for tag, loc, lastmod in iter_sitemap(session, base_url + path):
+                found = True
+                if tag == 'sitemap':
+                    children.append((loc, lastmod))
+                elif modified_since(lastmod, since):
+                    yield loc, lastmod
+        except (requests.RequestException, ElementTree.ParseError):
+            if found:
+                raise
+            continue
+        if not found:
+            continue
+
+        # Post sitemaps only (not pages, categories, users), unless none is recognisable
+        posts = [child for child in children if POST_SITEMAP_RE.search(child[0])] or children
+        for loc, lastmod in posts:
+            # A child sitemap's lastmod is its newest entry: skip whole files with nothing new
+            if not modified_since(lastmod, since):
+                continue
+            time.sleep(delay)
+            for tag, url, url_lastmod in iter_sitemap(session, loc):
+                if tag == 'url' and modified_since(url_lastmod, since):
+                    yield url, url_lastmod
+        return
+
+    raise LookupError(f"No sitemap at {base_url} ({', '.join(SITEMAP_INDEXES)})")
+
+
+def rest_posts(session, base_url, since=None, delay=0, per_page=100):
+    """Yield (url, modified) for published posts from the WordPress REST API, newest first"""
+    endpoint = f"{base_url}/wp-json/wp/v2/posts"
+    params = {'per_page': per_page, '_fields': 'link,modified_gmt'}
+    if since:
+        # WordPress 5.7+; older versions ignore it and the check below filters instead
+        params['modified_after'] = since.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
+
+    page = 1
+    while True:
+        response = session.get(endpoint, params={**params, 'page': page}, timeout=30)
+        if response.status_code == 400 and page > 1:
+            # rest_post_invalid_page_number: walked past the last page
+            return
+        response.raise_for_status()
+        posts = response.json()
+        if not isinstance(posts, list):
+            raise ValueError(f"Unexpected response from {endpoint}")
+        if not posts:
+            return
+
+        for post in posts:
+            modified = post.get('modified_gmt')
+            lastmod = f"{modified}+00:00" if modified else None
+            if post.get('link') and modified_since(lastmod, since):
+                yield post['link'], lastmod
+
+        if page >= int(response.headers.get('X-WP-TotalPages', page)):
+            return
+        page += 1
+        time.sleep(delay)
+
+
+SOURCES = {
+    'rest': rest_posts,
+    'sitemap': sitemap_posts,
+}
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+URL frontier: every article URL once per discovery pass, and a compact seen-set across runs
+
+Frontier collects the article URLs of one discovery pass (listing pages,
+sitemaps or the REST API) in canonical form (url_canon.py) and in order,
+with a hash set for the duplicate check instead of a scan of the list.
+
+SeenSet remembers every URL ever scraped into a crawl state, as a scalable
+Bloom filter saved next to the state database (crawl_state.db ->
+crawl_state.seen). A Bloom filter answers "seen?" in O(1) with 3-4 bytes per
+URL and no false negatives; a false positive (at most error_rate,
+0.1% by default) only means the exact check in the state database is made
+after all. So a URL that was never scraped costs no database lookup, and the
+seen-set of millions of URLs takes a few MB of RAM. When the filter fills up,
+the next one is added at twice the capacity and half the error rate, so the
+total error rate stays within error_rate however many URLs are added.
+
+The saved file records how many URLs the state had; if that does not match
+(the process was killed before saving), the filter is rebuilt from the state.
+
+    python frontier.py scraped_data/crawl_state.seen   # capacity, fill and size of a saved seen-set
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import struct
+
+from url_canon import canonical_url
+
+
+MAGIC = b'SBLOOM1\n'
+
+
+def key_hashes(key):
+    """Two independent 64-bit hashes of a key, for double hashing (h1 + i * h2)"""
+    digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+    h1, h2 = struct.unpack('<QQ', digest)
+    return h1, h2 | 1
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter of `capacity` keys at `error_rate` false positives"""
+
+    def __init__(self, capacity, error_rate, bits=None, count=0):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bits if bits is not None else bytearray((self.size + 7) // 8)
+        self.count = count
+
+    def positions(self, hashes):
+        h1, h2 = hashes
+        size = self.size
+        return [(h1 + i * h2) % size for i in range(self.hashes)]
+
+    def contains(self, hashes):
+        # A loop rather than all(positions): a key that is not there mostly fails on the first bit or two
+        h1, h2 = hashes
+        bits, size = self.bits, self.size
+        for i in range(self.hashes):
+            position = (h1 + i * h2) % size
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def add(self, hashes):
+        bits = self.bits
+        for position in self.positions(hashes):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    @property
+    def full(self):
+        return self.count >= self.capacity
+
+
+class ScalableBloomFilter:
+    """
+    Bloom filter that grows: a series of filters, each twice as large and half as error-prone
+
+    With the first filter at error_rate / 2 the rates of the series add up
+    to at most error_rate (Almeida et al., Scalable Bloom Filters, 2007).
+    """
+
+    def __init__(self, initial_capacity=100000, error_rate=0.001, growth=2, tightening=0.5):
+        self.initial_capacity = initial_capacity
+        self.error_rate = error_rate
+        self.growth = growth
+        self.tightening = tightening
+        self.filters = []
+
+    def __contains__(self, key):
+        return self.contains(key_hashes(key))
+
+    def contains(self, hashes):
+        # Newest first: it is the largest, so it holds most of the keys
+        return any(bloom.contains(hashes) for bloom in reversed(self.filters))
+
+    def add(self, key):
+        """Add a key; False if it was (probably) there already"""
+        hashes = key_hashes(key)
+        if self.contains(hashes):
+            return False
+        if not self.filters or self.filters[-1].full:
+            n = len(self.filters)
+            self.filters.append(BloomFilter(self.initial_capacity * self.growth ** n,
+                                            self.error_rate * (1 - self.tightening) * self.tightening ** n))
+        self.filters[-1].add(hashes)
+        return True
+
+    def __len__(self):
+        return sum(bloom.count for bloom in self.filters)
+
+    @property
+    def nbytes(self):
+        return sum(len(bloom.bits) for bloom in self.filters)
+
+    def save(self, path, **meta):
+        """Write the filter (and `meta`) to `path` atomically"""
+        header = json.dumps({
+            'initial_capacity': self.initial_capacity, 'error_rate': self.error_rate,
+            'growth': self.growth, 'tightening': self.tightening,
+            'filters': [[bloom.capacity, bloom.error_rate, bloom.count] for bloom in self.filters],
+            'meta': meta,
+        }).encode('utf-8')
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(MAGIC + struct.pack('<I', len(header)) + header)
+            for bloom in self.filters:
+                f.write(bloom.bits)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """(filter, meta) from a file written by save(); raises ValueError if it is not one"""
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a saved Bloom filter")
+            length, = struct.unpack('<I', f.read(4))
+            header = json.loads(f.read(length))
+            self = cls(header['initial_capacity'], header['error_rate'], header['growth'], header['tightening'])
+            for capacity, error_rate, count in header['filters']:
+                bloom = BloomFilter(capacity, error_rate, count=count)
+                bits = f.read(len(bloom.bits))
+                if len(bits) != len(bloom.bits):
+                    raise ValueError(f"{path} is truncated")
+                bloom.bits = bytearray(bits)
+                self.filters.append(bloom)
+        return self, header['meta']
+
+
+class SeenSet:
+    """
+    URLs scraped in any run, kept in a ScalableBloomFilter alongside a CrawlState
+
+    Usage:
+        seen = SeenSet.for_state(state)
+        if url in seen and state.is_known(url): ...   # no query for URLs never seen
+        seen.add(url)
+        seen.save()
+    """
+
+    def __init__(self, path, state, error_rate=0.001):
+        self.path = path
+        self.state = state
+        self.error_rate = error_rate
+        self.urls = self.load()
+
+    @classmethod
+    def for_state(cls, state, **kwargs):
+        return cls(os.path.splitext(state.path)[0] + '.seen', state, **kwargs)
+
+    def load(self):
+        """The saved filter if it covers the state's URLs, else one rebuilt from the state"""
+        if os.path.exists(self.path):
+            try:
+                urls, meta = ScalableBloomFilter.load(self.path)
+                if meta.get('state_urls') == self.state.count():
+                    return urls
+            except (OSError, ValueError) as e:
+                print(f"  Rebuilding seen-set {self.path}: {e}")
+        urls = ScalableBloomFilter(error_rate=self.error_rate)
+        for url in self.state.urls():
+            urls.add(url)
+        return urls
+
+    def __contains__(self, url):
+        return url in self.urls
+
+    def __len__(self):
+        return len(self.urls)
+
+    def add(self, url):
+        self.urls.add(url)
+
+    def save(self):
+        self.urls.save(self.path, state_urls=self.state.count())
+
+
+class Frontier:
+    """
+    Article URLs of one discovery pass: canonical, in discovery order, each once
+
+    Usage:
+        frontier = Frontier(profile)
+        for href in hrefs:
+            url = frontier.add(href)   # the canonical URL if new and an article, else None
+        frontier.urls
+    """
+
+    def __init__(self, profile):
+        self.profile = profile
+        self.urls = []
+        self.found = set()
+
+    def add(self, href):
+        """Canonicalize `href`; returns it if it is an article URL not found before in this pass"""
+        try:
+            url = canonical_url(href, self.profile.base_url, self.profile.trailing_slash)
+        except ValueError:
+            return None
+        if url in self.found or not self.profile.is_canonical_article_url(url):
+            return None
+        self.found.add(url)
+        self.urls.append(url)
+        return url
+
+    def __contains__(self, url):
+        return url in self.found
+
+    def __len__(self):
+        return len(self.urls)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show a saved seen-set (Bloom filter)")
+    parser.add_argument('path', nargs='?', default="scraped_data/crawl_state.seen")
+    args = parser.parse_args()
+
+    urls, meta = ScalableBloomFilter.load(args.path)
+    print(f"{args.path}: {len(urls)} URLs in {len(urls.filters)} filters, {urls.nbytes / 1024:.0f} KB, "
+          f"error rate ≤ {urls.error_rate:g} (state had {meta.get('state_urls')} URLs when saved)")
+    for bloom in urls.filters:
+        print(f"  capacity {bloom.capacity:>10,}  used {bloom.count:>10,}  {bloom.hashes:>2} hashes  "
+              f"error rate {bloom.error_rate:.2g}  {len(bloom.bits) / 1024:.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Append-only archive of raw HTTP responses (WARC 1.0, one gzip member per record)
+
+The scraper can keep every listing and article page it downloads, with its
+status line and headers, so extraction fixes can be re-run offline
+(`scrape_aimaq.py --from-archive`) without touching the site. Files are
+standard .warc.gz (readable with warcio, zcat, ...); a SQLite index maps URLs
+to record offsets for random access. If the index is lost or behind,
+rebuild_index() recovers it by scanning the archive.
+
+Layout:
+    scraped_data/archive/
+    ├── responses.warc.gz
+    └── index.db
+"""
+
+import gzip
+import os
+import sqlite3
+import threading
+import uuid
+import zlib
+from datetime import datetime, timezone
+from http import HTTPStatus
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+
+# Re-encoded or recomputed on write: the archived body is the decoded payload
+HOP_HEADERS = {'content-encoding', 'transfer-encoding', 'content-length'}
+
+
+class ArchivedResponse:
+    """A response read back from the archive"""
+
+    def __init__(self, url, status, headers, body, fetched_at, kind=None):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.fetched_at = fetched_at
+        self.kind = kind
+
+    @property
+    def content(self):
+        """Same attribute name as requests.Response"""
+        return self.body
+
+
+def http_block(status, headers, body):
+    """Serialize an HTTP response as the WARC record block"""
+    try:
+        reason = HTTPStatus(status).phrase
+    except ValueError:
+        reason = ''
+    lines = [f"HTTP/1.1 {status} {reason}"]
+    for name, value in headers:
+        if name.lower() not in HOP_HEADERS:
+            lines.append(f"{name}: {value}")
+    lines.append(f"Content-Length: {len(body)}")
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('utf-8') + body
+
+
+def parse_headers(block):
+    """'Name: value' lines -> list of (name, value)"""
+    headers = []
+    for line in block.split(b'\r\n'):
+        if b':' in line:
+            name, value = line.split(b':', 1)
+            headers.append((name.decode('utf-8').strip(), value.decode('utf-8').strip()))
+    return headers
+
+
+def parse_record(data):
+    """Decompressed WARC record bytes -> (warc headers dict, ArchivedResponse)"""
+    warc_head, _, block = data.partition(b'\r\n\r\n')
+    warc = dict(parse_headers(warc_head.split(b'\r\n', 1)[1]))
+    length = int(warc['Content-Length'])
+    block = block[:length]
+
+    http_head, _, body = block.partition(b'\r\n\r\n')
+    status_line, _, header_lines = http_head.partition(b'\r\n')
+    status = int(status_line.split()[1])
+
+    return warc, ArchivedResponse(
+        url=warc['WARC-Target-URI'],
+        status=status,
+        headers=CaseInsensitiveDict(parse_headers(header_lines)),
+        body=body,
+        fetched_at=warc['WARC-Date'],
+        kind=warc.get('X-Page-Kind'),
+    )
+
+
+def iter_members(path):
+    """Yield (offset, length, decompressed bytes) for every gzip member of the file"""
+    with open(path, 'rb') as f:
+        offset = 0
+        buffered = b''
+        while True:
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            output = []
+            consumed = 0
+            while not decompressor.eof:
+                chunk = buffered or f.read(64 * 1024)
+                buffered = b''
+                if not chunk:
+                    # Truncated trailing record (e.g. crash mid-write): stop before it
+                    return
+                output.append(decompressor.decompress(chunk))
+                consumed += len(chunk) - len(decompressor.unused_data)
+            buffered = decompressor.unused_data
+            yield offset, consumed, b''.join(output)
+            offset += consumed
+            if not buffered:
+                buffered = f.read(64 * 1024)
+                if not buffered:
+                    return
+
+
+class HtmlArchive:
+    """
+    Usage:
+        archive = HtmlArchive('scraped_data/archive')
+        archive.write(url, 200, response.headers.items(), response.content, kind='article')
+        page = archive.get(url)          # latest record for url, or None
+        for page in archive.pages('article'): ...
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.path = os.path.join(directory, 'responses.warc.gz')
+        os.makedirs(directory, exist_ok=True)
+
+        # Fetch threads and the async engine share one archive
+        self.lock = threading.Lock()
+        self.file = open(self.path, 'ab')
+        self.reader = open(self.path, 'rb')
+        self.connection = sqlite3.connect(os.path.join(directory, 'index.db'), check_same_thread=False)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS records (
+                offset INTEGER PRIMARY KEY,
+                length INTEGER NOT NULL,
+                url TEXT NOT NULL,
+                kind TEXT,
+                status INTEGER,
+                fetched_at TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_records_url ON records(url);
+        """)
+        self.connection.commit()
+        self.written = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, url, status, headers, body, kind=None):
+        """Append one response; `headers` is an iterable of (name, value)"""
+        block = http_block(status, headers, body)
+        fetched_at = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        warc_headers = [
+            ('WARC-Type', 'response'),
+            ('WARC-Record-ID', f"<urn:uuid:{uuid.uuid4()}>"),
+            ('WARC-Date', fetched_at),
+            ('WARC-Target-URI', url),
+            ('Content-Type', 'application/http; msgtype=response'),
+            ('Content-Length', str(len(block))),
+        ]
+        if kind:
+            warc_headers.append(('X-Page-Kind', kind))
+        head = 'WARC/1.0\r\n' + ''.join(f"{name}: {value}\r\n" for name, value in warc_headers)
+        member = gzip.compress(head.encode('utf-8') + b'\r\n' + block + b'\r\n\r\n', compresslevel=6)
+
+        with self.lock:
+            offset = self.file.seek(0, os.SEEK_END)
+            self.file.write(member)
+            self.file.flush()
+            self.connection.execute(
+                "INSERT OR REPLACE INTO records (offset, length, url, kind, status, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (offset, len(member), url, kind, status, fetched_at)
+            )
+            self.connection.commit()
+            self.written += 1
+
+    def read(self, offset, length):
+        with self.lock:
+            self.reader.seek(offset)
+            member = self.reader.read(length)
+        return parse_record(gzip.decompress(member))[1]
+
+    def get(self, url):
+        """Latest archived response for `url`, or None"""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT offset, length FROM records WHERE url = ? ORDER BY offset DESC LIMIT 1", (url,)
+            ).fetchone()
+        return self.read(*row) if row else None
+
+    def pages(self, kind=None):
+        """Latest response per URL (optionally of one kind), in archive order"""
+        where = "WHERE kind = ?" if kind else ""
+        with self.lock:
+            rows = self.connection.execute(f"""
+                SELECT MAX(offset), length FROM records {where} GROUP BY url ORDER BY 1
+            """, (kind,) if kind else ()).fetchall()
+        for offset, length in rows:
+            yield self.read(offset, length)
+
+    def count(self, kind=None):
+        where = "WHERE kind = ?" if kind else ""
+        with self.lock:
+            return self.connection.execute(
+                f"SELECT COUNT(DISTINCT url) FROM records {where}", (kind,) if kind else ()
+            ).fetchone()[0]
+
+    def rebuild_index(self):
+        """Re-create the offset index from the archive file; returns the number of records"""
+        with self.lock:
+            self.file.flush()
+            self.connection.execute("DELETE FROM records")
+            count = 0
+            for offset, length, data in iter_members(self.path):
+                warc, response = parse_record(data)
+                self.connection.execute(
+                    "INSERT INTO records (offset, length, url, kind, status, fetched_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (offset, length, response.url, response.kind, response.status, response.fetched_at)
+                )
+                count += 1
+            self.connection.commit()
+        return count
+
+    def close(self):
+        self.file.close()
+        self.reader.close()
+        self.connection.close()
+
+
+def load_page(url, archive_dir=None):
+    """Page bytes from the archive if it has `url`, else from the network"""
+    if archive_dir:
+        with HtmlArchive(archive_dir) as archive:
+            page = archive.get(url)
+        if page:
+            print(f"(from archive {archive_dir}, fetched {page.fetched_at})")
+            return page.body
+    return requests.get(url, timeout=30).content
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Pluggable HTML parser backends for the scraper
+
+Each backend turns raw page bytes into the raw parts the scraper needs, using
+targeted selectors instead of repeated find_all walks:
+
+    listing_links(content) -> hrefs of the first link in each post (class post_class)
+    article_parts(content) -> {'json_ld': [...script texts],
+                               'h1': str or None,
+                               'paragraphs': [...non-empty stripped texts],
+                               'images': [{'src', 'alt', 'width', 'height'}, ...]}
+
+Backends: 'lxml' (default, pinned in requirements.txt), 'selectolax'
+(optional, pip install selectolax) and 'bs4' (BeautifulSoup with html.parser,
+the original implementation and the fallback). All three produce the same
+output on well-formed pages.
+
+The selectors come from the site profile (site_profiles.py): post_class for
+listing posts and content_classes for the article body when a page has no
+<article>; the defaults fit aimaqaqshamy.kz.
+"""
+
+import re
+
+from bs4 import BeautifulSoup
+
+
+# Main content container when there is no <article> element
+CONTENT_CLASSES = ('entry-content', 'post-content', 'article-content')
+# Listing pages: one element with this class per post
+POST_CLASS = 'bs-blog-post'
+
+META_CHARSET_RE = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.IGNORECASE)
+
+
+def decode_html(content):
+    """
+    Decode page bytes using <meta charset>, else UTF-8
+
+    lxml assumes Latin-1 for bytes without a charset declaration and lexbor
+    assumes UTF-8, unlike BeautifulSoup's detection. Returns the bytes unchanged if nothing fits.
+    """
+    match = META_CHARSET_RE.search(content[:4096])
+    for encoding in ((match.group(1).decode('ascii'),) if match else ()) + ('utf-8',):
+        try:
+            return content.decode(encoding)
+        except (LookupError, UnicodeDecodeError):
+            continue
+    return content
+
+
+def image_attrs(get):
+    """Attribute dict for an <img>, given an attribute getter with a default"""
+    return {
+        'src': get('src', ''),
+        'alt': get('alt', ''),
+        'width': get('width', ''),
+        'height': get('height', ''),
+    }
+
+
+class SoupBackend:
+    """BeautifulSoup + html.parser: slowest, most forgiving, always available"""
+
+    name = 'bs4'
+
+    def __init__(self, post_class=POST_CLASS, content_classes=CONTENT_CLASSES):
+        self.post_class = post_class
+        self.content_class_re = re.compile('|'.join(map(re.escape, content_classes)))
+
+    def listing_links(self, content):
+        soup = BeautifulSoup(content, 'html.parser')
+        links = []
+        for article_div in soup.find_all(class_=self.post_class):
+            link = article_div.find('a', href=True)
+            if link:
+                links.append(link.get('href', ''))
+        return links
+
+    def article_parts(self, content):
+        soup = BeautifulSoup(content, 'html.parser')
+        parts = {
+            'json_ld': [script.string for script in soup.find_all('script', type='application/ld+json')],
+            'h1': None,
+            'paragraphs': [],
+            'images': None,
+        }
+
+        h1 = soup.find('h1')
+        if h1:
+            parts['h1'] = h1.get_text(strip=True)
+
+        article_body = soup.find('article') or soup.find('div', class_=self.content_class_re)
+        if article_body:
+            texts = (p.get_text(strip=True) for p in article_body.find_all('p'))
+            parts['paragraphs'] = [text for text in texts if text]
+            parts['images'] = [image_attrs(img.get) for img in article_body.find_all('img')]
+
+        return parts
+
+
+class LxmlBackend:
+    """lxml.html tree with precompiled XPath selectors"""
+
+    name = 'lxml'
+
+    def __init__(self, post_class=POST_CLASS, content_classes=CONTENT_CLASSES):
+        import lxml.html
+        from lxml import etree
+
+        self.html = lxml.html
+        class_test = ' or '.join(f"contains(@class, '{cls}')" for cls in content_classes)
+        self.xpath_posts = etree.XPath(
+            f"//*[contains(concat(' ', normalize-space(@class), ' '), ' {post_class} ')]"
+        )
+        self.xpath_first_link = etree.XPath("(.//a[@href])[1]/@href")
+        self.xpath_json_ld = etree.XPath("//script[@type='application/ld+json']")
+        self.xpath_h1 = etree.XPath("(//h1)[1]")
+        self.xpath_article = etree.XPath("(//article)[1]")
+        self.xpath_content_div = etree.XPath(f"(//div[{class_test}])[1]")
+        self.xpath_paragraphs = etree.XPath(".//p")
+        # Script/style text is not visible text (BeautifulSoup's get_text skips it too)
+        self.xpath_text = etree.XPath(".//text()[not(parent::script or parent::style)]")
+        self.xpath_images = etree.XPath(".//img")
+
+    def parse(self, content):
+        if isinstance(content, bytes):
+            text = decode_html(content)
+            try:
+                return self.html.fromstring(text)
+            except ValueError:
+                # str input with an <?xml encoding=...?> declaration is rejected by lxml
+                pass
+        return self.html.fromstring(content)
+
+    def text(self, element):
+        return ''.join(part.strip() for part in self.xpath_text(element))
+
+    def listing_links(self, content):
+        tree = self.parse(content)
+        links = []
+        for post in self.xpath_posts(tree):
+            href = self.xpath_first_link(post)
+            if href:
+                links.append(str(href[0]))
+        return links
+
+    def article_parts(self, content):
+        tree = self.parse(content)
+        parts = {
+            'json_ld': [script.text for script in self.xpath_json_ld(tree)],
+            'h1': None,
+            'paragraphs': [],
+            'images': None,
+        }
+
+        h1 = self.xpath_h1(tree)
+        if h1:
+            parts['h1'] = self.text(h1[0])
+
+        article_body = self.xpath_article(tree) or self.xpath_content_div(tree)
+        if article_body:
+            body = article_body[0]
+            texts = (self.text(p) for p in self.xpath_paragraphs(body))
+            parts['paragraphs'] = [text for text in texts if text]
+            parts['images'] = [image_attrs(img.get) for img in self.xpath_images(body)]
+
+        return parts
+
+
+class SelectolaxBackend:
+    """selectolax (lexbor) CSS selectors: fastest, optional dependency"""
+
+    name = 'selectolax'
+
+    def __init__(self, post_class=POST_CLASS, content_classes=CONTENT_CLASSES):
+        from selectolax.lexbor import LexborHTMLParser
+
+        self.parser = LexborHTMLParser
+        self.post_selector = f'.{post_class}'
+        self.content_selector = ', '.join(f'div[class*="{cls}"]' for cls in content_classes)
+
+    def parse(self, content):
+        # lexbor reads bytes as UTF-8 only; honour <meta charset> like the other backends
+        return self.parser(decode_html(content) if isinstance(content, bytes) else content)
+
+    def listing_links(self, content):
+        tree = self.parse(content)
+        links = []
+        for post in tree.css(self.post_selector):
+            link = post.css_first('a[href]')
+            if link:
+                links.append(link.attributes.get('href') or '')
+        return links
+
+    def article_parts(self, content):
+        tree = self.parse(content)
+        parts = {
+            'json_ld': [script.text(deep=True) for script in tree.css('script[type="application/ld+json"]')],
+            'h1': None,
+            'paragraphs': [],
+            'images': None,
+        }
+
+        # Script/style text is not visible text (BeautifulSoup's get_text skips it too)
+        tree.strip_tags(['script', 'style'])
+
+        h1 = tree.css_first('h1')
+        if h1:
+            parts['h1'] = h1.text(deep=True, separator='', strip=True)
+
+        # <article> wins over the content div regardless of document order
+        article_body = tree.css_first('article') or tree.css_first(self.content_selector)
+        if article_body:
+            texts = (p.text(deep=True, separator='', strip=True) for p in article_body.css('p'))
+            parts['paragraphs'] = [text for text in texts if text]
+            parts['images'] = [
+                image_attrs(lambda key, default, attrs=img.attributes: attrs.get(key) or default)
+                for img in article_body.css('img')
+            ]
+
+        return parts
+
+
+BACKENDS = {
+    'lxml': LxmlBackend,
+    'selectolax': SelectolaxBackend,
+    'bs4': SoupBackend,
+}
+
+
+def get_backend(name='lxml', **selectors):
+    """
+    Instantiate a backend by name, falling back to BeautifulSoup if its library is missing
+
+    `selectors` are post_class / content_classes, usually SiteProfile.selectors.
+    """
+    try:
+        return BACKENDS[name](**selectors)
+    except ImportError as e:
+        print(f"Parser backend '{name}' unavailable ({e}), falling back to BeautifulSoup")
+        return SoupBackend(**selectors)
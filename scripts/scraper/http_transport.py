@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+HTTP transport for the scraper: pooled keep-alive session, retries, adaptive pacing
+
+    session = pooled_session(pool_size=10)
+    pacer = AdaptiveDelay(initial=1.0, minimum=0.1, maximum=30)
+    client = RetryingClient(MeteredSession(session, metrics), RetryPolicy(), pacer)
+    response = client.get(url, kind='article', timeout=30)
+
+RetryPolicy retries 429/5xx responses and connection errors with exponential
+backoff and jitter, waiting for Retry-After instead when the server sends it.
+AdaptiveDelay replaces fixed sleeps between requests: the delay shrinks while
+responses are fast and clean, and grows when latency climbs above the
+baseline or errors show up, so the crawl settles at the fastest rate the
+server handles. The async engine shares both (see async_scraper.py).
+Given metrics, pooled_session() times name resolution and connection setup
+(TCP + TLS) of every new connection, like the async engine's aiohttp trace.
+"""
+
+import itertools
+import random
+import socket
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from urllib3.util.connection import allowed_gai_family
+
+
+# Failures worth retrying: the request may succeed later, nothing was processed
+RETRY_ERRORS = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)
+
+
+def parse_retry_after(value):
+    """Retry-After header (seconds or HTTP date) -> seconds to wait, or None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class TimedConnection:
+    """
+    urllib3 connection mixin timing connection setup into `metrics` (a Metrics)
+
+    The host is resolved here, timed as scraper_dns_seconds, and urllib3 then
+    connects to its addresses in turn; the rest of connect() (TCP, and the
+    TLS handshake for HTTPS) is scraper_connect_seconds.
+    """
+
+    metrics = None
+    dns_seconds = 0.0
+
+    def _new_conn(self):
+        host = self._dns_host
+        start = time.perf_counter()
+        try:
+            addresses = socket.getaddrinfo(host.strip('[]'), self.port, allowed_gai_family(), socket.SOCK_STREAM)
+        except socket.gaierror as e:
+            raise NewConnectionError(self, f"Failed to resolve {host}: {e}") from e
+        finally:
+            self.dns_seconds = time.perf_counter() - start
+            self.metrics.observe('scraper_dns_seconds', self.dns_seconds)
+
+        error = None
+        try:
+            for address in dict.fromkeys(info[4][0] for info in addresses):
+                self._dns_host = address
+                try:
+                    return super()._new_conn()
+                except ConnectTimeoutError as e:
+                    error = e
+            raise error
+        finally:
+            self._dns_host = host
+
+    def connect(self):
+        self.dns_seconds = 0.0
+        start = time.perf_counter()
+        super().connect()
+        self.metrics.observe('scraper_connect_seconds', time.perf_counter() - start - self.dns_seconds)
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose connections are TimedConnections reporting to `metrics`"""
+
+    def __init__(self, metrics, **kwargs):
+        self.metrics = metrics
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        pools = {}
+        for scheme, pool_cls, connection_cls in (('http', HTTPConnectionPool, HTTPConnection),
+                                                 ('https', HTTPSConnectionPool, HTTPSConnection)):
+            timed = type(f"Timed{connection_cls.__name__}", (TimedConnection, connection_cls),
+                         {'metrics': self.metrics})
+            pools[scheme] = type(f"Timed{pool_cls.__name__}", (pool_cls,), {'ConnectionCls': timed})
+        self.poolmanager.pool_classes_by_scheme = pools
+
+
+def pooled_session(pool_size=10, user_agent=None, metrics=None):
+    """
+    requests.Session whose connection pool keeps `pool_size` keep-alive connections per host
+
+    With `metrics`, DNS and connection setup times of new connections are recorded.
+    """
+    session = requests.Session()
+    # Retries are done by RetryingClient, which also paces and counts them
+    options = dict(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+    adapter = TimedHTTPAdapter(metrics, **options) if metrics else HTTPAdapter(**options)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    if user_agent:
+        session.headers['User-Agent'] = user_agent
+    return session
+
+
+class RetryPolicy:
+    """Which responses to retry, how often, and how long to wait in between"""
+
+    statuses = frozenset({429, 500, 502, 503, 504})
+
+    def __init__(self, retries=4, backoff=0.5, max_backoff=30.0, max_retry_after=120.0):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        # A longer Retry-After means "come back later", not "retry": give up instead
+        self.max_retry_after = max_retry_after
+
+    def retryable(self, status):
+        return status in self.statuses
+
+    def delay(self, attempt, retry_after=None):
+        """Seconds to wait before retry number `attempt + 1`, or None to give up"""
+        if attempt >= self.retries:
+            return None
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_retry_after else None
+        # Exponential backoff with "equal jitter": half fixed, half random, so
+        # clients that failed together do not retry together
+        cap = min(self.max_backoff, self.backoff * 2 ** attempt)
+        return cap / 2 + random.uniform(0, cap / 2)
+
+
+class AdaptiveDelay:
+    """
+    Delay between consecutive requests, adjusted from what the server reports
+
+    Every response is recorded with its latency (time to headers). Being
+    throttled (429) doubles the delay; other errors (5xx, connection failures)
+    grow it by 50% once they make up more than error_threshold of the last
+    `window` responses, and a slow response (latency above slow_factor x
+    baseline + slack) by 25%, up to `maximum`. Otherwise the delay shrinks by
+    10% per response down to `minimum`, as long as the error rate stays below
+    the threshold. Retry-After pauses all requests until the given time.
+    minimum == maximum gives a fixed delay.
+
+    Responses to requests sent before the last increase do not increase the
+    delay again: a burst of concurrent 429s is one signal, not twenty.
+
+    Thread-safe: reserve() hands out evenly spaced send slots to all threads.
+    """
+
+    # Smallest non-zero delay backoff starts from when the delay is 0
+    step = 0.05
+    # Latency this much above slow_factor x baseline counts as slow (absorbs jitter on fast links)
+    slack = 0.05
+
+    def __init__(self, initial=1.0, minimum=0.1, maximum=30.0, window=20,
+                 error_threshold=0.2, slow_factor=2.0):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.delay = min(maximum, max(minimum, initial))
+        self.error_threshold = error_threshold
+        self.slow_factor = slow_factor
+        self.outcomes = deque(maxlen=window)
+        self.latency = None
+        self.baseline = None
+        self.next_slot = 0.0
+        self.not_before = 0.0
+        self.increased_at = 0.0
+        self.lock = threading.Lock()
+
+    @property
+    def fixed(self):
+        return self.minimum == self.maximum
+
+    def reserve(self):
+        """Claim the next send slot; returns the seconds to sleep before sending"""
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot, self.not_before)
+            self.next_slot = slot + self.delay
+            return slot - now
+
+    def paused(self):
+        """Seconds left of a Retry-After pause"""
+        return max(0.0, self.not_before - time.monotonic())
+
+    def increase(self, factor, sent):
+        if sent is None or sent >= self.increased_at:
+            self.delay = min(self.maximum, max(self.delay * factor, self.step))
+            self.increased_at = time.monotonic()
+
+    def record(self, latency=None, error=False, throttled=False, retry_after=None, sent=None):
+        """
+        Feed back one response (or failed request) and adjust the delay
+
+        `error` is any failed attempt, `throttled` a 429; `sent` is the
+        time.monotonic() at which the request was sent.
+        """
+        with self.lock:
+            stale = sent is not None and sent < self.increased_at
+            if not (stale and (error or throttled)):
+                # Failures of requests sent before the last increase were already reacted to
+                self.outcomes.append(error or throttled)
+            error_rate = sum(self.outcomes) / len(self.outcomes) if self.outcomes else 0.0
+            if retry_after:
+                self.not_before = max(self.not_before, time.monotonic() + retry_after)
+            if throttled:
+                self.increase(2, sent)
+                return
+            if error:
+                # Occasional failures are left to the retries; a rising error rate is load
+                if error_rate > self.error_threshold:
+                    self.increase(1.5, sent)
+                return
+
+            if latency is not None:
+                self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+                self.baseline = self.latency if self.baseline is None else min(self.baseline, self.latency)
+
+            slow = self.latency is not None and \
+                self.latency > self.slow_factor * self.baseline + self.slack
+            if slow:
+                self.increase(1.25, sent)
+            elif error_rate <= self.error_threshold:
+                self.delay = max(self.minimum, self.delay * 0.9)
+
+
+class RetryingClient:
+    """
+    Paced, retrying GET on top of a MeteredSession (every attempt is metered)
+
+    Returns the final response like requests does: after the last retry a
+    429/5xx response is returned for the caller's raise_for_status(); a
+    connection error is raised.
+    """
+
+    def __init__(self, client, policy, pacer):
+        self.client = client
+        self.policy = policy
+        self.pacer = pacer
+
+    @property
+    def metrics(self):
+        return self.client.metrics
+
+    def with_kind(self, kind):
+        return RetryingClient(self.client.with_kind(kind), self.policy, self.pacer)
+
+    def get(self, url, kind=None, **kwargs):
+        kind = kind or self.client.kind
+        for attempt in itertools.count():
+            wait = self.pacer.reserve()
+            if wait > 0:
+                self.metrics.observe('scraper_wait_seconds', wait, reason='pacing')
+                time.sleep(wait)
+
+            sent = time.monotonic()
+            try:
+                response = self.client.get(url, kind=kind, **kwargs)
+            except RETRY_ERRORS:
+                self.pacer.record(error=True, sent=sent)
+                delay = self.policy.delay(attempt)
+                if delay is None:
+                    raise
+                reason = 'error'
+            else:
+                retryable = self.policy.retryable(response.status_code)
+                retry_after = parse_retry_after(response.headers.get('Retry-After')) if retryable else None
+                self.pacer.record(response.elapsed.total_seconds(), error=retryable,
+                                  throttled=response.status_code == 429, retry_after=retry_after, sent=sent)
+                delay = self.policy.delay(attempt, retry_after) if retryable else None
+                if delay is None:
+                    return response
+                response.close()
+                reason = str(response.status_code)
+
+            self.metrics.inc('scraper_retries_total', kind=kind, reason=reason)
+            self.metrics.observe('scraper_wait_seconds', delay, reason='backoff')
+            time.sleep(delay)
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Content-addressed image store
+
+Images are streamed to a temporary file while being hashed and then stored
+once under images/sha256/xx/<sha256><ext>. A photo reused by several articles
+is stored (and, once its URL is known, downloaded) only once. A small SQLite
+index maps image URLs and digests to stored files, and keeps the probed size
+and responsive variants of each object (image_variants.py).
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from urllib.parse import urlparse
+
+
+CHUNK_SIZE = 64 * 1024
+
+
+def digest_of(path):
+    """SHA-256 of a stored object, read from its file name"""
+    return os.path.splitext(os.path.basename(path))[0] if path else None
+
+
+class PendingImage:
+    """A download in progress: bytes go to a temp file and into the running SHA-256"""
+
+    def __init__(self, store, url):
+        self.store = store
+        self.url = url
+        self.hasher = hashlib.sha256()
+        self.size = 0
+        # Disk time (writes + commit), reported as scraper_image_write_seconds
+        self.write_seconds = 0.0
+        fd, self.tmp_path = tempfile.mkstemp(dir=store.tmp_dir, suffix='.part')
+        self.file = os.fdopen(fd, 'wb')
+
+    def write(self, chunk):
+        start = time.perf_counter()
+        self.file.write(chunk)
+        self.write_seconds += time.perf_counter() - start
+        self.hasher.update(chunk)
+        self.size += len(chunk)
+
+    def commit(self):
+        """Move the finished file into the store (or drop it if the content exists); return its path"""
+        start = time.perf_counter()
+        self.file.close()
+        path = self.store.add(self.url, self.tmp_path, self.hasher.hexdigest(), self.size)
+        if self.store.metrics:
+            self.write_seconds += time.perf_counter() - start
+            self.store.metrics.observe('scraper_image_write_seconds', self.write_seconds)
+        return path
+
+    def discard(self):
+        self.file.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+class ImageStore:
+    """
+    Usage:
+        store = ImageStore('scraped_data/images')
+        path = store.lookup(url) or store.download(session, url)
+    """
+
+    def __init__(self, root, metrics=None):
+        self.root = root
+        self.metrics = metrics
+        self.objects_dir = os.path.join(root, 'sha256')
+        self.tmp_dir = os.path.join(root, 'tmp')
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+        # Downloads run in a thread pool; one connection guarded by a lock
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(os.path.join(root, 'index.db'), check_same_thread=False)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS objects (
+                sha256 TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                bytes INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS urls (
+                url TEXT PRIMARY KEY,
+                sha256 TEXT NOT NULL REFERENCES objects(sha256)
+            );
+            CREATE TABLE IF NOT EXISTS processed (
+                sha256 TEXT PRIMARY KEY REFERENCES objects(sha256),
+                settings TEXT NOT NULL,
+                width INTEGER,
+                height INTEGER,
+                variants TEXT
+            );
+        """)
+        self.connection.commit()
+
+        self.downloaded = 0
+        self.reused = 0
+        self.deduplicated = 0
+
+    def object_path(self, digest, url):
+        """sha256/ab/abcdef...<ext>, keeping the extension from the URL"""
+        ext = os.path.splitext(urlparse(url).path)[1].lower()
+        return os.path.join(self.objects_dir, digest[:2], digest + ext)
+
+    def lookup(self, url):
+        """Stored path for an already-downloaded URL, or None"""
+        with self.lock:
+            row = self.connection.execute("""
+                SELECT objects.path FROM urls JOIN objects USING (sha256) WHERE urls.url = ?
+            """, (url,)).fetchone()
+            if row and os.path.exists(row[0]):
+                self.reused += 1
+                return row[0]
+        return None
+
+    def begin(self, url):
+        return PendingImage(self, url)
+
+    def add(self, url, tmp_path, digest, size):
+        """Register a fully written temp file; returns the path of the stored object"""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT path FROM objects WHERE sha256 = ?", (digest,)
+            ).fetchone()
+
+            if row and os.path.exists(row[0]):
+                os.remove(tmp_path)
+                path = row[0]
+                self.deduplicated += 1
+            else:
+                path = self.object_path(digest, url)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp_path, path)
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO objects (sha256, path, bytes) VALUES (?, ?, ?)",
+                    (digest, path, size)
+                )
+                self.downloaded += 1
+
+            self.connection.execute(
+                "INSERT OR REPLACE INTO urls (url, sha256) VALUES (?, ?)", (url, digest)
+            )
+            self.connection.commit()
+        return path
+
+    def processed(self, digest, settings):
+        """Size and variants of an object processed with the same settings, or None"""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT width, height, variants FROM processed WHERE sha256 = ? AND settings = ?",
+                (digest, settings)
+            ).fetchone()
+        if row is None:
+            return None
+        variants = json.loads(row[2] or '[]')
+        # Variant files removed since (e.g. a cleaned cache) mean processing again
+        if not all(os.path.exists(variant['path']) for variant in variants):
+            return None
+        return {'width': row[0], 'height': row[1], 'variants': variants}
+
+    def record_processed(self, digest, settings, result):
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO processed (sha256, settings, width, height, variants) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (digest, settings, result['width'], result['height'], json.dumps(result['variants']))
+            )
+            self.connection.commit()
+
+    def download(self, session, url, timeout=30):
+        """Stream `url` through a requests session into the store; returns the stored path"""
+        pending = self.begin(url)
+        try:
+            with session.get(url, stream=True, timeout=timeout) as response:
+                response.raise_for_status()
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    pending.write(chunk)
+            return pending.commit()
+        except BaseException:
+            pending.discard()
+            raise
+
+    def close(self):
+        self.connection.close()
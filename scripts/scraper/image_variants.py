@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Image post-processing: real dimensions and responsive WebP variants
+
+probe_size() reads the pixel size from the file header only (JPEG SOF
+segment, PNG IHDR, GIF screen descriptor, WebP VP8/VP8L/VP8X chunk), without
+decoding and without Pillow, so every stored image gets a width and height
+even when its <img> tag had none. JPEG sizes follow the EXIF orientation.
+
+make_variants() writes downscaled copies at the configured widths (WebP, or
+AVIF where Pillow supports it) next to the originals:
+
+    images/variants/3f/3fa1…c2-320.webp
+    images/variants/3f/3fa1…c2-640.webp
+
+Pillow is optional (pip install pillow): without it images are only probed.
+ImageProcessor runs the work in a process pool and remembers the result per
+SHA-256 in the image store index, so a photo shared by articles or handled
+in an earlier run is never processed twice.
+
+Add variants to an existing output file:
+    python image_variants.py scraped_data/articles.ndjson --widths 320,640,1024
+"""
+
+import argparse
+import os
+import struct
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:
+    Image = None
+
+
+DEFAULT_WIDTHS = (320, 640, 1024)
+
+# JPEG start-of-frame markers (baseline, progressive, lossless...; not DHT/JPG/DAC)
+SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+# Markers without a length field
+STANDALONE_MARKERS = frozenset(range(0xD0, 0xDA)) | {0x01}
+
+
+def exif_orientation(segment):
+    """EXIF Orientation tag (1-8) from an APP1 segment body, or 1"""
+    if not segment.startswith(b'Exif\x00\x00'):
+        return 1
+    tiff = segment[6:]
+    endian = {b'II': '<', b'MM': '>'}.get(tiff[:2])
+    if endian is None or len(tiff) < 8:
+        return 1
+    offset = struct.unpack(endian + 'I', tiff[4:8])[0]
+    if offset + 2 > len(tiff):
+        return 1
+    count = struct.unpack(endian + 'H', tiff[offset:offset + 2])[0]
+    for i in range(count):
+        entry = tiff[offset + 2 + i * 12:offset + 14 + i * 12]
+        if len(entry) < 12:
+            break
+        tag, kind = struct.unpack(endian + 'HH', entry[:4])
+        if tag == 0x0112 and kind == 3:
+            return struct.unpack(endian + 'H', entry[8:10])[0]
+    return 1
+
+
+def jpeg_size(f):
+    """Walk JPEG segments up to the frame header, seeking over everything else"""
+    f.seek(2)
+    orientation = 1
+    while True:
+        byte = f.read(1)
+        while byte and byte != b'\xff':
+            byte = f.read(1)
+        while byte == b'\xff':
+            byte = f.read(1)
+        if not byte:
+            return None
+        marker = byte[0]
+        if marker in STANDALONE_MARKERS:
+            continue
+        if marker == 0xD9:
+            return None
+        length = struct.unpack('>H', f.read(2))[0]
+        if marker in SOF_MARKERS:
+            height, width = struct.unpack('>xHH', f.read(5))
+            # Orientations 5-8 are rotated by 90 degrees: displayed sideways
+            return (height, width) if orientation >= 5 else (width, height)
+        if marker == 0xE1 and orientation == 1:
+            orientation = exif_orientation(f.read(length - 2))
+        else:
+            f.seek(length - 2, os.SEEK_CUR)
+
+
+def webp_size(head):
+    """Canvas size from the first chunk of a RIFF/WEBP file (needs 30 header bytes)"""
+    chunk = head[12:16]
+    if chunk == b'VP8 ' and head[23:26] == b'\x9d\x01\x2a':
+        width, height = struct.unpack('<HH', head[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b'VP8L' and head[20] == 0x2F:
+        bits = int.from_bytes(head[21:25], 'little')
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b'VP8X':
+        return int.from_bytes(head[24:27], 'little') + 1, int.from_bytes(head[27:30], 'little') + 1
+    return None
+
+
+def probe_size(path):
+    """(width, height) of an image read from its header, or None for unknown formats"""
+    with open(path, 'rb') as f:
+        head = f.read(32)
+        if head.startswith(b'\x89PNG\r\n\x1a\n') and head[12:16] == b'IHDR':
+            return struct.unpack('>II', head[16:24])
+        if head[:6] in (b'GIF87a', b'GIF89a'):
+            return struct.unpack('<HH', head[6:10])
+        if head[:4] == b'RIFF' and head[8:12] == b'WEBP' and len(head) >= 30:
+            return webp_size(head)
+        if head[:2] == b'\xff\xd8':
+            try:
+                return jpeg_size(f)
+            except struct.error:
+                return None
+    return None
+
+
+def variant_path(variants_dir, digest, width, image_format):
+    return os.path.join(variants_dir, digest[:2], f"{digest}-{width}.{image_format}")
+
+
+def make_variants(path, digest, widths, variants_dir, image_format='webp', quality=80):
+    """
+    Write downscaled copies of an image at each width below its own; returns their records
+
+    Needs Pillow. The largest variant is resized from the decoded image
+    (JPEGs are decoded at a reduced scale when that is still large enough),
+    each smaller one from the previous, so a set costs little more than one
+    decode. Files are written atomically; existing ones are kept.
+    """
+    variants = []
+    with Image.open(path) as original:
+        # Widths are of the image as displayed, i.e. after EXIF rotation
+        rotated = original.getexif().get(0x0112, 1) >= 5
+        width = original.height if rotated else original.width
+        targets = sorted((w for w in set(widths) if w < width), reverse=True)
+        if not targets:
+            return variants
+        if original.format == 'JPEG':
+            # DCT scaling: decode at 1/2, 1/4 or 1/8 size if that still covers the largest width
+            scale = targets[0] / width
+            original.draft('RGB', (int(original.width * scale) + 1, int(original.height * scale) + 1))
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+
+        for width in targets:
+            height = max(1, round(image.height * width / image.width))
+            image = image.resize((width, height), Image.LANCZOS)
+            target = variant_path(variants_dir, digest, width, image_format)
+            if not os.path.exists(target):
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                tmp_path = f"{target}.{os.getpid()}.part"
+                # WebP method 2: ~2.5x faster to encode than the default 4, ~4% larger files
+                image.save(tmp_path, format=image_format.upper(), quality=quality, method=2)
+                os.replace(tmp_path, target)
+            variants.append({'width': width, 'height': height, 'path': target,
+                             'bytes': os.path.getsize(target)})
+    return variants
+
+
+def process_image(path, digest, widths, variants_dir, image_format='webp', quality=80):
+    """Worker entry point: one stored image -> {'width', 'height', 'variants', 'seconds'[, 'error']}"""
+    start = time.perf_counter()
+    result = {'width': None, 'height': None, 'variants': []}
+    try:
+        size = probe_size(path)
+        if size:
+            result['width'], result['height'] = size
+        if widths and Image is not None:
+            result['variants'] = make_variants(path, digest, widths, variants_dir, image_format, quality)
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+class ImageProcessor:
+    """
+    Usage:
+        with ImageProcessor(image_store, widths=(320, 640, 1024), workers=4) as processor:
+            processor.annotate(article_data['images'])
+
+    annotate() fills in width/height where the HTML had none and adds a
+    `variants` list to each image. Without widths (or without Pillow) images
+    are only probed, inline: a header read is cheaper than a trip to a worker.
+    """
+
+    def __init__(self, store, widths=(), workers=None, image_format='webp', quality=80, metrics=None):
+        if widths and Image is None:
+            print("Pillow is not installed (pip install pillow): images are probed, no variants made")
+            widths = ()
+        if widths and image_format == 'avif' and not features.check('avif'):
+            print("This Pillow build has no AVIF support, writing WebP variants")
+            image_format = 'webp'
+        self.store = store
+        self.widths = tuple(sorted(set(widths)))
+        self.image_format = image_format
+        self.quality = quality
+        self.metrics = metrics
+        self.workers = workers or os.cpu_count() or 1
+        self.variants_dir = os.path.join(store.root, 'variants')
+        # Cache key: results made with other settings do not count as done
+        self.settings = f"{self.image_format}:{self.quality}:{','.join(map(str, self.widths))}"
+        self.executor = None
+        # Digests being processed, so concurrent articles sharing an image wait for one job
+        self.in_progress = {}
+        self.lock = threading.Lock()
+        self.processed = 0
+        self.cached = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self.executor:
+            self.executor.shutdown()
+            self.executor = None
+
+    def submit(self, path, digest):
+        """Future of the processing result for a stored image (already resolved if cached)"""
+        with self.lock:
+            if digest in self.in_progress:
+                return self.in_progress[digest]
+            cached = self.store.processed(digest, self.settings)
+            if cached is not None:
+                self.cached += 1
+                self.count('cached')
+                future = Future()
+                future.set_result(cached)
+                return future
+
+            future = Future()
+            self.in_progress[digest] = future
+
+        args = (path, digest, self.widths, self.variants_dir, self.image_format, self.quality)
+        if self.widths:
+            with self.lock:
+                if self.executor is None:
+                    self.executor = ProcessPoolExecutor(max_workers=self.workers)
+                submitted = self.executor.submit(process_image, *args)
+            submitted.add_done_callback(lambda done: self.finished(digest, future, self.outcome(done)))
+        else:
+            self.finished(digest, future, process_image(*args))
+        return future
+
+    @staticmethod
+    def outcome(done):
+        """Result of a worker future; a crashed pool counts as a failed image, not a hang"""
+        try:
+            return done.result()
+        except Exception as e:
+            return {'width': None, 'height': None, 'variants': [], 'seconds': 0.0,
+                    'error': f"{type(e).__name__}: {e}"}
+
+    def finished(self, digest, future, result):
+        """Record a worker's result, then hand it to whoever waits for the digest"""
+        if self.metrics:
+            self.metrics.observe('scraper_image_process_seconds', result['seconds'])
+        if 'error' in result:
+            print(f"    Error processing image {digest[:12]}: {result['error']}")
+            self.count('failed')
+        else:
+            self.store.record_processed(digest, self.settings, result)
+            self.processed += 1
+            self.count('processed')
+        with self.lock:
+            self.in_progress.pop(digest, None)
+        future.set_result(result)
+
+    def count(self, result):
+        if self.metrics:
+            self.metrics.inc('scraper_images_processed_total', result=result)
+
+    def annotate(self, images):
+        """Process an article's stored images (in parallel) and record the results on them"""
+        futures = [(image, self.submit(image['local_path'], image['sha256']))
+                   for image in images if image.get('local_path') and image.get('sha256')]
+        for image, future in futures:
+            result = future.result()
+            if result['width'] and not image.get('width'):
+                image['width'] = result['width']
+                image['height'] = result['height']
+            if result['variants']:
+                image['variants'] = result['variants']
+
+
+def main():
+    from article_store import iter_articles, open_sink
+    from image_store import ImageStore
+
+    parser = argparse.ArgumentParser(description="Probe image sizes and make responsive variants "
+                                                 "for the articles of an output file")
+    parser.add_argument('articles', help="articles.json or articles.ndjson")
+    parser.add_argument('-o', '--output', help="Output file (default: <input>.variants.ndjson)")
+    parser.add_argument('--images-dir', default="scraped_data/images")
+    parser.add_argument('--widths', default=','.join(map(str, DEFAULT_WIDTHS)),
+                        help="Comma-separated variant widths; empty to only probe sizes")
+    parser.add_argument('--format', dest='image_format', choices=['webp', 'avif'], default='webp')
+    parser.add_argument('--quality', type=int, default=80)
+    parser.add_argument('--workers', type=int, default=None, help="Processes (default: all cores)")
+    args = parser.parse_args()
+
+    widths = [int(w) for w in args.widths.split(',') if w.strip()]
+    output = args.output or os.path.splitext(args.articles)[0] + '.variants.ndjson'
+    store = ImageStore(args.images_dir)
+    start = time.perf_counter()
+    images = 0
+    with ImageProcessor(store, widths, args.workers, args.image_format, args.quality) as processor, \
+            open_sink(output) as sink:
+        for article_data in iter_articles(args.articles):
+            processor.annotate(article_data.get('images', []))
+            images += len(article_data.get('images', []))
+            sink.write(article_data)
+    elapsed = time.perf_counter() - start
+
+    print(f"✓ {sink.count} articles, {images} images in {elapsed:.1f} s "
+          f"({processor.processed} processed, {processor.cached} cached) -> {output}")
+
+
+if __name__ == "__main__":
+    main()
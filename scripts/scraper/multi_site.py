@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Crawl several news sites at once, in one process
+
+Each site is described by a profile (site_profiles.py) and crawled by its own
+AsyncAimaqScraper into output_dir/<site name>/ (articles, images, jobs.db,
+crawl state), with its own rate limit, adaptive delay and per-host cap. All
+of them share one event loop, one aiohttp connection pool, a global
+budget of requests in flight and (with parse_workers) one pool of parser
+processes, so adding a site adds coroutines, not processes, and a slow site
+cannot starve the others of connections.
+
+    python multi_site.py sites.yaml -n 30 --concurrency 16
+    python multi_site.py aimaq sites.yaml --job nightly
+    python multi_site.py sites.yaml --resume nightly
+"""
+
+import argparse
+import asyncio
+import contextlib
+import os
+import sys
+import time
+
+import aiohttp
+
+from article_store import open_sink
+from async_scraper import AsyncAimaqScraper, trace_config
+from parse_pool import ParsePool
+from scrape_aimaq import image_widths
+from site_profiles import resolve_profiles
+
+
+class MultiSiteScraper:
+    """
+    Usage:
+        runner = MultiSiteScraper(load_profiles('sites.yaml'), output_dir='scraped_data', concurrency=16)
+        results = runner.scrape_all(num_articles=30)   # {site name: articles}
+
+    Extra keyword arguments go to every AsyncAimaqScraper (retries,
+    output_format, job_name, ...); a profile's rate and per_host override
+    the runner's.
+    """
+
+    def __init__(self, profiles, output_dir="scraped_data", concurrency=16, per_host=4, rate=5.0,
+                 incremental=False, **options):
+        names = [profile.name for profile in profiles]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Site names must be unique: {', '.join(names)}")
+        self.concurrency = concurrency
+        self.timeout = options.get('timeout', 30)
+        # > 0: parse every site's pages in one pool of this many processes
+        self.parse_workers = options.get('parse_workers', 0)
+        self.scrapers = {}
+        for profile in profiles:
+            site_dir = os.path.join(output_dir, profile.name)
+            self.scrapers[profile.name] = AsyncAimaqScraper(
+                output_dir=site_dir, profile=profile,
+                per_host=profile.per_host or per_host, rate=profile.rate or rate,
+                state_file=os.path.join(site_dir, 'crawl_state.db') if incremental else None,
+                **options
+            )
+
+    async def crawl_all(self, sinks, num_articles, links):
+        """Run every site's crawl on one session; a failing site is reported, the others go on"""
+        budget = asyncio.Semaphore(self.concurrency)
+        # Per-host caps are each scraper's semaphores; the pool only bounds connections overall
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=0, keepalive_timeout=30,
+                                         ttl_dns_cache=300)
+        first = next(iter(self.scrapers.values()))
+        headers = dict(first.session.headers)
+        # Workers parse each site's pages with its own profile (parse_pool.parse_page)
+        parse_pool = ParsePool(parser=first.parser_name, base_url=first.base_url, profile=first.profile,
+                               workers=self.parse_workers) if self.parse_workers else None
+        with parse_pool or contextlib.nullcontext():
+            async with aiohttp.ClientSession(connector=connector, headers=headers,
+                                             timeout=aiohttp.ClientTimeout(total=self.timeout),
+                                             trace_configs=[trace_config()]) as http:
+                names = list(links)
+                results = await asyncio.gather(
+                    *(self.scrapers[name].run(http, sinks[name], num_articles, links[name], parse_pool, budget)
+                      for name in names),
+                    return_exceptions=True
+                )
+        for name, result in zip(names, results):
+            if isinstance(result, Exception):
+                print(f"✗ Site {name} failed: {result!r}")
+
+    def scrape_all(self, num_articles=30, resume=None):
+        """Scrape the latest `num_articles` of every site (or the rest of each site's job `resume`)"""
+        links = {}
+        for name, scraper in self.scrapers.items():
+            if resume:
+                links[name] = scraper.resume_job(resume)
+                if links[name] is None:
+                    print(f"  Skipping {name}")
+                    continue
+            else:
+                links[name] = None
+
+        start = time.perf_counter()
+        with contextlib.ExitStack() as stack:
+            sinks = {name: stack.enter_context(open_sink(self.scrapers[name].output_file)) for name in links}
+            for name in links:
+                stack.enter_context(self.scrapers[name].image_processor)
+            try:
+                asyncio.run(self.crawl_all(sinks, num_articles, links))
+            except KeyboardInterrupt:
+                jobs = sorted({scraper.job for scraper in self.scrapers.values() if scraper.job})
+                if len(jobs) == 1:
+                    print(f"\n✗ Interrupted: continue with --resume {jobs[0]}")
+                raise
+            finally:
+                for name, sink in sinks.items():
+                    if self.scrapers[name].job:
+                        self.scrapers[name].close_job(sink)
+        elapsed = time.perf_counter() - start
+
+        self.print_summary(sinks, elapsed)
+        return {name: sink.articles for name, sink in sinks.items()}
+
+    def print_summary(self, sinks, elapsed):
+        print("\n" + "=" * 70)
+        print(f"{'site':<20} {'articles':>9} {'failed':>7} {'requests':>9} {'retries':>8} {'MB':>7}  job")
+        total = 0
+        for name, sink in sinks.items():
+            scraper = self.scrapers[name]
+            metrics = scraper.metrics
+            total += sink.count
+            print(f"{name:<20} {sink.count:>9} {metrics.counter('scraper_articles_total', result='failed'):>7} "
+                  f"{metrics.total('scraper_requests_total'):>9} {metrics.total('scraper_retries_total'):>8} "
+                  f"{metrics.total('scraper_response_bytes_total') / 1024 / 1024:>7.1f}  {scraper.job or '-'}")
+        print(f"\n✓ {total} articles from {len(sinks)} sites in {elapsed:.1f} s "
+              f"({total / elapsed if elapsed else 0:.2f}/s), at most {self.concurrency} requests in flight")
+        for name in sinks:
+            print(f"  {name}: {self.scrapers[name].output_file}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape several news sites concurrently from site profiles")
+    parser.add_argument('sites', nargs='+',
+                        help="Built-in profile names (aimaq) and/or YAML/JSON site files")
+    parser.add_argument('--output-dir', default="scraped_data",
+                        help="Each site writes to <output-dir>/<site name>/")
+    parser.add_argument('-n', '--num-articles', type=int, default=30, help="Articles per site")
+    parser.add_argument('--concurrency', type=int, default=16,
+                        help="Requests in flight across all sites")
+    parser.add_argument('--per-host', type=int, default=4,
+                        help="Max concurrent requests per host (unless the profile sets per_host)")
+    parser.add_argument('--rate', type=float, default=5.0,
+                        help="Max requests per second per site (unless the profile sets rate)")
+    parser.add_argument('--retries', type=int, default=4)
+    parser.add_argument('--format', dest='output_format', choices=['json', 'ndjson'], default='json')
+    parser.add_argument('--parser', choices=['lxml', 'selectolax', 'bs4'], default='lxml')
+    parser.add_argument('--parse-workers', type=int, default=0,
+                        help="Parse every site's article pages in one pool of N worker processes")
+    parser.add_argument('--image-variants', dest='image_widths', type=image_widths, default=(),
+                        help="Comma-separated widths of WebP variants to make of every image (needs Pillow)")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Keep crawl state per site and skip unchanged articles")
+    parser.add_argument('--job', dest='job_name',
+                        help="Name for this run's job on every site (default: start time)")
+    parser.add_argument('--resume', metavar='JOB', help="Continue every site's job JOB")
+    args = parser.parse_args()
+
+    runner = MultiSiteScraper(
+        resolve_profiles(args.sites),
+        output_dir=args.output_dir,
+        concurrency=args.concurrency,
+        per_host=args.per_host,
+        rate=args.rate,
+        incremental=args.incremental,
+        retries=args.retries,
+        output_format=args.output_format,
+        parser=args.parser,
+        parse_workers=args.parse_workers,
+        job_name=args.job_name,
+        image_widths=args.image_widths,
+    )
+    try:
+        runner.scrape_all(num_articles=args.num_articles, resume=args.resume)
+    except KeyboardInterrupt:
+        sys.exit(130)
+
+
+if __name__ == "__main__":
+    main()
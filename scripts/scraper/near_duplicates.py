@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate article detection: word shingles, MinHash and LSH in SQLite
+
+Syndicated and re-posted news comes back under a new URL with an edited
+headline, a trimmed paragraph or a different byline, so the importers'
+exact original_url match lets it through. Each article body is cut into
+overlapping 5-word shingles and summarised by a MinHash signature: the
+minimum of 120 independent hash functions over its shingles. The share of
+positions where two signatures agree estimates the Jaccard similarity of
+the shingle sets. Signatures are split into 24 bands of 5 rows; articles
+that agree on a whole band share an LSH bucket and become candidates (99%
+of pairs at similarity 0.7, 6% at 0.3), and only those are compared. A
+lookup is one indexed query, however many articles are indexed.
+
+The index is a SQLite file, updated as articles are imported (add()) and
+backfilled from an existing corpus with build(), which computes signatures
+for a few hundred articles per vectorised NumPy pass. Without NumPy the
+same signatures are computed in pure Python, only slower.
+
+    python near_duplicates.py build scraped_data/articles.ndjson
+    python near_duplicates.py check scraped_data/new_articles.ndjson
+    python near_duplicates.py stats
+"""
+
+import argparse
+import json
+import random
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from array import array
+from itertools import islice
+
+from article_store import iter_articles
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+SHINGLE_WORDS = 5
+BANDS = 24
+ROWS = 5
+THRESHOLD = 0.7
+
+MASK64 = (1 << 64) - 1
+WORD_RE = re.compile(r'\w+')
+
+# Fixed seeds: signatures must match across runs and between the two code paths
+_rng = random.Random(20251203)
+SHINGLE_MULTIPLIERS = tuple(_rng.getrandbits(64) | 1 for _ in range(SHINGLE_WORDS))
+# Multiply-shift hashing (a * x mod 2^64) >> 32 with odd a: one hash function per row
+PERMUTATIONS = tuple(_rng.getrandbits(64) | 1 for _ in range(BANDS * ROWS))
+BAND_PRIME = 0x100000001B3
+
+_word_hashes = {}
+
+
+def word_hashes(text):
+    """crc32 of every lower-cased word, cached per word"""
+    words = WORD_RE.findall(text.lower())
+    missing = set(words).difference(_word_hashes)
+    if missing:
+        if len(_word_hashes) > 1_000_000:
+            _word_hashes.clear()
+            missing = set(words)
+        for word in missing:
+            _word_hashes[word] = zlib.crc32(word.encode('utf-8'))
+    return list(map(_word_hashes.__getitem__, words))
+
+
+def _mix(x):
+    x ^= x >> 31
+    x = (x * 0x7FB5D329728EA185) & MASK64
+    return x ^ (x >> 27)
+
+
+def shingle_hashes(hashes):
+    """64-bit hashes of the SHINGLE_WORDS-word windows (a shorter text is one shingle)"""
+    width = min(SHINGLE_WORDS, len(hashes))
+    multipliers = SHINGLE_MULTIPLIERS[:width]
+    return {
+        _mix(sum(h * m for h, m in zip(hashes[i:i + width], multipliers)) & MASK64)
+        for i in range(len(hashes) - width + 1)
+    }
+
+
+def signature(text):
+    """MinHash signature of `text` as array('I'), or None when it has no words"""
+    hashes = word_hashes(text or '')
+    if not hashes:
+        return None
+    if np is not None:
+        return array('I', signatures_numpy([hashes])[0].tobytes())
+    return minhash(shingle_hashes(hashes))
+
+
+def minhash(shingles):
+    """Pure-Python signature of a set of shingle hashes"""
+    return array('I', (min(((a * x) & MASK64) >> 32 for x in shingles) for a in PERMUTATIONS))
+
+
+def signatures_numpy(documents):
+    """
+    Signatures of many documents (lists of word hashes, none empty) at once
+
+    The shingles of all documents are concatenated into one vector, a block
+    of permutations is applied to all of them in one operation and
+    np.minimum.reduceat takes each document's minimum. Returns a
+    (documents, BANDS * ROWS) uint32 matrix.
+    """
+    shingles = []
+    for hashes in documents:
+        words = np.array(hashes, dtype=np.uint64)
+        width = min(SHINGLE_WORDS, len(words))
+        count = len(words) - width + 1
+        mixed = np.zeros(count, dtype=np.uint64)
+        for offset in range(width):
+            mixed += words[offset:offset + count] * np.uint64(SHINGLE_MULTIPLIERS[offset])
+        mixed ^= mixed >> np.uint64(31)
+        mixed *= np.uint64(0x7FB5D329728EA185)
+        mixed ^= mixed >> np.uint64(27)
+        shingles.append(mixed)
+
+    starts = np.cumsum([0] + [len(s) for s in shingles[:-1]])
+    values = np.concatenate(shingles)
+    permutations = np.array(PERMUTATIONS, dtype=np.uint64)[:, None]
+    result = np.empty((len(documents), len(PERMUTATIONS)), dtype=np.uint32)
+    # Blocks of ~2M hashes keep the temporary matrix small for large batches
+    step = max(1, min(len(PERMUTATIONS), 2_000_000 // len(values)))
+    for first in range(0, len(PERMUTATIONS), step):
+        hashed = (permutations[first:first + step] * values[None, :]) >> np.uint64(32)
+        result[:, first:first + step] = np.minimum.reduceat(hashed, starts, axis=1).T
+    return result
+
+
+def band_buckets(sig):
+    """One signed 64-bit bucket key per band (the band number is mixed in)"""
+    buckets = []
+    for band in range(BANDS):
+        h = band + 1
+        for value in sig[band * ROWS:(band + 1) * ROWS]:
+            h = ((h ^ value) * BAND_PRIME) & MASK64
+        buckets.append(h - (1 << 64) if h >> 63 else h)
+    return buckets
+
+
+def band_buckets_numpy(matrix):
+    """band_buckets() for every row of a signature matrix: (documents, BANDS) int64"""
+    bands = matrix.astype(np.uint64).reshape(len(matrix), BANDS, ROWS)
+    h = np.broadcast_to(np.arange(1, BANDS + 1, dtype=np.uint64), bands.shape[:2]).copy()
+    for row in range(ROWS):
+        h ^= bands[:, :, row]
+        h *= np.uint64(BAND_PRIME)
+    return h.view(np.int64)
+
+
+def similarity(a, b):
+    """Estimated Jaccard similarity: the share of equal signature positions"""
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+class NearDuplicateIndex:
+    """
+    Usage:
+        index = NearDuplicateIndex('scraped_data/near_duplicates.db')
+        match = index.find(article['content'], exclude=article['url'])   # (key, similarity) or None
+        if match is None:
+            index.add(article['url'], article['content'])
+        index.commit()
+
+    Keys are article URLs; adding a key again replaces its signature, so a
+    re-imported article is never a duplicate of itself.
+    """
+
+    def __init__(self, path, threshold=THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        # Safe to share between threads, like the scraper's other SQLite stores
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript(f"""
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            CREATE TABLE IF NOT EXISTS meta (
+                name TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS signatures (
+                id INTEGER PRIMARY KEY,
+                key TEXT UNIQUE NOT NULL,
+                signature BLOB NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS buckets (
+                bucket INTEGER NOT NULL,
+                id INTEGER NOT NULL,
+                PRIMARY KEY (bucket, id)
+            ) WITHOUT ROWID;
+            INSERT OR IGNORE INTO meta (name, value)
+                VALUES ('layout', '{SHINGLE_WORDS}x{BANDS}x{ROWS}');
+        """)
+        self.connection.commit()
+        layout, = self.connection.execute("SELECT value FROM meta WHERE name = 'layout'").fetchone()
+        if layout != f"{SHINGLE_WORDS}x{BANDS}x{ROWS}":
+            raise ValueError(f"{path} was built with shingles x bands x rows = {layout}; rebuild it")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM signatures").fetchone()[0]
+
+    def candidates(self, sig):
+        """(key, signature) of every indexed article sharing a band with `sig`"""
+        buckets = band_buckets(sig)
+        with self.lock:
+            return self.connection.execute(f"""
+                SELECT key, signature FROM signatures WHERE id IN (
+                    SELECT id FROM buckets WHERE bucket IN ({','.join('?' * len(buckets))})
+                )
+            """, buckets).fetchall()
+
+    def matches(self, text, exclude=None, sig=None):
+        """Indexed articles at least `threshold` similar to `text`, most similar first"""
+        sig = sig or signature(text)
+        if sig is None:
+            return []
+        found = []
+        for key, blob in self.candidates(sig):
+            if key == exclude:
+                continue
+            score = similarity(sig, array('I', blob))
+            if score >= self.threshold:
+                found.append((key, score))
+        return sorted(found, key=lambda match: -match[1])
+
+    def find(self, text, exclude=None, sig=None):
+        """The most similar indexed article as (key, similarity), or None"""
+        found = self.matches(text, exclude, sig)
+        return found[0] if found else None
+
+    def add(self, key, text, sig=None):
+        """Index `text` under `key` (replacing an older version); returns False for text without words"""
+        sig = sig or signature(text)
+        if sig is None:
+            return False
+        self.insert([(key, sig.tobytes(), band_buckets(sig))])
+        return True
+
+    def check(self, key, text):
+        """
+        find() and, when nothing matches, add(): the importer's one call per article
+
+        The addition is visible to later checks at once but only kept by
+        commit(); an importer whose write fails calls rollback() instead.
+        """
+        sig = signature(text)
+        match = self.find(text, exclude=key, sig=sig)
+        if match is None and sig is not None:
+            self.add(key, text, sig=sig)
+        return match
+
+    def insert(self, rows):
+        """
+        Store (key, signature bytes, buckets) rows with a few executemany calls
+
+        A key indexed before keeps its id and loses its old buckets; within
+        `rows` the last occurrence of a key wins.
+        """
+        rows = {key: (blob, buckets) for key, blob, buckets in rows}
+        with self.lock:
+            cursor = self.connection.cursor()
+            old = cursor.execute(
+                "SELECT key, id, signature FROM signatures WHERE key IN (SELECT value FROM json_each(?))",
+                (json.dumps(list(rows), ensure_ascii=False),)
+            ).fetchall()
+            cursor.executemany("DELETE FROM buckets WHERE bucket = ? AND id = ?", [
+                (bucket, article_id) for _, article_id, blob in old for bucket in band_buckets(array('I', blob))
+            ])
+            ids = {key: article_id for key, article_id, _ in old}
+            next_id = cursor.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM signatures").fetchone()[0]
+            for key in rows:
+                if key not in ids:
+                    ids[key] = next_id
+                    next_id += 1
+            cursor.executemany("INSERT OR REPLACE INTO signatures (id, key, signature) VALUES (?, ?, ?)",
+                               [(ids[key], key, blob) for key, (blob, _) in rows.items()])
+            # Sorted, the bucket rows go into the B-tree in order
+            cursor.executemany("INSERT OR IGNORE INTO buckets (bucket, id) VALUES (?, ?)", sorted(
+                (int(bucket), ids[key]) for key, (_, buckets) in rows.items() for bucket in buckets
+            ))
+
+    def build(self, articles, batch_size=500):
+        """
+        Backfill from an iterable of articles (url + content), committed per batch
+
+        With NumPy every batch's signatures and bucket keys are computed as
+        matrices; otherwise article by article. Returns the number indexed.
+        """
+        indexed = 0
+        articles = iter(articles)
+        while True:
+            batch = [(article['url'], word_hashes(article.get('content') or ''))
+                     for article in islice(articles, batch_size) if article.get('url')]
+            if not batch:
+                break
+            batch = [(key, hashes) for key, hashes in batch if hashes]
+            if np is not None and batch:
+                matrix = signatures_numpy([hashes for _, hashes in batch])
+                buckets = band_buckets_numpy(matrix)
+                rows = [(key, matrix[i].tobytes(), buckets[i].tolist()) for i, (key, _) in enumerate(batch)]
+            else:
+                rows = []
+                for key, hashes in batch:
+                    sig = minhash(shingle_hashes(hashes))
+                    rows.append((key, sig.tobytes(), band_buckets(sig)))
+            self.insert(rows)
+            self.commit()
+            indexed += len(rows)
+        return indexed
+
+    def commit(self):
+        with self.lock:
+            self.connection.commit()
+
+    def rollback(self):
+        """Forget everything added since the last commit()"""
+        with self.lock:
+            self.connection.rollback()
+
+    def close(self):
+        self.commit()
+        self.connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find near-duplicate articles with MinHash LSH")
+    parser.add_argument('command', choices=['build', 'check', 'stats'],
+                        help="build: index an articles file; check: report articles in a file that "
+                             "near-duplicate indexed ones; stats: index size")
+    parser.add_argument('articles_file', nargs='?', default='scraped_data/articles.json')
+    parser.add_argument('--index', default='scraped_data/near_duplicates.db')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help="Minimum estimated Jaccard similarity of 5-word shingles")
+    args = parser.parse_args()
+
+    with NearDuplicateIndex(args.index, threshold=args.threshold) as index:
+        if args.command == 'build':
+            if np is None:
+                print("NumPy not installed, building in pure Python (pip install numpy for a faster build)")
+            start = time.perf_counter()
+            count = index.build(iter_articles(args.articles_file))
+            elapsed = time.perf_counter() - start
+            print(f"✓ Indexed {count} articles in {elapsed:.1f} s; {len(index)} in {args.index}")
+        elif args.command == 'check':
+            found = 0
+            for article in iter_articles(args.articles_file):
+                match = index.find(article.get('content'), exclude=article.get('url'))
+                if match:
+                    found += 1
+                    print(f"≈ {article.get('url')}\n    {match[1]:.0%} like {match[0]}")
+            print(f"\n{found} near-duplicates against {len(index)} indexed articles")
+        else:
+            print(f"{len(index)} articles in {args.index} "
+                  f"({SHINGLE_WORDS}-word shingles, {BANDS} bands x {ROWS} rows, threshold {index.threshold:g})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+"""
+Columnar corpus export: articles and images as month-partitioned Parquet
+
+Layout (Hive partitioning, readable by pandas, Polars, DuckDB and Spark):
+    scraped_data/parquet/
+    ├── articles/month=YYYY-MM/part-<n>.parquet
+    ├── images/month=YYYY-MM/part-<n>.parquet     one row per image, joined on article_url
+    └── _corpus.json                              source file, counts, export time
+
+Articles without a parseable publish date go to month=__HIVE_DEFAULT_PARTITION__
+(month is null when read back). Dates are UTC timestamps, image sizes are
+integers, and content_length / image_count are stored next to the text, so
+the usual questions (how much, when, how long, how illustrated) never touch
+the content column. The export streams the input once: articles are written
+as they come, images go to a staging file that is partitioned at the end.
+The new dataset is built next to the old one and swapped in, so readers
+never see half an export.
+
+ParquetCorpus reads through memory-mapped files and only the columns asked
+for; summary() is what ArticleImporter.print_summary prints.
+
+Needs pyarrow (pip install pyarrow).
+
+    python parquet_export.py export scraped_data/articles.ndjson -o scraped_data/parquet
+    python parquet_export.py summary scraped_data/parquet
+
+    import pandas as pd
+    pd.read_parquet('scraped_data/parquet/articles', columns=['date_published', 'content_length'])
+"""
+
+import argparse
+import json
+import os
+import shutil
+import time
+from itertools import islice
+
+from article_store import iter_articles
+from static_export import month_of
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    from pyarrow import fs
+except ImportError:
+    pa = pc = ds = pq = fs = None
+
+
+METADATA = '_corpus.json'
+BATCH_SIZE = 10_000
+# write_dataset buffers up to this many rows per month before writing a row
+# group: larger groups compress better, but every open month holds its buffer
+MIN_ROWS_PER_GROUP = 2048
+MAX_ROWS_PER_GROUP = 65536
+COMPRESSION = 'zstd'
+
+
+def article_schema():
+    # Parquet has no second resolution; milliseconds is what reads back
+    timestamp = pa.timestamp('ms', tz='UTC')
+    return pa.schema([
+        ('url', pa.string()),
+        ('title', pa.string()),
+        ('author', pa.string()),
+        ('category', pa.string()),
+        ('date_published', timestamp),
+        ('date_modified', timestamp),
+        ('scraped_at', pa.string()),
+        ('thumbnail_url', pa.string()),
+        ('content', pa.string()),
+        ('content_length', pa.int32()),
+        ('image_count', pa.int16()),
+        ('month', pa.string()),
+    ])
+
+
+def image_schema():
+    return pa.schema([
+        ('article_url', pa.string()),
+        ('position', pa.int16()),
+        ('url', pa.string()),
+        ('local_path', pa.string()),
+        ('alt', pa.string()),
+        ('width', pa.int32()),
+        ('height', pa.int32()),
+        ('is_thumbnail', pa.bool_()),
+        ('sha256', pa.string()),
+        ('month', pa.string()),
+    ])
+
+
+def month_partitioning():
+    return ds.partitioning(pa.schema([('month', pa.string())]), flavor='hive')
+
+
+def timestamps(values):
+    """ISO 8601 strings -> UTC timestamp array; unparseable values become null"""
+    timestamp = pa.timestamp('ms', tz='UTC')
+    strings = pa.array(values, pa.string())
+    try:
+        return strings.cast(timestamp)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        parsed = []
+        for value in strings:
+            try:
+                parsed.append(pa.array([value.as_py()], pa.string()).cast(timestamp)[0])
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                parsed.append(None)
+        return pa.array(parsed, timestamp)
+
+
+def integer(value):
+    """Image sizes are strings in the scraper output ('1125'); None when missing or invalid"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def article_batch(articles, months):
+    images = [article.get('images') or [] for article in articles]
+    return pa.RecordBatch.from_arrays([
+        pa.array([article.get('url') for article in articles], pa.string()),
+        pa.array([article.get('title') for article in articles], pa.string()),
+        pa.array([article.get('author') for article in articles], pa.string()),
+        pa.array([article.get('category') or None for article in articles], pa.string()),
+        timestamps([article.get('date_published') or None for article in articles]),
+        timestamps([article.get('date_modified') or None for article in articles]),
+        pa.array([article.get('scraped_at') for article in articles], pa.string()),
+        pa.array([article.get('thumbnail_url') or None for article in articles], pa.string()),
+        pa.array([article.get('content') or '' for article in articles], pa.string()),
+        pa.array([len(article.get('content') or '') for article in articles], pa.int32()),
+        pa.array([len(article_images) for article_images in images], pa.int16()),
+        pa.array(months, pa.string()),
+    ], schema=article_schema())
+
+
+def image_batch(articles, months):
+    rows = [(article.get('url'), position, image, month)
+            for article, month in zip(articles, months)
+            for position, image in enumerate(article.get('images') or [])]
+    return pa.RecordBatch.from_arrays([
+        pa.array([row[0] for row in rows], pa.string()),
+        pa.array([row[1] for row in rows], pa.int16()),
+        pa.array([row[2].get('url') for row in rows], pa.string()),
+        pa.array([row[2].get('local_path') for row in rows], pa.string()),
+        pa.array([row[2].get('alt') for row in rows], pa.string()),
+        pa.array([integer(row[2].get('width')) for row in rows], pa.int32()),
+        pa.array([integer(row[2].get('height')) for row in rows], pa.int32()),
+        pa.array([bool(row[2].get('is_thumbnail')) for row in rows], pa.bool_()),
+        pa.array([row[2].get('sha256') for row in rows], pa.string()),
+        pa.array([row[3] for row in rows], pa.string()),
+    ], schema=image_schema())
+
+
+def source_stamp(path):
+    """What a source file looked like when exported, to tell if an export is stale"""
+    stat = os.stat(path)
+    return {'path': os.path.abspath(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def is_current(output_dir, source_path):
+    """True if output_dir holds an export of source_path as it is now"""
+    try:
+        with open(os.path.join(output_dir, METADATA), encoding='utf-8') as f:
+            metadata = json.load(f)
+        return metadata.get('source') == source_stamp(source_path)
+    except (OSError, ValueError):
+        return False
+
+
+class ParquetExporter:
+    """
+    Usage:
+        exporter = ParquetExporter('scraped_data/parquet')
+        stats = exporter.export(iter_articles('scraped_data/articles.ndjson'),
+                                source='scraped_data/articles.ndjson')
+
+    Every export rewrites the whole dataset. Articles without a URL are
+    skipped; fields other than the scraper's own (category_slug etc.) are
+    not exported.
+    """
+
+    def __init__(self, output_dir='scraped_data/parquet', batch_size=BATCH_SIZE):
+        if pa is None:
+            raise ImportError("The Parquet export needs pyarrow (pip install pyarrow)")
+        self.output_dir = output_dir
+        self.batch_size = batch_size
+
+    def export(self, articles, source=None):
+        """Write `articles` (any iterable) as the new dataset; `source` is the file they came from"""
+        start = time.perf_counter()
+        stats = {'articles': 0, 'images': 0, 'skipped': 0}
+        building = f"{self.output_dir.rstrip(os.sep)}.{os.getpid()}.tmp"
+        shutil.rmtree(building, ignore_errors=True)
+        os.makedirs(building)
+        staging = os.path.join(building, 'images.staging.parquet')
+        file_options = ds.ParquetFileFormat().make_write_options(compression=COMPRESSION)
+
+        try:
+            with pq.ParquetWriter(staging, image_schema(), compression=COMPRESSION) as images:
+                def batches():
+                    source_articles = iter(articles)
+                    while True:
+                        batch = list(islice(source_articles, self.batch_size))
+                        if not batch:
+                            return
+                        with_url = [article for article in batch if article.get('url')]
+                        stats['skipped'] += len(batch) - len(with_url)
+                        if not with_url:
+                            continue
+                        months = [month_of(article) for article in with_url]
+                        image_rows = image_batch(with_url, months)
+                        images.write_batch(image_rows)
+                        stats['articles'] += len(with_url)
+                        stats['images'] += image_rows.num_rows
+                        yield article_batch(with_url, months)
+
+                self.write(batches(), article_schema(), os.path.join(building, 'articles'), file_options)
+
+            self.write(ds.dataset(staging, format='parquet').to_batches(), image_schema(),
+                       os.path.join(building, 'images'), file_options)
+            os.remove(staging)
+
+            stats['seconds'] = time.perf_counter() - start
+            with open(os.path.join(building, METADATA), 'w', encoding='utf-8') as f:
+                json.dump({
+                    'source': source_stamp(source) if source else None,
+                    'articles': stats['articles'],
+                    'images': stats['images'],
+                    'exported_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                }, f, ensure_ascii=False, indent=2)
+            self.swap_in(building)
+        except BaseException:
+            shutil.rmtree(building, ignore_errors=True)
+            raise
+        return stats
+
+    @staticmethod
+    def write(batches, schema, directory, file_options):
+        ds.write_dataset(
+            batches, directory, schema=schema, format='parquet', file_options=file_options,
+            partitioning=month_partitioning(), basename_template='part-{i}.parquet',
+            min_rows_per_group=MIN_ROWS_PER_GROUP, max_rows_per_group=MAX_ROWS_PER_GROUP,
+        )
+
+    def swap_in(self, building):
+        """Replace the old dataset with the new one (two renames; the old one is then deleted)"""
+        old = f"{self.output_dir.rstrip(os.sep)}.{os.getpid()}.old"
+        if os.path.exists(self.output_dir):
+            os.replace(self.output_dir, old)
+        os.replace(building, self.output_dir)
+        shutil.rmtree(old, ignore_errors=True)
+
+
+class ParquetCorpus:
+    """
+    Memory-mapped, column-projected reads of an exported corpus
+
+    Usage:
+        corpus = ParquetCorpus('scraped_data/parquet')
+        table = corpus.read(['date_published', 'content_length'], month='2024-05')
+        frame = corpus.read(['article_url', 'width'], table='images').to_pandas()
+        corpus.summary()
+    """
+
+    def __init__(self, path='scraped_data/parquet'):
+        if pa is None:
+            raise ImportError("Reading the Parquet export needs pyarrow (pip install pyarrow)")
+        if not os.path.exists(os.path.join(path, 'articles')):
+            raise FileNotFoundError(f"No Parquet export in {path} (run: python parquet_export.py export)")
+        self.path = path
+        filesystem = fs.LocalFileSystem(use_mmap=True)
+        # Few distinct values: decoded as dictionaries, counted without building a string per row
+        parquet = ds.ParquetFileFormat(read_options=ds.ParquetReadOptions(
+            dictionary_columns=['author', 'category']))
+        self.datasets = {
+            table: ds.dataset(os.path.join(os.path.abspath(path), table), format=parquet,
+                              partitioning=month_partitioning(), filesystem=filesystem)
+            for table in ('articles', 'images')
+        }
+
+    def read(self, columns=None, table='articles', month=None, filter=None):
+        """A pyarrow Table of `columns` (default: all), optionally of one month or a dataset filter"""
+        if month is not None:
+            by_month = ds.field('month') == month
+            filter = by_month if filter is None else filter & by_month
+        return self.datasets[table].to_table(columns=columns, filter=filter)
+
+    def count(self, table='articles'):
+        """Row count from the Parquet footers, without reading any column"""
+        return self.datasets[table].count_rows()
+
+    def summary(self, latest=10):
+        """Totals, date range, per-month/year/category/author counts, length stats and the latest articles"""
+        articles = self.read(['date_published', 'category', 'author', 'content_length',
+                              'image_count', 'month'])
+        total = articles.num_rows
+        summary = {'articles': total, 'images': self.count('images')}
+        if not total:
+            return summary
+
+        dates = articles['date_published']
+        first, last = pc.min_max(dates).values()
+        lengths = articles['content_length']
+        median, p95 = pc.tdigest(lengths, q=[0.5, 0.95]).to_pylist()
+        by_month = self.counts(articles['month'])
+        by_year = {}
+        for month, count in by_month.items():
+            year = int(month[:4]) if month else None
+            by_year[year] = by_year.get(year, 0) + count
+        summary.update({
+            'first_published': first.as_py(),
+            'last_published': last.as_py(),
+            'undated': dates.null_count,
+            'content_length': {'mean': pc.mean(lengths).as_py(), 'median': median, 'p95': p95},
+            'images_per_article': pc.mean(articles['image_count']).as_py(),
+            'articles_without_images': pc.sum(pc.equal(articles['image_count'], 0)).as_py() or 0,
+            'by_month': by_month,
+            'by_year': by_year,
+            'by_category': self.counts(articles['category'], by_size=True),
+            'by_author': self.counts(articles['author'], by_size=True),
+        })
+        summary['latest'] = self.latest(articles, latest)
+        return summary
+
+    def latest(self, articles, count):
+        """The `count` newest articles; titles are read only from the months they are in"""
+        newest = articles.take(pc.select_k_unstable(articles, count, [('date_published', 'descending')]))
+        columns = ['title', 'date_published', 'image_count', 'content_length']
+        dates = [date for date in newest['date_published'].to_pylist() if date]
+        if not dates:
+            return self.datasets['articles'].head(count, columns=columns).to_pylist()
+        oldest = min(dates)
+        rows = self.read(columns, filter=(ds.field('month') >= f"{oldest:%Y-%m}")
+                         & (ds.field('date_published') >= pa.scalar(oldest, articles.schema.field('date_published').type)))
+        return rows.take(pc.select_k_unstable(rows, count, [('date_published', 'descending')])).to_pylist()
+
+    @staticmethod
+    def counts(column, by_size=False):
+        """{value: articles} for one column, in value order or largest first"""
+        counted = [(entry['values'], entry['counts']) for entry in column.value_counts().to_pylist()]
+        if by_size:
+            counted.sort(key=lambda item: -item[1])
+        else:
+            counted.sort(key=lambda item: (item[0] is None, item[0]))
+        return dict(counted)
+
+
+def print_corpus_summary(summary, months=12, top=10):
+    """Print ParquetCorpus.summary() in the layout of ArticleImporter.print_summary"""
+    print("\n" + "=" * 70)
+    print("ARTICLES SUMMARY")
+    print("=" * 70)
+
+    print(f"\nTotal articles: {summary['articles']}")
+    print(f"Total images: {summary['images']}")
+    if not summary['articles']:
+        return
+
+    first, last = summary['first_published'], summary['last_published']
+    if first:
+        print(f"Published: {first:%Y-%m-%d} .. {last:%Y-%m-%d}"
+              + (f" ({summary['undated']} undated)" if summary['undated'] else ""))
+    length = summary['content_length']
+    print(f"Content: mean {length['mean']:.0f} chars, median {length['median']:.0f}, p95 {length['p95']:.0f}")
+    print(f"Images per article: {summary['images_per_article']:.1f} "
+          f"({summary['articles_without_images']} articles without images)")
+
+    print("\nBy year:")
+    for year, count in summary['by_year'].items():
+        print(f"   {year or 'undated'}: {count}")
+    print(f"\nLast {months} months:")
+    for month, count in list((m, c) for m, c in summary['by_month'].items() if m)[-months:]:
+        print(f"   {month}: {count}")
+    print("\nCategories:")
+    for category, count in list(summary['by_category'].items())[:top]:
+        print(f"   {category or '(none)'}: {count}")
+    print("\nTop authors:")
+    for author, count in list(summary['by_author'].items())[:top]:
+        print(f"   {author or '(none)'}: {count}")
+
+    print("\nLatest articles:")
+    for i, article in enumerate(summary['latest'], 1):
+        date = article['date_published']
+        print(f"\n{i}. {article['title'] or 'Untitled'}")
+        print(f"   Date: {date.isoformat() if date else 'N/A'}")
+        print(f"   Images: {article['image_count']}")
+        print(f"   Content: {article['content_length']} chars")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export articles as month-partitioned Parquet and summarise them")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    export = commands.add_parser('export', help="Write (or rewrite) the Parquet dataset")
+    export.add_argument('articles_file', nargs='?', default='scraped_data/articles.json')
+    export.add_argument('-o', '--output-dir', default='scraped_data/parquet')
+
+    summary = commands.add_parser('summary', help="Print totals, dates, categories and the latest articles")
+    summary.add_argument('directory', nargs='?', default='scraped_data/parquet')
+    summary.add_argument('--latest', type=int, default=10)
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        stats = ParquetExporter(args.output_dir).export(iter_articles(args.articles_file),
+                                                        source=args.articles_file)
+        print(f"✓ Exported {stats['articles']} articles and {stats['images']} images to "
+              f"{args.output_dir} in {stats['seconds']:.1f} s"
+              + (f", {stats['skipped']} skipped without URL" if stats['skipped'] else ""))
+    else:
+        start = time.perf_counter()
+        print_corpus_summary(ParquetCorpus(args.directory).summary(latest=args.latest))
+        print(f"\n({time.perf_counter() - start:.2f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Process-pool parsing stage
+
+HTML parsing and JSON-LD extraction are CPU-bound, so they run in a
+ProcessPoolExecutor of parser workers instead of on the thread doing network
+I/O. The fetch stage (any iterable of pages, e.g. a generator doing HTTP
+requests) runs in its own thread and pushes raw HTML bytes onto a bounded
+queue; the pool turns them into article dicts. When the workers fall behind,
+the queue fills up and the fetcher blocks, so memory stays bounded.
+
+Re-extract articles from saved pages using every core:
+    python parse_pool.py saved_pages/ -o scraped_data/reparsed.ndjson --workers 8
+"""
+
+import argparse
+import glob
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from article_store import open_sink
+from html_parsers import get_backend
+from scrape_aimaq import AimaqScraper, parse_article_html
+from site_profiles import AIMAQ
+
+
+# Per-process parser state, set up once by init_worker
+_worker = {}
+
+_DONE = object()
+
+
+def init_worker(parser, base_url, profile):
+    _worker['parser_name'] = parser
+    _worker['parser'] = get_backend(parser, **profile.selectors)
+    _worker['base_url'] = base_url
+    _worker['profile'] = profile
+    _worker['sites'] = {}
+
+
+def site_parser(profile):
+    """(parser, base URL, profile) for another site's pages, set up on first use (pools shared by sites)"""
+    if profile.name not in _worker['sites']:
+        _worker['sites'][profile.name] = get_backend(_worker['parser_name'], **profile.selectors)
+    return _worker['sites'][profile.name], profile.base_url, profile
+
+
+def parse_page(url, content, profile=None):
+    """Worker entry point: raw HTML bytes -> (article dict, parse seconds); `profile` if not the pool's"""
+    start = time.perf_counter()
+    if profile is None or profile == _worker['profile']:
+        parser, base_url, profile = _worker['parser'], _worker['base_url'], _worker['profile']
+    else:
+        parser, base_url, profile = site_parser(profile)
+    article_data = parse_article_html(parser, content, url, base_url, profile)
+    return article_data, time.perf_counter() - start
+
+
+def iter_saved_pages(directory, base_url="https://aimaqaqshamy.kz"):
+    """Yield (url, bytes) for every saved *.html page; the file name stands in for the article slug"""
+    for path in sorted(glob.glob(os.path.join(directory, '*.html'))):
+        slug = os.path.splitext(os.path.basename(path))[0]
+        with open(path, 'rb') as f:
+            yield f"{base_url}/{slug}/", f.read()
+
+
+class ParsePool:
+    """
+    Usage:
+        with ParsePool(parser='lxml', workers=8) as pool:
+            for url, context, article_data in pool.map(fetched_pages):
+                ...
+
+    `fetched_pages` yields (url, content, context) tuples. Pages with content
+    None (e.g. 304 Not Modified) are passed through unparsed; `context` is
+    handed back untouched. Results come back in input order, article_data is
+    None when parsing failed.
+    """
+
+    def __init__(self, parser='lxml', base_url="https://aimaqaqshamy.kz", workers=None,
+                 queue_size=None, metrics=None, profile=AIMAQ):
+        self.parser = parser
+        # Selectors and JSON-LD mapping of the site the pages come from
+        self.profile = profile
+        self.metrics = metrics
+        self.base_url = base_url
+        self.workers = workers or os.cpu_count() or 1
+        # Pages fetched but not yet handed to a worker
+        self.queue_size = queue_size or self.workers * 2
+        self.executor = None
+
+    def __enter__(self):
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=init_worker,
+            initargs=(self.parser, self.base_url, self.profile)
+        )
+        return self
+
+    def __exit__(self, *exc):
+        self.executor.shutdown(cancel_futures=True)
+        self.executor = None
+
+    def fetch_stage(self, pages, pending, stop):
+        """Producer thread: move pages onto the bounded queue, blocking while it is full"""
+        try:
+            for page in pages:
+                while not stop.is_set():
+                    try:
+                        pending.put(page, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+                if stop.is_set():
+                    return
+        except Exception as e:
+            print(f"  ✗ Fetch stage failed: {e}")
+        finally:
+            pending.put(_DONE)
+
+    def submit(self, url, content):
+        if content is None:
+            future = Future()
+            future.set_result(None)
+            return future
+        return self.executor.submit(parse_page, url, content)
+
+    def result(self, url, future):
+        try:
+            result = future.result()
+        except Exception as e:
+            print(f"  ✗ Error parsing {url}: {e}")
+            return None
+        if result is None:
+            return None
+        article_data, seconds = result
+        if self.metrics:
+            self.metrics.observe('scraper_parse_seconds', seconds, stage='article')
+        return article_data
+
+    def map(self, pages):
+        """Parse pages from the fetch stage in the worker pool, yielding (url, context, article_data)"""
+        pending = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        producer = threading.Thread(target=self.fetch_stage, args=(pages, pending, stop), daemon=True)
+        producer.start()
+
+        # Enough parses in flight to keep every worker busy; the oldest is collected first
+        in_flight = deque()
+        try:
+            while True:
+                page = pending.get()
+                if page is _DONE:
+                    break
+                url, content, context = page
+                in_flight.append((url, context, self.submit(url, content)))
+
+                if len(in_flight) >= self.workers * 2:
+                    url, context, future = in_flight.popleft()
+                    yield url, context, self.result(url, future)
+
+            while in_flight:
+                url, context, future = in_flight.popleft()
+                yield url, context, self.result(url, future)
+        finally:
+            stop.set()
+            # Unblock a producer waiting on a full queue so the thread can exit
+            while producer.is_alive():
+                try:
+                    pending.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-extract articles from saved HTML pages in parallel")
+    parser.add_argument('pages_dir', help="Directory of saved *.html article pages")
+    parser.add_argument('-o', '--output', default="scraped_data/reparsed.ndjson",
+                        help="Output file (.ndjson appends per article, .json writes at the end)")
+    parser.add_argument('--base-url', default="https://aimaqaqshamy.kz")
+    parser.add_argument('--parser', choices=['lxml', 'selectolax', 'bs4'], default='lxml')
+    parser.add_argument('--workers', type=int, default=None, help="Parser processes (default: all cores)")
+    parser.add_argument('--images-dir',
+                        help="Image store to fill in local_path from (e.g. scraped_data/images)")
+    args = parser.parse_args()
+
+    image_store = None
+    if args.images_dir:
+        from image_store import ImageStore
+        image_store = ImageStore(args.images_dir)
+
+    pages = ((url, content, None) for url, content in iter_saved_pages(args.pages_dir, args.base_url))
+    output_dir = os.path.dirname(args.output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    with ParsePool(parser=args.parser, base_url=args.base_url, workers=args.workers) as pool, \
+            open_sink(args.output) as sink:
+        print(f"Parsing {args.pages_dir} with {pool.workers} {args.parser} workers...")
+        for url, _, article_data in pool.map(pages):
+            if article_data is None:
+                continue
+            if image_store:
+                AimaqScraper.attach_stored_images(article_data, image_store)
+            sink.write(article_data)
+
+    print(f"✓ Re-extracted {sink.count} articles into {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Offline regression suite: extraction checks and pipeline benchmarks on recorded pages
+
+Replays a fixture corpus (fixtures/aimaq: recorded listing and article pages
+plus the expected extraction in expected.json) without touching the live site.
+
+    check   every parser backend must extract exactly expected.json from each
+            page and the listing links; then full crawls with the sync and
+            async engines through a local server (stub_server.FixtureSite)
+            with latency, injected 503s and dropped connections must still
+            deliver every article with its fields and images
+    bench   end-to-end articles/s (both engines), parse ms/page per backend
+            and peak Python memory of a crawl; --save writes the results,
+            --baseline fails when a metric is worse than the saved one by more
+            than --tolerance
+    record  save live (or archived) pages as fixtures and add their current
+            extraction to expected.json, to be reviewed before committing
+
+test_regression.py runs the same checks as pytest tests, one per page and
+crawl case, with pytest-benchmark benchmarks.
+
+The exit status is 0 when everything passes and 1 otherwise:
+    python regression_suite.py check
+    python regression_suite.py bench --save bench_baseline.json      (a baseline is per machine)
+    python regression_suite.py bench --baseline bench_baseline.json
+    python regression_suite.py record https://aimaqaqshamy.kz/<slug>/ --archive-dir scraped_data/archive
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from async_scraper import AsyncAimaqScraper
+from html_archive import load_page
+from html_parsers import BACKENDS, get_backend
+from scrape_aimaq import AimaqScraper, parse_article_html
+from site_profiles import AIMAQ
+from stub_server import Faults, FixtureSite, StubServer
+
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'aimaq')
+# Image keys taken from the page; the rest (local_path, sha256, ...) come from downloading
+IMAGE_KEYS = ('url', 'alt', 'width', 'height')
+# Benchmark metrics where a higher value is better; for the others lower is better
+HIGHER_IS_BETTER = ('articles_per_s',)
+
+
+def load_expected(directory):
+    with open(os.path.join(directory, 'expected.json'), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def article_pages(directory):
+    """(slug, bytes) for every recorded article page"""
+    for name in sorted(os.listdir(directory)):
+        if name.endswith('.html'):
+            with open(os.path.join(directory, name), 'rb') as f:
+                yield name[:-len('.html')], f.read()
+
+
+def listing_pages(directory):
+    """(page number, bytes) for every recorded listing page"""
+    listing_dir = os.path.join(directory, 'listing')
+    for name in sorted(os.listdir(listing_dir), key=lambda name: int(name.split('.')[0])):
+        with open(os.path.join(listing_dir, name), 'rb') as f:
+            yield int(name.split('.')[0]), f.read()
+
+
+def available_backends():
+    backends = []
+    for name in BACKENDS:
+        with contextlib.redirect_stdout(io.StringIO()):
+            backend = get_backend(name, **AIMAQ.selectors)
+        if backend.name == name:
+            backends.append(backend)
+    return backends
+
+
+def extracted(article_data):
+    """The fields of an article that come from its page, as stored in expected.json"""
+    fields = {key: value for key, value in article_data.items() if key not in ('url', 'scraped_at', 'images')}
+    if 'images' in article_data:
+        fields['images'] = [{key: image.get(key) for key in IMAGE_KEYS}
+                            for image in article_data['images'] if not image.get('is_thumbnail')]
+    return fields
+
+
+def rebased(obj, recorded_url, base_url):
+    """`obj` with the recorded site's URL replaced by the fixture server's"""
+    return json.loads(json.dumps(obj, ensure_ascii=False).replace(recorded_url, base_url))
+
+
+def differences(name, expected, actual):
+    """One line per field of `expected` that `actual` gets wrong (or has and should not)"""
+    lines = []
+    for key in sorted(expected.keys() | actual.keys()):
+        if expected.get(key, '<missing>') != actual.get(key, '<missing>'):
+            lines.append(f"{name}: {key}: expected {expected.get(key, '<missing>')!r}, "
+                         f"got {actual.get(key, '<missing>')!r}")
+    return lines
+
+
+def check_extraction(directory, expected):
+    """Failures of every available backend on the recorded pages"""
+    failures = []
+    base_url = expected['base_url']
+    for backend in available_backends():
+        for slug, content in article_pages(directory):
+            if slug not in expected['articles']:
+                failures.append(f"{slug}.html: not in expected.json")
+                continue
+            with contextlib.redirect_stdout(io.StringIO()):
+                article_data = parse_article_html(backend, content, f"{base_url}/{slug}/", base_url)
+            failures += differences(f"[{backend.name}] {slug}", expected['articles'][slug],
+                                    extracted(article_data))
+        for page, content in listing_pages(directory):
+            links = backend.listing_links(content)
+            if links != expected['listing'][str(page)]:
+                failures.append(f"[{backend.name}] listing/{page}.html: expected links "
+                                f"{expected['listing'][str(page)]}, got {links}")
+        print(f"  {backend.name:<12} {len(expected['articles'])} articles, {len(expected['listing'])} listing pages")
+    return failures
+
+
+def crawl(engine, base_url, output_dir, num_articles):
+    """Run one engine against base_url quietly; returns (articles, seconds)"""
+    options = dict(base_url=base_url, output_dir=output_dir, discovery='html', page_delay=0, max_delay=1)
+    if engine == 'async':
+        scraper = AsyncAimaqScraper(per_host=8, rate=500.0, **options)
+    else:
+        scraper = AimaqScraper(min_delay=0, **options)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        articles = scraper.scrape_articles(num_articles=num_articles)
+    return articles, time.perf_counter() - start
+
+
+def check_crawl(directory, expected, engine, latency, faults):
+    """Failures of a full crawl through the fixture server"""
+    site = FixtureSite(directory)
+    with StubServer(site=site, latency=latency, faults=faults) as server, \
+            tempfile.TemporaryDirectory() as tmp:
+        articles, seconds = crawl(engine, server.base_url, tmp, site.num_articles)
+        wanted = rebased(expected['articles'], expected['base_url'], server.base_url)
+
+    failures = []
+    scraped = {article['url'].rstrip('/').rsplit('/', 1)[-1]: article for article in articles}
+    for slug in sorted(wanted.keys() - scraped.keys()):
+        failures.append(f"[{engine}] {slug}: not scraped")
+    for slug in sorted(wanted.keys() & scraped.keys()):
+        failures += differences(f"[{engine}] {slug}", wanted[slug], extracted(scraped[slug]))
+        missing = [image['url'] for image in scraped[slug].get('images', []) if not image.get('local_path')]
+        if missing:
+            failures.append(f"[{engine}] {slug}: images not downloaded: {', '.join(missing)}")
+    injected = ', '.join(f"{count} {kind}" for kind, count in faults.injected.items() if count)
+    print(f"  {engine:<12} {len(scraped)}/{len(wanted)} articles in {seconds:.1f} s "
+          f"(injected: {injected or 'none'})")
+    return failures
+
+
+def run_check(args):
+    expected = load_expected(args.fixtures)
+    print(f"Extraction ({args.fixtures})")
+    failures = check_extraction(args.fixtures, expected)
+    print(f"\nCrawl through the fixture server: {args.latency * 1000:.0f} ms latency, "
+          f"{args.error_rate:.0%} 503s, {args.reset_rate:.0%} dropped connections")
+    for engine in ('sync', 'async'):
+        faults = Faults(error_rate=args.error_rate, reset_rate=args.reset_rate, seed=args.seed)
+        failures += check_crawl(args.fixtures, expected, engine, args.latency, faults)
+
+    print()
+    for failure in failures:
+        print(f"✗ {failure}")
+    print(f"✗ {len(failures)} failures" if failures else "✓ All checks passed")
+    return not failures
+
+
+def parse_timings(directory, repeat):
+    """Best-of-`repeat` parse+extract ms per article page, per backend"""
+    pages = list(article_pages(directory))
+    timings = {}
+    for backend in available_backends():
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                for slug, content in pages:
+                    parse_article_html(backend, content, f"{AIMAQ.base_url}/{slug}/", AIMAQ.base_url)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        timings[backend.name] = best / len(pages) * 1000
+    return timings
+
+
+def run_bench(args):
+    site = FixtureSite(args.fixtures)
+    results = {}
+    with StubServer(site=site, latency=args.latency) as server:
+        for engine in ('sync', 'async'):
+            # Best crawl of the rounds: the slower ones measure whatever else the machine was doing
+            best = 0.0
+            for _ in range(args.rounds):
+                with tempfile.TemporaryDirectory() as tmp:
+                    articles, elapsed = crawl(engine, server.base_url, tmp, site.num_articles)
+                best = max(best, len(articles) / elapsed)
+            results[f'{engine}_articles_per_s'] = best
+
+        # A separate crawl: tracing allocations slows everything down
+        with tempfile.TemporaryDirectory() as tmp:
+            tracemalloc.start()
+            crawl('sync', server.base_url, tmp, site.num_articles)
+            results['crawl_peak_memory_mb'] = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+            tracemalloc.stop()
+
+    for name, ms in parse_timings(args.fixtures, args.repeat).items():
+        results[f'parse_ms_per_page_{name}'] = ms
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    print(f"Best of {args.rounds} crawls of {site.num_articles} articles per engine, "
+          f"{args.latency * 1000:.0f} ms latency\n")
+    print(f"{'metric':<30} {'value':>10} {'baseline':>10} {'change':>8}")
+    regressions = []
+    for name, value in results.items():
+        line = f"{name:<30} {value:>10.2f}"
+        if name in baseline:
+            change = value / baseline[name] - 1
+            worse = -change if name.endswith(HIGHER_IS_BETTER) else change
+            line += f" {baseline[name]:>10.2f} {change:>+7.0%}"
+            if worse > args.tolerance:
+                regressions.append(name)
+                line += "  ✗ regression"
+        print(line)
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+            f.write('\n')
+        print(f"\n✓ Results saved to: {args.save}")
+    if regressions:
+        print(f"\n✗ Worse than the baseline by more than {args.tolerance:.0%}: {', '.join(regressions)}")
+    return not regressions
+
+
+def run_record(args):
+    """Save pages as fixtures and their current extraction as expected.json entries"""
+    path = os.path.join(args.fixtures, 'expected.json')
+    expected = load_expected(args.fixtures) if os.path.exists(path) else {
+        'base_url': AIMAQ.base_url, 'listing': {}, 'articles': {}}
+    backend = get_backend('lxml', **AIMAQ.selectors)
+    base_url = expected['base_url']
+
+    for url in args.urls:
+        slug = url.rstrip('/').rsplit('/', 1)[-1]
+        content = load_page(url, args.archive_dir)
+        with open(os.path.join(args.fixtures, f"{slug}.html"), 'wb') as f:
+            f.write(content)
+        expected['articles'][slug] = extracted(parse_article_html(backend, content, url, base_url))
+        print(f"✓ {slug}.html")
+
+    os.makedirs(os.path.join(args.fixtures, 'listing'), exist_ok=True)
+    for page in range(1, args.listing_pages + 1):
+        content = load_page(AIMAQ.listing_url(page), args.archive_dir)
+        with open(os.path.join(args.fixtures, 'listing', f"{page}.html"), 'wb') as f:
+            f.write(content)
+        expected['listing'][str(page)] = backend.listing_links(content)
+        print(f"✓ listing/{page}.html")
+
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(expected, f, ensure_ascii=False, indent=2)
+        f.write('\n')
+    print(f"\nReview the new entries in {path}: they are what the scraper extracts today")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--fixtures', default=FIXTURES, help="Fixture directory")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    check = commands.add_parser('check', help="Extraction and crawl correctness")
+    check.add_argument('--latency', type=float, default=0.01, help="Server latency per request, seconds")
+    check.add_argument('--error-rate', type=float, default=0.1, help="Fraction of requests answered with 503")
+    check.add_argument('--reset-rate', type=float, default=0.05, help="Fraction of connections dropped")
+    check.add_argument('--seed', type=int, default=1, help="Seed of the injected faults")
+
+    bench = commands.add_parser('bench', help="Throughput, parse time and memory")
+    bench.add_argument('--latency', type=float, default=0.0, help="Server latency per request, seconds")
+    bench.add_argument('--rounds', type=int, default=10, help="Crawls of the corpus per engine (best is kept)")
+    bench.add_argument('--repeat', type=int, default=20, help="Parse runs per backend (best is kept)")
+    bench.add_argument('--baseline', help="Results JSON to compare with")
+    bench.add_argument('--tolerance', type=float, default=0.3,
+                       help="Allowed slowdown relative to the baseline (0.3 = 30%%)")
+    bench.add_argument('--save', help="Write the results JSON here")
+
+    record = commands.add_parser('record', help="Add live or archived pages to the fixtures")
+    record.add_argument('urls', nargs='*', help="Article URLs")
+    record.add_argument('--listing-pages', type=int, default=0, help="Also record listing pages 1..N")
+    record.add_argument('--archive-dir', help="Read pages from this response archive when there")
+
+    args = parser.parse_args()
+    passed = {'check': run_check, 'bench': run_bench, 'record': run_record}[args.command](args)
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,478 @@
+#!/usr/bin/env python3
+"""
+Continuous scraping: a revisit scheduler and a daemon around AimaqScraper
+
+Instead of cron re-running a one-shot scrape, one long-running process keeps
+a heap of tasks keyed by their next due time. The listing task looks for the
+latest articles every --listing-interval seconds, the way a one-shot run does
+(--discovery: REST API, sitemaps or listing pages), and queues new ones at
+once. Every article is then revisited (a conditional GET, so an unchanged
+article costs one 304) on a schedule from its age and its own change
+history:
+
+    interval = min(age factor x age, CHANGE_FACTOR x age / observed changes)
+
+clamped to [min_interval, max_interval]. The age factor is FRESH_FACTOR for
+the first FRESH_PERIOD, when news is edited most, and AGE_FACTOR after, so
+a story under an hour old is checked every 5 minutes, a six-hour-old one
+about every half hour and a week-old one weekly. An article whose
+dateModified keeps moving is checked about four times per mean gap between
+its changes; that gap is taken over the article's whole age, so a story
+that has gone quiet slows down again.
+Articles that have not changed for retire_after are dropped from the
+schedule. Every request (discovery, listing, articles, images, retries)
+takes a slot from a global budget of at most --budget requests in any 60
+seconds before it is sent; when the budget runs out, tasks wait, most overdue
+first.
+
+The schedule lives in the crawl state database (table `revisits`), so the
+daemon resumes where it stopped. Scraped articles are appended to
+articles.ndjson as they change.
+
+    python scrape_aimaq.py --daemon --state-db scraped_data/crawl_state.db --budget 30
+    python revisit_scheduler.py scraped_data/crawl_state.db        # what is scheduled when
+    python benchmark_revisits.py                                   # cron vs scheduler, simulated week
+"""
+
+import argparse
+import heapq
+import signal
+import sqlite3
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from itertools import count
+
+from article_store import open_sink
+from discovery import parse_lastmod
+
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+
+# Revisit after this share of the article's age while it is fresh...
+FRESH_FACTOR = 0.08
+FRESH_PERIOD = 12 * HOUR
+# ...and after that...
+AGE_FACTOR = 1.0
+# ...or of the mean gap between its changes (age / changes), whichever is sooner
+CHANGE_FACTOR = 0.25
+MIN_INTERVAL = 5 * MINUTE
+MAX_INTERVAL = 7 * DAY
+RETIRE_AFTER = 30 * DAY
+# A dateModified this close to datePublished is the publication itself, not an edit
+EDIT_MARGIN = MINUTE
+
+# Ties on the due time: the listing and new articles before revisits
+LISTING, NEW, REVISIT = 0, 1, 2
+
+
+@dataclass
+class Revisit:
+    """Schedule entry of one article; times are Unix timestamps"""
+    url: str
+    published: float = None
+    last_change: float = None
+    changes: int = 0
+    checks: int = 0
+    failures: int = 0
+    due: float = 0.0
+
+
+class RevisitPolicy:
+    """When to look at an article next, from its age and change history"""
+
+    def __init__(self, fresh_factor=FRESH_FACTOR, fresh_period=FRESH_PERIOD, age_factor=AGE_FACTOR,
+                 change_factor=CHANGE_FACTOR, min_interval=MIN_INTERVAL, max_interval=MAX_INTERVAL,
+                 retire_after=RETIRE_AFTER):
+        self.fresh_factor = fresh_factor
+        self.fresh_period = fresh_period
+        self.age_factor = age_factor
+        self.change_factor = change_factor
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.retire_after = retire_after
+
+    def interval(self, entry, now):
+        age = now - entry.published if entry.published else 0
+        interval = (self.fresh_factor if age < self.fresh_period else self.age_factor) * age
+        if entry.changes:
+            # Changes per unit of age: the Poisson rate estimate, falling while the article stays quiet
+            interval = min(interval, self.change_factor * age / entry.changes)
+        return min(self.max_interval, max(self.min_interval, interval))
+
+    def retired(self, entry, now):
+        """True once the article has neither been published nor changed for retire_after"""
+        latest = max(filter(None, (entry.published, entry.last_change)), default=None)
+        return latest is not None and now - latest > self.retire_after
+
+    def retry_interval(self, entry):
+        """After a failed fetch: back off from min_interval, doubling per failure in a row"""
+        return min(self.max_interval, self.min_interval * 2 ** (entry.failures - 1))
+
+
+class RequestBudget:
+    """At most `per_minute` requests in any 60 seconds (sliding window of request times)"""
+
+    def __init__(self, per_minute, clock=time.time):
+        self.per_minute = per_minute
+        self.clock = clock
+        self.sent = deque()
+        self.lock = threading.Lock()
+
+    def charge(self, requests, now=None):
+        """Record `requests` requests made at `now`"""
+        now = self.clock() if now is None else now
+        with self.lock:
+            self.sent.extend([now] * requests)
+
+    def available_at(self, now=None):
+        """When the next request fits in the budget"""
+        now = self.clock() if now is None else now
+        with self.lock:
+            return self.first_slot(now)
+
+    def reserve(self, now=None):
+        """Claim the next slot in the budget; returns the seconds to wait before sending"""
+        now = self.clock() if now is None else now
+        with self.lock:
+            slot = self.first_slot(now)
+            self.sent.append(slot)
+            return slot - now
+
+    def first_slot(self, now):
+        while self.sent and self.sent[0] <= now - MINUTE:
+            self.sent.popleft()
+        # Never before a slot already handed out, and the per_minute-th last one a minute back
+        slot = max(now, self.sent[-1]) if self.sent else now
+        if len(self.sent) >= self.per_minute:
+            slot = max(slot, self.sent[-self.per_minute] + MINUTE)
+        return slot
+
+
+class BudgetPacer:
+    """
+    A scraper's AdaptiveDelay that also takes every request's slot from a RequestBudget
+
+    Waits out the local delay first, then reserves the budget slot, so each
+    attempt (retries and image downloads included) is counted before it is
+    sent. Everything else (record(), delay, fixed, ...) is the local pacer's.
+    """
+
+    def __init__(self, pacer, budget):
+        self.pacer = pacer
+        self.budget = budget
+
+    def reserve(self):
+        wait = self.pacer.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return self.budget.reserve()
+
+    def __getattr__(self, name):
+        return getattr(self.pacer, name)
+
+
+class RevisitScheduler:
+    """
+    Heap of (due, kind, sequence, url) tasks; the listing task has url None
+
+    Usage:
+        scheduler = RevisitScheduler(RevisitPolicy(), RequestBudget(30), listing_interval=60)
+        while True:
+            wait, kind, entry = scheduler.next()
+            ... sleep `wait`, run the task, then:
+            scheduler.listed(now) / scheduler.add(url, now) / scheduler.visited(entry, ...)
+
+    Stale heap items (an entry rescheduled or retired since) are skipped on pop.
+    `clock` is injectable so the benchmark can run in simulated time.
+    """
+
+    def __init__(self, policy, budget, listing_interval=60, clock=time.time):
+        self.policy = policy
+        self.budget = budget
+        self.listing_interval = listing_interval
+        self.clock = clock
+        self.entries = {}
+        self.heap = []
+        self.sequence = count()
+        self.listing_due = clock()
+        self.retired = 0
+        self.push(self.listing_due, LISTING, None)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def push(self, due, kind, url):
+        heapq.heappush(self.heap, (due, kind, next(self.sequence), url))
+
+    def schedule(self, entry, kind=REVISIT):
+        self.entries[entry.url] = entry
+        self.push(entry.due, kind, entry.url)
+
+    def add(self, url, now=None):
+        """A newly listed article: due immediately, ahead of revisits. Returns its entry."""
+        if url in self.entries:
+            return self.entries[url]
+        entry = Revisit(url, due=self.clock() if now is None else now)
+        self.schedule(entry, NEW)
+        return entry
+
+    def restore(self, entries):
+        """Load persisted entries (they keep their due times)"""
+        for entry in entries:
+            self.schedule(entry)
+
+    def peek(self):
+        """(due, kind, entry) of the earliest live task, dropping stale heap items"""
+        while self.heap:
+            due, kind, _, url = self.heap[0]
+            if kind == LISTING:
+                if due == self.listing_due:
+                    return due, kind, None
+            else:
+                entry = self.entries.get(url)
+                if entry is not None and entry.due == due:
+                    return due, kind, entry
+            heapq.heappop(self.heap)
+        return None
+
+    def next(self):
+        """(seconds to wait, kind, entry) of the next task, counting the request budget"""
+        now = self.clock()
+        due, kind, entry = self.peek()
+        start = max(due, self.budget.available_at(now))
+        return max(0.0, start - now), kind, entry
+
+    def pop(self):
+        due, kind, entry = self.peek()
+        heapq.heappop(self.heap)
+        return kind, entry
+
+    def listed(self, now=None):
+        """The listing was checked: next check in listing_interval"""
+        now = self.clock() if now is None else now
+        self.listing_due = now + self.listing_interval
+        self.push(self.listing_due, LISTING, None)
+
+    def visited(self, entry, published=None, modified=None, changed=False, failed=False, now=None):
+        """
+        Reschedule (or retire) an article after a fetch
+
+        `published` / `modified` are the article's datePublished / dateModified
+        (Unix times, when known); `changed` means the fetch found new content.
+        Returns False if the article was retired.
+        """
+        now = self.clock() if now is None else now
+        if failed:
+            entry.failures += 1
+            entry.due = now + self.policy.retry_interval(entry)
+            self.schedule(entry)
+            return True
+
+        entry.failures = 0
+        first_visit = entry.checks == 0
+        entry.checks += 1
+        if published:
+            entry.published = published
+        elif entry.published is None:
+            entry.published = now
+        if first_visit:
+            # Edits made before we first saw the article still tell how lively it is
+            if modified and modified > entry.published + EDIT_MARGIN:
+                entry.changes, entry.last_change = 1, modified
+        elif changed:
+            entry.changes += 1
+            entry.last_change = modified if modified and modified > (entry.last_change or 0) else now
+
+        if self.policy.retired(entry, now):
+            del self.entries[entry.url]
+            self.retired += 1
+            return False
+        entry.due = now + self.policy.interval(entry, now)
+        self.schedule(entry)
+        return True
+
+
+class RevisitStore:
+    """The schedule, persisted in the crawl state database"""
+
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS revisits (
+                url TEXT PRIMARY KEY,
+                published REAL,
+                last_change REAL,
+                changes INTEGER NOT NULL DEFAULT 0,
+                checks INTEGER NOT NULL DEFAULT 0,
+                failures INTEGER NOT NULL DEFAULT 0,
+                due REAL NOT NULL
+            )
+        """)
+        self.connection.commit()
+
+    def load(self):
+        rows = self.connection.execute(
+            "SELECT url, published, last_change, changes, checks, failures, due FROM revisits")
+        return [Revisit(*row) for row in rows]
+
+    def save(self, entry):
+        self.connection.execute("""
+            INSERT OR REPLACE INTO revisits (url, published, last_change, changes, checks, failures, due)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (entry.url, entry.published, entry.last_change, entry.changes, entry.checks,
+              entry.failures, entry.due))
+        self.connection.commit()
+
+    def delete(self, url):
+        self.connection.execute("DELETE FROM revisits WHERE url = ?", (url,))
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+
+def timestamp(value):
+    """ISO 8601 date from JSON-LD -> Unix time, or None"""
+    parsed = parse_lastmod(value)
+    return parsed.timestamp() if parsed else None
+
+
+class RevisitDaemon:
+    """
+    Runs a RevisitScheduler against the site with an AimaqScraper
+
+    The scraper must have a crawl state (state_file): its validators make
+    revisits conditional and its content hashes tell changed from unchanged.
+    Its client is paced through the budget (BudgetPacer), so a task that
+    needs more requests than are left waits for them mid-task.
+
+    Usage:
+        scraper = AimaqScraper(state_file='scraped_data/crawl_state.db', output_format='ndjson')
+        RevisitDaemon(scraper, budget=30, listing_interval=60).run()
+    """
+
+    def __init__(self, scraper, budget=30, listing_interval=60, listing_articles=20, policy=None):
+        if scraper.state is None:
+            raise ValueError("The revisit daemon needs a crawl state (--state-db)")
+        self.scraper = scraper
+        self.listing_articles = listing_articles
+        self.store = RevisitStore(scraper.state.path)
+        self.scheduler = RevisitScheduler(policy or RevisitPolicy(), RequestBudget(budget),
+                                          listing_interval=listing_interval)
+        scraper.client.pacer = BudgetPacer(scraper.pacer, self.scheduler.budget)
+        self.scheduler.restore(self.store.load())
+        self.stopping = threading.Event()
+        self.stats = {'listings': 0, 'new': 0, 'changed': 0, 'unchanged': 0, 'failed': 0}
+
+    def stop(self, *_):
+        self.stopping.set()
+
+    def run(self, until=None):
+        """Run tasks until stopped (SIGINT/SIGTERM) or, if given, until Unix time `until`"""
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, self.stop)
+        print(f"Revisit daemon for {self.scraper.base_url}: {len(self.scheduler)} articles scheduled, "
+              f"budget {self.scheduler.budget.per_minute} requests/min, "
+              f"listing every {self.scheduler.listing_interval:g} s")
+
+        with open_sink(self.scraper.output_file) as sink, self.scraper.image_processor:
+            self.sink = sink
+            while not self.stopping.is_set() and (until is None or time.time() < until):
+                wait, kind, entry = self.scheduler.next()
+                if wait > 0:
+                    # Short naps so a new deadline, a signal or `until` is noticed
+                    self.stopping.wait(min(wait, 5.0))
+                    continue
+                self.scheduler.pop()
+                if kind == LISTING:
+                    self.check_listing()
+                else:
+                    self.revisit(entry)
+
+        self.store.close()
+        self.scraper.seen.save()
+        self.print_stats()
+
+    def check_listing(self):
+        """Find the latest articles (per --discovery) and queue those not yet scheduled"""
+        self.stats['listings'] += 1
+        links = self.scraper.get_article_links(self.listing_articles)
+        for url in links:
+            if url not in self.scheduler.entries:
+                self.store.save(self.scheduler.add(url))
+        self.scheduler.listed()
+
+    def revisit(self, entry):
+        """Conditional fetch of one article; changed content goes to the sink"""
+        unchanged = self.scraper.unchanged
+        article_data = self.scraper.scrape_article(entry.url)
+        if article_data:
+            self.stats['new' if entry.checks == 0 else 'changed'] += 1
+            self.scraper.metrics.inc('scraper_articles_total', result='scraped')
+            self.sink.write(article_data)
+            kept = self.scheduler.visited(entry, published=timestamp(article_data.get('date_published')),
+                                          modified=timestamp(article_data.get('date_modified')),
+                                          changed=True)
+        elif self.scraper.unchanged > unchanged:
+            self.stats['unchanged'] += 1
+            published = None
+            if entry.published is None:
+                # Scraped before it was scheduled (e.g. by cron): date it by its stored dateModified
+                page = self.scraper.state.get(entry.url)
+                published = timestamp(page['date_modified']) if page else None
+            kept = self.scheduler.visited(entry, published=published)
+        else:
+            self.stats['failed'] += 1
+            kept = self.scheduler.visited(entry, failed=True)
+
+        if kept:
+            self.store.save(entry)
+            print(f"  Next visit in {format_interval(entry.due - time.time())}")
+        else:
+            self.store.delete(entry.url)
+            print(f"  Unchanged for {format_interval(self.scheduler.policy.retire_after)}, no more visits")
+
+    def print_stats(self):
+        stats = self.stats
+        print(f"\n✓ Revisit daemon stopped: {stats['listings']} listing checks, {stats['new']} new articles, "
+              f"{stats['changed']} changed, {stats['unchanged']} unchanged, {stats['failed']} failed, "
+              f"{self.scheduler.retired} retired; {len(self.scheduler)} still scheduled")
+
+
+def format_interval(seconds):
+    for unit, size in (('d', DAY), ('h', HOUR), ('min', MINUTE)):
+        if seconds >= size:
+            return f"{seconds / size:.1f} {unit}"
+    return f"{max(seconds, 0):.0f} s"
+
+
+def print_schedule(path, limit=20):
+    """What is scheduled when, from the crawl state database"""
+    store = RevisitStore(path)
+    entries = sorted(store.load(), key=lambda entry: entry.due)
+    store.close()
+    now = time.time()
+    due_now = sum(entry.due <= now for entry in entries)
+    print(f"{len(entries)} articles scheduled, {due_now} due now")
+    for window, label in ((HOUR, 'an hour'), (DAY, 'a day'), (7 * DAY, 'a week')):
+        print(f"  due within {label}: {sum(entry.due <= now + window for entry in entries)}")
+    print(f"\n{'due in':>10} {'age':>8} {'changes':>7} {'checks':>6}  url")
+    for entry in entries[:limit]:
+        age = format_interval(now - entry.published) if entry.published else '-'
+        print(f"{format_interval(entry.due - now):>10} {age:>8} {entry.changes:>7} {entry.checks:>6}  {entry.url}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the revisit schedule kept by scrape_aimaq.py --daemon")
+    parser.add_argument('state_db', nargs='?', default='scraped_data/crawl_state.db')
+    parser.add_argument('-n', '--limit', type=int, default=20, help="Earliest entries to list")
+    args = parser.parse_args()
+    print_schedule(args.state_db, args.limit)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,78 +4,294 @@ Scraper for https://aimaqaqshamy.kz/
 Downloads the latest 30 articles with their images and metadata
 """
 
-import requests
-from bs4 import BeautifulSoup
+import argparse
+import heapq
 import json
 import os
-from datetime import datetime
-from urllib.parse import urljoin, urlparse
+import sys
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
 import time
-import re
+from dataclasses import replace
+
+from article_store import compact_to_json, open_sink
+from crawl_jobs import JobQueue
+from crawl_state import CrawlState, article_hash
+from discovery import DISCOVERY_ERRORS, SOURCES, parse_lastmod
+from frontier import Frontier, SeenSet
+from html_archive import HtmlArchive
+from html_parsers import get_backend
+from http_transport import AdaptiveDelay, RetryingClient, RetryPolicy, pooled_session
+from image_store import ImageStore, digest_of
+from image_variants import ImageProcessor
+from scrape_metrics import MeteredSession, Metrics, profiled
+from site_profiles import AIMAQ, json_ld_value
+
+
+def parse_article_html(parser, content, article_url, base_url, profile=AIMAQ):
+    """
+    Extract article data from raw HTML with a parser backend (html_parsers.py)
+
+    A plain function so it can run in parser worker processes (parse_pool.py).
+    Which JSON-LD items and keys fill the fields comes from the site profile.
+    Images are returned with local_path set to None; the thumbnail is only
+    recorded in thumbnail_url and gets added to images once downloaded.
+    """
+    parts = parser.article_parts(content)
+
+    article_data = {
+        'url': article_url,
+        'scraped_at': datetime.now().isoformat()
+    }
+
+    # Extract data from Schema.org JSON-LD
+    described = False
+    for json_ld_text in parts['json_ld']:
+        if not json_ld_text or not json_ld_text.strip():
+            continue
+        try:
+            json_data = json.loads(json_ld_text)
+
+            # Handle @graph structure or array of schema objects or single object
+            items_to_check = []
+            if isinstance(json_data, dict) and '@graph' in json_data:
+                items_to_check = json_data['@graph']
+            elif isinstance(json_data, list):
+                items_to_check = json_data
+            else:
+                items_to_check = [json_data]
+
+            for item in items_to_check:
+                # Look for the profile's article types (WebPage, NewsArticle, Article)
+                if not isinstance(item, dict) or not profile.is_article_item(item):
+                    continue
+                described = True
+                # The first item with a value wins; within an item, the first key with one
+                for name, keys in profile.json_ld_fields.items():
+                    if not article_data.get(name):
+                        for key in keys:
+                            value = json_ld_value(item.get(key))
+                            if value:
+                                article_data[name] = value
+                                break
+
+        except json.JSONDecodeError as e:
+            print(f"  Error parsing JSON-LD: {e}")
+
+    if described:
+        # Same keys for every article described in JSON-LD, found or not
+        for name in profile.json_ld_fields:
+            article_data.setdefault(name, '')
+        if 'author' in article_data and not article_data['author']:
+            article_data['author'] = profile.default_author
+
+    # Fallback: Extract title from h1
+    if 'title' not in article_data or not article_data['title']:
+        if parts['h1'] is not None:
+            article_data['title'] = parts['h1']
+
+    # Article content: <article> or the profile's content div (entry-content, ...)
+    if parts['images'] is not None:
+        article_data['content'] = '\n\n'.join(parts['paragraphs'])
+
+        # Extract all images in the article
+        article_data['images'] = []
+        for img in parts['images']:
+            img_url = img['src']
+            if img_url:
+                article_data['images'].append({
+                    # Handle relative URLs
+                    'url': urljoin(base_url, img_url),
+                    'local_path': None,
+                    'alt': img['alt'],
+                    'width': img['width'],
+                    'height': img['height']
+                })
+
+    return article_data
 
 
 class AimaqScraper:
-    def __init__(self, base_url="https://aimaqaqshamy.kz", output_dir="scraped_data"):
-        self.base_url = base_url
+    def __init__(self, base_url="https://aimaqaqshamy.kz", output_dir="scraped_data",
+                 page_delay=1, min_delay=0.1, max_delay=30, retries=4, state_file=None,
+                 known_run_limit=5, output_format='json', compact_json=False, image_workers=4,
+                 parser='lxml', parse_workers=0, archive_dir=None, discovery=None, since=None,
+                 metrics_file=None, job_db=None, job_name=None, profile=None, image_widths=(),
+                 image_format='webp', image_process_workers=None):
+        # Site specifics (site_profiles.py); without a profile, aimaqaqshamy.kz's at base_url
+        self.profile = profile or replace(AIMAQ, base_url=base_url)
+        self.base_url = self.profile.base_url
+        # Safety limit on listing pages scanned by get_article_links
+        self.max_pages = self.profile.max_pages
         self.output_dir = output_dir
         self.images_dir = os.path.join(output_dir, "images")
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
+        self.image_workers = image_workers
+        self.parser = get_backend(parser, **self.profile.selectors)
+        self.parser_name = parser
+        # > 0: parse article pages in a process pool while the next ones are fetched
+        self.parse_workers = parse_workers
+
+        # 'json' writes articles.json at the end, 'ndjson' appends articles.ndjson as it goes
+        self.json_file = os.path.join(output_dir, 'articles.json')
+        self.output_file = os.path.join(output_dir, f'articles.{output_format}')
+        self.compact_json = compact_json
+
+        # Incremental mode: remember what was scraped and revalidate instead of re-downloading
+        self.state = CrawlState(state_file) if state_file else None
+        # Bloom filter of the state's URLs (crawl_state.seen): URLs never scraped skip the database
+        self.seen = SeenSet.for_state(self.state) if self.state else None
+        self.known_run_limit = known_run_limit
+        self.unchanged = 0
+
+        # Where article URLs come from: 'rest', 'sitemap', 'auto' (rest, then sitemap)
+        # or 'html' (listing pages); anything but 'html' falls back to the listing crawl
+        self.discovery = discovery or self.profile.discovery
+        # Only discover articles modified since this aware datetime
+        self.since = since
+
+        # Every crawl is a job: its URL queue and progress are checkpointed for --resume
+        self.job_db = job_db or os.path.join(output_dir, 'jobs.db')
+        self.job_name = job_name
+        self.job = None
+
+        # Raw listing/article responses for offline re-extraction (--from-archive)
+        self.archive = HtmlArchive(archive_dir) if archive_dir else None
+
+        # Per-request timings, bytes and outcomes; written to metrics_file (.json or .prom) at the end
+        self.metrics = Metrics()
+        self.metrics_file = metrics_file
+
+        # Keep-alive connections for the article fetch plus every image download thread
+        self.session = pooled_session(
+            pool_size=max(10, image_workers + 2),
+            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+            metrics=self.metrics
+        )
+        # Delay between requests starts at page_delay and adapts within [min_delay, max_delay]
+        self.pacer = AdaptiveDelay(initial=page_delay, minimum=min_delay, maximum=max_delay)
+        self.client = RetryingClient(MeteredSession(self.session, self.metrics),
+                                     RetryPolicy(retries=retries), self.pacer)
 
         # Create output directories
         os.makedirs(self.output_dir, exist_ok=True)
         os.makedirs(self.images_dir, exist_ok=True)
+        self.image_store = ImageStore(self.images_dir, metrics=self.metrics)
+        # Real image sizes for every article; responsive variants at image_widths (needs Pillow)
+        self.image_processor = ImageProcessor(self.image_store, image_widths, image_process_workers,
+                                              image_format, metrics=self.metrics)
+        self.jobs = JobQueue(self.job_db)
 
     def get_article_links(self, num_articles=30):
         """Get links to the latest articles"""
+        if self.discovery != 'html':
+            links = self.discover_article_links(num_articles)
+            if links is not None:
+                return links
+            print("Falling back to listing pages")
+        return self.crawl_listing_links(num_articles)
+
+    def discovery_sources(self):
+        return ['rest', 'sitemap'] if self.discovery == 'auto' else [self.discovery]
+
+    def discover_article_links(self, num_articles=30):
+        """Latest article URLs from the REST API or sitemaps, or None if neither is available"""
+        for name in self.discovery_sources():
+            print(f"Discovering articles via {name} at {self.base_url}...")
+            unchanged = self.unchanged
+            try:
+                # The client paces requests itself, so the sources need no delay of their own
+                entries = SOURCES[name](self.client.with_kind('discovery'), self.base_url,
+                                        since=self.since)
+                links = self.select_links(entries, num_articles, newest_first=(name == 'rest'))
+            except DISCOVERY_ERRORS as e:
+                print(f"  {name} discovery unavailable: {e}")
+                continue
+            # Nothing new is a valid answer; an empty source is not
+            if links or self.unchanged > unchanged:
+                print(f"  Found {len(links)} new or updated articles via {name}")
+                return links
+            print(f"  No articles via {name}")
+        return None
+
+    def select_links(self, entries, num_articles, newest_first):
+        """
+        Pick the `num_articles` latest article URLs from (url, lastmod) pairs
+
+        Entries already scraped with the same lastmod are skipped. REST results
+        arrive newest first and are cut off early, like the listing crawl after
+        known_run_limit current articles in a row; sitemaps are mostly oldest
+        first, so the newest entries are selected while streaming.
+        """
+        frontier = Frontier(self.profile)
+        known_run = 0
+
+        def candidates():
+            nonlocal known_run
+            for href, lastmod in entries:
+                url = frontier.add(href)
+                if url is None:
+                    continue
+                if self.state and url in self.seen and self.state.is_current(url, lastmod):
+                    self.unchanged += 1
+                    self.metrics.inc('scraper_articles_total', result='up_to_date')
+                    known_run += 1
+                    if newest_first and known_run >= self.known_run_limit:
+                        print(f"  Reached {known_run} up-to-date articles in a row, stopping")
+                        return
+                    continue
+                known_run = 0
+                yield url, lastmod
+
+        if newest_first:
+            links = []
+            for url, _ in candidates():
+                links.append(url)
+                if len(links) >= num_articles:
+                    break
+            return links
+
+        oldest = datetime.min.replace(tzinfo=timezone.utc)
+        latest = heapq.nlargest(num_articles, candidates(),
+                                key=lambda entry: parse_lastmod(entry[1]) or oldest)
+        return [url for url, _ in latest]
+
+    def crawl_listing_links(self, num_articles=30):
+        """Get links to the latest articles by scanning the homepage listing pages"""
         print(f"Fetching article links from {self.base_url}...")
-        article_links = []
+        frontier = Frontier(self.profile)
+        article_links = frontier.urls
+        known_run = 0
         page = 1
 
         while len(article_links) < num_articles:
-            url = f"{self.base_url}/page/{page}/" if page > 1 else self.base_url
+            url = self.profile.listing_url(page)
             print(f"Scanning page {page}...")
 
             try:
-                response = self.session.get(url, timeout=30)
+                response = self.client.get(url, kind='listing', timeout=30)
                 response.raise_for_status()
-                soup = BeautifulSoup(response.content, 'html.parser')
-
-                # Find all article posts using the bs-blog-post class
-                article_divs = soup.find_all('div', class_='bs-blog-post')
-
-                for article_div in article_divs:
-                    # Find the link inside the article div
-                    link = article_div.find('a', href=True)
-                    if link:
-                        href = link.get('href', '')
-
-                        # Filter valid article URLs
-                        if (href and
-                            self.base_url in href and
-                            '/page/' not in href and
-                            '/category/' not in href and
-                            '/author/' not in href and
-                            href != self.base_url and
-                            href != self.base_url + '/' and
-                            href not in article_links):
-
-                            article_links.append(href)
-                            print(f"  Found article {len(article_links)}: {href}")
-
-                            if len(article_links) >= num_articles:
-                                break
+                self.archive_response(url, response.status_code, response.headers,
+                                      response.content, 'listing')
+
+                for href in self.extract_article_links(response.content):
+                    if frontier.add(href):
+                        known_run = self.track_known(href, len(article_links), known_run)
+
+                        if len(article_links) >= num_articles or known_run >= self.known_run_limit:
+                            break
 
                 if len(article_links) >= num_articles:
                     break
 
+                if known_run >= self.known_run_limit:
+                    print(f"Reached {known_run} already-known articles in a row, stopping")
+                    break
+
                 page += 1
-                time.sleep(1)  # Be polite to the server
 
                 # Safety check to avoid infinite loop
-                if page > 10:
+                if page > self.max_pages:
                     print("Reached page limit")
                     break
 
@@ -85,222 +301,567 @@ class AimaqScraper:
 
         return article_links[:num_articles]
 
-    def download_image(self, image_url, article_slug):
-        """Download an image and return the local path"""
-        try:
-            # Get filename from URL
-            parsed_url = urlparse(image_url)
-            filename = os.path.basename(parsed_url.path)
-
-            # Create a unique filename with article slug
-            filename = f"{article_slug}_{filename}"
-            filepath = os.path.join(self.images_dir, filename)
-
-            # Skip if already downloaded
-            if os.path.exists(filepath):
-                print(f"    Image already exists: {filename}")
-                return filepath
-
-            # Download image
-            print(f"    Downloading image: {filename}")
-            response = self.session.get(image_url, timeout=30)
-            response.raise_for_status()
+    def track_known(self, href, position, known_run):
+        """Print a found link and return the updated run of consecutive already-known URLs"""
+        if self.is_known(href):
+            print(f"  Known article {position}: {href}")
+            return known_run + 1
+        print(f"  Found article {position}: {href}")
+        return 0
+
+    def extract_article_links(self, content):
+        """Extract candidate article URLs from a listing page, canonical and in page order"""
+        frontier = Frontier(self.profile)
+
+        # First link inside each post (the profile's post_class)
+        with self.metrics.timer('scraper_parse_seconds', stage='listing'):
+            hrefs = self.parser.listing_links(content)
+        for href in hrefs:
+            frontier.add(href)
+
+        return frontier.urls
 
-            with open(filepath, 'wb') as f:
-                f.write(response.content)
+    def is_article_url(self, href):
+        """Filter valid article URLs"""
+        return self.profile.is_article_url(href)
 
-            return filepath
+    def is_known(self, url):
+        """Whether `url` was scraped in an earlier run (the seen-set answers most URLs without a query)"""
+        return bool(self.state) and url in self.seen and self.state.is_known(url)
+
+    def download_image(self, image_url):
+        """Download an image into the content-addressed store and return the local path"""
+        try:
+            # Skip if this URL was already downloaded (by any article)
+            local_path = self.image_store.lookup(image_url)
+            if local_path:
+                print(f"    Image already stored: {image_url}")
+                return local_path
+
+            # Stream to disk while hashing; identical content is stored once
+            print(f"    Downloading image: {image_url}")
+            with self.metrics.timer('scraper_image_seconds'):
+                return self.image_store.download(self.client.with_kind('image'), image_url)
 
         except Exception as e:
             print(f"    Error downloading image {image_url}: {e}")
             return None
 
+    def parse_article(self, content, article_url):
+        """Extract article data from raw HTML without downloading anything"""
+        with self.metrics.timer('scraper_parse_seconds', stage='article'):
+            return parse_article_html(self.parser, content, article_url, self.base_url, self.profile)
+
+    def thumbnail_needs_download(self, article_data):
+        """True if the thumbnail is not already one of the article body images"""
+        if 'thumbnail_url' not in article_data:
+            return False
+        return not any(img['url'] == article_data['thumbnail_url'] for img in article_data.get('images', []))
+
+    @staticmethod
+    def add_thumbnail(article_data, local_path):
+        """Insert the downloaded thumbnail as the first image of the article"""
+        if 'images' not in article_data:
+            article_data['images'] = []
+        article_data['images'].insert(0, {
+            'url': article_data['thumbnail_url'],
+            'local_path': local_path,
+            'alt': 'Thumbnail',
+            'is_thumbnail': True,
+            'sha256': digest_of(local_path)
+        })
+
+    def image_downloads(self, article_data):
+        """Image URLs to fetch for an article: body images in order, then the thumbnail if separate"""
+        urls = [image['url'] for image in article_data.get('images', [])]
+        if self.thumbnail_needs_download(article_data):
+            urls.append(article_data['thumbnail_url'])
+        return urls
+
+    def attach_images(self, article_data, local_paths):
+        """Record download results (in image_downloads order) on the article"""
+        images = article_data.get('images', [])
+        for image, local_path in zip(images, local_paths):
+            image['local_path'] = local_path
+            image['sha256'] = digest_of(local_path)
+
+        # Thumbnail is added only if it was downloaded
+        if len(local_paths) > len(images) and local_paths[-1]:
+            self.add_thumbnail(article_data, local_paths[-1])
+
+    @classmethod
+    def attach_stored_images(cls, article_data, image_store):
+        """Fill in local paths from the image store without downloading (offline re-extraction)"""
+        for image in article_data.get('images', []):
+            image['local_path'] = image_store.lookup(image['url'])
+            image['sha256'] = digest_of(image['local_path'])
+
+        thumbnail_url = article_data.get('thumbnail_url')
+        if thumbnail_url and not any(image['url'] == thumbnail_url for image in article_data.get('images', [])):
+            local_path = image_store.lookup(thumbnail_url)
+            if local_path:
+                cls.add_thumbnail(article_data, local_path)
+
+    def archive_response(self, url, status, headers, body, kind):
+        """Keep a raw 200 response in the archive, if archiving is enabled"""
+        if self.archive and status == 200:
+            self.archive.write(url, status, headers.items(), body, kind=kind)
+
+    def conditional_headers(self, article_url):
+        """Revalidation headers for an article seen in a previous run"""
+        return self.state.conditional_headers(article_url) if self.state else {}
+
+    def skip_unchanged(self, article_url, headers, reason):
+        """Record a revalidation that found no change"""
+        self.state.mark_checked(article_url, headers.get('ETag'), headers.get('Last-Modified'))
+        self.unchanged += 1
+        self.metrics.inc('scraper_articles_total', result='unchanged')
+        if self.job:
+            self.jobs.complete(self.job, article_url)
+        print(f"  = {reason}, skipping")
+
+    def record_failure(self, article_url, error):
+        """Count a failed article and mark it failed in the job, to be retried on --resume"""
+        self.metrics.inc('scraper_articles_total', result='failed')
+        if self.job:
+            self.jobs.fail(self.job, article_url, error)
+
+    def emit(self, sink, article_url, article_data):
+        """Hand a scraped article to the sink and checkpoint it as done"""
+        self.metrics.inc('scraper_articles_total', result='scraped')
+        if sink.streaming:
+            sink.write(article_data)
+        # Streamed articles are on disk already; the rest are kept in the job until close_job()
+        self.jobs.complete(self.job, article_url, None if sink.streaming else article_data)
+
+    def remember(self, article_url, headers, article_data, content_hash):
+        """Store validators and content hash of a freshly scraped article"""
+        if self.state:
+            self.seen.add(article_url)
+            self.state.record(
+                article_url,
+                etag=headers.get('ETag'),
+                last_modified=headers.get('Last-Modified'),
+                date_modified=article_data.get('date_modified'),
+                content_hash=content_hash
+            )
+
+    @staticmethod
+    def print_article_summary(article_data):
+        """Print the per-article progress lines"""
+        print(f"  ✓ Title: {article_data.get('title', 'N/A')}")
+        print(f"  ✓ Date: {article_data.get('date_published', 'N/A')}")
+        print(f"  ✓ Images: {len(article_data.get('images', []))}")
+        print(f"  ✓ Content length: {len(article_data.get('content', ''))} chars")
+
     def scrape_article(self, article_url):
         """Scrape a single article with all its data"""
         print(f"\nScraping: {article_url}")
 
         try:
-            response = self.session.get(article_url, timeout=30)
+            response = self.client.get(article_url, kind='article',
+                                       headers=self.conditional_headers(article_url), timeout=30)
+            if response.status_code == 304:
+                self.skip_unchanged(article_url, response.headers, "Not modified (304)")
+                return None
             response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
-
-            article_data = {
-                'url': article_url,
-                'scraped_at': datetime.now().isoformat()
-            }
-
-            # Extract data from Schema.org JSON-LD
-            json_ld_scripts = soup.find_all('script', type='application/ld+json')
-            for json_ld_script in json_ld_scripts:
-                try:
-                    json_data = json.loads(json_ld_script.string)
-
-                    # Handle @graph structure or array of schema objects or single object
-                    items_to_check = []
-                    if isinstance(json_data, dict) and '@graph' in json_data:
-                        items_to_check = json_data['@graph']
-                    elif isinstance(json_data, list):
-                        items_to_check = json_data
-                    else:
-                        items_to_check = [json_data]
-
-                    for item in items_to_check:
-                        item_type = item.get('@type', '')
-
-                        # Look for WebPage, NewsArticle, or Article types
-                        if item_type in ['WebPage', 'NewsArticle', 'Article']:
-                            # Extract title
-                            if not article_data.get('title'):
-                                article_data['title'] = item.get('name', '') or item.get('headline', '')
-
-                            # Extract dates
-                            if not article_data.get('date_published'):
-                                article_data['date_published'] = item.get('datePublished', '')
-                            if not article_data.get('date_modified'):
-                                article_data['date_modified'] = item.get('dateModified', '')
-
-                            # Extract author
-                            if not article_data.get('author'):
-                                author_data = item.get('author', {})
-                                if isinstance(author_data, dict):
-                                    article_data['author'] = author_data.get('name', 'admin')
-                                elif isinstance(author_data, str):
-                                    article_data['author'] = author_data
-                                else:
-                                    article_data['author'] = 'admin'
-
-                            # Get thumbnail/primary image
-                            if not article_data.get('thumbnail_url'):
-                                # Try thumbnailUrl first (direct URL string)
-                                thumbnail_url = item.get('thumbnailUrl', '')
-                                if thumbnail_url and isinstance(thumbnail_url, str):
-                                    article_data['thumbnail_url'] = thumbnail_url
-                                else:
-                                    # Try image field (can be dict, list, or string)
-                                    image_data = item.get('image', '')
-                                    if isinstance(image_data, str) and image_data:
-                                        article_data['thumbnail_url'] = image_data
-                                    elif isinstance(image_data, dict):
-                                        article_data['thumbnail_url'] = image_data.get('url', '')
-                                    elif isinstance(image_data, list) and len(image_data) > 0:
-                                        article_data['thumbnail_url'] = image_data[0].get('url', '') if isinstance(image_data[0], dict) else image_data[0]
-
-                except json.JSONDecodeError as e:
-                    print(f"  Error parsing JSON-LD: {e}")
-
-            # Fallback: Extract title from h1
-            if 'title' not in article_data or not article_data['title']:
-                h1 = soup.find('h1')
-                if h1:
-                    article_data['title'] = h1.get_text(strip=True)
-
-            # Extract article content
-            # Look for main article content area
-            article_body = soup.find('article') or soup.find('div', class_=re.compile(r'entry-content|post-content|article-content'))
-
-            if article_body:
-                # Extract text content
-                paragraphs = article_body.find_all('p')
-                article_data['content'] = '\n\n'.join([p.get_text(strip=True) for p in paragraphs if p.get_text(strip=True)])
-
-                # Extract all images in the article
-                images = article_body.find_all('img')
-                article_data['images'] = []
-
-                # Create slug from URL for image naming
-                article_slug = article_url.rstrip('/').split('/')[-1][:50]
-
-                for img in images:
-                    img_url = img.get('src', '')
-                    if img_url:
-                        # Handle relative URLs
-                        img_url = urljoin(self.base_url, img_url)
-
-                        # Download image
-                        local_path = self.download_image(img_url, article_slug)
-
-                        article_data['images'].append({
-                            'url': img_url,
-                            'local_path': local_path,
-                            'alt': img.get('alt', ''),
-                            'width': img.get('width', ''),
-                            'height': img.get('height', '')
-                        })
-
-            # Also download thumbnail if not already in images
-            if 'thumbnail_url' in article_data:
-                thumbnail_found = any(img['url'] == article_data['thumbnail_url'] for img in article_data.get('images', []))
-                if not thumbnail_found:
-                    article_slug = article_url.rstrip('/').split('/')[-1][:50]
-                    local_path = self.download_image(article_data['thumbnail_url'], article_slug)
-                    if local_path:
-                        if 'images' not in article_data:
-                            article_data['images'] = []
-                        article_data['images'].insert(0, {
-                            'url': article_data['thumbnail_url'],
-                            'local_path': local_path,
-                            'alt': 'Thumbnail',
-                            'is_thumbnail': True
-                        })
-
-            print(f"  ✓ Title: {article_data.get('title', 'N/A')}")
-            print(f"  ✓ Date: {article_data.get('date_published', 'N/A')}")
-            print(f"  ✓ Images: {len(article_data.get('images', []))}")
-            print(f"  ✓ Content length: {len(article_data.get('content', ''))} chars")
-
-            return article_data
+            self.archive_response(article_url, response.status_code, response.headers,
+                                  response.content, 'article')
+            article_data = self.parse_article(response.content, article_url)
+            return self.finish_article(article_url, response.headers, article_data)
 
         except Exception as e:
             print(f"  ✗ Error scraping article: {e}")
+            self.record_failure(article_url, e)
+            return None
+
+    def finish_article(self, article_url, headers, article_data):
+        """Skip unchanged content, download images and record state for a parsed article"""
+        content_hash = article_hash(article_data)
+        if self.state and self.state.is_unchanged(article_url, content_hash):
+            self.skip_unchanged(article_url, headers, "Content unchanged")
+            return None
+
+        # Download all images in the article (plus the thumbnail) in parallel
+        with ThreadPoolExecutor(max_workers=self.image_workers) as pool:
+            local_paths = list(pool.map(self.download_image, self.image_downloads(article_data)))
+        self.attach_images(article_data, local_paths)
+        self.image_processor.annotate(article_data.get('images', []))
+
+        self.remember(article_url, headers, article_data, content_hash)
+        self.print_article_summary(article_data)
+
+        return article_data
+
+    def fetch_pages(self, article_links, request_headers):
+        """
+        Fetch stage of the parse pipeline: yield (url, html bytes, response) per article
+
+        Runs in the ParsePool producer thread, so it only does network I/O;
+        html is None for 304 Not Modified. Failed fetches are reported and skipped.
+        """
+        for i, link in enumerate(article_links, 1):
+            print(f"\n[{i}/{len(article_links)}] Fetching: {link}")
+            self.jobs.start(self.job, link)
+            try:
+                response = self.client.get(link, kind='article', headers=request_headers[link], timeout=30)
+                if response.status_code == 304:
+                    yield link, None, response
+                else:
+                    response.raise_for_status()
+                    self.archive_response(link, response.status_code, response.headers,
+                                          response.content, 'article')
+                    yield link, response.content, response
+            except Exception as e:
+                print(f"  ✗ Error fetching article: {e}")
+                self.record_failure(link, e)
+
+    def scrape_pipelined(self, article_links, sink):
+        """Fetch articles in a thread, parse them in worker processes, finish them here"""
+        from parse_pool import ParsePool
+
+        # Crawl state is read here, not in the fetch thread (one SQLite connection per thread)
+        request_headers = {link: self.conditional_headers(link) for link in article_links}
+
+        with ParsePool(parser=self.parser_name, base_url=self.base_url, profile=self.profile,
+                       workers=self.parse_workers, metrics=self.metrics) as pool:
+            for link, response, article_data in pool.map(self.fetch_pages(article_links, request_headers)):
+                if response.status_code == 304:
+                    self.skip_unchanged(link, response.headers, "Not modified (304)")
+                    continue
+                if article_data is None:
+                    self.record_failure(link, "parse failed")
+                    continue
+                try:
+                    article_data = self.finish_article(link, response.headers, article_data)
+                except Exception as e:
+                    print(f"  ✗ Error scraping article: {e}")
+                    self.record_failure(link, e)
+                    continue
+                if article_data:
+                    self.emit(sink, link, article_data)
+
+    def begin_job(self, article_links, num_articles):
+        """Create a job for freshly discovered links and queue them"""
+        self.job = self.jobs.create(self.job_name, base_url=self.base_url, num_articles=num_articles,
+                                    output_file=self.output_file)
+        self.jobs.add(self.job, article_links)
+        print(f"Job {self.job}: {len(article_links)} articles queued (continue with --resume {self.job})")
+        return self.jobs.pending(self.job)
+
+    def resume_job(self, job_id):
+        """Reopen a job: interrupted and failed items go back to pending; returns them, or None"""
+        job = self.jobs.get(job_id)
+        if not job:
+            print(f"✗ No job {job_id} in {self.job_db}")
+            return None
+        if job['params'].get('base_url') != self.base_url:
+            print(f"✗ Job {job_id} crawls {job['params'].get('base_url')}, not {self.base_url}")
             return None
 
-    def scrape_articles(self, num_articles=30):
-        """Main method to scrape multiple articles"""
+        self.job = job_id
+        requeued = self.jobs.requeue(job_id)
+        article_links = self.jobs.pending(job_id)
+        done = self.jobs.counts(job_id)['done']
+        print(f"Resuming job {job_id}: {done} done, {len(article_links)} to go "
+              f"({requeued} interrupted or failed)")
+        return article_links
+
+    def close_job(self, sink):
+        """Write the job's kept articles to a non-streaming sink (in queue order) and stamp the job"""
+        if not sink.streaming:
+            for article_data in self.jobs.results(self.job):
+                sink.write(article_data)
+        self.jobs.finish(self.job)
+        if self.seen:
+            self.seen.save()
+
+    def scrape_articles(self, num_articles=30, resume=None):
+        """Main method to scrape multiple articles (or the rest of job `resume`)"""
         print(f"Starting scrape of {num_articles} articles from {self.base_url}\n")
         print("=" * 70)
 
-        # Get article links
-        article_links = self.get_article_links(num_articles)
-        print(f"\n✓ Found {len(article_links)} article links\n")
+        if resume:
+            article_links = self.resume_job(resume)
+            if article_links is None:
+                return []
+        else:
+            # Get article links
+            with self.metrics.timer('scraper_stage_seconds', stage='links'):
+                article_links = self.get_article_links(num_articles)
+            print(f"\n✓ Found {len(article_links)} article links\n")
+            article_links = self.begin_job(article_links, num_articles)
         print("=" * 70)
 
         # Scrape each article
-        articles = []
-        for i, link in enumerate(article_links, 1):
-            print(f"\n[{i}/{len(article_links)}]")
-            article_data = self.scrape_article(link)
-            if article_data:
-                articles.append(article_data)
-            time.sleep(2)  # Be polite to the server
+        with open_sink(self.output_file) as sink, self.image_processor, \
+                self.metrics.timer('scraper_stage_seconds', stage='articles'):
+            try:
+                if self.parse_workers:
+                    self.scrape_pipelined(article_links, sink)
+                else:
+                    for i, link in enumerate(article_links, 1):
+                        print(f"\n[{i}/{len(article_links)}]")
+                        self.jobs.start(self.job, link)
+                        article_data = self.scrape_article(link)
+                        if article_data:
+                            self.emit(sink, link, article_data)
+            except KeyboardInterrupt:
+                print(f"\n✗ Interrupted: continue with --resume {self.job}")
+                raise
+            finally:
+                self.close_job(sink)
+
+        self.print_run_summary(sink)
+        return sink.articles
+
+    def parsed_archive_pages(self):
+        """(url, page, article_data) for every archived article page, parsed inline or in a pool"""
+        pages = ((page.url, page.body, page) for page in self.archive.pages('article'))
+
+        if self.parse_workers:
+            from parse_pool import ParsePool
+            with ParsePool(parser=self.parser_name, base_url=self.base_url, profile=self.profile,
+                           workers=self.parse_workers, metrics=self.metrics) as pool:
+                yield from pool.map(pages)
+            return
+
+        for url, content, page in pages:
+            try:
+                yield url, page, self.parse_article(content, url)
+            except Exception as e:
+                print(f"  ✗ Error parsing {url}: {e}")
+
+    def scrape_from_archive(self):
+        """Re-run extraction over the archived article pages, with no network access"""
+        total = self.archive.count('article')
+        print(f"Re-extracting {total} archived articles from {self.archive.directory}\n")
+        print("=" * 70)
 
-        # Save to JSON
-        output_file = os.path.join(self.output_dir, 'articles.json')
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(articles, f, ensure_ascii=False, indent=2)
+        with open_sink(self.output_file) as sink, self.image_processor, \
+                self.metrics.timer('scraper_stage_seconds', stage='archive'):
+            for i, (url, page, article_data) in enumerate(self.parsed_archive_pages(), 1):
+                if article_data:
+                    self.attach_stored_images(article_data, self.image_store)
+                    self.image_processor.annotate(article_data.get('images', []))
+                    sink.write(article_data)
+                if i % 1000 == 0:
+                    print(f"  {i}/{total} pages")
+
+        self.print_run_summary(sink)
+        return sink.articles
+
+    def print_run_summary(self, sink):
+        """Optionally compact NDJSON into articles.json and print the run summary"""
+        if sink.streaming and self.compact_json:
+            compacted = compact_to_json(self.output_file, self.json_file)
+            print(f"\n✓ Compacted {compacted} articles into {self.json_file}")
 
         print("\n" + "=" * 70)
         print(f"✓ Scraping complete!")
-        print(f"✓ Scraped {len(articles)} articles")
-        print(f"✓ Data saved to: {output_file}")
+        print(f"✓ Scraped {sink.count} articles")
+        print(f"✓ Data saved to: {self.output_file}")
         print(f"✓ Images saved to: {self.images_dir}")
         print("=" * 70)
 
-        # Print summary
-        total_images = sum(len(article.get('images', [])) for article in articles)
-        print(f"\nSummary:")
-        print(f"  Articles: {len(articles)}")
-        print(f"  Images: {total_images}")
-        print(f"  Output directory: {self.output_dir}")
-
-        return articles
+        # One summary: the run's totals, then where the time went (percentiles) and the counters
+        elapsed = time.time() - self.metrics.started
+        received = self.metrics.total('scraper_response_bytes_total')
+        run = [
+            ('Articles', f"{sink.count} in {elapsed:.1f} s ({sink.count / elapsed if elapsed else 0:.2f}/s)"),
+            ('Images', sink.images),
+            ('Image files', f"{self.image_store.downloaded} new, {self.image_store.deduplicated} duplicate "
+                            f"content, {self.image_store.reused} already stored"),
+        ]
+        if self.image_processor.widths:
+            run.append((f"Image variants ({self.image_processor.image_format}, "
+                        f"{', '.join(map(str, self.image_processor.widths))} px)",
+                        f"{self.image_processor.processed} images processed, {self.image_processor.cached} cached"))
+        run.append(('Received', f"{received / 1024 / 1024:.1f} MB in "
+                                f"{self.metrics.total('scraper_requests_total')} responses"))
+        if self.state:
+            run.append(('Unchanged (skipped)', self.unchanged))
+        if not self.pacer.fixed:
+            run.append(('Request delay', f"{self.pacer.delay:.2f} s at the end "
+                                         f"(adaptive, {self.pacer.minimum:g}-{self.pacer.maximum:g} s)"))
+        if self.archive and self.archive.written:
+            run.append(('Archived responses', f"{self.archive.written} ({self.archive.path})"))
+        if self.job:
+            counts = self.jobs.counts(self.job)
+            left = counts['pending'] + counts['in_flight']
+            run.append((f"Job {self.job}", f"{counts['done']} done, {counts['failed']} failed, {left} left"
+                        + (f"; retry the rest with --resume {self.job}" if counts['failed'] or left else "")))
+        run.append(('Output directory', self.output_dir))
+        self.metrics.print_summary(run)
+        if self.metrics_file:
+            self.metrics.write(self.metrics_file)
+            print(f"\n✓ Metrics saved to: {self.metrics_file}")
+
+
+def since_date(text):
+    """argparse type for --since"""
+    since = parse_lastmod(text)
+    if since is None:
+        raise argparse.ArgumentTypeError(f"not an ISO 8601 date: {text}")
+    return since
+
+
+def image_widths(text):
+    """argparse type for --image-variants: '320,640,1024' -> (320, 640, 1024)"""
+    try:
+        widths = tuple(int(width) for width in text.split(',') if width.strip())
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a comma-separated list of widths: {text}")
+    if any(width <= 0 for width in widths):
+        raise argparse.ArgumentTypeError(f"widths must be positive: {text}")
+    return widths
 
 
 def main():
-    scraper = AimaqScraper(
-        base_url="https://aimaqaqshamy.kz",
-        output_dir="scraped_data"
-    )
-    scraper.scrape_articles(num_articles=30)
+    parser = argparse.ArgumentParser(description="Scrape the latest articles from aimaqaqshamy.kz")
+    parser.add_argument('--base-url', default="https://aimaqaqshamy.kz")
+    parser.add_argument('--output-dir', default="scraped_data")
+    parser.add_argument('-n', '--num-articles', type=int, default=30)
+    parser.add_argument('--job', dest='job_name',
+                        help="Name for this crawl job (default: its start time, e.g. 20251202-045753)")
+    parser.add_argument('--resume', metavar='JOB',
+                        help="Continue job JOB: finish interrupted articles and retry failed ones")
+    parser.add_argument('--state-db',
+                        help="Incremental mode: SQLite crawl state file (e.g. scraped_data/crawl_state.db)")
+    parser.add_argument('--format', dest='output_format', choices=['json', 'ndjson'], default='json',
+                        help="json: write articles.json at the end; ndjson: append articles.ndjson per article")
+    parser.add_argument('--compact', action='store_true',
+                        help="With --format ndjson: also write articles.json from the NDJSON file at the end")
+    parser.add_argument('--image-workers', type=int, default=4,
+                        help="Parallel image downloads per article")
+    parser.add_argument('--image-variants', dest='image_widths', type=image_widths, default=(),
+                        help="Make responsive variants of every image at these widths, e.g. 320,640,1024 "
+                             "(needs Pillow; image sizes are probed either way)")
+    parser.add_argument('--image-format', choices=['webp', 'avif'], default='webp',
+                        help="Format of the image variants (avif if the Pillow build supports it)")
+    parser.add_argument('--image-process-workers', type=int,
+                        help="Processes making image variants (default: all cores)")
+    parser.add_argument('--parser', choices=['lxml', 'selectolax', 'bs4'], default='lxml',
+                        help="HTML parser backend (selectolax is optional: pip install selectolax)")
+    parser.add_argument('--discovery', choices=['auto', 'rest', 'sitemap', 'html'], default='auto',
+                        help="Article URL source: WordPress REST API, sitemaps, or listing pages "
+                             "(auto: REST, then sitemaps; listing pages are always the fallback)")
+    parser.add_argument('--since', type=since_date,
+                        help="Only articles modified since this date (e.g. 2025-12-01 or 2025-12-01T00:00:00+05:00)")
+    parser.add_argument('--parse-workers', type=int, default=0,
+                        help="Parse article pages in N worker processes while fetching continues")
+    parser.add_argument('--archive', dest='archive_dir',
+                        help="Keep raw listing/article responses in a WARC archive (e.g. scraped_data/archive)")
+    parser.add_argument('--from-archive',
+                        help="Re-extract articles from a WARC archive directory instead of the site (no network)")
+    parser.add_argument('--metrics', dest='metrics_file',
+                        help="Write run metrics to this file: *.json, or Prometheus textfile format otherwise "
+                             "(e.g. /var/lib/node_exporter/textfile/scraper.prom)")
+    parser.add_argument('--profile', choices=['cprofile', 'pyinstrument'],
+                        help="Profile the run; writes profile.prof or profile.html to the output directory")
+    parser.add_argument('--delay', type=float, default=1.0,
+                        help="Initial delay between requests, seconds (adapted as the crawl runs)")
+    parser.add_argument('--min-delay', type=float, default=0.1,
+                        help="Lower bound of the adaptive delay (--min-delay = --max-delay: fixed delay)")
+    parser.add_argument('--max-delay', type=float, default=30.0,
+                        help="Upper bound of the adaptive delay when the server slows down or errors")
+    parser.add_argument('--retries', type=int, default=4,
+                        help="Retries per request on 429/5xx responses and connection errors")
+    parser.add_argument('--daemon', action='store_true',
+                        help="Run continuously: re-check the listing and revisit articles on an adaptive "
+                             "schedule (needs --state-db; appends to articles.ndjson; see revisit_scheduler.py)")
+    parser.add_argument('--budget', type=int, default=30,
+                        help="Daemon: max requests to the site in any minute (discovery, articles, images, retries)")
+    parser.add_argument('--listing-interval', type=float, default=60,
+                        help="Daemon: seconds between listing checks")
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help="Use the concurrent asyncio engine (AsyncAimaqScraper)")
+    parser.add_argument('--per-host', type=int, default=4,
+                        help="Async engine: max concurrent requests per host")
+    parser.add_argument('--rate', type=float, default=5.0,
+                        help="Async engine: max requests per second (token bucket)")
+    args = parser.parse_args()
+    if args.daemon and not args.state_db:
+        parser.error("--daemon needs --state-db")
+    if args.daemon and args.use_async:
+        parser.error("--daemon runs the synchronous scraper; drop --async")
+
+    if args.from_archive:
+        scraper = AimaqScraper(
+            base_url=args.base_url,
+            output_dir=args.output_dir,
+            parser=args.parser,
+            parse_workers=args.parse_workers,
+            output_format=args.output_format,
+            compact_json=args.compact,
+            archive_dir=args.from_archive,
+            metrics_file=args.metrics_file,
+            image_widths=args.image_widths,
+            image_format=args.image_format,
+            image_process_workers=args.image_process_workers
+        )
+        with profiled(args.profile, args.output_dir):
+            scraper.scrape_from_archive()
+        return
+
+    if args.use_async:
+        from async_scraper import AsyncAimaqScraper
+        scraper = AsyncAimaqScraper(
+            base_url=args.base_url,
+            output_dir=args.output_dir,
+            per_host=args.per_host,
+            rate=args.rate,
+            page_delay=args.delay,
+            max_delay=args.max_delay,
+            retries=args.retries,
+            state_file=args.state_db,
+            output_format=args.output_format,
+            compact_json=args.compact,
+            parser=args.parser,
+            parse_workers=args.parse_workers,
+            archive_dir=args.archive_dir,
+            discovery=args.discovery,
+            since=args.since,
+            metrics_file=args.metrics_file,
+            job_name=args.job_name,
+            image_widths=args.image_widths,
+            image_format=args.image_format,
+            image_process_workers=args.image_process_workers
+        )
+    else:
+        scraper = AimaqScraper(
+            base_url=args.base_url,
+            output_dir=args.output_dir,
+            image_workers=args.image_workers,
+            page_delay=args.delay,
+            min_delay=args.min_delay,
+            max_delay=args.max_delay,
+            retries=args.retries,
+            parser=args.parser,
+            parse_workers=args.parse_workers,
+            archive_dir=args.archive_dir,
+            discovery=args.discovery,
+            since=args.since,
+            state_file=args.state_db,
+            # The daemon appends every changed article as it goes
+            output_format='ndjson' if args.daemon else args.output_format,
+            compact_json=args.compact,
+            metrics_file=args.metrics_file,
+            job_name=args.job_name,
+            image_widths=args.image_widths,
+            image_format=args.image_format,
+            image_process_workers=args.image_process_workers
+        )
+    if args.daemon:
+        from revisit_scheduler import RevisitDaemon
+        RevisitDaemon(scraper, budget=args.budget, listing_interval=args.listing_interval).run()
+        return
+
+    with profiled(args.profile, args.output_dir):
+        try:
+            scraper.scrape_articles(num_articles=args.num_articles, resume=args.resume)
+        except KeyboardInterrupt:
+            sys.exit(130)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Run metrics for the scraper: request latency, bytes, parse and image write time
+
+Metrics keeps every observation of a run (a few thousand to a few hundred
+thousand floats), so the end-of-run summary reports exact percentiles and
+the Prometheus textfile gets histogram buckets computed at write time.
+
+    metrics = Metrics()
+    with metrics.timer('scraper_parse_seconds', stage='article'):
+        ...
+    metrics.inc('scraper_response_bytes_total', len(body), kind='article')
+    metrics.write('scraped_data/metrics.prom')   # or .json
+    metrics.print_summary()
+
+Series names follow Prometheus conventions (*_seconds histograms, *_total
+counters) so the .prom file can be dropped into node_exporter's textfile
+collector directory.
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+# Upper bounds (seconds) for Prometheus histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+HELP = {
+    'scraper_request_seconds': "HTTP request time until the body is read (headers only for streamed requests)",
+    'scraper_ttfb_seconds': "Time from sending the request to receiving response headers",
+    'scraper_dns_seconds': "DNS resolution time, per new connection",
+    'scraper_connect_seconds': "TCP + TLS connection setup time, per new connection",
+    'scraper_parse_seconds': "HTML parsing and extraction time",
+    'scraper_image_seconds': "Image download time, request to stored file",
+    'scraper_image_write_seconds': "Time spent writing and committing image files",
+    'scraper_image_process_seconds': "Image size probe and variant encoding time, per image",
+    'scraper_stage_seconds': "Wall time of a crawl stage",
+    'scraper_requests_total': "HTTP responses by status",
+    'scraper_request_errors_total': "Requests that failed without a response",
+    'scraper_response_bytes_total': "Response body bytes received",
+    'scraper_retries_total': "Retried requests, by reason (status code or error)",
+    'scraper_wait_seconds': "Time waited before a request (adaptive pacing, retry backoff)",
+    'scraper_articles_total': "Articles by outcome",
+    'scraper_images_processed_total': "Stored images post-processed, or found already processed (cached)",
+}
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def series_key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in pairs) + '}'
+
+
+class Metrics:
+    def __init__(self):
+        # Image downloads and the parse pipeline report from worker threads
+        self.lock = threading.Lock()
+        self.samples = {}
+        self.counters = {}
+        self.started = time.time()
+
+    def observe(self, name, value, **labels):
+        key = series_key(name, labels)
+        with self.lock:
+            self.samples.setdefault(key, []).append(value)
+
+    def inc(self, name, amount=1, **labels):
+        key = series_key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    @contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def counter(self, name, **labels):
+        """Current value of a counter series (0 if never incremented)"""
+        with self.lock:
+            return self.counters.get(series_key(name, labels), 0)
+
+    def total(self, name):
+        """Sum of a counter over all its label sets"""
+        with self.lock:
+            return sum(value for (key, _), value in self.counters.items() if key == name)
+
+    def snapshot(self):
+        """Sorted copies of all series, taken under the lock"""
+        with self.lock:
+            samples = {key: sorted(values) for key, values in self.samples.items()}
+            counters = dict(self.counters)
+        return samples, counters
+
+    def to_dict(self):
+        samples, counters = self.snapshot()
+        histograms = []
+        for (name, labels), values in sorted(samples.items()):
+            histograms.append({
+                'name': name,
+                'labels': dict(labels),
+                'count': len(values),
+                'sum': sum(values),
+                'p50': percentile(values, 50),
+                'p90': percentile(values, 90),
+                'p99': percentile(values, 99),
+                'max': values[-1],
+            })
+        return {
+            'started_at': self.started,
+            'finished_at': time.time(),
+            'histograms': histograms,
+            'counters': [
+                {'name': name, 'labels': dict(labels), 'value': value}
+                for (name, labels), value in sorted(counters.items())
+            ],
+        }
+
+    def to_prometheus(self):
+        """Prometheus text exposition format (textfile collector)"""
+        samples, counters = self.snapshot()
+        lines = []
+        described = set()
+
+        def describe(name, kind):
+            if name not in described:
+                described.add(name)
+                if name in HELP:
+                    lines.append(f"# HELP {name} {HELP[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), values in sorted(samples.items()):
+            describe(name, 'histogram')
+            position = 0
+            for bound in BUCKETS:
+                while position < len(values) and values[position] <= bound:
+                    position += 1
+                lines.append(f"{name}_bucket{format_labels(labels, [('le', bound)])} {position}")
+            lines.append(f"{name}_bucket{format_labels(labels, [('le', '+Inf')])} {len(values)}")
+            lines.append(f"{name}_sum{format_labels(labels)} {sum(values)}")
+            lines.append(f"{name}_count{format_labels(labels)} {len(values)}")
+
+        for (name, labels), value in sorted(counters.items()):
+            describe(name, 'counter')
+            lines.append(f"{name}{format_labels(labels)} {value}")
+
+        lines.append(f"scraper_last_run_timestamp_seconds {time.time():.0f}")
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        """Write metrics as JSON (*.json) or Prometheus text (anything else), atomically"""
+        if path.endswith('.json'):
+            payload = json.dumps(self.to_dict(), indent=2, ensure_ascii=False)
+        else:
+            payload = self.to_prometheus()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # node_exporter may read the file at any moment: never expose a partial one
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+
+    def print_summary(self, run=()):
+        """
+        The run summary: `run` totals, then a percentile table of every timed series and the counters
+
+        `run` is (label, value) pairs the caller knows beyond the metrics
+        (articles, image files, ...); requests, bytes, retries and waits are
+        in the table and the counters.
+        """
+        samples, counters = self.snapshot()
+
+        if run:
+            print("\nSummary:")
+            for label, value in run:
+                print(f"  {label}: {value}")
+
+        print(f"\n{'timing':<52} {'count':>7} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} "
+              f"{'max ms':>9} {'total s':>9}")
+        for (name, labels), values in sorted(samples.items()):
+            label = name.replace('scraper_', '').replace('_seconds', '') + format_labels(labels)
+            print(f"  {label:<50} {len(values):>7} {percentile(values, 50) * 1000:>9.1f} "
+                  f"{percentile(values, 90) * 1000:>9.1f} {percentile(values, 99) * 1000:>9.1f} "
+                  f"{values[-1] * 1000:>9.1f} {sum(values):>9.2f}")
+
+        if counters:
+            print(f"\n{'counter':<52} {'value':>9}")
+            for (name, labels), value in sorted(counters.items()):
+                label = name.replace('scraper_', '') + format_labels(labels)
+                print(f"  {label:<50} {value:>9}")
+
+
+class MeteredSession:
+    """
+    requests.Session wrapper timing every GET into Metrics
+
+    Usage:
+        client = MeteredSession(session, metrics)
+        response = client.get(url, kind='article', timeout=30)
+    """
+
+    def __init__(self, session, metrics, kind='other'):
+        self.session = session
+        self.metrics = metrics
+        self.kind = kind
+
+    def with_kind(self, kind):
+        """Same session and metrics, different default `kind` label (e.g. for discovery.py)"""
+        return MeteredSession(self.session, self.metrics, kind)
+
+    def get(self, url, kind=None, **kwargs):
+        kind = kind or self.kind
+        start = time.perf_counter()
+        try:
+            response = self.session.get(url, **kwargs)
+            # Non-streamed bodies are read here, so the timing covers the transfer
+            size = len(response.content) if not kwargs.get('stream') else int(
+                response.headers.get('Content-Length') or 0)
+        except Exception:
+            self.metrics.inc('scraper_request_errors_total', kind=kind)
+            raise
+
+        self.metrics.observe('scraper_request_seconds', time.perf_counter() - start, kind=kind)
+        self.metrics.observe('scraper_ttfb_seconds', response.elapsed.total_seconds(), kind=kind)
+        self.metrics.inc('scraper_requests_total', kind=kind, status=str(response.status_code))
+        self.metrics.inc('scraper_response_bytes_total', size, kind=kind)
+        return response
+
+
+@contextmanager
+def profiled(mode, output_dir):
+    """
+    Profile the enclosed block with cProfile or pyinstrument (optional dependency)
+
+    Writes output_dir/profile.prof (open with snakeviz or pstats) or
+    output_dir/profile.html; mode None disables profiling.
+    """
+    if not mode:
+        yield
+        return
+
+    if mode == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            print("pyinstrument is not installed (pip install pyinstrument), using cProfile")
+            mode = 'cprofile'
+
+    if mode == 'pyinstrument':
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            path = os.path.join(output_dir, 'profile.html')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(profiler.output_html())
+            print(f"\n✓ Profile saved to: {path}")
+        return
+
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        path = os.path.join(output_dir, 'profile.prof')
+        profiler.dump_stats(path)
+        print(f"\n✓ Profile saved to: {path}")
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(20)
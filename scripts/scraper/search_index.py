@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+Full-text search over scraped articles (SQLite FTS5)
+
+Builds a local search index from articles.json / articles.ndjson so editors
+can look up prior coverage without grepping files or querying the CMS
+database. Titles and bodies go into an FTS5 table with the unicode61
+tokenizer, which lower-cases Cyrillic and keeps the Kazakh letters
+(ә ғ қ ң ө ұ ү һ і) as letters; ё is folded to е on both sides. FTS5 has no
+Kazakh or Russian stemmer, so query words are cut to a stem by stripping
+common case, plural and possessive endings (облыстардың -> облыс,
+учителей -> учител) and matched as prefixes: облысқа finds облыс, облысы,
+облыстың. Quoted phrases are matched exactly. Results are ranked by BM25
+with title matches weighted 10x and come with a snippet around the match.
+
+Updates are incremental: an article is re-indexed only when its content hash
+changes, and for an NDJSON file the index remembers how far it has read, so
+the next update only parses the lines appended since.
+
+    python search_index.py update scraped_data/articles.ndjson
+    python search_index.py query "облыс әкімдігі" --since 2024-01-01
+    python search_index.py query '"мектеп жөндеу"' --category Білім
+"""
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from article_store import is_ndjson, iter_articles
+from crawl_state import article_hash
+
+
+TOKENIZER = "unicode61 remove_diacritics 2"
+TITLE_WEIGHT = 10.0
+MIN_STEM = 4
+MAX_STRIPS = 2
+
+# Inflectional endings, longest match first (Russian cases; Kazakh plural,
+# case and possessive suffixes in their vowel-harmony variants)
+ENDINGS = sorted({
+    'ями', 'ами', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими', 'иях', 'ях', 'ах', 'ов', 'ев', 'ей', 'ий',
+    'ый', 'ой', 'ая', 'яя', 'ое', 'ее', 'ые', 'ие', 'ом', 'ем', 'ам', 'ям', 'ию', 'ия', 'ть',
+    'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь',
+    'лар', 'лер', 'дар', 'дер', 'тар', 'тер',
+    'ның', 'нің', 'дың', 'дің', 'тың', 'тің', 'ға', 'ге', 'қа', 'ке', 'на', 'не',
+    'да', 'де', 'та', 'те', 'нда', 'нде', 'дан', 'ден', 'тан', 'тен', 'нан', 'нен',
+    'мен', 'бен', 'пен', 'ды', 'ді', 'ты', 'ті', 'ны', 'ні', 'сы', 'сі', 'ын', 'ін', 'і',
+}, key=len, reverse=True)
+
+WORD_RE = re.compile(r'\w+')
+PHRASE_RE = re.compile(r'"([^"]*)"')
+TERM_RE = re.compile(r'"([^"]*)"(\*?)|(\w+)(\*?)')
+OPERATORS = {'AND', 'OR', 'NOT', 'NEAR'}
+SPACE_RE = re.compile(r'\s+')
+
+
+def fold(text):
+    """ё -> е, case kept (the tokenizer lower-cases; snippets show the original case)"""
+    return text.replace('ё', 'е').replace('Ё', 'Е')
+
+
+def stem(word):
+    """Strip up to MAX_STRIPS inflectional endings, keeping at least MIN_STEM letters"""
+    for _ in range(MAX_STRIPS):
+        for ending in ENDINGS:
+            if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+                word = word[:-len(ending)]
+                break
+        else:
+            break
+    return word
+
+
+def match_expression(query):
+    """
+    FTS5 MATCH expression for a query typed by an editor
+
+    Words become prefix queries on their stems, "quoted phrases" stay exact
+    phrases, and all parts must match.
+    """
+    parts = []
+    for phrase in PHRASE_RE.findall(query):
+        words = WORD_RE.findall(fold(phrase).lower())
+        if words:
+            parts.append('"' + ' '.join(words) + '"')
+    for word in WORD_RE.findall(fold(PHRASE_RE.sub(' ', query)).lower()):
+        parts.append(f'"{stem(word)}"*' if len(word) >= 3 else f'"{word}"')
+    return ' AND '.join(parts)
+
+
+def highlight_terms(expression):
+    """(prefixes, words) to highlight for a MATCH expression; FTS5 operators are ignored"""
+    prefixes, words = set(), set()
+    for quoted, quoted_star, bare, bare_star in TERM_RE.findall(expression):
+        if bare in OPERATORS:
+            continue
+        for word in WORD_RE.findall(fold(quoted or bare).lower()):
+            (prefixes if quoted_star or bare_star else words).add(word)
+    return prefixes, words
+
+
+def make_snippet(text, prefixes, words, size=16):
+    """The `size`-word window of `text` with the most matching words, matches in [brackets]"""
+    tokens = list(WORD_RE.finditer(text))
+    matched = [i for i, token in enumerate(tokens)
+               if (word := fold(token.group()).lower()) in words or word.startswith(tuple(prefixes))]
+    if not tokens:
+        return ''
+    start = 0
+    if matched:
+        start = max(((max(0, i - 2)) for i in matched),
+                    key=lambda s: sum(s <= i < s + size for i in matched))
+    window = tokens[start:start + size]
+    marked = set(matched)
+    parts = [] if start == 0 else ['…']
+    position = window[0].start()
+    for index, token in enumerate(window, start):
+        parts.append(SPACE_RE.sub(' ', text[position:token.start()]))
+        parts.append(f"[{token.group()}]" if index in marked else token.group())
+        position = token.end()
+    if start + size < len(tokens):
+        parts.append('…')
+    return ''.join(parts)
+
+
+def iter_ndjson_from(path, offset):
+    """Yield (article, offset after its line) for the complete lines after byte `offset`"""
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b'\n'):
+                break   # being written; picked up next time
+            offset += len(line)
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                article = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"✗ Skipping malformed line at byte {offset - len(line)} in {path}: {e}")
+                continue
+            yield article, offset
+
+
+class SearchIndex:
+    """
+    Usage:
+        index = SearchIndex('scraped_data/search.db')
+        index.update_from_file('scraped_data/articles.ndjson')   # or index.update(articles)
+        for hit in index.search('облыс әкімдігі', limit=10):
+            print(hit['title'], hit['url'], hit['snippet'])
+    """
+
+    def __init__(self, path):
+        self.path = path
+        # Safe to share between threads, like the scraper's other SQLite stores
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        created = not self.connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'documents_fts'"
+        ).fetchone()
+        self.connection.executescript(f"""
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            CREATE TABLE IF NOT EXISTS documents (
+                id INTEGER PRIMARY KEY,
+                url TEXT UNIQUE NOT NULL,
+                title TEXT,
+                date_published TEXT,
+                author TEXT,
+                category TEXT,
+                content_hash TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_documents_date ON documents(date_published);
+            CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+                title, content, tokenize = '{TOKENIZER}'
+            );
+            CREATE TABLE IF NOT EXISTS sources (
+                path TEXT PRIMARY KEY,
+                offset INTEGER NOT NULL
+            );
+        """)
+        if created:
+            self.connection.execute("INSERT INTO documents_fts (documents_fts, rank) VALUES ('rank', ?)",
+                                    (f"bm25({TITLE_WEIGHT}, 1.0)",))
+        self.connection.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def index_article(self, cursor, article, stats):
+        url = article.get('url')
+        if not url:
+            stats['skipped'] += 1
+            return
+        digest = article_hash(article)
+        row = cursor.execute("SELECT id, content_hash FROM documents WHERE url = ?", (url,)).fetchone()
+        if row and row['content_hash'] == digest:
+            stats['unchanged'] += 1
+            return
+
+        values = (article.get('title'), article.get('date_published'), article.get('author'),
+                  article.get('category') or None, digest)
+        if row:
+            document_id = row['id']
+            cursor.execute("""
+                UPDATE documents SET title = ?, date_published = ?, author = ?, category = ?, content_hash = ?
+                WHERE id = ?
+            """, values + (document_id,))
+            cursor.execute("DELETE FROM documents_fts WHERE rowid = ?", (document_id,))
+            stats['updated'] += 1
+        else:
+            document_id = cursor.execute("""
+                INSERT INTO documents (url, title, date_published, author, category, content_hash)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (url,) + values).lastrowid
+            stats['added'] += 1
+        cursor.execute("INSERT INTO documents_fts (rowid, title, content) VALUES (?, ?, ?)",
+                       (document_id, fold(article.get('title') or ''), fold(article.get('content') or '')))
+
+    def update(self, articles, batch_size=1000, source=None):
+        """
+        Index new and changed articles, committing every `batch_size`
+
+        `articles` is any iterable of article dicts, or of (article, offset)
+        pairs when `source` names the NDJSON file they were read from; its
+        read offset is saved with each commit. Returns added / updated /
+        unchanged / skipped counts.
+        """
+        stats = {'added': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0}
+        offset = None
+        with self.lock:
+            cursor = self.connection.cursor()
+            for count, item in enumerate(articles, 1):
+                if source:
+                    item, offset = item
+                self.index_article(cursor, item, stats)
+                if count % batch_size == 0:
+                    self.save_offset(cursor, source, offset)
+                    self.connection.commit()
+            self.save_offset(cursor, source, offset)
+            self.connection.commit()
+        return stats
+
+    @staticmethod
+    def save_offset(cursor, source, offset):
+        if source and offset is not None:
+            cursor.execute("INSERT OR REPLACE INTO sources (path, offset) VALUES (?, ?)", (source, offset))
+
+    def update_from_file(self, path, batch_size=1000):
+        """update() from articles.json (every article, unchanged ones skipped) or the new lines of an NDJSON file"""
+        if not is_ndjson(path):
+            return self.update(iter_articles(path), batch_size)
+
+        source = os.path.abspath(path)
+        with self.lock:
+            row = self.connection.execute("SELECT offset FROM sources WHERE path = ?", (source,)).fetchone()
+        offset = row['offset'] if row else 0
+        if offset > os.path.getsize(path):
+            offset = 0   # the file was replaced or truncated: read it again from the start
+        return self.update(iter_ndjson_from(path, offset), batch_size, source=source)
+
+    def optimize(self):
+        """Merge the FTS5 segments into one (after a large build; makes queries faster)"""
+        with self.lock:
+            self.connection.execute("INSERT INTO documents_fts (documents_fts) VALUES ('optimize')")
+            self.connection.commit()
+
+    def search(self, query, limit=10, category=None, since=None, raw=False, sort='rank'):
+        """
+        Best matches for `query` as dicts (url, title, date_published, category, snippet, score)
+
+        sort='rank' orders by BM25, which FTS5 computes for every match (~2 µs
+        each), so a query matching most of the archive takes longer;
+        sort='newest' orders by date_published and stays fast. raw=True
+        passes `query` to FTS5 MATCH as it is (AND/OR/NOT, NEAR, column filters).
+        """
+        expression = query if raw else match_expression(query)
+        if not expression:
+            return []
+        filters, params = '', [expression]
+        if category:
+            filters += " AND d.category = ?"
+            params.append(category)
+        if since:
+            filters += " AND d.date_published >= ?"
+            params.append(since)
+
+        # Rank the matches, then read only the hits' text for snippets (made
+        # here: FTS5 snippet() would look each hit up again through the index)
+        if sort == 'rank':
+            select = f"""
+                SELECT d.id, documents_fts.rank FROM documents_fts JOIN documents d ON d.id = documents_fts.rowid
+                WHERE documents_fts MATCH ?{filters}
+                ORDER BY documents_fts.rank LIMIT ?
+            """
+        elif sort == 'newest':
+            select = f"""
+                SELECT d.id, NULL FROM documents d
+                WHERE d.id IN (SELECT rowid FROM documents_fts WHERE documents_fts MATCH ?){filters}
+                ORDER BY d.date_published DESC LIMIT ?
+            """
+        else:
+            raise ValueError(f"sort must be 'rank' or 'newest', not {sort!r}")
+
+        with self.lock:
+            scores = dict(self.connection.execute(select, params + [limit]).fetchall())
+            if not scores:
+                return []
+            rows = self.connection.execute(f"""
+                SELECT d.id, d.url, d.title, d.date_published, d.category, documents_fts.content
+                FROM documents d JOIN documents_fts ON documents_fts.rowid = d.id
+                WHERE d.id IN ({','.join('?' * len(scores))})
+            """, list(scores)).fetchall()
+        prefixes, words = highlight_terms(expression)
+        hits = {row['id']: row for row in rows}
+        return [{
+            'url': hits[i]['url'],
+            'title': hits[i]['title'],
+            'date_published': hits[i]['date_published'],
+            'category': hits[i]['category'],
+            'snippet': make_snippet(hits[i]['content'], prefixes, words),
+            'score': score,
+        } for i, score in scores.items()]
+
+    def count(self, query, raw=False):
+        """Number of articles matching `query`"""
+        expression = query if raw else match_expression(query)
+        if not expression:
+            return 0
+        with self.lock:
+            return self.connection.execute(
+                "SELECT COUNT(*) FROM documents_fts WHERE documents_fts MATCH ?", (expression,)
+            ).fetchone()[0]
+
+    def close(self):
+        self.connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Full-text search over scraped articles (SQLite FTS5)")
+    parser.add_argument('--index', default='scraped_data/search.db')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    update = commands.add_parser('update', help="Index new and changed articles from a file")
+    update.add_argument('articles_file', nargs='?', default='scraped_data/articles.json')
+    update.add_argument('--optimize', action='store_true', help="Merge index segments afterwards")
+
+    query = commands.add_parser('query', help="Search the index")
+    query.add_argument('text', help='Words (matched by stem) and "exact phrases"')
+    query.add_argument('-n', '--limit', type=int, default=10)
+    query.add_argument('--category')
+    query.add_argument('--since', help="Only articles published on or after this date (YYYY-MM-DD)")
+    query.add_argument('--newest', action='store_true',
+                       help="Newest first instead of by relevance (faster for very common words)")
+    query.add_argument('--raw', action='store_true', help="Pass the query to FTS5 MATCH unchanged")
+
+    commands.add_parser('stats', help="Number of indexed articles")
+    args = parser.parse_args()
+
+    with SearchIndex(args.index) as index:
+        if args.command == 'update':
+            start = time.perf_counter()
+            stats = index.update_from_file(args.articles_file)
+            if args.optimize:
+                index.optimize()
+            print(f"✓ {stats['added']} added, {stats['updated']} updated, {stats['unchanged']} unchanged "
+                  f"in {time.perf_counter() - start:.1f} s; {len(index)} articles in {args.index}")
+        elif args.command == 'query':
+            start = time.perf_counter()
+            hits = index.search(args.text, args.limit, args.category, args.since, args.raw,
+                                'newest' if args.newest else 'rank')
+            elapsed = time.perf_counter() - start
+            total = index.count(args.text, args.raw)
+            for number, hit in enumerate(hits, 1):
+                print(f"\n{number}. {hit['title']}  ({(hit['date_published'] or '')[:10]}"
+                      f"{', ' + hit['category'] if hit['category'] else ''})")
+                print(f"   {hit['url']}")
+                print(f"   {hit['snippet']}")
+            print(f"\n{len(hits)} of {total} matches in {elapsed * 1000:.1f} ms"
+                  + (" (before --category/--since)" if args.category or args.since else ""))
+        else:
+            print(f"{len(index)} articles in {args.index}")
+
+
+if __name__ == "__main__":
+    main()
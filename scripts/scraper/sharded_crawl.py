@@ -0,0 +1,749 @@
+#!/usr/bin/env python3
+"""
+Sharded crawling on several nodes: batches of URLs claimed under leases
+
+A crawl is split into batches of article URLs kept in a shared store: a
+SQLite file when all workers run on one machine, Redis (pip install redis)
+when they run on several. There is no coordinator. Every worker runs the
+same command: the first one to get there seeds the crawl (discovers the
+latest -n articles of every site), then all of them claim batches:
+
+    pending --claim (lease of --lease seconds)--> leased --complete--> done
+
+A worker renews its lease after every article. One that crashes or hangs
+stops renewing, its lease expires and another worker claims the batch again
+(counted as reclaimed). Results are stored together with marking the batch
+done, and only by the lease holder, so every batch lands in the store
+exactly once however often it was started.
+
+Batches are spread over the live workers (those with a recent heartbeat) by
+consistent hashing of the batch id: each worker first claims the batches
+the hash ring gives it, so workers rarely race for the same one, and a
+worker joining or leaving moves only its own share. Once its share is done,
+a worker takes what is left of the others'.
+
+Politeness holds across all workers: every request to a site (listing,
+article, image) first reserves a send slot in the store, so a site gets at
+most --rate requests per second from the whole crawl, on top of each
+worker's adaptive delay. With Redis the slots are timed by the server clock.
+
+`merge` writes the articles of the whole crawl to one NDJSON (or JSON)
+file, which import_to_db.py reads like any scrape. Images are stored by each
+node under output_dir/<site>/images.
+
+    python sharded_crawl.py work sites.yaml -n 5000 --store scraped_data/shards.db --crawl backfill
+    python sharded_crawl.py work sites.yaml -n 5000 --store redis://10.0.0.5:6379/0 --crawl backfill
+    python sharded_crawl.py status --store scraped_data/shards.db --crawl backfill
+    python sharded_crawl.py merge --store scraped_data/shards.db --crawl backfill -o backfill.ndjson
+"""
+
+import argparse
+import bisect
+import contextlib
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime
+from urllib.parse import urlparse
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+from article_store import open_sink
+from scrape_aimaq import AimaqScraper
+from site_profiles import resolve_profiles
+
+
+# How long the seeding worker may take to discover the crawl before another one takes over
+SEED_LEASE = 15 * 60
+# Virtual nodes per worker on the hash ring
+REPLICAS = 64
+
+
+def ring_hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class HashRing:
+    """Consistent hashing: keys map to nodes, and a node joining or leaving moves only its share"""
+
+    def __init__(self, nodes, replicas=REPLICAS):
+        self.points = sorted((ring_hash(f"{node}#{i}"), node) for node in nodes for i in range(replicas))
+        self.hashes = [point for point, _ in self.points]
+
+    def node_for(self, key):
+        if not self.points:
+            return None
+        i = bisect.bisect(self.hashes, ring_hash(key)) % len(self.points)
+        return self.points[i][1]
+
+
+@dataclass
+class Batch:
+    """A claimed batch; attempts > 1 means it was started before (reclaimed)"""
+    id: str
+    site: str
+    urls: list
+    attempts: int = 1
+
+
+def interleave(links, batch_size):
+    """[(site, urls)] batches of every site's links, taking turns between sites"""
+    per_site = [[(site, urls[i:i + batch_size]) for i in range(0, len(urls), batch_size)]
+                for site, urls in links.items()]
+    batches = []
+    for turn in range(max(map(len, per_site), default=0)):
+        batches.extend(batches_of_site[turn] for batches_of_site in per_site if turn < len(batches_of_site))
+    return batches
+
+
+class SqliteLeaseStore:
+    """
+    Crawl batches, leases, results and per-host send slots in one SQLite file
+
+    For workers on one machine (or a local disk the processes share); WAL
+    mode lets them read while one writes, and claims run in IMMEDIATE
+    transactions so two workers never get the same batch.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        # Image download threads reserve send slots too: one connection behind a lock
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        # Every request reserves a send slot: no fsync per commit (WAL stays consistent on a crash)
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS crawls (
+                id TEXT PRIMARY KEY,
+                state TEXT NOT NULL,
+                owner TEXT,
+                lease_until REAL,
+                params TEXT,
+                created_at TIMESTAMP
+            );
+            CREATE TABLE IF NOT EXISTS batches (
+                crawl TEXT NOT NULL,
+                id TEXT NOT NULL,
+                site TEXT NOT NULL,
+                urls TEXT NOT NULL,
+                state TEXT NOT NULL DEFAULT 'pending',
+                owner TEXT,
+                lease_until REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (crawl, id)
+            );
+            CREATE TABLE IF NOT EXISTS results (
+                crawl TEXT NOT NULL,
+                batch TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                url TEXT NOT NULL,
+                article TEXT,
+                error TEXT,
+                PRIMARY KEY (crawl, batch, position)
+            );
+            CREATE TABLE IF NOT EXISTS workers (
+                crawl TEXT NOT NULL,
+                worker TEXT NOT NULL,
+                seen_until REAL,
+                PRIMARY KEY (crawl, worker)
+            );
+            CREATE TABLE IF NOT EXISTS hosts (
+                host TEXT PRIMARY KEY,
+                next_at REAL
+            );
+        """)
+
+    @contextlib.contextmanager
+    def transaction(self):
+        with self.lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.connection
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+            self.connection.execute("COMMIT")
+
+    def query(self, sql, params=()):
+        with self.lock:
+            return self.connection.execute(sql, params).fetchall()
+
+    def state(self, crawl):
+        """'seeding', 'ready' or None for an unknown crawl"""
+        rows = self.query("SELECT state FROM crawls WHERE id = ?", (crawl,))
+        return rows[0]['state'] if rows else None
+
+    def begin_seed(self, crawl, worker, ttl):
+        """'seed' if this worker should seed the crawl now, 'ready' if it is seeded, else 'wait'"""
+        now = time.time()
+        with self.transaction() as db:
+            row = db.execute("SELECT * FROM crawls WHERE id = ?", (crawl,)).fetchone()
+            if row is None:
+                db.execute("INSERT INTO crawls (id, state, owner, lease_until, created_at) "
+                           "VALUES (?, 'seeding', ?, ?, ?)", (crawl, worker, now + ttl, datetime.now().isoformat()))
+                return 'seed'
+            if row['state'] == 'ready':
+                return 'ready'
+            if row['lease_until'] < now:
+                db.execute("UPDATE crawls SET owner = ?, lease_until = ? WHERE id = ?", (worker, now + ttl, crawl))
+                return 'seed'
+            return 'wait'
+
+    def seed(self, crawl, worker, batches, params):
+        """Store [(site, urls)] batches and open the crawl; False if the seeding lease was lost"""
+        with self.transaction() as db:
+            row = db.execute("SELECT owner, state FROM crawls WHERE id = ?", (crawl,)).fetchone()
+            if row is None or row['owner'] != worker or row['state'] != 'seeding':
+                return False
+            db.executemany("INSERT INTO batches (crawl, id, site, urls) VALUES (?, ?, ?, ?)",
+                           [(crawl, f"{i:06d}", site, json.dumps(urls)) for i, (site, urls) in enumerate(batches)])
+            db.execute("UPDATE crawls SET state = 'ready', owner = NULL, lease_until = NULL, params = ? "
+                       "WHERE id = ?", (json.dumps(params, ensure_ascii=False), crawl))
+        return True
+
+    def heartbeat(self, crawl, worker, ttl):
+        with self.transaction() as db:
+            db.execute("INSERT OR REPLACE INTO workers (crawl, worker, seen_until) VALUES (?, ?, ?)",
+                       (crawl, worker, time.time() + ttl))
+
+    def workers(self, crawl):
+        """Workers with a heartbeat that has not expired"""
+        rows = self.query("SELECT worker FROM workers WHERE crawl = ? AND seen_until >= ? ORDER BY worker",
+                          (crawl, time.time()))
+        return [row['worker'] for row in rows]
+
+    def leave(self, crawl, worker):
+        with self.transaction() as db:
+            db.execute("DELETE FROM workers WHERE crawl = ? AND worker = ?", (crawl, worker))
+
+    def claim(self, crawl, worker, ttl, prefer=None):
+        """Lease a pending batch (one `prefer(id)` accepts if any); None if all are leased or done"""
+        now = time.time()
+        with self.transaction() as db:
+            ids = [row['id'] for row in db.execute("""
+                SELECT id FROM batches
+                WHERE crawl = ? AND state = 'pending' AND (owner IS NULL OR lease_until < ?)
+                ORDER BY id
+            """, (crawl, now))]
+            if not ids:
+                return None
+            chosen = next((batch_id for batch_id in ids if prefer is None or prefer(batch_id)), ids[0])
+            db.execute("UPDATE batches SET owner = ?, lease_until = ?, attempts = attempts + 1 "
+                       "WHERE crawl = ? AND id = ?", (worker, now + ttl, crawl, chosen))
+            row = db.execute("SELECT site, urls, attempts FROM batches WHERE crawl = ? AND id = ?",
+                             (crawl, chosen)).fetchone()
+        return Batch(chosen, row['site'], json.loads(row['urls']), row['attempts'])
+
+    def renew(self, crawl, batch_id, worker, ttl):
+        """Extend a lease this worker holds; False if it expired and was taken over"""
+        with self.transaction() as db:
+            cursor = db.execute("""
+                UPDATE batches SET lease_until = ?
+                WHERE crawl = ? AND id = ? AND owner = ? AND state = 'pending'
+            """, (time.time() + ttl, crawl, batch_id, worker))
+            return cursor.rowcount == 1
+
+    def complete(self, crawl, batch_id, worker, results):
+        """Store [(url, article, error)] and mark the batch done, if this worker still holds it"""
+        with self.transaction() as db:
+            row = db.execute("SELECT owner, state FROM batches WHERE crawl = ? AND id = ?",
+                             (crawl, batch_id)).fetchone()
+            if row is None or row['owner'] != worker or row['state'] != 'pending':
+                return False
+            db.executemany(
+                "INSERT OR REPLACE INTO results (crawl, batch, position, url, article, error) VALUES (?, ?, ?, ?, ?, ?)",
+                [(crawl, batch_id, position, url,
+                  json.dumps(article, ensure_ascii=False) if article is not None else None, error)
+                 for position, (url, article, error) in enumerate(results)]
+            )
+            db.execute("UPDATE batches SET state = 'done', lease_until = NULL WHERE crawl = ? AND id = ?",
+                       (crawl, batch_id))
+        return True
+
+    def release(self, crawl, batch_id, worker):
+        """Give a batch back unfinished (on Ctrl-C), so others need not wait for the lease to expire"""
+        with self.transaction() as db:
+            db.execute("""
+                UPDATE batches SET owner = NULL, lease_until = NULL, attempts = attempts - 1
+                WHERE crawl = ? AND id = ? AND owner = ? AND state = 'pending'
+            """, (crawl, batch_id, worker))
+
+    def reserve(self, host, interval):
+        """Claim the next send slot for `host`, `interval` seconds after the last one; seconds to wait"""
+        now = time.time()
+        with self.transaction() as db:
+            row = db.execute("SELECT next_at FROM hosts WHERE host = ?", (host,)).fetchone()
+            slot = max(now, row['next_at'] if row else 0.0)
+            db.execute("INSERT OR REPLACE INTO hosts (host, next_at) VALUES (?, ?)", (host, slot + interval))
+        return slot - now
+
+    def counts(self, crawl):
+        """Batches pending (claimable), leased and done; articles, failed URLs and reclaimed batches"""
+        now = time.time()
+        counts = dict.fromkeys(('pending', 'leased', 'done', 'articles', 'failed', 'reclaimed'), 0)
+        for row in self.query("SELECT state, owner, lease_until, attempts FROM batches WHERE crawl = ?", (crawl,)):
+            if row['state'] == 'done':
+                counts['done'] += 1
+            elif row['owner'] and row['lease_until'] >= now:
+                counts['leased'] += 1
+            else:
+                counts['pending'] += 1
+            counts['reclaimed'] += max(0, row['attempts'] - 1)
+        row = self.query("SELECT COUNT(article), COUNT(error) FROM results WHERE crawl = ?", (crawl,))[0]
+        counts['articles'], counts['failed'] = row[0], row[1]
+        return counts
+
+    def results(self, crawl):
+        """Scraped articles in batch order"""
+        with self.lock:
+            rows = self.connection.execute("""
+                SELECT article FROM results WHERE crawl = ? AND article IS NOT NULL ORDER BY batch, position
+            """, (crawl,)).fetchall()
+        for row in rows:
+            yield json.loads(row['article'])
+
+    def failures(self, crawl):
+        """(url, error) of every article that failed"""
+        return [(row['url'], row['error']) for row in self.query(
+            "SELECT url, error FROM results WHERE crawl = ? AND error IS NOT NULL ORDER BY batch, position",
+            (crawl,))]
+
+    def close(self):
+        self.connection.close()
+
+
+class RedisLeaseStore:
+    """
+    The same store in Redis, for workers on several nodes
+
+    Leases are keys with a TTL; claiming is SET NX, and renewing, completing
+    and reserving send slots are Lua scripts, so each is atomic on the
+    server. All keys of a crawl share the hash tag {crawl} (Redis Cluster).
+    """
+
+    RENEW = """
+        if redis.call('get', KEYS[1]) ~= ARGV[1] then return 0 end
+        return redis.call('pexpire', KEYS[1], ARGV[2])
+    """
+    # KEYS: seed lock, batches, pending, state, params
+    SEED = """
+        if redis.call('get', KEYS[1]) ~= ARGV[1] then return 0 end
+        for i = 3, #ARGV, 2 do
+            redis.call('hset', KEYS[2], ARGV[i], ARGV[i + 1])
+            redis.call('sadd', KEYS[3], ARGV[i])
+        end
+        redis.call('set', KEYS[5], ARGV[2])
+        redis.call('set', KEYS[4], 'ready')
+        redis.call('del', KEYS[1])
+        return 1
+    """
+    # KEYS: lease, results, pending, done, stats
+    COMPLETE = """
+        if redis.call('get', KEYS[1]) ~= ARGV[1] then return 0 end
+        redis.call('hset', KEYS[2], ARGV[2], ARGV[3])
+        redis.call('srem', KEYS[3], ARGV[2])
+        redis.call('sadd', KEYS[4], ARGV[2])
+        redis.call('hincrby', KEYS[5], 'articles', ARGV[4])
+        redis.call('hincrby', KEYS[5], 'failed', ARGV[5])
+        redis.call('del', KEYS[1])
+        return 1
+    """
+    # KEYS: lease, attempts
+    RELEASE = """
+        if redis.call('get', KEYS[1]) ~= ARGV[1] then return 0 end
+        redis.call('hincrby', KEYS[2], ARGV[2], -1)
+        return redis.call('del', KEYS[1])
+    """
+    # Server time, so nodes with skewed clocks still space their requests
+    RESERVE = """
+        local time = redis.call('time')
+        local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+        local slot = math.max(now, tonumber(redis.call('get', KEYS[1]) or '0'))
+        redis.call('set', KEYS[1], tostring(slot + tonumber(ARGV[1])), 'EX', 3600)
+        return tostring(slot - now)
+    """
+
+    def __init__(self, client, prefix='sharded'):
+        self.redis = client
+        self.prefix = prefix
+        self.scripts = {name: client.register_script(getattr(self, name))
+                        for name in ('RENEW', 'SEED', 'COMPLETE', 'RELEASE', 'RESERVE')}
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        if redis is None:
+            raise ImportError("The Redis store needs redis (pip install redis)")
+        return cls(redis.Redis.from_url(url), **kwargs)
+
+    def key(self, crawl, name):
+        return f"{self.prefix}:{{{crawl}}}:{name}"
+
+    def now(self):
+        seconds, microseconds = self.redis.time()
+        return seconds + microseconds / 1e6
+
+    def state(self, crawl):
+        state = self.redis.get(self.key(crawl, 'state'))
+        return state.decode() if state else None
+
+    def begin_seed(self, crawl, worker, ttl):
+        if self.state(crawl) == 'ready':
+            return 'ready'
+        if self.redis.set(self.key(crawl, 'seed'), worker, nx=True, px=int(ttl * 1000)):
+            self.redis.set(self.key(crawl, 'state'), 'seeding')
+            return 'seed'
+        return 'wait'
+
+    def seed(self, crawl, worker, batches, params):
+        args = [worker, json.dumps(params, ensure_ascii=False)]
+        for i, (site, urls) in enumerate(batches):
+            args += [f"{i:06d}", json.dumps({'site': site, 'urls': urls})]
+        keys = [self.key(crawl, name) for name in ('seed', 'batches', 'pending', 'state', 'params')]
+        return bool(self.scripts['SEED'](keys=keys, args=args))
+
+    def heartbeat(self, crawl, worker, ttl):
+        self.redis.zadd(self.key(crawl, 'workers'), {worker: self.now() + ttl})
+
+    def workers(self, crawl):
+        return sorted(worker.decode() for worker in
+                      self.redis.zrangebyscore(self.key(crawl, 'workers'), self.now(), '+inf'))
+
+    def leave(self, crawl, worker):
+        self.redis.zrem(self.key(crawl, 'workers'), worker)
+
+    def claim(self, crawl, worker, ttl, prefer=None):
+        ids = sorted(batch_id.decode() for batch_id in self.redis.smembers(self.key(crawl, 'pending')))
+        if not ids:
+            return None
+        held = self.redis.mget([self.key(crawl, f"lease:{batch_id}") for batch_id in ids])
+        free = [batch_id for batch_id, owner in zip(ids, held) if owner is None]
+        free.sort(key=lambda batch_id: not (prefer is None or prefer(batch_id)))
+        for batch_id in free:
+            lease = self.key(crawl, f"lease:{batch_id}")
+            if not self.redis.set(lease, worker, nx=True, px=int(ttl * 1000)):
+                continue
+            # Completed between the scan and the claim
+            if not self.redis.sismember(self.key(crawl, 'pending'), batch_id):
+                self.redis.delete(lease)
+                continue
+            attempts = self.redis.hincrby(self.key(crawl, 'attempts'), batch_id, 1)
+            batch = json.loads(self.redis.hget(self.key(crawl, 'batches'), batch_id))
+            return Batch(batch_id, batch['site'], batch['urls'], attempts)
+        return None
+
+    def renew(self, crawl, batch_id, worker, ttl):
+        return bool(self.scripts['RENEW'](keys=[self.key(crawl, f"lease:{batch_id}")],
+                                          args=[worker, int(ttl * 1000)]))
+
+    def complete(self, crawl, batch_id, worker, results):
+        keys = [self.key(crawl, name) for name in (f"lease:{batch_id}", 'results', 'pending', 'done', 'stats')]
+        payload = json.dumps(results, ensure_ascii=False)
+        articles = sum(1 for _, article, _ in results if article is not None)
+        failed = sum(1 for _, _, error in results if error is not None)
+        return bool(self.scripts['COMPLETE'](keys=keys, args=[worker, batch_id, payload, articles, failed]))
+
+    def release(self, crawl, batch_id, worker):
+        self.scripts['RELEASE'](keys=[self.key(crawl, f"lease:{batch_id}"), self.key(crawl, 'attempts')],
+                                args=[worker, batch_id])
+
+    def reserve(self, host, interval):
+        return float(self.scripts['RESERVE'](keys=[f"{self.prefix}:host:{host}"], args=[interval]))
+
+    def counts(self, crawl):
+        ids = [batch_id.decode() for batch_id in self.redis.smembers(self.key(crawl, 'pending'))]
+        held = self.redis.mget([self.key(crawl, f"lease:{batch_id}") for batch_id in ids]) if ids else []
+        leased = sum(1 for owner in held if owner is not None)
+        stats = self.redis.hgetall(self.key(crawl, 'stats'))
+        attempts = self.redis.hvals(self.key(crawl, 'attempts'))
+        return {
+            'pending': len(ids) - leased,
+            'leased': leased,
+            'done': self.redis.scard(self.key(crawl, 'done')),
+            'articles': int(stats.get(b'articles', 0)),
+            'failed': int(stats.get(b'failed', 0)),
+            'reclaimed': sum(max(0, int(n) - 1) for n in attempts),
+        }
+
+    def batch_results(self, crawl):
+        """[(url, article, error)] of every done batch, in batch order"""
+        key = self.key(crawl, 'results')
+        for batch_id in sorted(batch_id.decode() for batch_id in self.redis.hkeys(key)):
+            yield from json.loads(self.redis.hget(key, batch_id))
+
+    def results(self, crawl):
+        for _, article, _ in self.batch_results(crawl):
+            if article is not None:
+                yield article
+
+    def failures(self, crawl):
+        return [(url, error) for url, _, error in self.batch_results(crawl) if error is not None]
+
+    def close(self):
+        self.redis.close()
+
+
+def open_store(spec):
+    """redis://... (or rediss://) -> RedisLeaseStore, anything else is a SQLite file"""
+    if spec.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisLeaseStore.from_url(spec)
+    return SqliteLeaseStore(spec)
+
+
+class SharedPacer:
+    """
+    A worker's AdaptiveDelay plus a send slot per host shared by all workers
+
+    Waits out the local delay first, then reserves the global slot, so the
+    spacing between requests from different workers holds too. Everything
+    else (record(), delay, fixed, ...) is the local pacer's.
+    """
+
+    def __init__(self, pacer, store, host, rate):
+        self.pacer = pacer
+        self.store = store
+        self.host = host
+        self.interval = 1.0 / rate
+
+    def reserve(self):
+        wait = self.pacer.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return self.store.reserve(self.host, self.interval)
+
+    def __getattr__(self, name):
+        return getattr(self.pacer, name)
+
+
+class ShardScraper(AimaqScraper):
+    """AimaqScraper paced through the shared store, keeping each article's error for the results"""
+
+    def __init__(self, store, rate, **kwargs):
+        super().__init__(**kwargs)
+        self.client.pacer = SharedPacer(self.pacer, store, urlparse(self.base_url).netloc, rate)
+        self.errors = {}
+
+    def record_failure(self, article_url, error):
+        super().record_failure(article_url, error)
+        self.errors[article_url] = str(error) or type(error).__name__
+
+
+class ShardWorker:
+    """
+    Usage:
+        store = open_store('scraped_data/shards.db')
+        worker = ShardWorker(store, 'backfill', resolve_profiles(['sites.yaml']), output_dir='scraped_data')
+        worker.run(num_articles=5000)   # seeds the crawl unless another worker did
+
+    Extra keyword arguments go to every AimaqScraper (retries, parser, ...);
+    a profile's rate overrides the worker's.
+    """
+
+    def __init__(self, store, crawl, profiles, output_dir="scraped_data", worker_id=None, lease=60.0,
+                 rate=5.0, batch_size=20, poll=1.0, **options):
+        names = [profile.name for profile in profiles]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Site names must be unique: {', '.join(names)}")
+        self.store = store
+        self.crawl = crawl
+        self.profiles = {profile.name: profile for profile in profiles}
+        self.output_dir = output_dir
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.lease = lease
+        self.rate = rate
+        self.batch_size = batch_size
+        self.poll = poll
+        self.options = options
+        self.scrapers = {}
+        self.stack = contextlib.ExitStack()
+        self.stats = Counter()
+
+    def scraper_for(self, site):
+        if site not in self.scrapers:
+            if site not in self.profiles:
+                raise ValueError(f"Crawl {self.crawl} has a batch of site {site}, which this worker "
+                                 f"was not given (start every worker with the same sites)")
+            profile = self.profiles[site]
+            scraper = ShardScraper(self.store, profile.rate or self.rate, profile=profile,
+                                   output_dir=os.path.join(self.output_dir, site), **self.options)
+            self.stack.enter_context(scraper.image_processor)
+            self.scrapers[site] = scraper
+        return self.scrapers[site]
+
+    def seed(self, num_articles):
+        """Discover the latest `num_articles` of every site and store them as batches"""
+        links = {name: self.scraper_for(name).get_article_links(num_articles) for name in self.profiles}
+        batches = interleave(links, self.batch_size)
+        params = {'sites': list(self.profiles), 'num_articles': num_articles, 'batch_size': self.batch_size}
+        if self.store.seed(self.crawl, self.worker_id, batches, params):
+            print(f"✓ Crawl {self.crawl}: {sum(map(len, links.values()))} articles in {len(batches)} batches")
+        else:
+            print(f"✗ Seeding took longer than {SEED_LEASE} s and was taken over")
+
+    def wait_until_seeded(self, num_articles):
+        while True:
+            if num_articles:
+                state = self.store.begin_seed(self.crawl, self.worker_id, SEED_LEASE)
+                if state == 'seed':
+                    self.seed(num_articles)
+                    continue
+            else:
+                state = self.store.state(self.crawl)
+            if state == 'ready':
+                return
+            print(f"Waiting for crawl {self.crawl} to be seeded...")
+            time.sleep(self.poll)
+
+    def crawl_batch(self, batch):
+        """Scrape a batch and store its results; stops early if the lease is lost"""
+        scraper = self.scraper_for(batch.site)
+        if batch.attempts > 1:
+            self.stats['reclaimed'] += 1
+        print(f"\nBatch {batch.id} ({batch.site}, {len(batch.urls)} articles, attempt {batch.attempts})")
+        results = []
+        for url in batch.urls:
+            article = scraper.scrape_article(url)
+            results.append((url, article, scraper.errors.pop(url, None)))
+            if not self.store.renew(self.crawl, batch.id, self.worker_id, self.lease):
+                print(f"✗ Lease on batch {batch.id} expired and was taken over, dropping it")
+                self.stats['lost'] += 1
+                return
+            self.store.heartbeat(self.crawl, self.worker_id, self.lease)
+        if self.store.complete(self.crawl, batch.id, self.worker_id, results):
+            self.stats['batches'] += 1
+            self.stats['articles'] += sum(1 for _, article, _ in results if article is not None)
+            self.stats['failed'] += sum(1 for _, _, error in results if error is not None)
+        else:
+            self.stats['lost'] += 1
+
+    def run(self, num_articles=None):
+        """Claim and scrape batches until the crawl is done; returns this worker's stats"""
+        start = time.perf_counter()
+        batch = None
+        try:
+            with self.stack:
+                self.wait_until_seeded(num_articles)
+                while True:
+                    self.store.heartbeat(self.crawl, self.worker_id, self.lease)
+                    ring = HashRing(self.store.workers(self.crawl))
+                    batch = self.store.claim(self.crawl, self.worker_id, self.lease,
+                                             prefer=lambda batch_id: ring.node_for(batch_id) == self.worker_id)
+                    if batch is None:
+                        counts = self.store.counts(self.crawl)
+                        if not counts['pending'] and not counts['leased']:
+                            break
+                        # The rest is leased: wait for it to finish, or for a lease to expire
+                        time.sleep(self.poll)
+                        continue
+                    self.crawl_batch(batch)
+                    batch = None
+        except KeyboardInterrupt:
+            if batch:
+                self.store.release(self.crawl, batch.id, self.worker_id)
+            print(f"\n✗ Interrupted: batch given back, the crawl goes on with the other workers")
+            raise
+        finally:
+            self.store.leave(self.crawl, self.worker_id)
+        self.stats['seconds'] = time.perf_counter() - start
+        self.print_summary()
+        return self.stats
+
+    def print_summary(self):
+        print("\n" + "=" * 70)
+        print(f"✓ Worker {self.worker_id}: {self.stats['batches']} batches, {self.stats['articles']} articles, "
+              f"{self.stats['failed']} failed in {self.stats['seconds']:.1f} s")
+        if self.stats['reclaimed'] or self.stats['lost']:
+            print(f"  Batches reclaimed from other workers: {self.stats['reclaimed']}, "
+                  f"lost to others: {self.stats['lost']}")
+        print_status(self.store, self.crawl)
+
+
+def merge(store, crawl, output):
+    """Write every article of the crawl to `output` (NDJSON or JSON by extension); returns the count"""
+    base, ext = os.path.splitext(output)
+    tmp_path = f"{base}.tmp{ext}"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    with open_sink(tmp_path) as sink:
+        for article in store.results(crawl):
+            sink.write(article)
+    os.replace(tmp_path, output)
+    return sink.count
+
+
+def print_status(store, crawl):
+    state = store.state(crawl)
+    if state is None:
+        print(f"✗ No crawl {crawl}")
+        return
+    counts = store.counts(crawl)
+    workers = store.workers(crawl)
+    print(f"Crawl {crawl} ({state}): {counts['done']} batches done, {counts['leased']} leased, "
+          f"{counts['pending']} pending; {counts['articles']} articles, {counts['failed']} failed, "
+          f"{counts['reclaimed']} reclaimed")
+    print(f"Live workers: {', '.join(workers) if workers else 'none'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crawl with several workers sharing batches through leases")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    work = commands.add_parser('work', help="Claim and scrape batches until the crawl is done")
+    work.add_argument('sites', nargs='+', help="Built-in profile names (aimaq) and/or YAML/JSON site files")
+    work.add_argument('-n', '--num-articles', type=int,
+                      help="Articles per site; seeds the crawl if it does not exist yet")
+    work.add_argument('--batch-size', type=int, default=20, help="Articles per batch (when seeding)")
+    work.add_argument('--lease', type=float, default=60, help="Seconds a batch stays claimed without renewal")
+    work.add_argument('--rate', type=float, default=5.0,
+                      help="Max requests per second per site, all workers together (unless the profile sets rate)")
+    work.add_argument('--output-dir', default="scraped_data", help="Images go to <output-dir>/<site name>/")
+    work.add_argument('--worker-id', help="Default: host name and process id")
+    work.add_argument('--retries', type=int, default=4)
+    work.add_argument('--parser', choices=['lxml', 'selectolax', 'bs4'], default='lxml')
+
+    for name, help_text in (('status', "Show a crawl's progress and live workers"),
+                            ('merge', "Write all articles of a crawl to one file")):
+        command = commands.add_parser(name, help=help_text)
+        if name == 'merge':
+            command.add_argument('-o', '--output', default="scraped_data/articles.ndjson",
+                                 help=".ndjson/.jsonl streams, anything else is a JSON array")
+            command.add_argument('--failed', action='store_true', help="List the failed URLs instead")
+    for command in commands.choices.values():
+        command.add_argument('--store', default="scraped_data/shards.db",
+                             help="SQLite file, or redis://host:port/db for workers on several nodes")
+        command.add_argument('--crawl', default="crawl", help="Crawl name (several can share a store)")
+    args = parser.parse_args()
+
+    store = open_store(args.store)
+    if args.command == 'status':
+        print_status(store, args.crawl)
+    elif args.command == 'merge':
+        if args.failed:
+            for url, error in store.failures(args.crawl):
+                print(f"{url}\n    {error}")
+            return
+        count = merge(store, args.crawl, args.output)
+        print(f"✓ {count} articles written to {args.output}")
+    else:
+        worker = ShardWorker(store, args.crawl, resolve_profiles(args.sites), output_dir=args.output_dir,
+                             worker_id=args.worker_id, lease=args.lease, rate=args.rate,
+                             batch_size=args.batch_size, retries=args.retries, parser=args.parser)
+        try:
+            worker.run(num_articles=args.num_articles)
+        except KeyboardInterrupt:
+            sys.exit(130)
+
+
+if __name__ == "__main__":
+    main()
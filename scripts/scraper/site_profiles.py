@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Site profiles: everything site-specific about a news site, declared as data
+
+A profile says how to find a site's articles (discovery mode, listing page
+URLs, which links are articles), where the posts and the article body are in
+its HTML, and which Schema.org JSON-LD items and keys fill the article
+fields. AimaqScraper takes one (AIMAQ by default); multi_site.py crawls many
+at once.
+
+Profiles are Python (SiteProfile(...), see AIMAQ below) or YAML/JSON files:
+
+    sites:
+      - name: aimaq
+        base_url: https://aimaqaqshamy.kz
+      - name: example
+        base_url: https://news.example.kz
+        discovery: html
+        listing_path: /news/page/{page}/
+        post_class: news-card
+        content_classes: [news-text]
+        exclude_paths: [/news/page/, /tag/]
+        rate: 2
+
+Fields left out keep the defaults, which describe aimaqaqshamy.kz (WordPress
+with a Bootstrap-style news theme). Only the given json_ld_fields entries
+replace the default mapping.
+"""
+
+import json
+import re
+from dataclasses import dataclass, field, fields
+from urllib.parse import urlsplit
+
+from html_parsers import CONTENT_CLASSES, POST_CLASS
+from url_canon import canonical_url
+
+
+DISCOVERY_MODES = ('auto', 'rest', 'sitemap', 'html')
+
+# Article field -> JSON-LD keys tried in order (see json_ld_value for non-string values)
+JSON_LD_FIELDS = {
+    'title': ('name', 'headline'),
+    'date_published': ('datePublished',),
+    'date_modified': ('dateModified',),
+    'author': ('author',),
+    'thumbnail_url': ('thumbnailUrl', 'image'),
+    'category': ('articleSection',),
+}
+
+
+def json_ld_value(value):
+    """A JSON-LD property as text: strings as they are, an object's name or url, a list's first item"""
+    if isinstance(value, list):
+        value = value[0] if value else ''
+    if isinstance(value, dict):
+        value = value.get('name') or value.get('url') or ''
+    return value if isinstance(value, str) else ''
+
+
+@dataclass(frozen=True)
+class SiteProfile:
+    name: str
+    base_url: str
+    # 'auto' (REST API, then sitemaps), 'rest', 'sitemap' or 'html'; all fall back to listing pages
+    discovery: str = 'auto'
+    # Listing page N > 1; page 1 is the home page
+    listing_path: str = '/page/{page}/'
+    max_pages: int = 10
+    # Listing pages: the first link inside each element with this class leads to an article
+    post_class: str = POST_CLASS
+    # Article body: the <article> element, else the first div with one of these classes
+    content_classes: tuple = CONTENT_CLASSES
+    # Site links that are never articles
+    exclude_paths: tuple = ('/page/', '/category/', '/author/')
+    # If set, only links matching this regex are articles
+    article_pattern: str = None
+    # Article URLs end in '/' (WordPress permalinks): canonical URLs get one (url_canon.py)
+    trailing_slash: bool = True
+    # JSON-LD items that describe the article, and where each article field comes from
+    json_ld_types: tuple = ('WebPage', 'NewsArticle', 'Article')
+    json_ld_fields: dict = field(default_factory=lambda: dict(JSON_LD_FIELDS))
+    default_author: str = 'admin'
+    # Politeness for this site in multi_site.py and sharded_crawl.py (None: the runner's --rate / --per-host)
+    rate: float = None
+    per_host: int = None
+
+    @property
+    def selectors(self):
+        """Keyword arguments for html_parsers.get_backend()"""
+        return {'post_class': self.post_class, 'content_classes': self.content_classes}
+
+    def listing_url(self, page):
+        return self.base_url + self.listing_path.format(page=page) if page > 1 else self.base_url
+
+    def canonical_url(self, href):
+        """The one spelling of a link to this site (url_canon.py); raises ValueError if unparsable"""
+        return canonical_url(href, self.base_url, self.trailing_slash)
+
+    def is_article_url(self, href):
+        """Filter valid article URLs, compared in canonical form"""
+        if not href:
+            return False
+        try:
+            url = self.canonical_url(href)
+        except ValueError:
+            return False
+        return self.is_canonical_article_url(url)
+
+    def is_canonical_article_url(self, url):
+        """is_article_url for a URL already in canonical form"""
+        home = self.canonical_url(self.base_url)
+        if not url.startswith(home) or url == home:
+            return False
+        path = urlsplit(url).path
+        if any(excluded in path for excluded in self.exclude_paths):
+            return False
+        return self.article_pattern is None or re.search(self.article_pattern, url) is not None
+
+    def is_article_item(self, item):
+        """Whether a JSON-LD item (one of a @graph) describes the article"""
+        item_type = item.get('@type', '')
+        types = item_type if isinstance(item_type, list) else [item_type]
+        return any(t in self.json_ld_types for t in types)
+
+
+AIMAQ = SiteProfile(name='aimaq', base_url="https://aimaqaqshamy.kz")
+
+# Built-in profiles, selectable by name in multi_site.py
+PROFILES = {profile.name: profile for profile in (AIMAQ,)}
+
+
+def profile_from_dict(data):
+    """SiteProfile from a mapping as found in a YAML/JSON site file; raises ValueError if invalid"""
+    known = {f.name for f in fields(SiteProfile)}
+    unknown = set(data) - known
+    if unknown:
+        raise ValueError(f"Unknown site profile keys: {', '.join(sorted(unknown))}")
+    missing = {'name', 'base_url'} - set(data)
+    if missing:
+        raise ValueError(f"Site profile needs {' and '.join(sorted(missing))}: {data}")
+
+    values = dict(data)
+    values['base_url'] = values['base_url'].rstrip('/')
+    for key in ('content_classes', 'exclude_paths', 'json_ld_types'):
+        if key in values:
+            values[key] = tuple(values[key])
+    if 'json_ld_fields' in values:
+        given = {name: tuple([keys] if isinstance(keys, str) else keys)
+                 for name, keys in values['json_ld_fields'].items()}
+        values['json_ld_fields'] = {**JSON_LD_FIELDS, **given}
+    if values.get('discovery', 'auto') not in DISCOVERY_MODES:
+        raise ValueError(f"Site {values['name']}: discovery must be one of {', '.join(DISCOVERY_MODES)}")
+    return SiteProfile(**values)
+
+
+def load_profiles(path):
+    """Profiles from a YAML (needs PyYAML) or JSON file: a list of sites, or a mapping with a `sites` list"""
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError("YAML site files need PyYAML (pip install pyyaml); or use JSON") from None
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+
+    sites = data.get('sites', []) if isinstance(data, dict) else data
+    profiles = [profile_from_dict(site) for site in sites or []]
+    names = [profile.name for profile in profiles]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate site names in {path}: {', '.join(duplicates)}")
+    return profiles
+
+
+def resolve_profiles(specs):
+    """Built-in profile names and site files -> list of profiles"""
+    profiles = []
+    for spec in specs:
+        if spec in PROFILES:
+            profiles.append(PROFILES[spec])
+        else:
+            profiles.extend(load_profiles(spec))
+    return profiles
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Incremental static-site export: one JSON file per article plus paginated indexes
+
+Layout:
+    public/articles/
+    ├── index.json                  totals, page counts, categories and months
+    ├── <slug>.json                 the article
+    ├── pages/<n>.json              all articles, newest first, page_size per page
+    ├── category/<category>/<n>.json
+    ├── month/<YYYY-MM>/<n>.json
+    └── .manifest.json              SHA-256 of every file written (for the next run)
+
+A page is {"page", "pages", "total", "articles": [summary, ...]}, so a client
+fetches index.json and one page instead of the whole catalogue. Files are
+compact JSON; a file is only rewritten when its content hash differs from the
+last run's, via a temporary file and an atomic rename, so an unchanged archive
+re-exports without writing anything and readers never see half a file. With
+compress=('gz', 'br') every written file gets pre-compressed .gz/.br siblings
+(for nginx gzip_static / brotli_static; .br needs `pip install brotli`).
+Article files are serialised, hashed, compressed and written in a process
+pool.
+
+The input is added to what earlier exports wrote: articles missing from it
+keep their files and stay in the indexes (the manifest keeps their
+summaries), so the output of an incremental scrape, which holds only that
+run's articles, can be exported on its own. With --prune the input is taken
+as the whole archive and files of articles missing from it are removed.
+
+    python static_export.py scraped_data/articles.ndjson -o public/articles --compress gz,br
+    python static_export.py scraped_data/articles.ndjson -o public/articles --prune   # full archive
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from article_store import iter_articles
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+MANIFEST = '.manifest.json'
+COMPRESSIONS = ('gz', 'br')
+# Quality 11 saves ~10% more bytes on article JSON but is ~40x slower than 5
+BROTLI_QUALITY = 5
+
+
+def dumps(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def compressed(data, kind):
+    if kind == 'gz':
+        # mtime=0: the same content always gives the same .gz bytes
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    return brotli.compress(data, quality=BROTLI_QUALITY)
+
+
+def write_atomic(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def write_files(output_dir, items, compress=()):
+    """
+    Worker entry point: write (relative path, object, previous hash) items
+
+    Returns (relative path, hash, written) per item; a file whose hash equals
+    the previous one is left alone.
+    """
+    results = []
+    for relpath, obj, previous in items:
+        data = dumps(obj)
+        digest = hashlib.sha256(data).hexdigest()
+        path = os.path.join(output_dir, relpath)
+        if digest == previous and os.path.exists(path):
+            results.append((relpath, digest, False))
+            continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        for kind in compress:
+            write_atomic(f"{path}.{kind}", compressed(data, kind))
+        write_atomic(path, data)
+        results.append((relpath, digest, True))
+    return results
+
+
+def article_slug(article):
+    """The last path segment of the article URL (the WordPress permalink slug)"""
+    return article['url'].rstrip('/').split('/')[-1]
+
+
+def category_slug(name):
+    """File-system-safe category key; Kazakh and Russian letters are kept"""
+    return re.sub(r'\W+', '-', name.lower()).strip('-')
+
+
+def month_of(article):
+    date = article.get('date_published') or ''
+    return date[:7] if re.match(r'\d{4}-\d{2}', date) else None
+
+
+def summary(article, slug):
+    return {
+        'slug': slug,
+        'title': article.get('title'),
+        'date_published': article.get('date_published'),
+        'thumbnail_url': article.get('thumbnail_url'),
+        'category': article.get('category') or None,
+    }
+
+
+class StaticExporter:
+    """
+    Usage:
+        exporter = StaticExporter('public/articles', page_size=50, compress=('gz',))
+        stats = exporter.export(iter_articles('scraped_data/articles.ndjson'))
+
+    Articles exported before and missing from `articles` are kept, unless
+    prune=True says `articles` is the whole archive. When a slug repeats (e.g. an NDJSON file appended to by several
+    runs) the last occurrence wins.
+    """
+
+    def __init__(self, output_dir='public/articles', page_size=50, workers=None, compress=(), batch_size=200):
+        unknown = set(compress) - set(COMPRESSIONS)
+        if unknown:
+            raise ValueError(f"Unknown compression {', '.join(sorted(unknown))}; use {', '.join(COMPRESSIONS)}")
+        if 'br' in compress and brotli is None:
+            print("brotli not installed, skipping .br files (pip install brotli)")
+            compress = tuple(kind for kind in compress if kind != 'br')
+        self.output_dir = output_dir
+        self.page_size = page_size
+        self.workers = workers or os.cpu_count() or 1
+        self.compress = tuple(compress)
+        self.batch_size = batch_size
+
+    def load_manifest(self):
+        """
+        The last export's file hashes, the hashes to compare against (none when
+        it used other compressions) and its article summaries
+        """
+        try:
+            with open(os.path.join(self.output_dir, MANIFEST), encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}, {}, {}
+        files = manifest.get('files', {})
+        same_compression = manifest.get('compress') == list(self.compress)
+        return files, files if same_compression else {}, manifest.get('articles', {})
+
+    def export(self, articles, prune=False):
+        """
+        Write changed files, remove stale ones; returns counts of articles and files
+
+        Without `prune` the files of articles exported before and missing
+        from `articles` are kept and listed in the indexes.
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        old_files, previous, old_summaries = self.load_manifest()
+        start = time.perf_counter()
+        self.files = {}
+        self.stats = {'articles': 0, 'skipped': 0, 'written': 0, 'unchanged': 0, 'kept': 0, 'removed': 0}
+
+        summaries = self.export_articles(articles, previous)
+        if not prune:
+            self.keep_articles(old_files, old_summaries, summaries)
+        self.stats['articles'] = len(summaries)
+        self.record(write_files(self.output_dir, self.index_items(summaries, previous), self.compress))
+
+        for relpath in old_files.keys() - self.files.keys():
+            for path in [relpath] + [f"{relpath}.{kind}" for kind in COMPRESSIONS]:
+                path = os.path.join(self.output_dir, path)
+                if os.path.exists(path):
+                    os.remove(path)
+            self.stats['removed'] += 1
+
+        write_atomic(os.path.join(self.output_dir, MANIFEST),
+                     dumps({'compress': list(self.compress), 'files': self.files, 'articles': summaries}))
+        self.stats['seconds'] = time.perf_counter() - start
+        return self.stats
+
+    def keep_articles(self, old_files, old_summaries, summaries):
+        """Carry the article files of earlier exports that this input lacks over to this one"""
+        for relpath, digest in old_files.items():
+            # Article files are the top-level <slug>.json ones
+            if '/' in relpath or relpath == 'index.json' or relpath in self.files:
+                continue
+            slug = relpath[:-len('.json')]
+            self.files[relpath] = digest
+            # Manifests written before summaries were kept: the file stays but is not listed
+            if slug in old_summaries:
+                summaries[slug] = old_summaries[slug]
+            self.stats['kept'] += 1
+
+    def export_articles(self, articles, previous):
+        """Article files, in batches on the pool; returns {slug: summary}"""
+        summaries = {}
+        pending = []
+        in_flight = {}   # slug -> future of the batch writing it
+        executor = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+        articles = iter(articles)
+        try:
+            while True:
+                batch = []
+                for article in islice(articles, self.batch_size):
+                    if not article.get('url'):
+                        self.stats['skipped'] += 1
+                        continue
+                    slug = article_slug(article)
+                    relpath = f"{slug}.json"
+                    # A repeated slug is rewritten, after the batch holding its earlier version
+                    if slug in summaries:
+                        if slug in in_flight:
+                            in_flight[slug].result()
+                        batch.append((relpath, article, None))
+                    else:
+                        batch.append((relpath, article, previous.get(relpath)))
+                    summaries[slug] = summary(article, slug)
+                if not batch:
+                    break
+
+                if executor is None:
+                    self.record(write_files(self.output_dir, batch, self.compress))
+                    continue
+                future = executor.submit(write_files, self.output_dir, batch, self.compress)
+                pending.append(future)
+                for relpath, _, _ in batch:
+                    in_flight[relpath[:-len('.json')]] = future
+                # Keep a bounded number of batches queued; results are recorded in submission order
+                while len(pending) > 2 * self.workers or (pending and pending[0].done()):
+                    self.record(pending.pop(0).result())
+                if len(in_flight) > 10 * self.batch_size * self.workers:
+                    in_flight = {slug: f for slug, f in in_flight.items() if not f.done()}
+            for future in pending:
+                self.record(future.result())
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+        return summaries
+
+    def record(self, results):
+        for relpath, digest, written in results:
+            self.files[relpath] = digest
+            self.stats['written' if written else 'unchanged'] += 1
+
+    def paginate(self, directory, entries):
+        """(relative path, page object) for every page of `entries`"""
+        pages = max(1, -(-len(entries) // self.page_size))
+        for page in range(1, pages + 1):
+            yield f"{directory}/{page}.json", {
+                'page': page,
+                'pages': pages,
+                'total': len(entries),
+                'articles': entries[(page - 1) * self.page_size:page * self.page_size],
+            }
+
+    def index_items(self, summaries, previous):
+        """index.json and every index page, as write_files() items"""
+        # Newest first; undated articles last
+        newest = sorted(summaries.values(), key=lambda s: s['date_published'] or '', reverse=True)
+        categories, months = {}, {}
+        for entry in newest:
+            if entry['category']:
+                categories.setdefault(entry['category'], []).append(entry)
+            month = month_of(entry)
+            if month:
+                months.setdefault(month, []).append(entry)
+
+        pages = list(self.paginate('pages', newest))
+        index = {
+            'total': len(newest),
+            'page_size': self.page_size,
+            'pages': pages[0][1]['pages'],
+            'categories': [],
+            'months': [],
+        }
+        for name, entries in sorted(categories.items()):
+            key = category_slug(name)
+            category_pages = list(self.paginate(f"category/{key}", entries))
+            index['categories'].append({'slug': key, 'name': name, 'count': len(entries),
+                                        'pages': len(category_pages)})
+            pages += category_pages
+        for month, entries in sorted(months.items(), reverse=True):
+            month_pages = list(self.paginate(f"month/{month}", entries))
+            index['months'].append({'month': month, 'count': len(entries), 'pages': len(month_pages)})
+            pages += month_pages
+
+        pages.append(('index.json', index))
+        return [(relpath, obj, previous.get(relpath)) for relpath, obj in pages]
+
+
+def print_stats(stats, output_dir):
+    print(f"✓ Exported {stats['articles']} articles to {output_dir} in {stats['seconds']:.1f} s: "
+          f"{stats['written']} files written, {stats['unchanged']} unchanged, {stats['removed']} removed"
+          + (f", {stats['kept']} articles kept from earlier exports" if stats['kept'] else "")
+          + (f", {stats['skipped']} skipped without URL" if stats['skipped'] else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export articles as static JSON with paginated indexes")
+    parser.add_argument('articles_file', nargs='?', default='scraped_data/articles.json')
+    parser.add_argument('-o', '--output-dir', default='public/articles')
+    parser.add_argument('--page-size', type=int, default=50, help="Articles per index page")
+    parser.add_argument('--workers', type=int, default=None, help="Processes (default: all cores)")
+    parser.add_argument('--compress', default='',
+                        help="Comma-separated pre-compressed siblings to write: gz, br")
+    parser.add_argument('--prune', action='store_true',
+                        help="The input is the whole archive: remove files of articles missing from it")
+    args = parser.parse_args()
+    if args.prune and args.articles_file.endswith('.json'):
+        # articles.json is rewritten by every run with that run's articles only
+        parser.error("--prune needs the whole archive; articles.json holds only the last scrape")
+
+    exporter = StaticExporter(args.output_dir, page_size=args.page_size, workers=args.workers,
+                              compress=tuple(kind for kind in args.compress.split(',') if kind))
+    print_stats(exporter.export(iter_articles(args.articles_file), prune=args.prune), args.output_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,519 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for aimaqaqshamy.kz used by the benchmarks
+
+Serves WordPress-like listing pages (/, /page/N/), article pages with
+Schema.org JSON-LD and images, the core sitemaps (/wp-sitemap.xml) and the
+/wp-json/wp/v2/posts REST endpoint, with a configurable per-request latency.
+Faults can inject 5xx errors, dropped connections and a rate limit (429 with
+Retry-After, latency rising with load) to exercise http_transport.py.
+FixtureSite serves recorded pages (fixtures/) instead of generated ones.
+"""
+
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+ARTICLE_TEMPLATE = """<!DOCTYPE html>
+<html lang="kk">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<script type="application/ld+json">{json_ld}</script>
+</head>
+<body>
+{chrome_header}
+<div class="site-content">
+<{article_tag} class="post">
+<h1 class="entry-title">{title}</h1>
+<div class="{content_class}">
+{paragraphs}
+{images}
+</div>
+</{article_tag}>
+{chrome_sidebar}
+</div>
+</body>
+</html>
+"""
+
+LISTING_TEMPLATE = """<!DOCTYPE html>
+<html lang="kk">
+<head><meta charset="utf-8"><title>Aimaq Aqshamy</title></head>
+<body>
+<div class="site-content">
+{posts}
+</div>
+<a href="{base_url}/category/news/">News</a>
+</body>
+</html>
+"""
+
+POST_TEMPLATE = """<div class="{post_class}">
+<a href="{url}"><img src="{base_url}/wp-content/uploads/thumb-{n}.jpg" alt=""></a>
+<h4><a href="{url}">{title}</a></h4>
+<a href="{base_url}/author/admin/">admin</a>
+</div>"""
+
+SIDEBAR_ITEM = """<li class="recent-post"><a href="{base_url}/zhangalyq-{n}/">
+<img src="{base_url}/wp-content/uploads/thumb-{n}-150x150.jpg" width="150" height="150" alt=""></a>
+<div class="recent-post-body"><a href="{base_url}/zhangalyq-{n}/">Жаңалық {n}</a>
+<span class="date">2025-12-{day:02d}</span></div></li>"""
+
+SITEMAP_INDEX_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+{sitemaps}
+</sitemapindex>
+"""
+
+URLSET_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+{urls}
+</urlset>
+"""
+
+PARAGRAPH = "Облыс әкімдігінде өткен жиында өңірдің әлеуметтік-экономикалық дамуы талқыланды."
+SECTIONS = ("Жаңалықтар", "Қоғам", "Спорт")
+
+
+def placeholder_image(path, size):
+    """Deterministic image bytes for an uploads path"""
+    seed = path.encode('utf-8')
+    return (seed * (size // len(seed) + 1))[:size]
+
+
+class StubSite:
+    """Deterministic synthetic site content: pages x per_page articles"""
+
+    def __init__(self, pages=10, per_page=10, images_per_article=2, image_size=20000,
+                 paragraphs=12, chrome=0, post_class='bs-blog-post', content_class='entry-content',
+                 article_tag='article'):
+        # chrome: number of menu/sidebar entries around the article, to approximate
+        # the size of real WordPress pages (0 keeps pages minimal)
+        self.chrome = chrome
+        # Theme markup, to stand in for sites with other site profiles (e.g. article_tag='section')
+        self.post_class = post_class
+        self.content_class = content_class
+        self.article_tag = article_tag
+        self.pages = pages
+        self.per_page = per_page
+        self.images_per_article = images_per_article
+        self.image_size = image_size
+        self.paragraphs = paragraphs
+        # Entries per wp-sitemap-posts-post-N.xml (WordPress core default)
+        self.sitemap_size = 2000
+
+    @property
+    def num_articles(self):
+        return self.pages * self.per_page
+
+    def article_path(self, n):
+        return f"/zhangalyq-{n}/"
+
+    def listing(self, base_url, page):
+        first = (page - 1) * self.per_page
+        posts = []
+        for n in range(first, min(first + self.per_page, self.num_articles)):
+            posts.append(POST_TEMPLATE.format(
+                url=base_url + self.article_path(n),
+                base_url=base_url,
+                post_class=self.post_class,
+                n=n,
+                title=f"Жаңалық {n}"
+            ))
+        return LISTING_TEMPLATE.format(base_url=base_url, posts='\n'.join(posts))
+
+    def published(self, n):
+        return f"2025-12-{(n % 28) + 1:02d}T04:57:53+00:00"
+
+    def sitemap_index(self, base_url):
+        count = (self.num_articles + self.sitemap_size - 1) // self.sitemap_size
+        entries = [f"<sitemap><loc>{base_url}/wp-sitemap-posts-post-{k}.xml</loc></sitemap>"
+                   for k in range(1, count + 1)]
+        entries.append(f"<sitemap><loc>{base_url}/wp-sitemap-taxonomies-category-1.xml</loc></sitemap>")
+        return SITEMAP_INDEX_TEMPLATE.format(sitemaps='\n'.join(entries))
+
+    def sitemap(self, base_url, k):
+        first = (k - 1) * self.sitemap_size
+        entries = [
+            f"<url><loc>{base_url}{self.article_path(n)}</loc><lastmod>{self.published(n)}</lastmod></url>"
+            for n in range(first, min(first + self.sitemap_size, self.num_articles))
+        ]
+        return URLSET_TEMPLATE.format(urls='\n'.join(entries))
+
+    def rest_posts(self, base_url, page, per_page):
+        """(posts JSON list, total pages) for /wp-json/wp/v2/posts, newest first"""
+        first = (page - 1) * per_page
+        posts = [{
+            'id': n + 1,
+            'link': base_url + self.article_path(n),
+            'date_gmt': self.published(n)[:19],
+            'modified_gmt': self.published(n)[:19],
+        } for n in range(first, min(first + per_page, self.num_articles))]
+        return posts, (self.num_articles + per_page - 1) // per_page
+
+    def article(self, base_url, n):
+        title = f"Жаңалық {n}"
+        published = self.published(n)
+        json_ld = {
+            "@context": "https://schema.org",
+            "@graph": [
+                {"@type": "Organization", "name": "Aimaq Aqshamy"},
+                {
+                    "@type": "WebPage",
+                    "name": title,
+                    "datePublished": published,
+                    "dateModified": published,
+                    "thumbnailUrl": f"{base_url}/wp-content/uploads/2025/12/cover-{n}.jpg",
+                },
+                {"@type": "Article", "headline": title, "author": {"name": "admin"},
+                 "articleSection": [SECTIONS[n % len(SECTIONS)]]},
+            ]
+        }
+        paragraphs = '\n'.join(
+            f"<p>{PARAGRAPH} ({n}.{i})</p>" for i in range(self.paragraphs)
+        )
+        images = '\n'.join(
+            f'<img src="/wp-content/uploads/2025/12/photo-{n}-{i}.jpg" alt="Фото {i}" '
+            f'width="1125" height="639">'
+            for i in range(self.images_per_article)
+        )
+        return ARTICLE_TEMPLATE.format(
+            chrome_header=self.chrome_header(base_url),
+            chrome_sidebar=self.chrome_sidebar(base_url, n),
+            article_tag=self.article_tag,
+            content_class=self.content_class,
+            title=title,
+            json_ld=json.dumps(json_ld, ensure_ascii=False),
+            paragraphs=paragraphs,
+            images=images
+        )
+
+    def chrome_header(self, base_url):
+        if not self.chrome:
+            return ''
+        items = ''.join(
+            f'<li class="menu-item"><a href="{base_url}/category/section-{i}/">Бөлім {i}</a></li>'
+            for i in range(self.chrome)
+        )
+        return f'<header class="site-header"><nav class="main-menu"><ul>{items}</ul></nav></header>'
+
+    def chrome_sidebar(self, base_url, n):
+        if not self.chrome:
+            return ''
+        items = '\n'.join(
+            SIDEBAR_ITEM.format(base_url=base_url, n=(n + i) % self.num_articles, day=(i % 28) + 1)
+            for i in range(1, self.chrome + 1)
+        )
+        return f'<aside class="sidebar"><h3>Соңғы жаңалықтар</h3><ul>{items}</ul></aside>'
+
+    def image(self, path):
+        return placeholder_image(path, self.image_size)
+
+    def route(self, base_url, path, query):
+        """(status, content type, body, extra headers) for a GET"""
+        html = 'text/html; charset=utf-8'
+        xml = 'application/xml; charset=utf-8'
+
+        if path == '/':
+            return 200, html, self.listing(base_url, 1).encode('utf-8'), {}
+
+        if path.startswith('/page/'):
+            page = int(path.strip('/').split('/')[-1])
+            if page <= self.pages:
+                return 200, html, self.listing(base_url, page).encode('utf-8'), {}
+
+        elif path.startswith('/zhangalyq-'):
+            n = int(path.strip('/').rsplit('-', 1)[-1])
+            if n < self.num_articles:
+                return 200, html, self.article(base_url, n).encode('utf-8'), {}
+
+        elif path.startswith('/wp-content/uploads/'):
+            return 200, 'image/jpeg', self.image(path), {}
+
+        elif path == '/wp-sitemap.xml':
+            return 200, xml, self.sitemap_index(base_url).encode('utf-8'), {}
+
+        elif path.startswith('/wp-sitemap-posts-post-'):
+            k = int(path[len('/wp-sitemap-posts-post-'):-len('.xml')])
+            return 200, xml, self.sitemap(base_url, k).encode('utf-8'), {}
+
+        elif path == '/wp-sitemap-taxonomies-category-1.xml':
+            return 200, xml, URLSET_TEMPLATE.format(urls='').encode('utf-8'), {}
+
+        elif path.rstrip('/') == '/wp-json/wp/v2/posts':
+            page = int(query.get('page', ['1'])[0])
+            per_page = min(100, int(query.get('per_page', ['10'])[0]))
+            posts, total_pages = self.rest_posts(base_url, page, per_page)
+            if page > total_pages:
+                body = {'code': 'rest_post_invalid_page_number', 'data': {'status': 400}}
+                return 400, 'application/json', json.dumps(body).encode('utf-8'), {}
+            return 200, 'application/json; charset=UTF-8', json.dumps(posts).encode('utf-8'), {
+                'X-WP-Total': str(self.num_articles),
+                'X-WP-TotalPages': str(total_pages),
+            }
+
+        return 404, 'text/plain', b'Not Found', {}
+
+
+class FixtureSite:
+    """
+    Recorded pages served as the site (a fixture directory, see regression_suite.py)
+
+    Layout: <slug>.html per article page, listing/<n>.html per listing page
+    (1 is the home page) and expected.json, whose base_url is the site the
+    pages were recorded from. Links to it are rewritten to the server's own
+    URL so a crawl never leaves 127.0.0.1. Uploads get placeholder bytes;
+    sitemaps and the REST API are not recorded and answer 404.
+    """
+
+    def __init__(self, directory, image_size=20000):
+        self.directory = directory
+        self.image_size = image_size
+        with open(os.path.join(directory, 'expected.json'), 'r', encoding='utf-8') as f:
+            self.recorded_url = json.load(f)['base_url']
+        self.articles = {}
+        for name in sorted(os.listdir(directory)):
+            if name.endswith('.html'):
+                with open(os.path.join(directory, name), 'rb') as f:
+                    self.articles[name[:-len('.html')]] = f.read()
+        self.listings = {}
+        listing_dir = os.path.join(directory, 'listing')
+        for name in os.listdir(listing_dir) if os.path.isdir(listing_dir) else ():
+            if name.endswith('.html'):
+                with open(os.path.join(listing_dir, name), 'rb') as f:
+                    self.listings[int(name[:-len('.html')])] = f.read()
+
+    @property
+    def num_articles(self):
+        return len(self.articles)
+
+    @property
+    def pages(self):
+        return len(self.listings)
+
+    def served(self, base_url, body):
+        return body.replace(self.recorded_url.encode('utf-8'), base_url.encode('utf-8'))
+
+    def route(self, base_url, path, query):
+        """(status, content type, body, extra headers) for a GET"""
+        html = 'text/html; charset=utf-8'
+
+        if path == '/' and 1 in self.listings:
+            return 200, html, self.served(base_url, self.listings[1]), {}
+
+        if path.startswith('/page/'):
+            page = path.strip('/').split('/')[-1]
+            if page.isdigit() and int(page) in self.listings:
+                return 200, html, self.served(base_url, self.listings[int(page)]), {}
+
+        elif path.startswith('/wp-content/uploads/'):
+            return 200, 'image/jpeg', placeholder_image(path, self.image_size), {}
+
+        elif path.strip('/') in self.articles:
+            return 200, html, self.served(base_url, self.articles[path.strip('/')]), {}
+
+        return 404, 'text/plain', b'Not Found', {}
+
+
+class Faults:
+    """
+    Failure behaviour of the stub server
+
+    error_rate:  fraction of requests answered with 503
+    reset_rate:  fraction of connections dropped without a response
+    capacity:    requests/second the server handles; above half of it latency
+                 grows with load, above it requests get 429 + Retry-After
+    """
+
+    def __init__(self, error_rate=0.0, reset_rate=0.0, capacity=None, retry_after=1, seed=1):
+        self.error_rate = error_rate
+        self.reset_rate = reset_rate
+        self.capacity = capacity
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.recent = deque()
+        self.lock = threading.Lock()
+        self.injected = {'503': 0, '429': 0, 'reset': 0}
+
+    def load(self):
+        """Requests received in the last second (including this one)"""
+        now = time.monotonic()
+        with self.lock:
+            self.recent.append(now)
+            while self.recent[0] < now - 1:
+                self.recent.popleft()
+            return len(self.recent)
+
+    def decide(self):
+        """(fault or None, extra latency factor) for the next request"""
+        load = self.load()
+        with self.lock:
+            roll = self.random.random()
+        fault = None
+        if self.capacity and load > self.capacity:
+            fault = '429'
+        elif roll < self.reset_rate:
+            fault = 'reset'
+        elif roll < self.reset_rate + self.error_rate:
+            fault = '503'
+        if fault:
+            with self.lock:
+                self.injected[fault] += 1
+        slowdown = max(1.0, 2 * load / self.capacity) if self.capacity else 1.0
+        return fault, slowdown
+
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        fault, slowdown = server.faults.decide() if server.faults else (None, 1.0)
+        if server.latency:
+            time.sleep(server.latency * slowdown)
+        with server.stats_lock:
+            server.requests += 1
+
+        if fault == 'reset':
+            # Drop the connection without a response (client sees a connection error)
+            self.close_connection = True
+            return
+        if fault:
+            self.send_fault(fault)
+            return
+
+        path, _, query = self.path.partition('?')
+        status, content_type, body, extra_headers = server.site.route(server.base_url, path, parse_qs(query))
+
+        # Validators so conditional GETs can be answered with 304
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()[:16]
+        if status == 200 and self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if status == 200:
+            self.send_header('ETag', etag)
+            self.send_header('Last-Modified', 'Tue, 02 Dec 2025 04:57:53 GMT')
+        for name, value in extra_headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        with server.stats_lock:
+            server.bytes_sent += len(body)
+
+    def send_fault(self, fault):
+        body = b'Service Unavailable' if fault == '503' else b'Too Many Requests'
+        self.send_response(int(fault))
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', str(len(body)))
+        if fault == '429':
+            self.send_header('Retry-After', str(self.server.faults.retry_after))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients dropping connections (timeouts, injected resets) are expected here
+        pass
+
+
+class StubServer:
+    """
+    Threaded HTTP server on 127.0.0.1 serving a StubSite (or a FixtureSite)
+
+    Usage:
+        with StubServer(latency=0.05) as server:
+            scraper = AimaqScraper(base_url=server.base_url)
+
+        with StubServer(faults=Faults(error_rate=0.05, capacity=20)) as server: ...
+    """
+
+    def __init__(self, site=None, latency=0.0, port=0, faults=None):
+        self.site = site or StubSite()
+        self.latency = latency
+        self.faults = faults
+        self.port = port
+        self.httpd = None
+        self.thread = None
+
+    @property
+    def base_url(self):
+        return self.httpd.base_url
+
+    @property
+    def requests(self):
+        return self.httpd.requests
+
+    @property
+    def bytes_sent(self):
+        return self.httpd.bytes_sent
+
+    def start(self):
+        self.httpd = StubHTTPServer(('127.0.0.1', self.port), StubRequestHandler)
+        self.httpd.site = self.site
+        self.httpd.latency = self.latency
+        self.httpd.faults = self.faults
+        self.httpd.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.httpd.requests = 0
+        self.httpd.bytes_sent = 0
+        self.httpd.stats_lock = threading.Lock()
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve a synthetic aimaqaqshamy.kz clone")
+    parser.add_argument('--port', type=int, default=8008)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument('--reset-rate', type=float, default=0.0, help="Fraction of connections dropped")
+    parser.add_argument('--capacity', type=float, help="Requests/second before 429 + Retry-After")
+    args = parser.parse_args()
+
+    faults = None
+    if args.error_rate or args.reset_rate or args.capacity:
+        faults = Faults(error_rate=args.error_rate, reset_rate=args.reset_rate, capacity=args.capacity)
+
+    with StubServer(latency=args.latency, port=args.port, faults=faults) as server:
+        print(f"Serving stub site at {server.base_url} (Ctrl-C to stop)")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
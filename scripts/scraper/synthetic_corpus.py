@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Synthetic scraped-article corpus for the import/export benchmarks
+
+Generates records with the same schema as articles.json (see README), with
+Kazakh/Russian vocabulary so text-processing benchmarks see realistic input.
+"""
+
+import random
+
+
+WORDS = (
+    "облыс әкімдігі жиын өңір даму жоба мектеп мұғалім оқушы ауыл шаруашылық "
+    "егін астық жол құрылыс жөндеу денсаулық аурухана дәрігер спорт жарыс "
+    "жеңімпаз мәдениет театр концерт кітап ақын жазушы тарих мұражай "
+    "қала тұрғын үй қаржы бюджет инвестиция кәсіпкер өндіріс зауыт "
+    "область акимат совещание развитие проект школа учитель ученик село "
+    "урожай дорога ремонт больница врач спорт турнир культура театр "
+    "город жители бюджет инвестиции предприниматель производство завод"
+).split()
+
+AUTHORS = ["admin", "Айгүл Сапарова", "Ерлан Мұқанов", "Дина Ахметова"]
+
+CATEGORIES = ["Жаңалықтар", "Қоғам", "Экономика", "Спорт", "Мәдениет", "Білім"]
+
+
+def synthetic_article(n, rng, base_url="https://aimaqaqshamy.kz", paragraphs=8, images=2):
+    """One article dict in the scraper's output schema"""
+    slug = f"synthetic-article-{n}"
+    url = f"{base_url}/{slug}/"
+    year = 2015 + n % 11
+    month = 1 + (n // 7) % 12
+    day = 1 + n % 28
+    published = f"{year}-{month:02d}-{day:02d}T04:57:53+00:00"
+    title = ' '.join(rng.choices(WORDS, k=6)).capitalize()
+    content = '\n\n'.join(
+        ' '.join(rng.choices(WORDS, k=rng.randint(25, 60))).capitalize() + '.'
+        for _ in range(paragraphs)
+    )
+
+    article_images = [{
+        'url': f"{base_url}/wp-content/uploads/{year}/{month:02d}/cover-{n}.jpg",
+        'local_path': f"scraped_data/images/{slug}_cover-{n}.jpg",
+        'alt': 'Thumbnail',
+        'is_thumbnail': True
+    }]
+    for i in range(images):
+        article_images.append({
+            'url': f"{base_url}/wp-content/uploads/{year}/{month:02d}/photo-{n}-{i}.jpg",
+            'local_path': f"scraped_data/images/{slug}_photo-{n}-{i}.jpg",
+            'alt': f"Фото {i}",
+            'width': '1125',
+            'height': '639'
+        })
+
+    return {
+        'url': url,
+        'scraped_at': '2025-12-03T10:30:00',
+        'title': title,
+        'date_published': published,
+        'date_modified': published,
+        'author': rng.choice(AUTHORS),
+        'category': CATEGORIES[n % len(CATEGORIES)],
+        'thumbnail_url': article_images[0]['url'],
+        'content': content,
+        'images': article_images
+    }
+
+
+def synthetic_articles(count, seed=0, **kwargs):
+    """Yield `count` deterministic synthetic articles"""
+    rng = random.Random(seed)
+    for n in range(count):
+        yield synthetic_article(n, rng, **kwargs)
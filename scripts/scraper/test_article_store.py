@@ -0,0 +1,50 @@
+"""
+Streaming NDJSON output (article_store.py)
+
+    pytest test_article_store.py
+"""
+
+import contextlib
+import io
+import json
+
+import pytest
+
+from article_store import NdjsonSink, drop_partial_line, iter_ndjson
+
+
+def article(n):
+    return {'url': f"https://aimaqaqshamy.kz/zhangalyq-{n}/", 'title': f"Жаңалық {n}"}
+
+
+def read(path):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return [item['url'] for item in iter_ndjson(path)]
+
+
+def test_a_run_after_a_crash_mid_write_appends_on_a_new_line(tmp_path):
+    path = str(tmp_path / 'articles.ndjson')
+    with NdjsonSink(path) as sink:
+        sink.write(article(1))
+    # The crash: half of article 2 and no newline
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(article(2), ensure_ascii=False)[:20])
+
+    with contextlib.redirect_stdout(io.StringIO()), NdjsonSink(path) as sink:
+        sink.write(article(3))
+
+    assert read(path) == [article(1)['url'], article(3)['url']]
+
+
+@pytest.mark.parametrize('content, kept', [
+    (b'', b''),
+    (b'{"a": 1}\n', b'{"a": 1}\n'),
+    (b'{"a": 1}\n{"b":', b'{"a": 1}\n'),
+    (b'{"b":', b''),
+])
+def test_drop_partial_line(tmp_path, content, kept):
+    path = tmp_path / 'articles.ndjson'
+    path.write_bytes(content)
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert drop_partial_line(str(path), chunk_size=4) == len(content) - len(kept)
+    assert path.read_bytes() == kept
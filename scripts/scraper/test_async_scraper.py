@@ -0,0 +1,59 @@
+"""
+The async engine against a stub site (stub_server.py): incremental mode and image writes
+
+    pytest test_async_scraper.py
+"""
+
+import contextlib
+import io
+import os
+import threading
+
+import pytest
+
+pytest.importorskip('aiohttp')
+
+import image_store
+from async_scraper import AsyncAimaqScraper
+from stub_server import StubServer, StubSite
+
+
+@pytest.fixture
+def server():
+    with StubServer(site=StubSite(pages=2, per_page=10)) as server:
+        yield server
+
+
+def scrape(server, output_dir, num_articles=20):
+    # discovery='auto' runs sitemap/REST discovery in a worker thread, which reads the crawl state
+    scraper = AsyncAimaqScraper(base_url=server.base_url, output_dir=output_dir, discovery='auto',
+                                state_file=os.path.join(output_dir, 'crawl_state.db'),
+                                page_delay=0, max_delay=1, per_host=8, rate=500.0)
+    with contextlib.redirect_stdout(io.StringIO()):
+        articles = scraper.scrape_articles(num_articles=num_articles)
+    return scraper, articles
+
+
+def test_second_run_on_the_same_state_skips_unchanged_articles(server, tmp_path):
+    scraper, articles = scrape(server, str(tmp_path))
+    assert len(articles) == 20
+    assert scraper.state.count() == 20
+
+    scraper, articles = scrape(server, str(tmp_path))
+    assert articles == []
+    assert scraper.unchanged > 0
+    assert scraper.state.count() == 20
+
+
+def test_image_writes_run_off_the_event_loop(server, tmp_path, monkeypatch):
+    threads = set()
+    for name in ('write', 'commit'):
+        def recorded(self, *args, method=getattr(image_store.PendingImage, name)):
+            threads.add(threading.current_thread())
+            return method(self, *args)
+        monkeypatch.setattr(image_store.PendingImage, name, recorded)
+
+    scraper, articles = scrape(server, str(tmp_path), num_articles=3)
+
+    assert articles and all(image.get('local_path') for article in articles for image in article['images'])
+    assert threads and threading.main_thread() not in threads
@@ -0,0 +1,164 @@
+"""
+cms_postgres.load_articles against a disposable PostgreSQL with the CMS schema
+
+The schema comes from the Prisma migrations in apps/api/prisma/migrations.
+The server is $TEST_POSTGRES_DSN if set, else one started with pgserver
+(pip install pgserver); without either the tests are skipped.
+
+    pytest test_cms_postgres.py
+"""
+
+import glob
+import os
+import uuid
+from datetime import datetime
+
+import pytest
+
+psycopg2 = pytest.importorskip('psycopg2')
+
+from cms_postgres import load_articles
+from import_to_db import ArticleImporter
+from near_duplicates import NearDuplicateIndex
+
+
+MIGRATIONS = os.path.join(os.path.dirname(__file__), '..', '..', 'apps', 'api', 'prisma', 'migrations')
+AUTHOR_ID = 'author-1'
+DEFAULT_CATEGORY_ID = 'category-news'
+
+
+@pytest.fixture(scope='session')
+def postgres_dsn(tmp_path_factory):
+    dsn = os.environ.get('TEST_POSTGRES_DSN')
+    if dsn:
+        yield dsn
+        return
+    pgserver = pytest.importorskip('pgserver', reason="set TEST_POSTGRES_DSN or pip install pgserver")
+    try:
+        server = pgserver.get_server(str(tmp_path_factory.mktemp('postgres')), cleanup_mode='stop')
+    except Exception as e:
+        pytest.skip(f"Could not start PostgreSQL: {e}")
+    yield server.get_uri()
+    server.cleanup()
+
+
+@pytest.fixture
+def connection(postgres_dsn):
+    """A connection to a fresh database with the CMS schema, one author and two categories"""
+    name = f"cms_test_{uuid.uuid4().hex[:12]}"
+    admin = psycopg2.connect(postgres_dsn)
+    admin.autocommit = True
+    admin.cursor().execute(f'CREATE DATABASE "{name}"')
+
+    connection = psycopg2.connect(postgres_dsn, dbname=name)
+    with connection, connection.cursor() as cursor:
+        for path in sorted(glob.glob(os.path.join(MIGRATIONS, '*', 'migration.sql'))):
+            with open(path, encoding='utf-8') as f:
+                cursor.execute(f.read())
+        cursor.execute("""
+            INSERT INTO users (id, email, password, "firstName", "lastName", "updatedAt")
+            VALUES (%s, 'editor@example.kz', '-', 'Editor', 'Test', CURRENT_TIMESTAMP)
+        """, (AUTHOR_ID,))
+        cursor.execute("""
+            INSERT INTO categories (id, slug, name_kz, name_ru, updated_at) VALUES
+            (%s, 'zhanalyqtar', 'Жаңалықтар', 'Новости', CURRENT_TIMESTAMP),
+            ('category-sport', 'sport', 'Спорт', 'Спорт', CURRENT_TIMESTAMP)
+        """, (DEFAULT_CATEGORY_ID,))
+    yield connection
+
+    connection.close()
+    admin.cursor().execute(f'DROP DATABASE "{name}"')
+    admin.close()
+
+
+def article(slug, title="Тақырып", **fields):
+    return {
+        'url': f"https://aimaqaqshamy.kz/{slug}/",
+        'title': title,
+        'content': "Бірінші абзац.\n\nЕкінші абзац.",
+        'date_published': '2024-05-01T10:00:00+05:00',
+        **fields,
+    }
+
+
+def load(connection, articles):
+    return load_articles(connection, articles, AUTHOR_ID, DEFAULT_CATEGORY_ID)
+
+
+def fetch(connection, slug):
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT title_kz, content_kz, status, published, published_at, author_id, category_id
+            FROM articles WHERE slug_kz = %s
+        """, (slug,))
+        row = cursor.fetchone()
+    connection.commit()
+    columns = ('title', 'content', 'status', 'published', 'published_at', 'author_id', 'category_id')
+    return dict(zip(columns, row)) if row else None
+
+
+def test_insert(connection):
+    stats = load(connection, [article('birinshi'), article('ekinshi', category_slug='sport'),
+                              article('', title="")])
+
+    assert stats == {'staged': 2, 'inserted': 2, 'updated': 0, 'skipped': 1}
+    row = fetch(connection, 'birinshi')
+    assert row['content'] == "<p>Бірінші абзац.</p><p>Екінші абзац.</p>"
+    assert row['status'] == 'PUBLISHED' and row['published'] and row['author_id'] == AUTHOR_ID
+    # Stored as UTC, like Prisma's DateTime
+    assert row['published_at'] == datetime(2024, 5, 1, 5, 0)
+    assert row['category_id'] == DEFAULT_CATEGORY_ID
+    assert fetch(connection, 'ekinshi')['category_id'] == 'category-sport'
+
+
+def test_reimport_updates_content_and_keeps_editorial_fields(connection):
+    load(connection, [article('birinshi', category_slug='sport')])
+    with connection, connection.cursor() as cursor:
+        cursor.execute("UPDATE articles SET status = 'ARCHIVED', category_id = %s WHERE slug_kz = 'birinshi'",
+                       (DEFAULT_CATEGORY_ID,))
+
+    stats = load(connection, [article('birinshi', title="Жаңа тақырып", date_published=None,
+                                      category_slug='sport')])
+
+    assert stats['inserted'] == 0 and stats['updated'] == 1
+    row = fetch(connection, 'birinshi')
+    assert row['title'] == "Жаңа тақырып"
+    assert row['status'] == 'ARCHIVED' and row['category_id'] == DEFAULT_CATEGORY_ID
+    # No date in the new copy: the stored one is kept
+    assert row['published_at'] == datetime(2024, 5, 1, 5, 0)
+
+
+def test_duplicate_slugs_in_one_load_keep_the_latest_by_time(connection):
+    # As strings '2024-05-01T10:00:00+05:00' sorts after '2024-05-01T06:00:00Z', but it is an hour earlier
+    stats = load(connection, [
+        article('qaytalanghan', title="Ертерек", date_published='2024-05-01T10:00:00+05:00'),
+        article('qaytalanghan', title="Кешірек", date_published='2024-05-01T06:00:00Z'),
+        article('qaytalanghan', title="Күнсіз", date_published=None),
+    ])
+
+    assert stats['staged'] == 3 and stats['inserted'] == 1
+    row = fetch(connection, 'qaytalanghan')
+    assert row['title'] == "Кешірек"
+    assert row['published_at'] == datetime(2024, 5, 1, 6, 0)
+
+
+def test_unknown_or_unsure_category_falls_back_to_the_default(connection):
+    load(connection, [
+        article('belgisiz', category_slug='no-such-category'),
+        article('senimsiz', category_slug='sport', category_fallback=True),
+    ])
+
+    assert fetch(connection, 'belgisiz')['category_id'] == DEFAULT_CATEGORY_ID
+    assert fetch(connection, 'senimsiz')['category_id'] == DEFAULT_CATEGORY_ID
+
+
+def test_importer_indexes_only_loaded_articles(connection, tmp_path):
+    content = ' '.join(f"сөз{i}" for i in range(60))
+    with NearDuplicateIndex(str(tmp_path / 'near_duplicates.db')) as index:
+        importer = ArticleImporter(duplicates=index)
+        stats = importer.import_to_cms_postgres(connection, AUTHOR_ID, DEFAULT_CATEGORY_ID, [
+            article('taqyrypsyz', title="", content=content),
+            article('birinshi', content=content + " басқа"),
+        ])
+        assert stats['inserted'] == 1 and stats['skipped'] == 1
+        assert len(index) == 1
@@ -0,0 +1,90 @@
+"""
+Resuming an interrupted crawl job (crawl_jobs.py, scrape_aimaq.py --resume), against a stub site
+
+    pytest test_crawl_jobs.py
+"""
+
+import contextlib
+import io
+import json
+import os
+
+import pytest
+
+from crawl_jobs import JobQueue
+from scrape_aimaq import AimaqScraper
+from stub_server import StubServer, StubSite
+
+
+@pytest.fixture
+def server():
+    with StubServer(site=StubSite(pages=1, per_page=6, images_per_article=1)) as server:
+        yield server
+
+
+def scraper(server, output_dir, **kwargs):
+    return AimaqScraper(base_url=server.base_url, output_dir=output_dir, discovery='html',
+                        page_delay=0, min_delay=0, max_delay=0, image_workers=1, **kwargs)
+
+
+def requests_by_kind(metrics):
+    _, counters = metrics.snapshot()
+    kinds = {}
+    for (name, labels), value in counters.items():
+        if name == 'scraper_requests_total':
+            kind = dict(labels)['kind']
+            kinds[kind] = kinds.get(kind, 0) + value
+    return kinds
+
+
+def test_an_interrupted_job_resumes_with_its_unfinished_and_failed_items(server, tmp_path):
+    first = scraper(server, str(tmp_path), job_name='nightly')
+    with contextlib.redirect_stdout(io.StringIO()):
+        links = first.get_article_links(6)
+    parse_article = first.parse_article
+
+    def flaky_parse(content, url):
+        # The second article fails to parse, and Ctrl-C comes while the fourth is in flight
+        if url == links[1]:
+            raise ValueError("broken page")
+        if url == links[3]:
+            raise KeyboardInterrupt
+        return parse_article(content, url)
+
+    first.parse_article = flaky_parse
+    with contextlib.redirect_stdout(io.StringIO()), pytest.raises(KeyboardInterrupt):
+        first.scrape_articles(num_articles=6)
+
+    jobs = JobQueue(first.job_db)
+    assert jobs.counts('nightly') == {'pending': 2, 'in_flight': 1, 'done': 2, 'failed': 1}
+    assert jobs.get('nightly')['finished_at'] is None
+
+    # A new process picks the job up: no discovery, only the items left
+    second = scraper(server, str(tmp_path))
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        articles = second.scrape_articles(resume='nightly')
+
+    assert "Resuming job nightly: 2 done, 4 to go (2 interrupted or failed)" in output.getvalue()
+    assert 'listing' not in requests_by_kind(second.metrics)
+    assert requests_by_kind(second.metrics)['article'] == 4
+    assert jobs.counts('nightly') == {'pending': 0, 'in_flight': 0, 'done': 6, 'failed': 0}
+    assert jobs.get('nightly')['finished_at'] is not None
+    attempts = dict(jobs.query("SELECT url, attempts FROM items WHERE job_id = 'nightly'"))
+    assert [attempts[link] for link in links] == [1, 2, 1, 2, 1, 1]
+
+    # articles.json holds the whole job, in queue order
+    assert [article['url'] for article in articles] == links
+    with open(os.path.join(tmp_path, 'articles.json'), encoding='utf-8') as f:
+        assert [article['url'] for article in json.load(f)] == links
+
+
+def test_resume_of_an_unknown_job_scrapes_nothing(server, tmp_path):
+    known = scraper(server, str(tmp_path))
+    known.jobs.create('elsewhere', base_url="https://example.kz")
+
+    for job_id, message in (('nope', "✗ No job nope in"), ('elsewhere', "✗ Job elsewhere crawls https://example.kz")):
+        resumed = scraper(server, str(tmp_path))
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            assert resumed.scrape_articles(resume=job_id) == []
+        assert message in output.getvalue()
+    assert server.requests == 0
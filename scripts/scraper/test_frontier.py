@@ -0,0 +1,113 @@
+"""
+The discovery-pass frontier and the Bloom-filter seen-set (frontier.py)
+
+    pytest test_frontier.py
+"""
+
+import contextlib
+import io
+import os
+
+import pytest
+
+from crawl_state import CrawlState
+from frontier import BloomFilter, Frontier, ScalableBloomFilter, SeenSet, key_hashes
+from site_profiles import SiteProfile
+
+
+def urls(n, start=0, prefix="https://aimaqaqshamy.kz/zhangalyq"):
+    return [f"{prefix}-{i}/" for i in range(start, start + n)]
+
+
+def false_positives(bloom, n=20000):
+    return sum(url in bloom for url in urls(n, prefix="https://aimaqaqshamy.kz/zhoq")) / n
+
+
+@pytest.fixture
+def state(tmp_path):
+    state = CrawlState(str(tmp_path / 'crawl_state.db'))
+    yield state
+    state.close()
+
+
+def test_frontier_keeps_each_article_once_in_discovery_order():
+    frontier = Frontier(SiteProfile(name='aimaq', base_url="https://aimaqaqshamy.kz"))
+    hrefs = ["/qogham/birinshi", "http://www.aimaqaqshamy.kz/qogham/birinshi/?utm_source=fb",
+             "/category/qogham/", "https://example.kz/qogham/", "/qogham/ekinshi/#comments", "http://[::1"]
+    added = [frontier.add(href) for href in hrefs]
+
+    assert added == ["https://aimaqaqshamy.kz/qogham/birinshi/", None, None, None,
+                     "https://aimaqaqshamy.kz/qogham/ekinshi/", None]
+    assert frontier.urls == ["https://aimaqaqshamy.kz/qogham/birinshi/", "https://aimaqaqshamy.kz/qogham/ekinshi/"]
+    assert "https://aimaqaqshamy.kz/qogham/ekinshi/" in frontier and len(frontier) == 2
+
+
+def test_bloom_filter_stays_within_its_error_rate():
+    bloom = BloomFilter(10000, 0.01)
+    for key in urls(10000):
+        bloom.add(key_hashes(key))
+    assert bloom.full
+
+    # No false negatives, and at its capacity about error_rate false positives
+    assert all(bloom.contains(key_hashes(key)) for key in urls(10000))
+    unseen = urls(20000, prefix="https://aimaqaqshamy.kz/zhoq")
+    assert sum(bloom.contains(key_hashes(key)) for key in unseen) / len(unseen) < 0.015
+
+
+def test_a_scalable_filter_grows_and_keeps_the_total_error_rate():
+    seen = ScalableBloomFilter(initial_capacity=1000, error_rate=0.01)
+    keys = urls(15000)
+    # A false positive is taken for a key already added, so a few are not counted
+    added = sum(seen.add(key) for key in keys)
+    assert added >= len(keys) * 0.99 and len(seen) == added
+    assert not seen.add(keys[0])
+
+    # Over 1000 + 2000 + 4000 keys need a fourth filter, each larger and stricter than the last
+    assert [bloom.capacity for bloom in seen.filters] == [1000, 2000, 4000, 8000]
+    rates = [bloom.error_rate for bloom in seen.filters]
+    assert rates == sorted(rates, reverse=True) and sum(rates) <= 0.01
+    assert all(key in seen for key in keys)
+    assert false_positives(seen) <= 0.01
+
+
+def test_a_saved_filter_loads_back_the_same(tmp_path):
+    seen = ScalableBloomFilter(initial_capacity=500, error_rate=0.01)
+    for key in urls(1200):
+        seen.add(key)
+    path = str(tmp_path / 'crawl_state.seen')
+    seen.save(path, state_urls=1200)
+
+    loaded, meta = ScalableBloomFilter.load(path)
+    assert meta == {'state_urls': 1200}
+    assert len(loaded) == len(seen) and len(loaded.filters) == len(seen.filters) == 2
+    assert [bloom.bits for bloom in loaded.filters] == [bloom.bits for bloom in seen.filters]
+    assert all(key in loaded for key in urls(1200))
+    assert not os.path.exists(path + '.tmp')
+
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) - 1)
+    with pytest.raises(ValueError, match='truncated'):
+        ScalableBloomFilter.load(path)
+    (tmp_path / 'other').write_bytes(b'not a filter')
+    with pytest.raises(ValueError):
+        ScalableBloomFilter.load(str(tmp_path / 'other'))
+
+
+def test_the_seen_set_is_rebuilt_when_it_misses_urls_of_the_state(state):
+    for url in urls(3):
+        state.record(url)
+    seen = SeenSet.for_state(state)
+    assert seen.path.endswith('crawl_state.seen')
+    assert len(seen) == 3 and all(url in seen for url in urls(3))
+    seen.save()
+
+    # A run killed before saving its seen-set
+    state.record(urls(1, start=3)[0])
+    with contextlib.redirect_stdout(io.StringIO()):
+        reloaded = SeenSet.for_state(state)
+    assert len(reloaded) == 4 and urls(1, start=3)[0] in reloaded
+
+    # A seen-set saved with the state loads as saved
+    reloaded.add("https://aimaqaqshamy.kz/tek-suzgide/")
+    reloaded.save()
+    assert "https://aimaqaqshamy.kz/tek-suzgide/" in SeenSet.for_state(state)
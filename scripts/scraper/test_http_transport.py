@@ -0,0 +1,136 @@
+"""
+HTTP transport (http_transport.py) against the stub server (stub_server.py)
+
+Retries, Retry-After and adaptive pacing run against injected faults
+(stub_server.Faults); backoff sleeps are recorded instead of slept, except
+where the server's own clock has to move on.
+
+    pytest test_http_transport.py
+"""
+
+import time
+import types
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+import requests
+
+import http_transport
+from http_transport import AdaptiveDelay, RetryingClient, RetryPolicy, parse_retry_after, pooled_session
+from scrape_metrics import Metrics, MeteredSession
+from stub_server import Faults, StubServer
+
+
+@pytest.fixture
+def server():
+    with StubServer() as server:
+        yield server
+
+
+def test_new_connections_are_timed_by_dns_and_connect(server):
+    metrics = Metrics()
+    session = pooled_session(metrics=metrics)
+    # localhost is resolved; the keep-alive connection is set up once
+    url = server.base_url.replace('127.0.0.1', 'localhost')
+    for _ in range(3):
+        assert session.get(url + '/').status_code == 200
+
+    samples, _ = metrics.snapshot()
+    assert len(samples[('scraper_dns_seconds', ())]) == 1
+    assert len(samples[('scraper_connect_seconds', ())]) == 1
+
+    with pytest.raises(requests.ConnectionError):
+        session.get('http://no-such-host.invalid/')
+    samples, _ = metrics.snapshot()
+    assert len(samples[('scraper_dns_seconds', ())]) == 2
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Seconds the client sleeps, recorded and (with sleeps.real) actually slept"""
+    recorded = types.SimpleNamespace(waits=[], real=False)
+
+    def sleep(seconds):
+        recorded.waits.append(seconds)
+        if recorded.real:
+            time.sleep(seconds)
+
+    monkeypatch.setattr(http_transport, 'time', types.SimpleNamespace(
+        monotonic=time.monotonic, perf_counter=time.perf_counter, sleep=sleep))
+    return recorded
+
+
+def client(policy=None, pacer=None):
+    metrics = Metrics()
+    return RetryingClient(MeteredSession(pooled_session(), metrics), policy or RetryPolicy(),
+                          pacer or AdaptiveDelay(initial=0, minimum=0, maximum=0))
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('120') == 120.0
+    in_a_minute = datetime.now(timezone.utc) + timedelta(seconds=60)
+    assert parse_retry_after(format_datetime(in_a_minute, usegmt=True)) == pytest.approx(60, abs=2)
+    assert parse_retry_after(format_datetime(in_a_minute - timedelta(hours=1), usegmt=True)) == 0.0
+    assert parse_retry_after('soon') is None and parse_retry_after(None) is None
+
+
+def test_backoff_grows_with_jitter_and_gives_up():
+    policy = RetryPolicy(retries=5, backoff=0.5, max_backoff=4.0, max_retry_after=60)
+    for attempt, cap in enumerate((0.5, 1.0, 2.0, 4.0, 4.0)):
+        delays = [policy.delay(attempt) for _ in range(200)]
+        # Equal jitter: half of the capped exponential is fixed, half random
+        assert cap / 2 <= min(delays) and max(delays) <= cap
+        assert max(delays) - min(delays) > cap / 4
+    assert policy.delay(5) is None
+    assert policy.delay(0, retry_after=30) == 30
+    assert policy.delay(0, retry_after=300) is None
+
+
+def test_503s_are_retried_with_growing_backoff(sleeps):
+    faults = Faults(error_rate=1.0)
+    with StubServer(faults=faults) as server:
+        response = client(RetryPolicy(retries=3, backoff=0.2)).get(server.base_url + '/')
+        assert server.requests == 4
+
+    assert response.status_code == 503
+    assert len(sleeps.waits) == 3
+    for wait, cap in zip(sleeps.waits, (0.2, 0.4, 0.8)):
+        assert cap / 2 <= wait <= cap
+
+
+def test_429_waits_for_retry_after_and_backs_the_pacer_off(sleeps):
+    sleeps.real = True
+    pacer = AdaptiveDelay(initial=0, minimum=0, maximum=10)
+    http = client(pacer=pacer)
+    # Over one request a second the server throttles, asking for a second's pause
+    with StubServer(faults=Faults(capacity=1, retry_after=1)) as server:
+        assert http.get(server.base_url + '/').status_code == 200
+        assert http.get(server.base_url + '/').status_code == 200
+        assert server.requests == 3
+
+    assert 1.0 in sleeps.waits
+    assert http.metrics.counter('scraper_retries_total', kind='other', reason='429') == 1
+    assert pacer.delay >= AdaptiveDelay.step
+
+
+def test_delay_follows_latency(sleeps):
+    pacer = AdaptiveDelay(initial=0.2, minimum=0.01, maximum=5)
+    http = client(pacer=pacer)
+    with StubServer() as server:
+        url = server.base_url + '/'
+        for _ in range(30):
+            http.get(url)
+        fast = pacer.delay
+        assert fast < 0.02
+
+        server.httpd.latency = 0.15
+        for _ in range(4):
+            http.get(url)
+        slow = pacer.delay
+        assert slow > fast
+
+        server.httpd.latency = 0
+        for _ in range(30):
+            http.get(url)
+        assert pacer.delay < slow
@@ -0,0 +1,180 @@
+"""
+ArticleImporter (import_to_db.py): near-duplicate checks and the summary fallback
+
+An article is kept in the near-duplicate index (near_duplicates.py) only once
+it is stored, so a copy of an article whose batch failed is imported later,
+not skipped.
+
+    pytest test_import_to_db.py
+"""
+
+import contextlib
+import io
+import json
+import random
+import sqlite3
+
+import pytest
+
+from import_to_db import ArticleImporter
+from near_duplicates import NearDuplicateIndex
+
+
+WORDS = ("облыс әкімі жаңа мектеп ауыл жол салу жұмысы басталды тұрғындар қуанышты бюджет "
+         "қаражат бөлінді құрылыс аяқталады келесі жылы маусым айында жоспар бойынша").split()
+
+
+def story(seed, words=120):
+    rng = random.Random(seed)
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def article(url, content, title=None):
+    return {'url': f"https://aimaqaqshamy.kz/{url}/", 'title': title or url, 'content': content}
+
+
+@pytest.fixture
+def importer(tmp_path):
+    with NearDuplicateIndex(str(tmp_path / 'near_duplicates.db')) as index:
+        yield ArticleImporter(duplicates=index)
+
+
+def quietly(function, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return function(*args, **kwargs)
+
+
+def imported_urls(connection):
+    return {url.rstrip('/').rsplit('/', 1)[-1] for url, in connection.execute("SELECT original_url FROM articles")}
+
+
+def test_copies_within_an_import_are_skipped(importer):
+    connection = sqlite3.connect(':memory:')
+    text = story(1)
+    stats = quietly(importer.import_to_sql_batched, connection, [
+        article('original', text),
+        article('copy', text + " Жаңартылды."),
+        article('other', story(2)),
+    ], batch_size=10)
+
+    assert stats['near_duplicates'] == 1
+    assert imported_urls(connection) == {'original', 'other'}
+
+
+def test_articles_of_a_rolled_back_batch_are_not_indexed(importer):
+    connection = sqlite3.connect(':memory:')
+    text = story(1)
+    # sqlite3 cannot bind a dict: the first batch fails and is rolled back
+    broken = article('broken', story(3), title={'not': 'a string'})
+
+    stats = quietly(importer.import_to_sql_batched, connection, [
+        article('original', text), broken,
+        article('repost', text + " Жаңартылды."), article('other', story(2)),
+    ], batch_size=2)
+
+    assert stats['failed_batches'] == 1
+    assert stats['near_duplicates'] == 0
+    assert imported_urls(connection) == {'repost', 'other'}
+    assert len(importer.duplicates) == 2
+
+
+def test_write_errors_of_a_mongodb_batch_are_not_indexed(importer):
+    mongomock = pytest.importorskip('mongomock')
+    pytest.importorskip('pymongo')
+    collection = mongomock.MongoClient().db.articles
+    # A second unique index makes one write of the batch fail
+    collection.create_index('title', unique=True)
+    collection.insert_one({'original_url': 'https://example.kz/old', 'title': 'taken'})
+    rejected, accepted = story(1), story(2)
+
+    stats = quietly(importer.import_to_mongodb_batched, collection, [
+        article('rejected', rejected, title='taken'), article('accepted', accepted),
+    ])
+    assert stats['write_errors'] == 1 and stats['upserted'] == 1
+
+    stats = quietly(importer.import_to_mongodb_batched, collection, [
+        article('rejected-repost', rejected + " Жаңартылды."),
+        article('accepted-repost', accepted + " Жаңартылды."),
+    ])
+    assert stats['near_duplicates'] == 1
+    assert collection.find_one({'original_url': article('rejected-repost', '')['url']})
+    assert not collection.find_one({'original_url': article('accepted-repost', '')['url']})
+
+
+def test_rollback_forgets_staged_signatures(tmp_path):
+    with NearDuplicateIndex(str(tmp_path / 'near_duplicates.db')) as index:
+        text = story(1)
+        assert index.check('a', text) is None
+        assert index.find(text, exclude='b') is not None
+        index.rollback()
+        assert index.find(text) is None
+        assert index.check('a', text) is None
+        index.commit()
+        assert index.find(text, exclude='b')[0] == 'a'
+
+
+def test_article_list_without_pyarrow_streams_the_file(tmp_path, monkeypatch):
+    import parquet_export
+    monkeypatch.setattr(parquet_export, 'pa', None)
+    path = tmp_path / 'articles.ndjson'
+    path.write_text(''.join(json.dumps(article(url, story(n))) + '\n' for n, url in enumerate(('a', 'b'))),
+                    encoding='utf-8')
+
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        ArticleImporter(str(path)).print_summary()
+
+    assert "Total articles: 2" in output.getvalue()
+    assert "\n2. b\n" in output.getvalue()
+
+
+
+def corpus(edited=False):
+    """Three articles with two images each; `edited` retitles b and swaps one of its images"""
+    articles = []
+    for name in ('a', 'b', 'c'):
+        images = [f"https://aimaqaqshamy.kz/img/{name}-{n}.jpg" for n in (1, 2)]
+        title = name
+        if edited and name == 'b':
+            images[1], title = "https://aimaqaqshamy.kz/img/b-new.jpg", "b edited"
+        articles.append({**article(name, story(ord(name)), title=title),
+                         'images': [{'url': url} for url in images]})
+    return articles
+
+
+def attached_images(connection):
+    """{(slug, title): sorted image URLs}, joined on article_images.article_id"""
+    images = {}
+    for url, title, image_url in connection.execute("""
+        SELECT articles.original_url, articles.title, article_images.image_url
+        FROM article_images JOIN articles ON articles.id = article_images.article_id
+    """):
+        images.setdefault((url.rstrip('/').rsplit('/', 1)[-1], title), []).append(image_url)
+    return {key: sorted(urls) for key, urls in images.items()}
+
+
+def test_batched_reimport_updates_articles_and_attaches_images_by_id():
+    connection = sqlite3.connect(':memory:')
+    importer = ArticleImporter()
+    quietly(importer.import_to_sql_batched, connection, corpus(), batch_size=2)
+    # Reversed, so the upserts come in another order than the ids were handed out
+    quietly(importer.import_to_sql_batched, connection, corpus(edited=True)[::-1], batch_size=2)
+
+    assert connection.execute("SELECT COUNT(*) FROM articles").fetchone()[0] == 3
+    assert connection.execute("SELECT COUNT(*) FROM article_images").fetchone()[0] == 6
+    assert attached_images(connection) == {
+        ('a', 'a'): ["https://aimaqaqshamy.kz/img/a-1.jpg", "https://aimaqaqshamy.kz/img/a-2.jpg"],
+        ('b', 'b edited'): ["https://aimaqaqshamy.kz/img/b-1.jpg", "https://aimaqaqshamy.kz/img/b-new.jpg"],
+        ('c', 'c'): ["https://aimaqaqshamy.kz/img/c-1.jpg", "https://aimaqaqshamy.kz/img/c-2.jpg"],
+    }
+
+
+def test_per_article_reimport_keeps_existing_articles_and_their_images():
+    connection = sqlite3.connect(':memory:')
+    importer = ArticleImporter()
+    quietly(importer.import_to_sql, connection, corpus())
+    before = attached_images(connection)
+    quietly(importer.import_to_sql, connection, corpus(edited=True)[::-1])
+
+    assert connection.execute("SELECT COUNT(*) FROM article_images").fetchone()[0] == 6
+    assert attached_images(connection) == before
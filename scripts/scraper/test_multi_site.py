@@ -0,0 +1,51 @@
+"""
+Several sites on one session (multi_site.py), against stub sites with different themes
+
+    pytest test_multi_site.py
+"""
+
+import contextlib
+import io
+
+import pytest
+
+pytest.importorskip('aiohttp')
+
+from multi_site import MultiSiteScraper
+from site_profiles import SiteProfile
+from stub_server import StubServer, StubSite
+
+
+@pytest.fixture
+def servers():
+    themed = StubSite(pages=1, per_page=4, images_per_article=1, post_class='news-card',
+                      content_class='news-text', article_tag='section')
+    with StubServer(site=StubSite(pages=1, per_page=4, images_per_article=1)) as default, \
+            StubServer(site=themed) as other:
+        yield default, other
+
+
+def profiles(servers):
+    default, other = servers
+    return [
+        SiteProfile(name='default', base_url=default.base_url, discovery='html'),
+        SiteProfile(name='themed', base_url=other.base_url, discovery='html', post_class='news-card',
+                    content_classes=('news-text',)),
+    ]
+
+
+@pytest.mark.parametrize('parse_workers', [0, 1])
+def test_every_site_is_parsed_with_its_profile_and_timed_on_its_own(servers, tmp_path, parse_workers):
+    runner = MultiSiteScraper(profiles(servers), output_dir=str(tmp_path), rate=500.0, page_delay=0,
+                              parse_workers=parse_workers)
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = runner.scrape_all(num_articles=4)
+
+    for name, articles in results.items():
+        assert len(articles) == 4 and all(article.get('content') for article in articles), name
+        samples, _ = runner.scrapers[name].metrics.snapshot()
+        # Connection timings go to the site that opened the connection
+        connects = len(samples[('scraper_connect_seconds', ())])
+        assert 1 <= connects <= runner.scrapers[name].per_host
+        if parse_workers:
+            assert samples[('scraper_parse_seconds', (('stage', 'article'),))]
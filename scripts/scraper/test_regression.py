@@ -0,0 +1,119 @@
+"""
+The offline regression suite (regression_suite.py) as pytest tests and benchmarks
+
+One test per recorded page and parser backend, one per recorded article and
+crawl engine (through the fixture server, with injected 503s and dropped
+connections), and pytest-benchmark benchmarks of parsing and crawling:
+
+    pytest test_regression.py --benchmark-skip          # correctness only
+    pytest test_regression.py --benchmark-only
+    pytest test_regression.py --benchmark-autosave --benchmark-compare   # against the last saved run
+"""
+
+import contextlib
+import io
+import os
+import tempfile
+
+import pytest
+
+from regression_suite import (FIXTURES, article_pages, available_backends, crawl, differences, extracted,
+                              listing_pages, load_expected, rebased)
+from scrape_aimaq import parse_article_html
+from stub_server import Faults, FixtureSite, StubServer
+
+try:
+    import pytest_benchmark
+except ImportError:
+    pytest_benchmark = None
+
+    @pytest.fixture
+    def benchmark():
+        pytest.skip("pytest-benchmark is not installed (pip install pytest-benchmark)")
+
+
+EXPECTED = load_expected(FIXTURES)
+BACKENDS = {backend.name: backend for backend in available_backends()}
+ARTICLES = dict(article_pages(FIXTURES))
+LISTINGS = dict(listing_pages(FIXTURES))
+ENGINES = ('sync', 'async')
+
+
+def parse(backend, slug):
+    base_url = EXPECTED['base_url']
+    with contextlib.redirect_stdout(io.StringIO()):
+        return parse_article_html(backend, ARTICLES[slug], f"{base_url}/{slug}/", base_url)
+
+
+def test_every_recorded_page_is_expected():
+    assert sorted(ARTICLES) == sorted(EXPECTED['articles'])
+    assert sorted(LISTINGS) == sorted(int(page) for page in EXPECTED['listing'])
+
+
+@pytest.mark.parametrize('slug', sorted(ARTICLES))
+@pytest.mark.parametrize('backend', sorted(BACKENDS))
+def test_article_extraction(backend, slug):
+    problems = differences(slug, EXPECTED['articles'][slug], extracted(parse(BACKENDS[backend], slug)))
+    assert not problems, '\n'.join(problems)
+
+
+@pytest.mark.parametrize('page', sorted(LISTINGS))
+@pytest.mark.parametrize('backend', sorted(BACKENDS))
+def test_listing_links(backend, page):
+    assert BACKENDS[backend].listing_links(LISTINGS[page]) == EXPECTED['listing'][str(page)]
+
+
+@pytest.fixture(scope='module')
+def crawled():
+    """Crawl results per engine: {engine: {slug: (expected fields, article)}}, each engine crawled once"""
+    results = {}
+
+    def crawled_by(engine):
+        if engine not in results:
+            site = FixtureSite(FIXTURES)
+            faults = Faults(error_rate=0.1, reset_rate=0.05, seed=1)
+            with StubServer(site=site, latency=0.01, faults=faults) as server, \
+                    tempfile.TemporaryDirectory() as tmp:
+                articles, _ = crawl(engine, server.base_url, tmp, site.num_articles)
+                # Checked while the images are still on disk
+                scraped = {article['url'].rstrip('/').rsplit('/', 1)[-1]: article for article in articles}
+                missing = {slug: [image['url'] for image in article.get('images', [])
+                                  if not (image.get('local_path') and os.path.exists(
+                                      os.path.join(tmp, image['local_path'])))]
+                           for slug, article in scraped.items()}
+                wanted = rebased(EXPECTED['articles'], EXPECTED['base_url'], server.base_url)
+            results[engine] = {slug: (wanted[slug], scraped.get(slug), missing.get(slug)) for slug in wanted}
+        return results[engine]
+
+    return crawled_by
+
+
+@pytest.mark.parametrize('slug', sorted(EXPECTED['articles']))
+@pytest.mark.parametrize('engine', ENGINES)
+def test_crawl_through_faults(crawled, engine, slug):
+    wanted, article, missing_images = crawled(engine)[slug]
+    assert article is not None, f"{slug} was not scraped"
+    problems = differences(slug, wanted, extracted(article))
+    assert not problems, '\n'.join(problems)
+    assert not missing_images, f"images not downloaded: {missing_images}"
+
+
+@pytest.mark.parametrize('backend', sorted(BACKENDS))
+def test_bench_parse(benchmark, backend):
+    """Parse and extract every recorded article page"""
+    benchmark.group = 'parse'
+    results = benchmark(lambda: [parse(BACKENDS[backend], slug) for slug in sorted(ARTICLES)])
+    assert len(results) == len(ARTICLES)
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_bench_crawl(benchmark, engine):
+    """A full crawl of the fixture corpus through the fixture server, no latency"""
+    benchmark.group = 'crawl'
+    site = FixtureSite(FIXTURES)
+    with StubServer(site=site) as server:
+        def run():
+            with tempfile.TemporaryDirectory() as tmp:
+                return crawl(engine, server.base_url, tmp, site.num_articles)[0]
+        articles = benchmark.pedantic(run, rounds=5, warmup_rounds=1)
+    assert len(articles) == site.num_articles
@@ -0,0 +1,124 @@
+"""
+The revisit daemon's request budget and link discovery (revisit_scheduler.py), against a stub site
+
+    pytest test_revisit_scheduler.py
+"""
+
+import contextlib
+import io
+import os
+import time
+import types
+
+import pytest
+
+import http_transport
+from revisit_scheduler import MINUTE, RequestBudget, RevisitDaemon
+from scrape_aimaq import AimaqScraper
+from stub_server import StubServer, StubSite
+
+
+class FakeClock:
+    """Simulated time: sleeping advances it at once"""
+
+    def __init__(self):
+        self.now = time.time()
+        self.slept = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+        self.slept += seconds
+
+
+class Sink(list):
+    write = list.append
+
+
+@pytest.fixture
+def server():
+    with StubServer(site=StubSite(pages=2, per_page=10, images_per_article=2)) as server:
+        yield server
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # The client sleeps out budget waits through http_transport.time
+    clock = FakeClock()
+    monkeypatch.setattr(http_transport, 'time', types.SimpleNamespace(
+        monotonic=time.monotonic, perf_counter=time.perf_counter, sleep=clock.sleep))
+    return clock
+
+
+def daemon(server, output_dir, budget=30, discovery='html', clock=None):
+    scraper = AimaqScraper(base_url=server.base_url, output_dir=output_dir, discovery=discovery,
+                           state_file=os.path.join(output_dir, 'crawl_state.db'), output_format='ndjson',
+                           page_delay=0, min_delay=0, max_delay=0, image_workers=1)
+    daemon = RevisitDaemon(scraper, budget=budget, listing_articles=5)
+    if clock:
+        daemon.scheduler.clock = daemon.scheduler.budget.clock = clock
+    daemon.sink = Sink()
+    return daemon
+
+
+def requests_by_kind(metrics):
+    _, counters = metrics.snapshot()
+    kinds = {}
+    for (name, labels), value in counters.items():
+        if name == 'scraper_requests_total':
+            kind = dict(labels)['kind']
+            kinds[kind] = kinds.get(kind, 0) + value
+    return kinds
+
+
+def busiest_minute(times):
+    times = sorted(times)
+    return max(sum(start <= t < start + MINUTE for t in times) for start in times)
+
+
+def test_budget_reserves_slots_before_requests_are_sent():
+    budget = RequestBudget(3, clock=lambda: 0.0)
+    assert [budget.reserve(now=0.0) for _ in range(5)] == [0.0, 0.0, 0.0, MINUTE, MINUTE]
+    # A reservation never goes ahead of one already handed out
+    assert budget.reserve(now=10.0) == MINUTE - 10.0
+    assert budget.available_at(now=10.0) == 2 * MINUTE
+    assert budget.available_at(now=5 * MINUTE) == 5 * MINUTE
+
+
+def test_every_request_of_a_task_waits_for_the_budget(server, tmp_path, clock):
+    # An article with two images is three requests: with a budget of 2 a task has to wait mid-way
+    revisits = daemon(server, str(tmp_path), budget=2, clock=clock)
+    budget = revisits.scheduler.budget
+    slots = []
+
+    def reserve(reserve=budget.reserve):
+        # Image downloads reserve from a worker thread, so `now` is taken once
+        now = clock()
+        wait = reserve(now)
+        slots.append(now + wait)
+        return wait
+
+    budget.reserve = reserve
+    with contextlib.redirect_stdout(io.StringIO()), revisits.scraper.image_processor:
+        revisits.check_listing()
+        for _ in range(3):
+            _, kind, entry = revisits.scheduler.next()
+            revisits.scheduler.pop()
+            revisits.revisit(entry)
+
+    assert len(revisits.sink) == 3
+    assert server.requests == len(slots) == revisits.scraper.metrics.total('scraper_requests_total')
+    assert busiest_minute(slots) <= 2
+    assert clock.slept >= (server.requests // 2 - 1) * MINUTE
+
+
+def test_listing_check_uses_the_configured_discovery(server, tmp_path):
+    revisits = daemon(server, str(tmp_path), discovery='sitemap')
+    with contextlib.redirect_stdout(io.StringIO()):
+        revisits.check_listing()
+
+    assert len(revisits.scheduler) == 5
+    kinds = requests_by_kind(revisits.scraper.metrics)
+    assert kinds.get('discovery') and not kinds.get('listing')
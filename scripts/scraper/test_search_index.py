@@ -0,0 +1,102 @@
+"""
+Stemming, matching and incremental updates of the search index (search_index.py)
+
+    pytest test_search_index.py
+"""
+
+import json
+
+import pytest
+
+from search_index import SearchIndex, match_expression, stem
+
+
+@pytest.fixture
+def index(tmp_path):
+    with SearchIndex(str(tmp_path / 'search.db')) as index:
+        yield index
+
+
+def article(slug, title, content, **fields):
+    return {'url': f"https://aimaqaqshamy.kz/{slug}/", 'title': title, 'content': content, **fields}
+
+
+def found(index, query):
+    return sorted(hit['url'].rstrip('/').rsplit('/', 1)[-1] for hit in index.search(query))
+
+
+@pytest.mark.parametrize('forms', [
+    ['облыс', 'облысы', 'облысқа', 'облыстың', 'облыстар', 'облыстардың', 'облыстарға', 'облыстан'],
+    ['мектеп', 'мектепке', 'мектептің', 'мектептер', 'мектептерде', 'мектептен', 'мектеппен'],
+    ['учитель', 'учителя', 'учителей', 'учителям', 'учителями'],
+    ['школа', 'школы', 'школе', 'школой', 'школами', 'школах'],
+])
+def test_the_stem_of_any_form_is_a_prefix_of_every_form(forms):
+    # Stems are matched as prefixes, so any form finds all the others
+    for form in forms:
+        assert all(other.startswith(stem(form)) for other in forms), (form, stem(form))
+
+
+def test_short_words_keep_their_stem():
+    assert stem('ата') == 'ата' and stem('мен') == 'мен'
+    assert stem('облыстардың') == 'облыс'
+
+
+def test_match_expression():
+    assert match_expression('"Мектеп жөндеу" облысқа ёлка') == '"мектеп жөндеу" AND "облыс"* AND "елка"*'
+    assert match_expression('  ') == ''
+
+
+def test_a_query_finds_other_forms_of_its_words(index):
+    index.update([
+        article('oblys', "Облыстың жаңалықтары", "Облыс әкімдігі мектептерді жөндеуге қаражат бөлді."),
+        article('uchitel', "Учителей наградили", "В школе чествовали учителя года."),
+        article('basqa', "Ауа райы", "Ертең жаңбыр жауады."),
+    ])
+
+    assert found(index, 'облысқа') == ['oblys']
+    assert found(index, 'мектеп') == ['oblys']
+    assert found(index, 'учитель школы') == ['uchitel']
+    # Phrases are exact
+    assert found(index, '"облыс әкімдігі"') == ['oblys']
+    assert found(index, '"әкімдігі облыс"') == []
+    hit, = index.search('облыстар')
+    assert '[Облыс]' in hit['snippet']
+
+
+def test_an_edited_article_is_reindexed(index):
+    assert index.update([article('zhanalyq', "Жол жөндеу", "Көшелер жөнделді.")])['added'] == 1
+
+    stats = index.update([article('zhanalyq', "Жол жөндеу", "Көшелер жөнделді."),
+                          article('zhanalyq', "Көпір салу", "Өзен үстінен көпір салынды.")])
+
+    assert (stats['unchanged'], stats['updated'], stats['added']) == (1, 1, 0)
+    assert len(index) == 1
+    assert found(index, 'көпірлер') == ['zhanalyq'] and found(index, 'көшелер') == []
+    assert index.search('көпір')[0]['title'] == "Көпір салу"
+
+
+def test_ndjson_updates_read_only_the_lines_added_since(index, tmp_path):
+    path = tmp_path / 'articles.ndjson'
+
+    def append(*articles):
+        with open(path, 'a', encoding='utf-8') as f:
+            for item in articles:
+                f.write(json.dumps(item, ensure_ascii=False) + '\n')
+
+    append(article('birinshi', "Бірінші", "Астық жинау басталды."), article('ekinshi', "Екінші", "Жаңа саябақ."))
+    assert index.update_from_file(str(path))['added'] == 2
+
+    # A later run rescrapes an edited article and appends it, with a line still being written
+    append(article('birinshi', "Бірінші", "Астық жинау аяқталды."))
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"url": "https://aimaqaqshamy.kz/ush')
+    stats = index.update_from_file(str(path))
+    assert (stats['updated'], stats['added'], stats['unchanged']) == (1, 0, 0)
+    assert found(index, 'аяқталды') == ['birinshi'] and found(index, 'басталды') == []
+
+    # A file replaced by a shorter one is read again from the start
+    path.write_text('')
+    append(article('ekinshi', "Екінші", "Жаңа саябақ ашылды."))
+    stats = index.update_from_file(str(path))
+    assert stats['updated'] == 1 and found(index, 'саябақтар') == ['ekinshi']
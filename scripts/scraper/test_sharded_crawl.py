@@ -0,0 +1,117 @@
+"""
+Leases of the sharded crawl (sharded_crawl.py), on SQLite and on Redis
+
+Every test runs two stores on one backend, standing in for two nodes: two
+connections to one SQLite file, or two clients of one fakeredis server
+(pip install "fakeredis[lua]"; the Redis tests are skipped without it).
+
+    pytest test_sharded_crawl.py
+"""
+
+import contextlib
+import io
+import json
+import threading
+import time
+
+import pytest
+
+from sharded_crawl import RedisLeaseStore, ShardWorker, SqliteLeaseStore, merge
+from site_profiles import SiteProfile
+from stub_server import StubServer, StubSite
+
+
+CRAWL = 'test'
+
+
+@pytest.fixture(params=['sqlite', 'redis'])
+def stores(request, tmp_path):
+    """Two stores sharing one backend"""
+    if request.param == 'sqlite':
+        path = str(tmp_path / 'shards.db')
+        stores = [SqliteLeaseStore(path), SqliteLeaseStore(path)]
+    else:
+        fakeredis = pytest.importorskip('fakeredis')
+        # The scripts need Lua
+        pytest.importorskip('lupa')
+        server = fakeredis.FakeServer()
+        stores = [RedisLeaseStore(fakeredis.FakeRedis(server=server)) for _ in range(2)]
+    yield stores
+    for store in stores:
+        store.close()
+
+
+def seed(store, batches):
+    assert store.begin_seed(CRAWL, 'seeder', 10) == 'seed'
+    assert store.seed(CRAWL, 'seeder', [('site', urls) for urls in batches], {})
+
+
+def test_two_stores_never_claim_the_same_batch(stores):
+    seed(stores[0], [[f"https://example.kz/{i}/"] for i in range(40)])
+    claimed = {0: [], 1: []}
+
+    def claim_all(n):
+        while (batch := stores[n].claim(CRAWL, f"worker-{n}", ttl=30)) is not None:
+            claimed[n].append(batch.id)
+
+    threads = [threading.Thread(target=claim_all, args=(n,)) for n in claimed]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    ids = claimed[0] + claimed[1]
+    assert len(ids) == len(set(ids)) == 40
+    assert stores[0].counts(CRAWL)['leased'] == 40
+
+
+def test_an_expired_lease_is_reclaimed_and_its_old_holder_shut_out(stores):
+    first, second = stores
+    seed(first, [["https://example.kz/1/"]])
+
+    batch = first.claim(CRAWL, 'dead', ttl=0.3)
+    assert batch.attempts == 1
+    assert second.claim(CRAWL, 'alive', ttl=30) is None
+    assert not second.renew(CRAWL, batch.id, 'alive', 30)
+
+    time.sleep(0.5)
+    assert first.counts(CRAWL)['pending'] == 1
+    reclaimed = second.claim(CRAWL, 'alive', ttl=30)
+    assert (reclaimed.id, reclaimed.attempts) == (batch.id, 2)
+
+    # The worker that lost the lease can neither keep it nor store its results
+    assert not first.renew(CRAWL, batch.id, 'dead', 30)
+    assert not first.complete(CRAWL, batch.id, 'dead', [("https://example.kz/1/", {'title': "stale"}, None)])
+    assert second.complete(CRAWL, batch.id, 'alive', [("https://example.kz/1/", {'title': "fresh"}, None)])
+    assert list(first.results(CRAWL)) == [{'title': "fresh"}]
+    counts = first.counts(CRAWL)
+    assert (counts['done'], counts['reclaimed'], counts['articles']) == (1, 1, 1)
+
+
+def test_send_slots_are_shared(stores):
+    first, second = stores
+    assert first.reserve('example.kz', 0.5) == pytest.approx(0.0, abs=0.05)
+    assert second.reserve('example.kz', 0.5) == pytest.approx(0.5, abs=0.05)
+    assert first.reserve('other.kz', 0.5) == pytest.approx(0.0, abs=0.05)
+
+
+def test_a_dead_workers_batch_is_finished_by_another(stores, tmp_path):
+    first, second = stores
+    with StubServer(site=StubSite(pages=1, per_page=6, images_per_article=1)) as server:
+        profiles = [SiteProfile(name='stub', base_url=server.base_url, discovery='html')]
+        options = dict(output_dir=str(tmp_path), lease=0.5, rate=1000, batch_size=2, poll=0.1,
+                       page_delay=0, min_delay=0)
+        # The first worker seeds the crawl, claims a batch and dies without renewing it
+        with contextlib.redirect_stdout(io.StringIO()):
+            ShardWorker(first, CRAWL, profiles, worker_id='dead', **options).wait_until_seeded(6)
+        assert first.claim(CRAWL, 'dead', ttl=0.5) is not None
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            stats = ShardWorker(second, CRAWL, profiles, worker_id='alive', **options).run()
+
+    assert stats['batches'] == 3 and stats['reclaimed'] == 1
+    output = str(tmp_path / 'merged.ndjson')
+    assert merge(first, CRAWL, output) == 6
+    with open(output, encoding='utf-8') as f:
+        urls = [json.loads(line)['url'] for line in f]
+    assert len(set(urls)) == 6
@@ -0,0 +1,51 @@
+"""
+Incremental static-site export (static_export.py)
+
+    pytest test_static_export.py
+"""
+
+import json
+import os
+
+from static_export import StaticExporter
+
+
+def article(slug, title=None, date='2024-05-01T10:00:00+05:00'):
+    return {'url': f"https://aimaqaqshamy.kz/{slug}/", 'title': title or slug, 'date_published': date,
+            'content': "Мәтін."}
+
+
+def export(output_dir, articles, **kwargs):
+    return StaticExporter(str(output_dir), workers=1).export(articles, **kwargs)
+
+
+def listed(output_dir):
+    with open(os.path.join(output_dir, 'pages', '1.json'), encoding='utf-8') as f:
+        return sorted(entry['slug'] for entry in json.load(f)['articles'])
+
+
+def test_an_incremental_export_keeps_earlier_articles(tmp_path):
+    export(tmp_path, [article('birinshi'), article('ekinshi')])
+
+    # The JSON output of an incremental scrape holds only that run's articles
+    stats = export(tmp_path, [article('ushinshi'), article('birinshi', title="Жаңартылды")])
+
+    assert stats['kept'] == 1 and stats['removed'] == 0 and stats['articles'] == 3
+    assert listed(tmp_path) == ['birinshi', 'ekinshi', 'ushinshi']
+    assert os.path.exists(tmp_path / 'ekinshi.json')
+    with open(tmp_path / 'birinshi.json', encoding='utf-8') as f:
+        assert json.load(f)['title'] == "Жаңартылды"
+
+    # Kept articles are carried over again by the next export
+    export(tmp_path, [article('tortinshi')])
+    assert listed(tmp_path) == ['birinshi', 'ekinshi', 'tortinshi', 'ushinshi']
+
+
+def test_prune_removes_articles_missing_from_the_archive(tmp_path):
+    export(tmp_path, [article('birinshi'), article('ekinshi')], prune=True)
+
+    stats = export(tmp_path, [article('ekinshi')], prune=True)
+
+    assert stats['removed'] == 1 and stats['kept'] == 0
+    assert not os.path.exists(tmp_path / 'birinshi.json')
+    assert listed(tmp_path) == ['ekinshi']
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+URL canonicalization: one spelling per article URL
+
+Listing pages, sitemaps, the REST API and shared links spell the same
+article in different ways: http or https, with or without www., with or
+without the trailing slash, with utm_* and other tracking parameters, with
+%D0%B0, %d0%b0 or a raw Cyrillic letter, with a #fragment. canonical_url()
+reduces them to one form, so a duplicate is caught before it is fetched and
+crawl state keys stay stable:
+
+    canonical_url('HTTP://www.Aimaqaqshamy.kz/qogham?utm_source=fb&p=1#top', 'https://aimaqaqshamy.kz')
+    -> 'https://aimaqaqshamy.kz/qogham/?p=1'
+
+The rules, for http(s) URLs (anything else is returned as it is):
+- relative links are resolved against the base URL; scheme and host are
+  lower-cased, the default port, user info and the fragment dropped
+- a link to the base URL's host, with or without www., gets the base URL's
+  scheme and host, and (trailing_slash) a slash after a path without a file
+  extension, as WordPress permalinks have
+- percent escapes of unreserved characters are decoded, the others written
+  in lower case (as WordPress writes its slugs, so existing crawl state keys
+  keep their spelling), and characters that need escaping are escaped
+- tracking parameters are dropped and the remaining ones sorted
+
+    python url_canon.py 'http://www.aimaqaqshamy.kz/zhanalyq?utm_medium=social'
+"""
+
+import argparse
+import re
+from functools import lru_cache
+from urllib.parse import parse_qsl, quote, urlencode, urljoin, urlsplit, urlunsplit
+
+
+# Query parameters that only say where a click came from
+TRACKING_PARAMS = frozenset({
+    'fbclid', 'gclid', 'dclid', 'gbraid', 'wbraid', 'msclkid', 'yclid', 'ysclid', 'igshid',
+    'mc_cid', 'mc_eid', '_ga', '_gl', '_hsenc', '_hsmi', 'ref_src',
+})
+TRACKING_PREFIXES = ('utm_',)
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+UNRESERVED = frozenset('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~')
+ESCAPE = re.compile(r'%[0-9A-Fa-f]{2}')
+# Left as they are: RFC 3986 sub-delimiters, ':', '@', '/' and the '%' of existing escapes
+PATH_SAFE = "/%:@!$&'()*+,;=-._~"
+
+
+# '%41' -> 'A', '%D0' -> '%d0', for every spelling of every escape
+ESCAPES = {
+    f'%{code:02{case}}': chr(code) if chr(code) in UNRESERVED else f'%{code:02x}'
+    for code in range(256) for case in 'xX'
+}
+
+
+def normalize_escapes(text, safe=PATH_SAFE):
+    """Escape what needs it, decode escaped unreserved characters, lower-case the other escapes"""
+    text = quote(text, safe=safe)
+    if '%' not in text:
+        return text
+    return ESCAPE.sub(lambda match: ESCAPES.get(match.group().lower(), match.group()), text)
+
+
+def is_tracking(name):
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def canonical_query(query):
+    pairs = [(name, value) for name, value in parse_qsl(query, keep_blank_values=True) if not is_tracking(name)]
+    return normalize_escapes(urlencode(sorted(pairs)), safe="=&+%-._~")
+
+
+def strip_www(host):
+    return host[4:] if host.startswith('www.') else host
+
+
+@lru_cache(maxsize=64)
+def site_of(base_url):
+    """(scheme, netloc, host without www., non-default port) of a base URL"""
+    base = urlsplit(base_url)
+    scheme = base.scheme.lower()
+    port = base.port if base.port != DEFAULT_PORTS.get(scheme) else None
+    return scheme, base.netloc.lower(), strip_www((base.hostname or '').rstrip('.')), port
+
+
+# Cached: listing pages link the same articles and sections over and over
+@lru_cache(maxsize=4096)
+def canonical_url(url, base_url=None, trailing_slash=True):
+    """
+    The canonical spelling of `url` (see the module docstring); raises ValueError if it cannot be parsed
+
+    Without base_url, only site-independent rules apply.
+    """
+    url = url.strip()
+    if base_url:
+        url = urljoin(base_url, url)
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS:
+        return url
+
+    host = (parts.hostname or '').rstrip('.')
+    port = parts.port if parts.port != DEFAULT_PORTS[scheme] else None
+    netloc = f"[{host}]" if ':' in host else host
+    if port:
+        netloc += f":{port}"
+    path = normalize_escapes(parts.path) or '/'
+
+    if base_url:
+        base_scheme, base_netloc, base_host, base_port = site_of(base_url)
+        if base_host and strip_www(host) == base_host and port == base_port:
+            scheme, netloc = base_scheme, base_netloc
+            if trailing_slash and not path.endswith('/') and '.' not in path.rsplit('/', 1)[-1]:
+                path += '/'
+
+    query = canonical_query(parts.query) if parts.query else ''
+    return urlunsplit((scheme, netloc, path, query, ''))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print the canonical form of URLs")
+    parser.add_argument('urls', nargs='+')
+    parser.add_argument('--base-url', default="https://aimaqaqshamy.kz")
+    args = parser.parse_args()
+    for url in args.urls:
+        print(canonical_url(url, args.base_url))
+
+
+if __name__ == "__main__":
+    main()